@@ -0,0 +1,74 @@
+"""Screen deltas: bytes sent and encode/decode time per frame.
+
+The capture is fed to a Screen in ``--chunk`` pieces, and one frame is taken
+after every ``--per-frame`` chunks, as a frame-rate-capped viewer would.
+Sizes are compared with the raw output over the same span and with sending a
+keyframe (the full screen) every time.  The mirror is checked against the
+screen at the end.
+
+    python benchmarks/bench_delta.py [--chunk 4096] [--per-frame 4] [--capture FILE ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.delta import ScreenMirror, ScreenSnapshot, encode_delta
+from aioconpty.screen import Screen
+from captures import CAPTURES, chunked, load_capture
+
+
+def bench(name: str, data: bytes, chunk_size: int, per_frame: int, cols: int, rows: int):
+    chunks = chunked(data, chunk_size)
+    screen = Screen(cols, rows)
+    mirror = ScreenMirror()
+    last = None
+    frames = delta_bytes = key_bytes = 0
+    t_encode = t_decode = 0.0
+    for i, chunk in enumerate(chunks, 1):
+        screen.feed(chunk)
+        if i % per_frame and i != len(chunks):
+            continue
+        t0 = time.perf_counter()
+        snap = ScreenSnapshot(screen)
+        frame = encode_delta(last, snap)
+        t1 = time.perf_counter()
+        key_bytes += len(encode_delta(None, snap))
+        if frame is None:
+            continue
+        t2 = time.perf_counter()
+        mirror.apply(frame)
+        t3 = time.perf_counter()
+        t_encode += t1 - t0
+        t_decode += t3 - t2
+        last = snap
+        frames += 1
+        delta_bytes += len(frame)
+    assert mirror.display == screen.display, "mirror does not match the screen"
+    print(f"{name:<12} raw={len(data) / 1e3:9.1f} kB  keyframes={key_bytes / 1e3:9.1f} kB  "
+          f"deltas={delta_bytes / 1e3:8.1f} kB  frames={frames:5d}  "
+          f"avg={delta_bytes / max(frames, 1):7.0f} B  "
+          f"encode={t_encode / max(frames, 1) * 1e6:6.0f} us  decode={t_decode / max(frames, 1) * 1e6:6.0f} us")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--per-frame", type=int, default=4, help="chunks between frames")
+    ap.add_argument("--cols", type=int, default=120)
+    ap.add_argument("--rows", type=int, default=30)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    for name, make in CAPTURES.items():
+        bench(name, make(), args.chunk, args.per_frame, args.cols, args.rows)
+    for path in args.capture:
+        bench(os.path.basename(path), load_capture(path), args.chunk, args.per_frame,
+              args.cols, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Exit watching: wake-up latency, loop lag and poll() cost with many children.
+
+Spawns N children, one per session, that each sleep ``--sleep`` seconds, then
+has ``--waiters`` tasks await every child.  Reported per N: time from the
+children's exit to the last wait() returning, the event loop lag (lateness of
+a 1 ms ticker, p99 and max) while waiting, and poll() cost on a live child.
+
+    python benchmarks/bench_exitwatch.py [--children 10,100,500] [--waiters 2]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+
+TICK = 0.001
+
+
+def _cmd(sleep: float):
+    if sys.platform == "win32":
+        return ["powershell", "-NoProfile", "-Command", f"Start-Sleep -Milliseconds {int(sleep * 1000)}"]
+    return ["sleep", str(sleep)]
+
+
+async def _ticker(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - t - TICK)
+
+
+async def _run(n: int, waiters: int, sleep: float):
+    # 1 セッション 1 プロセス（POSIX の pty は同時に 1 セッションの制御端末にしかなれない）
+    ptys = [AsyncConPTY(80, 24) for _ in range(n)]
+    await asyncio.gather(*(p.open() for p in ptys))
+    try:
+        t_spawn = time.perf_counter()
+        procs = [await pty.spawn(_cmd(sleep)) for pty in ptys]
+        t_spawned = time.perf_counter()
+
+        t0 = time.perf_counter()
+        for _ in range(10000):
+            procs[-1].poll()
+        t_poll = (time.perf_counter() - t0) / 10000
+
+        lags, stop = [], asyncio.Event()
+        ticker = asyncio.create_task(_ticker(lags, stop))
+        await asyncio.gather(*(p.wait() for p in procs for _ in range(waiters)))
+        t_done = time.perf_counter()
+        stop.set()
+        await ticker
+        for p in procs:
+            p.close_handle()
+    finally:
+        await asyncio.gather(*(p.close() for p in ptys))
+    # 最後の子は t_spawned + sleep 以降に終了する
+    latency = t_done - (t_spawned + sleep)
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return t_spawned - t_spawn, latency, p99, lags[-1] if lags else 0.0, t_poll
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--children", default="10,100,500")
+    ap.add_argument("--waiters", type=int, default=2)
+    ap.add_argument("--sleep", type=float, default=0.5)
+    args = ap.parse_args()
+
+    for n in (int(x) for x in args.children.split(",")):
+        spawn, latency, p99, worst, t_poll = asyncio.run(_run(n, args.waiters, args.sleep))
+        print(f"{n:5d} children  spawn {spawn * 1000:8.1f} ms  last exit -> wake {latency * 1000:7.2f} ms  "
+              f"loop lag p99 {p99 * 1000:6.2f} ms  max {worst * 1000:6.2f} ms  poll() {t_poll * 1e9:6.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Expecter versus the naive accumulate-and-search readline loop.
+
+Feeds a chatty stream (CSI-decorated output lines) followed by a prompt that is
+not newline terminated, and measures the time until the prompt is found.
+
+    python benchmarks/bench_expect.py [--mb 4] [--chunk 4096]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.expect import Expecter
+from captures import ping_capture
+
+PROMPT = re.compile(rb"C:\\[^>\r\n]*>$")
+
+
+def make_reader(chunks):
+    reader = asyncio.StreamReader(limit=1 << 30)
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+async def naive(chunks):
+    reader = make_reader(chunks)
+    buf = b""
+    while True:
+        data = await reader.read(4096)
+        if not data:
+            raise EOFError
+        buf += data
+        m = PROMPT.search(buf)
+        if m:
+            return m
+
+
+async def naive_readline(chunks):
+    # readline() ではプロンプト（改行なし）を検出できないため、最後の 1 行を別途探す
+    reader = make_reader(chunks)
+    buf = b""
+    while True:
+        line = await reader.readline()
+        if not line:
+            m = PROMPT.search(buf)
+            return m
+        buf += line
+        PROMPT.search(buf)
+
+
+async def incremental(chunks):
+    reader = make_reader(chunks)
+    exp = Expecter(reader.read, searchwindowsize=256)
+    m = await exp.expect([b"Request timed out", PROMPT])
+    return m, exp.bytes_scanned
+
+
+def timed(fn, chunks):
+    t0 = time.perf_counter()
+    result = asyncio.run(fn(chunks))
+    return time.perf_counter() - t0, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=float, default=2.0)
+    ap.add_argument("--chunk", type=int, default=4096)
+    args = ap.parse_args()
+
+    body = ping_capture(1000)
+    reps = max(1, int(args.mb * 1e6 / len(body)))
+    data = body * reps + b"\r\nC:\\Users\\build>"
+    chunks = [data[i:i + args.chunk] for i in range(0, len(data), args.chunk)]
+    mb = len(data) / 1e6
+
+    t_inc, (m, scanned) = timed(incremental, chunks)
+    assert m.after.endswith(b">")
+    print(f"expect()          {mb:6.2f} MB  {t_inc * 1000:9.1f} ms  {mb / t_inc:8.1f} MB/s  "
+          f"scanned {scanned / len(data):.2f}x per pattern set")
+    t_naive, m = timed(naive, chunks)
+    assert m is not None
+    print(f"naive read+search {mb:6.2f} MB  {t_naive * 1000:9.1f} ms  {mb / t_naive:8.1f} MB/s")
+    t_line, m = timed(naive_readline, chunks)
+    print(f"naive readline    {mb:6.2f} MB  {t_line * 1000:9.1f} ms  {mb / t_line:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
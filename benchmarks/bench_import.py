@@ -0,0 +1,74 @@
+"""Cold import time of aioconpty.
+
+Each run is a fresh interpreter.  The wall-clock time of the statement
+(including submodules pulled in lazily by attribute access, and asyncio
+itself) is reported as the median over ``--runs`` runs; ``python -X
+importtime`` is used to list the slowest aioconpty modules imported by the
+``import`` statement.
+
+    python benchmarks/bench_import.py [--runs 20] [--stmt "import aioconpty"]
+"""
+
+import argparse
+import collections
+import os
+import statistics
+import subprocess
+import sys
+
+STMTS = [
+    "import aioconpty",
+    "import aioconpty; aioconpty.AsyncConPTY",
+    "import aioconpty; aioconpty.Screen",
+]
+
+_TIMER = "import time; _t0 = time.perf_counter(); {stmt}; print(time.perf_counter() - _t0)"
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = src + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _run(stmt: str, env: dict):
+    """
+    1 回分の (経過秒, {モジュール名: 累積マイクロ秒}) を返す
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _TIMER.format(stmt=stmt)],
+                          env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        times[name.strip()] = int(cumulative)
+    return float(proc.stdout.strip().splitlines()[-1]), times
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--stmt", action="append", help="statement to time (repeatable)")
+    ap.add_argument("--top", type=int, default=5, help="number of modules to list")
+    args = ap.parse_args()
+    env = _env()
+
+    for stmt in args.stmt or STMTS:
+        wall = []
+        modules = collections.defaultdict(list)
+        for _ in range(args.runs):
+            dt, times = _run(stmt, env)
+            wall.append(dt)
+            for name, us in times.items():
+                if name.split(".")[0] in ("aioconpty", "asyncio"):
+                    modules[name].append(us)
+        print(f"{stmt!r:<45} {statistics.median(wall) * 1000:8.2f} ms (median of {args.runs})")
+        top = sorted(((statistics.median(v), k) for k, v in modules.items()), reverse=True)
+        for us, name in top[:args.top]:
+            print(f"    {name:<30} {us / 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Instrumentation overhead on the output path: metrics disabled vs SessionMetrics.
+
+Feeds ``--chunks`` chunks of ``--size`` bytes through the reader protocol
+into a ring buffer that is drained after every chunk, and reports ns per
+chunk with and without a collector attached.
+
+    python benchmarks/bench_metrics.py [--chunks 200000] [--size 4096]
+"""
+
+import argparse
+import asyncio
+import time
+
+from aioconpty.conpty import _ReaderProtocol
+from aioconpty.metrics import SessionMetrics
+from aioconpty.ringbuffer import RingBufferReader
+
+
+class _Transport:
+    def pause_reading(self):
+        pass
+
+    def resume_reading(self):
+        pass
+
+    def get_extra_info(self, name, default=None):
+        return default
+
+
+async def _run(metrics, chunks: int, size: int) -> float:
+    reader = RingBufferReader(size * 4)
+    proto = _ReaderProtocol(reader, [])
+    proto.metrics = metrics
+    proto.connection_made(_Transport())
+    chunk = b"x" * size
+    buf = bytearray(size)
+    t0 = time.perf_counter()
+    for _ in range(chunks):
+        proto.data_received(chunk)
+        await reader.readinto(buf)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunks", type=int, default=200000)
+    ap.add_argument("--size", type=int, default=4096)
+    args = ap.parse_args()
+
+    for label, metrics in (("disabled", None), ("SessionMetrics", SessionMetrics())):
+        dt = asyncio.run(_run(metrics, args.chunks, args.size))
+        print(f"{label:<15} {dt / args.chunks * 1e9:8.0f} ns/chunk")
+
+
+if __name__ == "__main__":
+    main()
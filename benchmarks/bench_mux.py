@@ -0,0 +1,127 @@
+"""Fan-in scaling: one reader task per session vs PtyMux, against session count.
+
+Every session runs a child that waits for one input byte and then writes
+``--kb`` KiB.  Once all children are spawned they are released together, and
+the run ends when every byte has been consumed.  Reported are aggregate
+throughput and event loop lag (lateness of a 1 ms ticker: p99 and max).
+
+    python benchmarks/bench_mux.py [--sessions 10,50,200] [--kb 256]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+from aioconpty.mux import PtyMux
+
+TICK = 0.001
+
+
+class _LagProbe:
+    """
+    転送中だけ 1 ms ごとのタイマーの遅れを記録する
+    """
+
+    def __init__(self):
+        self.lags = []
+        self._stop = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stop = True
+        await self._task
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stop:
+            t = loop.time()
+            await asyncio.sleep(TICK)
+            self.lags.append(loop.time() - t - TICK)
+
+
+def _cmd(nbytes: int):
+    return ["sh", "-c", f"stty raw -echo; head -c 1 >/dev/null; head -c {nbytes} /dev/zero; sleep 60"]
+
+
+async def _tasks(n: int, nbytes: int, probe: _LagProbe):
+    ptys = [AsyncConPTY(80, 24) for _ in range(n)]
+    await asyncio.gather(*(p.open() for p in ptys))
+    await asyncio.gather(*(p.spawn(_cmd(nbytes)) for p in ptys))
+    await asyncio.sleep(0.5)
+
+    async def consume(pty):
+        received = 0
+        async for chunk in pty.read_chunks(4096):
+            received += len(chunk)
+            if received >= nbytes:
+                return
+
+    probe.start()
+    t0 = time.perf_counter()
+    for p in ptys:
+        await p.write(b"g")
+    await asyncio.gather(*(consume(p) for p in ptys))
+    dt = time.perf_counter() - t0
+    await probe.stop()
+    await asyncio.gather(*(p.close() for p in ptys))
+    return dt
+
+
+async def _mux(n: int, nbytes: int, probe: _LagProbe):
+    mux = PtyMux()
+    ptys = await asyncio.gather(*(mux.open(i, cols=80, rows=24) for i in range(n)))
+    await asyncio.gather(*(p.spawn(_cmd(nbytes)) for p in ptys))
+    await asyncio.sleep(0.5)
+
+    probe.start()
+    t0 = time.perf_counter()
+    for p in ptys:
+        await p.write(b"g")
+    remaining = dict.fromkeys(range(n), nbytes)
+    async for batch in mux.batches():
+        for sid, chunk in batch:
+            left = remaining[sid] - len(chunk)
+            if left <= 0:
+                del remaining[sid]
+            else:
+                remaining[sid] = left
+        if not remaining:
+            break
+    dt = time.perf_counter() - t0
+    await probe.stop()
+    await mux.close()
+    return dt
+
+
+async def _run(mode: str, n: int, nbytes: int):
+    probe = _LagProbe()
+    dt = await (_tasks if mode == "tasks" else _mux)(n, nbytes, probe)
+    lags = sorted(probe.lags)
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return dt, p99, lags[-1] if lags else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", default="10,50,200")
+    ap.add_argument("--kb", type=int, default=256)
+    args = ap.parse_args()
+    if sys.platform == "win32":
+        sys.exit("bench_mux.py needs the posix backend (sh, stty, head)")
+
+    nbytes = args.kb * 1024
+    for n in (int(x) for x in args.sessions.split(",")):
+        for mode in ("tasks", "mux"):
+            dt, p99, worst = asyncio.run(_run(mode, n, nbytes))
+            mb = n * nbytes / 2**20
+            print(f"{n:5d} sessions  {mode:<6} {mb / dt:8.1f} MiB/s  "
+                  f"loop lag p99 {p99 * 1000:6.2f} ms  max {worst * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
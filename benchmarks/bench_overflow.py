@@ -0,0 +1,86 @@
+"""Output buffer budget: peak memory and counters per overflow policy.
+
+A producer pushes ``--mb`` MiB into ``--sessions`` readers while the consumer
+drains only one chunk per ``--lag`` produced.  Reported per policy are peak
+traced memory, bytes dropped/spilled and the number of transport pauses; the
+unbounded ``asyncio.StreamReader`` without flow control is the baseline.
+
+    python benchmarks/bench_overflow.py [--mb 16] [--sessions 50] [--budget 65536]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from aioconpty.ringbuffer import OVERFLOW_POLICIES, RingBufferReader
+
+CHUNK = 16 * 1024
+
+
+class _Transport:
+    def __init__(self):
+        self.paused = False
+
+    def pause_reading(self):
+        self.paused = True
+
+    def resume_reading(self):
+        self.paused = False
+
+
+async def _run(policy: str, sessions: int, total: int, budget: int, lag: int):
+    chunk = b"x" * CHUNK
+    tracemalloc.start()
+    readers, transports = [], []
+    for _ in range(sessions):
+        transport = _Transport()
+        if policy == "stream":
+            reader = asyncio.StreamReader(limit=budget)
+        else:
+            reader = RingBufferReader(budget, overflow=policy)
+        reader.set_transport(transport)
+        readers.append(reader)
+        transports.append(transport)
+
+    t0 = time.perf_counter()
+    sent = 0
+    step = 0
+    while sent < total:
+        for reader, transport in zip(readers, transports):
+            if policy == "stream" or not transport.paused:
+                reader.feed_data(chunk)
+        sent += CHUNK
+        step += 1
+        if step % lag == 0:
+            for reader in readers:
+                await reader.read(CHUNK)
+    dt = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    line = f"{policy:<12} peak {peak / sessions / 1024:9.1f} KiB/session  {dt:6.2f} s"
+    if policy != "stream":
+        stats = readers[0].stats()
+        line += (f"  dropped {stats['bytes_dropped'] / 2**20:7.1f} MiB"
+                 f"  spilled {stats['bytes_spilled'] / 2**20:7.1f} MiB  pauses {stats['pauses']}")
+    print(line)
+    for reader in readers:
+        if policy != "stream":
+            reader.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=int, default=16)
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--budget", type=int, default=64 * 1024)
+    ap.add_argument("--lag", type=int, default=4, help="consumer reads once per LAG chunks")
+    args = ap.parse_args()
+
+    for policy in ("stream",) + OVERFLOW_POLICIES:
+        asyncio.run(_run(policy, args.sessions, args.mb * 2**20, args.budget, args.lag))
+
+
+if __name__ == "__main__":
+    main()
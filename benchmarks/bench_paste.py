@@ -0,0 +1,132 @@
+"""Pasting input: end-to-end MB/s from the parent to a child reading raw stdin.
+
+The child switches its terminal to raw mode, prints ``ready``, reads until it
+has received every byte and prints the count; the time runs from the first
+write to that count, and a ticker samples the write buffer size and the
+loop lag meanwhile.  ``write`` sends the whole payload with one ``write()``,
+``writeline`` sends it line by line (one drain per line), and
+``paste/N`` uses ``paste()`` with N-byte chunks.  ``keys`` compares a
+scripted keystroke sequence sent key by key against one ``send_keys()``.
+
+    python benchmarks/bench_paste.py [--mb 8] [--chunks 4096,16384,65536,262144] [--keys 20000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+from aioconpty.keys import encode_key, prepare_paste
+
+CHILD = r"""
+import os, sys
+if os.name == "posix":
+    import tty
+    tty.setraw(0)
+n, total = 0, int(sys.argv[1])
+sys.stdout.write("ready\n")
+sys.stdout.flush()
+while n < total:
+    data = os.read(0, 1 << 16)
+    if not data:
+        break
+    n += len(data)
+sys.stdout.write("got %d\n" % n)
+sys.stdout.flush()
+"""
+
+
+def _payload(mb: float) -> str:
+    line = "2024/01/01  12:00    1,234,567 file_000000.txt  some pasted text".ljust(79) + "\n"
+    return line * int(mb * 1e6 // len(line))
+
+
+async def _until(pty, marker: bytes, seen: bytearray):
+    while marker not in seen:
+        data = await pty.read(65536)
+        if not data:
+            raise RuntimeError(f"child exited before {marker!r}: {bytes(seen[-200:])!r}")
+        seen += data
+
+
+async def _one(mode: str, text: str, total: int):
+    async with AsyncConPTY(120, 30) as pty:
+        proc = await pty.spawn([sys.executable, "-c", CHILD, str(total)])
+        seen = bytearray()
+        await _until(pty, b"ready", seen)
+        del seen[:]
+        transport = pty._transport_write
+        peak = [0, 0.0]  # 書き込みバッファの最大, ループの最大遅れ
+        done = False
+
+        async def ticker():
+            while not done:
+                t = time.perf_counter()
+                await asyncio.sleep(0.001)
+                peak[0] = max(peak[0], transport.get_write_buffer_size())
+                peak[1] = max(peak[1], time.perf_counter() - t - 0.001)
+
+        task = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        if mode == "write":
+            await pty.write(prepare_paste(text))
+        elif mode == "writeline":
+            for line in text.splitlines():
+                await pty.write(line + "\r")
+        else:
+            await pty.paste(text, chunk_size=int(mode.split("/")[1]))
+        await _until(pty, b"got", seen)
+        dt = time.perf_counter() - t0
+        done = True
+        await task
+        await proc.wait()
+        proc.close_handle()
+    return dt, peak[0], peak[1]
+
+
+async def _keys(count: int):
+    script = ["h", "e", "l", "l", "o", "Left", "ctrl+a", "End", "alt+b", "Enter"] * (count // 10)
+    total = len(b"".join(encode_key(k) for k in script))
+    results = {}
+    for mode in ("write per key", "send_keys"):
+        async with AsyncConPTY(120, 30) as pty:
+            proc = await pty.spawn([sys.executable, "-c", CHILD, str(total)])
+            seen = bytearray()
+            await _until(pty, b"ready", seen)
+            t0 = time.perf_counter()
+            if mode == "send_keys":
+                await pty.send_keys(*script)
+            else:
+                for key in script:
+                    await pty.write(encode_key(key))
+            await _until(pty, b"got", seen)
+            results[mode] = time.perf_counter() - t0
+            await proc.wait()
+            proc.close_handle()
+    return len(script), results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=float, default=8)
+    ap.add_argument("--chunks", default="4096,16384,65536,262144")
+    ap.add_argument("--keys", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    text = _payload(args.mb)
+    total = len(prepare_paste(text))
+    modes = ["write", "writeline"] + [f"paste/{int(c)}" for c in args.chunks.split(",")]
+    for mode in modes:
+        best, buffered, lag = min(asyncio.run(_one(mode, text, total)) for _ in range(args.repeat))
+        print(f"{mode:<14} {total / 1e6 / best:8.1f} MB/s  ({best * 1000:8.1f} ms for {total / 1e6:.1f} MB)"
+              f"  peak buffer {buffered / 1024:9.0f} kB  max loop lag {lag * 1000:6.2f} ms")
+
+    n, results = asyncio.run(_keys(args.keys))
+    for mode, dt in results.items():
+        print(f"{mode:<14} {n / dt:10.0f} keys/s")
+
+
+if __name__ == "__main__":
+    main()
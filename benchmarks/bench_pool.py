@@ -0,0 +1,57 @@
+"""Per-job latency: fresh AsyncConPTY per command vs leasing from PtyPool.
+
+    python benchmarks/bench_pool.py [--jobs 200] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+from aioconpty.pool import PtyPool
+
+CMD = ["cmd", "/c", "exit 0"] if sys.platform == "win32" else ["true"]
+
+
+async def _fresh(jobs: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def job():
+        async with sem:
+            async with AsyncConPTY(cols=120, rows=30) as pty:
+                proc = await pty.spawn(CMD)
+                await proc.wait()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(job() for _ in range(jobs)))
+    return time.perf_counter() - t0, None
+
+
+async def _pooled(jobs: int, concurrency: int):
+    async with PtyPool(min_size=concurrency, max_size=concurrency, cols=120, rows=30) as pool:
+        async def job():
+            async with pool.lease() as pty:
+                proc = await pty.spawn(CMD)
+                await proc.wait()
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(job() for _ in range(jobs)))
+        return time.perf_counter() - t0, pool.stats()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--jobs", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    dt, _ = asyncio.run(_fresh(args.jobs, args.concurrency))
+    print(f"fresh   {args.jobs / dt:8.1f} jobs/s  {dt / args.jobs * 1000:7.2f} ms/job")
+    dt, stats = asyncio.run(_pooled(args.jobs, args.concurrency))
+    print(f"pooled  {args.jobs / dt:8.1f} jobs/s  {dt / args.jobs * 1000:7.2f} ms/job  "
+          f"hit_ratio={stats['hit_ratio']:.2f} p99_acquire={stats['acquire_latency_p99'] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Read path overhead: read_chunks(4096) vs readinto() on a ring buffer vs an output sink.
+
+The in-memory mode feeds a reader protocol from a producer that honours
+pause_reading()/resume_reading() like a real transport, so only the read
+path itself is measured.  ``--pty`` additionally streams ``head -c`` output
+through a real POSIX pty.
+
+    python benchmarks/bench_readpath.py [--mb 64] [--pty]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+from aioconpty.conpty import _ReaderProtocol
+from aioconpty.ringbuffer import RingBufferReader
+
+TRANSPORT_CHUNK = 32 * 1024
+
+
+class _MemoryTransport(asyncio.ReadTransport):
+    def __init__(self, protocol, total: int):
+        super().__init__()
+        self._protocol = protocol
+        self._total = total
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        protocol.connection_made(self)
+
+    def pause_reading(self):
+        self._resumed.clear()
+
+    def resume_reading(self):
+        self._resumed.set()
+
+    async def produce(self):
+        chunk = b"x" * TRANSPORT_CHUNK
+        sent = 0
+        while sent < self._total:
+            await self._resumed.wait()
+            self._protocol.data_received(chunk)
+            sent += len(chunk)
+            await asyncio.sleep(0)
+        self._protocol.eof_received()
+
+
+async def _memory(mode: str, total: int) -> float:
+    if mode == "stream":
+        reader = asyncio.StreamReader()
+    else:
+        reader = RingBufferReader(1 << 20)
+    proto = _ReaderProtocol(reader, [])
+    received = 0
+    if mode == "sink":
+        class _Sink:
+            def data_received(self, data):
+                nonlocal received
+                received += len(data)
+        proto.sink = _Sink()
+    transport = _MemoryTransport(proto, total)
+    t0 = time.perf_counter()
+    producer = asyncio.create_task(transport.produce())
+    if mode == "stream":
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            received += len(data)
+    elif mode == "ring":
+        buf = bytearray(65536)
+        while True:
+            n = await reader.readinto(buf)
+            if not n:
+                break
+            received += n
+    await producer
+    dt = time.perf_counter() - t0
+    assert received == total, (mode, received)
+    return dt
+
+
+async def _pty(mode: str, total: int) -> float:
+    ring = 1 << 20 if mode == "ring" else None
+    received = 0
+    done = asyncio.get_running_loop().create_future()
+
+    class _Sink:
+        def data_received(self, data):
+            nonlocal received
+            received += len(data)
+            if received >= total and not done.done():
+                done.set_result(None)
+
+    async with AsyncConPTY(80, 24, ring_buffer=ring) as pty:
+        if mode == "sink":
+            pty.set_output_sink(_Sink())
+        t0 = time.perf_counter()
+        await pty.spawn(["sh", "-c", f"stty raw -echo; head -c {total} /dev/zero"])
+        if mode == "stream":
+            async for chunk in pty.read_chunks(4096):
+                received += len(chunk)
+                if received >= total:
+                    break
+        elif mode == "ring":
+            buf = bytearray(65536)
+            while received < total:
+                received += await pty.readinto(buf)
+        else:
+            await done
+        return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=int, default=64)
+    ap.add_argument("--pty", action="store_true", help="also measure through a real POSIX pty")
+    args = ap.parse_args()
+    total = args.mb * 1024 * 1024
+
+    for mode in ("stream", "ring", "sink"):
+        dt = asyncio.run(_memory(mode, total))
+        print(f"memory  {mode:<7} {args.mb / dt:9.1f} MiB/s")
+    if args.pty and sys.platform != "win32":
+        for mode in ("stream", "ring", "sink"):
+            dt = asyncio.run(_pty(mode, total))
+            print(f"pty     {mode:<7} {args.mb / dt:9.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main()
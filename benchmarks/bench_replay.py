@@ -0,0 +1,71 @@
+"""Replay throughput: asciicast recordings fed through the reader path at full speed.
+
+Each capture is written as an asciicast v2 file (one event per 4 KiB chunk)
+and replayed with ``open_replay(speed=None)`` into plain reads, the VT parser
+(``read_events``) and an attached screen.  Pass ``--cast FILE`` to replay a
+real recording instead.
+
+    python benchmarks/bench_replay.py [--cast session.cast]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.record import load_asciicast, open_replay
+from captures import CAPTURES, chunked
+
+
+def _write_cast(path: str, data: bytes, chunk_size: int = 4096):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"version": 2, "width": 120, "height": 30}) + "\n")
+        for i, chunk in enumerate(chunked(data, chunk_size)):
+            text = chunk.decode("utf-8", "replace")
+            f.write(json.dumps([i * 0.001, "o", text], ensure_ascii=False) + "\n")
+
+
+async def _replay(recording, mode: str) -> float:
+    async with open_replay(recording) as pty:
+        screen = pty.attach_screen() if mode == "screen" else None
+        t0 = time.perf_counter()
+        if mode == "events":
+            async for _ in pty.read_events():
+                pass
+        else:
+            async for _ in pty.read_chunks(65536):
+                pass
+        dt = time.perf_counter() - t0
+        if screen is not None:
+            screen.take_dirty()
+        return dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cast", help="asciicast v2 file to replay")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        casts = {}
+        if args.cast:
+            casts[os.path.basename(args.cast)] = args.cast
+        else:
+            for name, make in CAPTURES.items():
+                casts[name] = os.path.join(tmp, name + ".cast")
+                _write_cast(casts[name], make())
+        for name, path in casts.items():
+            recording = load_asciicast(path)
+            size = sum(len(d.encode("utf-8")) for _, code, d in recording[1] if code == "o") / 1e6
+            for mode in ("read", "events", "screen"):
+                dt = asyncio.run(_replay(recording, mode))
+                print(f"{name:<12} {mode:<7} {size:6.2f} MB  {size / dt:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""One-shot runs: run() against a hand-written spawn/drain/wait/close sequence.
+
+For each workload the baseline reads through the StreamReader with a drain
+task, waits for the child and closes the session to end the stream, as the
+old ``main.py`` did.  ``run()`` captures through an output sink, hangs up the
+terminal once the child exits and returns at EOF.  Reported: wall time per run,
+output size, and the peak Python heap while capturing (tracemalloc, measured
+in separate runs).
+
+    python benchmarks/bench_run.py [--runs 20] [--mb 8]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+
+import aioconpty
+from aioconpty import AsyncConPTY
+
+
+def _workloads(mb: float):
+    n = int(mb * 1e6)
+    if sys.platform == "win32":
+        return {
+            "exit": ["cmd", "/c", "exit 0"],
+            "dir": ["cmd", "/c", "dir", "/s", "C:\\Windows\\System32\\drivers"],
+            "bulk": ["powershell", "-NoProfile", "-Command",
+                     f"[Console]::Out.Write('x' * {n})"],
+        }
+    return {
+        "exit": ["true"],
+        "seq": ["seq", "1", "100000"],
+        "bulk": ["sh", "-c", f"head -c {n} /dev/zero | tr '\\0' x"],
+    }
+
+
+async def _baseline(cmd) -> bytes:
+    pty = AsyncConPTY(120, 30)
+    await pty.open()
+    reader = pty.reader  # close() 後も読み切れるよう参照を持っておく
+    chunks = []
+
+    async def drain():
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    task = asyncio.create_task(drain())
+    try:
+        proc = await pty.spawn(cmd)
+        await proc.wait()
+        proc.close_handle()
+    finally:
+        await pty.close()  # transport を閉じて EOF にする
+    await task
+    return b"".join(chunks)
+
+
+async def _oneshot(cmd) -> bytes:
+    result = await aioconpty.run(cmd, 120, 30, max_output=None)
+    return result.output
+
+
+async def _time(fn, cmd, runs: int):
+    size = 0
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        size = len(await fn(cmd))
+    return (time.perf_counter() - t0) / runs, size
+
+
+async def _heap(fn, cmd):
+    tracemalloc.start()
+    await fn(cmd)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+async def _main(runs: int, mb: float):
+    for name, cmd in _workloads(mb).items():
+        n = runs if name != "bulk" else max(1, runs // 10)
+        for label, fn in (("baseline", _baseline), ("run()", _oneshot)):
+            t, size = await _time(fn, cmd, n)
+            peak = await _heap(fn, cmd)
+            print(f"{name:<6} {label:<9} {t * 1000:9.2f} ms/run  output={size / 1e6:7.2f} MB  "
+                  f"peak heap={peak / 1e6:7.2f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--mb", type=float, default=8, help="size of the bulk workload")
+    args = ap.parse_args()
+    asyncio.run(_main(args.runs, args.mb))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Screen model cost: MB/s applied, ms per MB and memory per session.
+
+    python benchmarks/bench_screen.py [--cols 120 --rows 30] [--sessions 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.screen import Screen
+from captures import CAPTURES, chunked, load_capture
+
+
+def bench_throughput(name: str, data: bytes, cols: int, rows: int, chunk_size: int, repeat: int):
+    chunks = chunked(data, chunk_size)
+    best = None
+    for _ in range(repeat):
+        screen = Screen(cols, rows)
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            screen.feed(chunk)
+            screen.take_dirty()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    mb = len(data) / 1e6
+    print(f"{name:<12} {mb:6.2f} MB  {mb / best:7.1f} MB/s  {best * 1000 / mb:7.1f} ms/MB")
+
+
+def bench_memory(cols: int, rows: int, sessions: int, data: bytes):
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    screens = [Screen(cols, rows) for _ in range(sessions)]
+    for screen in screens:
+        screen.feed(data)
+    snap = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in snap.compare_to(base, "filename"))
+    per = total / sessions
+    print(f"memory       {sessions} sessions {cols}x{rows}: {per / 1024:7.1f} KiB/session "
+          f"(cells {screens[0].memory_usage() / 1024:.1f} KiB)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cols", type=int, default=120)
+    ap.add_argument("--rows", type=int, default=30)
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--sessions", type=int, default=500)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    for name, make in CAPTURES.items():
+        bench_throughput(name, make(), args.cols, args.rows, args.chunk, args.repeat)
+    for path in args.capture:
+        bench_throughput(os.path.basename(path), load_capture(path), args.cols, args.rows,
+                         args.chunk, args.repeat)
+    bench_memory(args.cols, args.rows, args.sessions, CAPTURES["ping"](200))
+
+
+if __name__ == "__main__":
+    main()
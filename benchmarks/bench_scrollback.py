@@ -0,0 +1,79 @@
+"""Scrollback: ingest MB/s, random line access, search MB/s and Python heap.
+
+Each capture is repeated until it reaches ``--mb`` MB and fed in 4 KiB
+chunks.  The heap size (tracemalloc, measured in a separate run) shows that
+the history lives in the mapped segment files rather than in Python objects.
+
+    python benchmarks/bench_scrollback.py [--mb 32] [--capture FILE ...]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.scrollback import Scrollback
+from captures import CAPTURES, chunked, load_capture
+
+
+def bench(name: str, data: bytes, total: int, chunk_size: int):
+    chunks = chunked(data, chunk_size)
+    reps = max(1, total // len(data))
+    mb = reps * len(data) / 1e6
+    with Scrollback() as sb:
+        tracemalloc.start()
+        for _ in range(reps):
+            for chunk in chunks:
+                sb.feed(chunk)
+        heap = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    with Scrollback() as sb:
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            for chunk in chunks:
+                sb.feed(chunk)
+        t_ingest = time.perf_counter() - t0
+
+        rnd = random.Random(0)
+        picks = [rnd.randrange(sb.first_line, sb.next_line) for _ in range(100000)]
+        t0 = time.perf_counter()
+        for n in picks:
+            sb.line(n)
+        t_line = (time.perf_counter() - t0) / len(picks)
+
+        stored = sb.bytes_stored / 1e6
+        t0 = time.perf_counter()
+        literal = sum(1 for _ in sb.search(b"no such text"))
+        t_literal = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        regex = sum(1 for _ in sb.search(re.compile(rb"[0-9]{3}-ABCD|\x00")))
+        t_regex = time.perf_counter() - t0
+
+        print(f"{name:<12} {mb:8.1f} MB  ingest {mb / t_ingest:7.1f} MB/s  "
+              f"lines={len(sb):9d}  line() {t_line * 1e6:5.2f} us  "
+              f"find {stored / t_literal:7.0f} MB/s  regex {stored / t_regex:6.0f} MB/s "
+              f"({literal + regex} hits)  heap={heap / 1e6:6.1f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mb", type=float, default=32)
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    total = int(args.mb * 1e6)
+    for name, make in CAPTURES.items():
+        bench(name, make(), total, args.chunk)
+    for path in args.capture:
+        bench(os.path.basename(path), load_capture(path), total, args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""pty server: throughput and echo latency for localhost TCP/WebSocket clients.
+
+Throughput: ``--clients`` clients each receive a capture repeated to
+``--mb`` MB (``cat`` of the file in raw mode) until the session exits; reported are the aggregate MB/s,
+bytes on the wire and flushes per MB, with and without zlib.  Latency: one
+client sends single bytes to ``cat`` and waits for each echo; reported are
+p50/p99 round trips.
+
+    python benchmarks/bench_server.py [--clients 1,8] [--mb 16] [--capture FILE]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.server import PtyServer, connect
+from captures import CAPTURES, load_capture
+
+
+async def _throughput(path: str, size: int, clients: int, websocket: bool, compress: bool):
+    cmd = ["sh", "-c", f"stty raw -echo; cat {path}"]
+    async with PtyServer(cmd, compress=compress) as server:
+        listener = await server.start("127.0.0.1", 0, websocket=websocket)
+        port = listener.sockets[0].getsockname()[1]
+
+        async def client():
+            received = 0
+            async with await connect("127.0.0.1", port, websocket=websocket) as c:
+                async for chunk in c:
+                    received += len(chunk)
+                await c.wait()
+            return received
+
+        t0 = time.perf_counter()
+        received = await asyncio.gather(*(client() for _ in range(clients)))
+        dt = time.perf_counter() - t0
+        assert all(n == size for n in received), (received, size)
+        return dt, server.stats()
+
+
+async def _latency(websocket: bool, count: int):
+    async with PtyServer(["sh", "-c", "stty raw -echo; cat"]) as server:
+        listener = await server.start("127.0.0.1", 0, websocket=websocket)
+        port = listener.sockets[0].getsockname()[1]
+        async with await connect("127.0.0.1", port, websocket=websocket) as c:
+            await asyncio.sleep(0.2)  # stty が効くまで待つ
+            samples = []
+            for _ in range(count):
+                t0 = time.perf_counter()
+                c.write(b"k")
+                await c.read()
+                samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--clients", default="1,8")
+    ap.add_argument("--mb", type=float, default=16)
+    ap.add_argument("--echoes", type=int, default=2000)
+    ap.add_argument("--capture", help="raw ConPTY output capture (default: synthetic cmd_dir)")
+    args = ap.parse_args()
+    if sys.platform == "win32":
+        sys.exit("bench_server.py needs the posix backend (sh, stty, cat)")
+
+    data = load_capture(args.capture) if args.capture else CAPTURES["cmd_dir"]()
+    data *= max(1, int(args.mb * 1e6) // len(data))
+    with tempfile.NamedTemporaryFile(suffix=".bin", delete=False) as f:
+        f.write(data)
+    try:
+        mb = len(data) / 1e6
+        for clients in (int(x) for x in args.clients.split(",")):
+            for websocket in (False, True):
+                for compress in (False, True):
+                    dt, stats = asyncio.run(_throughput(f.name, len(data), clients, websocket, compress))
+                    print(f"{'ws' if websocket else 'tcp':<4} zlib={'on ' if compress else 'off'} "
+                          f"clients={clients:3d}  {mb * clients / dt:8.1f} MB/s  "
+                          f"wire={stats['bytes_sent'] / 1e6 / clients:7.2f} MB/client "
+                          f"({stats['compression_ratio']:5.1%})  "
+                          f"flushes/MB={stats['flushes'] / (mb * clients):6.1f}")
+    finally:
+        os.unlink(f.name)
+    for websocket in (False, True):
+        p50, p99 = asyncio.run(_latency(websocket, args.echoes))
+        print(f"{'ws' if websocket else 'tcp':<4} echo round trip  p50 {p50 * 1e6:7.1f} us  p99 {p99 * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Session logs: event loop lag while many sessions log their output.
+
+``--sessions`` replayed sessions each stream a capture at ``--rate`` MB/s
+(0 = as fast as the reader takes it) while a 1 ms ticker measures loop lag.  ``inline`` writes and flushes every chunk to
+a file from the output tap on the loop thread (what relaying output with
+``sys.stdout.buffer.write``/``flush`` amounts to), ``inline-gzip`` also
+compresses there, and ``sessionlog`` uses :class:`SessionLog` (gzip, writer
+threads).  Reported: aggregate MB/s, loop
+lag p99/max, bytes on disk.
+
+    python benchmarks/bench_sessionlog.py [--sessions 32] [--mb 2] [--rate 1] [--capture FILE]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty import AsyncConPTY
+from aioconpty.record import ReplayBackend
+from captures import CAPTURES, load_capture
+
+TICK = 0.001
+EVENT_SIZE = 16 * 1024
+
+
+async def _ticker(lags: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - t - TICK)
+
+
+def _events(data: bytes, rate: float):
+    text = data.decode("utf-8", "replace")
+    step = EVENT_SIZE / (rate * 1e6) if rate else 0.0
+    return [(n * step, "o", text[i:i + EVENT_SIZE])
+            for n, i in enumerate(range(0, len(text), EVENT_SIZE))]
+
+
+async def _run(mode: str, events, sessions: int, directory: str, paced: bool):
+    directory = os.path.join(directory, mode)
+    os.makedirs(directory)
+    speed = 1.0 if paced else None
+    ptys = [AsyncConPTY(120, 30, backend=ReplayBackend(({"version": 2}, events), speed=speed))
+            for _ in range(sessions)]
+    sinks = []
+    for i, pty in enumerate(ptys):
+        path = os.path.join(directory, f"{i}.log")
+        if mode.startswith("inline"):
+            f = open(path, "wb")
+            z = zlib.compressobj(1, zlib.DEFLATED, 31) if mode == "inline-gzip" else None
+
+            def tap(data, f=f, z=z):
+                if z is not None:
+                    data = z.compress(data) + z.flush(zlib.Z_SYNC_FLUSH)
+                f.write(data)
+                f.flush()
+            pty.add_output_tap(tap)
+            sinks.append(f)
+        else:
+            sinks.append(pty.attach_log(path))
+
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    total = 0
+
+    async def drain(pty):
+        nonlocal total
+        async with pty:
+            async for chunk in pty.read_chunks(65536):
+                total += len(chunk)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(drain(pty) for pty in ptys))
+    for sink in sinks:
+        if mode.startswith("inline"):
+            sink.close()
+        else:
+            await sink.close()
+    dt = time.perf_counter() - t0
+    stop.set()
+    await ticker
+    on_disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return total / 1e6 / dt, p99, lags[-1] if lags else 0.0, on_disk
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", type=int, default=32)
+    ap.add_argument("--mb", type=float, default=2, help="output per session")
+    ap.add_argument("--rate", type=float, default=1, help="MB/s per session (0 = unpaced)")
+    ap.add_argument("--capture", help="raw ConPTY output capture (default: synthetic cmd_dir)")
+    args = ap.parse_args()
+
+    data = load_capture(args.capture) if args.capture else CAPTURES["cmd_dir"]()
+    data *= max(1, int(args.mb * 1e6) // len(data))
+    events = _events(data, args.rate)
+    directory = tempfile.mkdtemp(prefix="aioconpty-bench-")
+    try:
+        for mode in ("inline", "inline-gzip", "sessionlog"):
+            rate, p99, worst, on_disk = asyncio.run(_run(mode, events, args.sessions, directory,
+                                                         bool(args.rate)))
+            print(f"{mode:<12} {args.sessions:3d} sessions  {rate:8.1f} MB/s  "
+                  f"loop lag p99 {p99 * 1000:6.2f} ms  max {worst * 1000:7.2f} ms  "
+                  f"disk {on_disk / 1e6:8.1f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
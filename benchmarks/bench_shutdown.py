@@ -0,0 +1,75 @@
+"""Bulk shutdown: closing sessions one by one vs close_all() under one deadline.
+
+Each session runs one child.  ``running`` children sleep for a long time and
+must be killed; ``exited`` children finish before the shutdown starts.  The
+sequential baseline kills and waits for each child, then closes its session
+with the graceful close; ``close_all()`` does all sessions concurrently.
+
+    python benchmarks/bench_shutdown.py [--sessions 10,100,300]
+"""
+
+import argparse
+import asyncio
+import collections
+import sys
+import time
+
+from aioconpty import AsyncConPTY, close_all
+
+if sys.platform == "win32":
+    LONG = ["powershell", "-NoProfile", "-Command", "Start-Sleep 60"]
+    SHORT = ["cmd", "/c", "exit 0"]
+else:
+    LONG = ["sleep", "60"]
+    SHORT = ["true"]
+
+
+async def _sessions(n: int, workload: str):
+    # 1 セッション 1 プロセス（POSIX の pty は同時に 1 セッションの制御端末にしかなれない）
+    ptys = [AsyncConPTY(80, 24) for _ in range(n)]
+    await asyncio.gather(*(p.open() for p in ptys))
+    procs = [await pty.spawn(LONG if workload == "running" else SHORT) for pty in ptys]
+    if workload == "exited":
+        await asyncio.gather(*(p.wait() for p in procs))
+    return ptys, procs
+
+
+async def _sequential(n: int, workload: str):
+    ptys, procs = await _sessions(n, workload)
+    t0 = time.perf_counter()
+    for pty, proc in zip(ptys, procs):
+        proc.kill()
+        await proc.wait()
+        await pty.close(fast=False)
+    dt = time.perf_counter() - t0
+    for proc in procs:
+        proc.close_handle()
+    return dt, None
+
+
+async def _bulk(n: int, workload: str, timeout: float):
+    ptys, procs = await _sessions(n, workload)
+    t0 = time.perf_counter()
+    results = await close_all(ptys, timeout=timeout, grace=0)
+    dt = time.perf_counter() - t0
+    for proc in procs:
+        proc.close_handle()
+    return dt, collections.Counter(r.status for r in results)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", default="10,100,300")
+    ap.add_argument("--timeout", type=float, default=10.0)
+    args = ap.parse_args()
+
+    for n in (int(x) for x in args.sessions.split(",")):
+        for workload in ("running", "exited"):
+            seq, _ = asyncio.run(_sequential(n, workload))
+            bulk, statuses = asyncio.run(_bulk(n, workload, args.timeout))
+            print(f"{n:5d} sessions  {workload:<8} sequential {seq * 1000:9.1f} ms  "
+                  f"close_all {bulk * 1000:9.1f} ms  {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Spawn storm: event-loop lag while many sessions open, spawn and close at once.
+
+A ticker sleeps ``--tick`` ms in a loop and records how late it wakes up,
+which is how long every other session on the loop would have waited.  The
+storm opens ``--sessions`` sessions concurrently, spawns a trivial command in
+each, waits for it and closes the session.  ``inline`` makes the backends'
+blocking calls (process creation, pseudo console setup, close) directly on
+the loop thread, as before the dedicated executor; ``executor`` uses the
+default executor; ``workers=N`` uses an executor with N threads.
+
+    python benchmarks/bench_spawnstorm.py [--sessions 50,200] [--workers 1,4] [--tick 1]
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+from aioconpty.backends import base
+
+CMD = ["cmd", "/c", "exit 0"] if sys.platform == "win32" else ["true"]
+
+
+class _InlineExecutor(concurrent.futures.Executor):
+    """
+    submit() の場で実行する executor（executor を使わない場合の比較用）
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        fut = concurrent.futures.Future()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            fut.set_exception(exc)
+        return fut
+
+
+async def _storm(n: int, tick: float):
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            t = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - t - tick)
+
+    async def session():
+        async with AsyncConPTY(80, 24) as pty:
+            proc = await pty.spawn(CMD)
+            await proc.wait()
+            proc.close_handle()
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(tick)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(n)))
+    dt = time.perf_counter() - t0
+    done = True
+    await task
+    return dt, sorted(lags)
+
+
+def _pct(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sessions", default="50,200")
+    ap.add_argument("--workers", default="1,4", help="executor sizes to try besides the default")
+    ap.add_argument("--tick", type=float, default=1.0, help="ticker interval in ms")
+    args = ap.parse_args()
+
+    modes = [("inline", _InlineExecutor()), (f"executor({base.BLOCKING_WORKERS})", None)]
+    for w in (int(x) for x in args.workers.split(",") if x):
+        modes.append((f"workers={w}", concurrent.futures.ThreadPoolExecutor(w)))
+
+    for n in (int(x) for x in args.sessions.split(",")):
+        for label, executor in modes:
+            base.set_blocking_executor(executor)
+            asyncio.run(_storm(min(n, 5), args.tick / 1000))  # ウォームアップ
+            dt, lags = asyncio.run(_storm(n, args.tick / 1000))
+            print(f"{n:5d} sessions  {label:<12} storm {dt * 1000:8.1f} ms  ticks {len(lags):5d}  "
+                  f"lag p50 {_pct(lags, 0.5) * 1000:7.2f}  p99 {_pct(lags, 0.99) * 1000:7.2f}  "
+                  f"max {_pct(lags, 1.0) * 1000:7.2f} ms")
+    base.set_blocking_executor(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Plain-text extraction: VTParser events vs EscapeStripper, in MB/s.
+
+The baseline joins the ``EV_PRINT`` runs and ``\\t``/``\\n`` executes that
+VTParser reports for each chunk.  EscapeStripper is fed the same chunks; the
+output size shows how much of the capture was escape sequences.
+
+    python benchmarks/bench_strip.py [--chunk 4096] [--capture FILE ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.text import EscapeStripper
+from aioconpty.vtparse import EV_EXECUTE, EV_PRINT, VTParser
+from captures import CAPTURES, chunked, load_capture
+
+
+def _vtparse(chunks) -> int:
+    parser = VTParser()
+    n = 0
+    for chunk in chunks:
+        out = bytearray()
+        for ev in parser.feed(chunk):
+            if ev[0] == EV_PRINT:
+                out += ev[1]
+            elif ev[0] == EV_EXECUTE and ev[1] in (0x09, 0x0a):
+                out.append(ev[1])
+        n += len(out)
+    return n
+
+
+def _stripper(chunks) -> int:
+    stripper = EscapeStripper()
+    n = 0
+    for chunk in chunks:
+        n += len(stripper.feed(chunk))
+    return n
+
+
+def _time(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, n
+
+
+def bench(name: str, data: bytes, chunk_size: int, repeat: int):
+    chunks = chunked(data, chunk_size)
+    mb = len(data) / 1e6
+    for label, fn in (("vtparse", _vtparse), ("stripper", _stripper)):
+        dt, out = _time(lambda fn=fn: fn(chunks), repeat)
+        print(f"{name:<12} {mb:8.2f} MB  {label:<10} {mb / dt:8.1f} MB/s  out={out / 1e6:6.2f} MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    for name, make in CAPTURES.items():
+        bench(name, make(), args.chunk, args.repeat)
+    for path in args.capture:
+        bench(os.path.basename(path), load_capture(path), args.chunk, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Hot-path suite: AsyncConPTY read/write throughput, session latency and memory, as JSON.
+
+Reads and writes go through the real ``AsyncConPTY`` code paths on top of the
+in-memory replay backend (output is streamed as fast as the reader takes it,
+input is discarded), so only the package itself is measured.  Session
+latency and memory use the platform backend with a trivial command.  Each
+benchmark runs once to warm up, then ``--repeat`` times, and the best run
+is kept.
+
+    python benchmarks/bench_suite.py [--out base.json] [--only read.] [--repeat 3] [--mb 16]
+    python benchmarks/bench_suite.py --compare base.json new.json [--threshold 0.05]
+
+``--compare`` prints the change per benchmark and exits with status 1 if any
+benchmark got worse by more than the threshold.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from aioconpty import AsyncConPTY
+from aioconpty.record import ReplayBackend
+
+TRANSPORT_CHUNK = 32 * 1024
+CMD = ["cmd", "/c", "exit 0"] if sys.platform == "win32" else ["true"]
+
+# name -> (unit, better, factory)。factory(args) はコルーチン関数を返し、それが 1 回分の値を返す
+BENCHMARKS = {}
+
+
+def _bench(name: str, unit: str, better: str = "higher"):
+    def register(factory):
+        BENCHMARKS[name] = (unit, better, factory)
+        return factory
+    return register
+
+
+def _replay(payload: bytes) -> ReplayBackend:
+    text = payload.decode("ascii")
+    events = [(0.0, "o", text[i:i + TRANSPORT_CHUNK])
+              for i in range(0, len(text), TRANSPORT_CHUNK)]
+    return ReplayBackend(({"version": 2}, events))
+
+
+def _lines(total: int) -> bytes:
+    line = b"%-78s\r\n" % b"2024/01/01  12:00    1,234,567 file_000000.txt"
+    return line * (total // len(line))
+
+
+# ---- read path ----
+def _read_bench(method: str, size: int = None):
+    def factory(args):
+        total = int(args.mb * 1e6)
+        payload = _lines(total) if method == "readline" else b"x" * total
+
+        async def once():
+            backend = _replay(payload)  # utf-8 への変換は計測の外で済ませる
+            received = 0
+            async with AsyncConPTY(120, 30, backend=backend) as pty:
+                t0 = time.perf_counter()
+                if method == "read":
+                    while True:
+                        data = await pty.read(size)
+                        if not data:
+                            break
+                        received += len(data)
+                elif method == "read_chunks":
+                    async for chunk in pty.read_chunks(size):
+                        received += len(chunk)
+                else:
+                    while True:
+                        line = await pty.readline()
+                        if not line:
+                            break
+                        received += len(line)
+                dt = time.perf_counter() - t0
+            assert received == len(payload), (method, received)
+            return received / 1e6 / dt
+        return once
+    return factory
+
+
+for _size in (1024, 4096, 65536):
+    _bench(f"read.read.{_size}", "MB/s")(_read_bench("read", _size))
+    _bench(f"read.read_chunks.{_size}", "MB/s")(_read_bench("read_chunks", _size))
+_bench("read.readline", "MB/s")(_read_bench("readline"))
+
+
+# ---- write path ----
+def _write_bench(method: str, size: int):
+    def factory(args):
+        count = max(1, int(args.mb * 1e6) // size // 16)
+        data = b"k" * size
+        line = "k" * (size - 2)
+
+        async def once():
+            async with AsyncConPTY(120, 30, backend=_replay(b"")) as pty:
+                t0 = time.perf_counter()
+                if method == "write":
+                    for _ in range(count):
+                        await pty.write(data)
+                else:
+                    for _ in range(count):
+                        await pty.writeline(line)
+                dt = time.perf_counter() - t0
+            return count / dt
+        return once
+    return factory
+
+
+for _size in (1, 64, 4096):
+    _bench(f"write.write.{_size}", "calls/s")(_write_bench("write", _size))
+_bench("write.writeline.64", "calls/s")(_write_bench("writeline", 64))
+
+
+# ---- session lifecycle ----
+def _lifecycle(phase: str):
+    def factory(args):
+        async def once():
+            pty = AsyncConPTY(120, 30)
+            t0 = time.perf_counter()
+            await pty.open()
+            t1 = time.perf_counter()
+            try:
+                proc = await pty.spawn(CMD)
+                t2 = time.perf_counter()
+                await proc.wait()
+                proc.close_handle()
+            finally:
+                t3 = time.perf_counter()
+                await pty.close()
+                t4 = time.perf_counter()
+            return {"open": t1 - t0, "spawn": t2 - t1, "close": t4 - t3}[phase] * 1000
+        return once
+    return factory
+
+
+for _phase in ("open", "spawn", "close"):
+    _bench(f"session.{_phase}", "ms", "lower")(_lifecycle(_phase))
+
+
+@_bench("session.memory", "kB/session", "lower")
+def _memory(args):
+    async def once():
+        n = args.sessions
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        ptys = [AsyncConPTY(120, 30) for _ in range(n)]
+        for pty in ptys:
+            await pty.open()
+        used = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        for pty in ptys:
+            await pty.close()
+        return used / n / 1024
+    return once
+
+
+# ---- 実行と比較 ----
+def _run(args) -> dict:
+    results = {}
+    for name, (unit, better, factory) in BENCHMARKS.items():
+        if args.only and not any(name.startswith(p) for p in args.only):
+            continue
+        once = factory(args)
+        asyncio.run(once())  # ウォームアップ（import やキャッシュの初回コストを除く）
+        samples = [asyncio.run(once()) for _ in range(args.repeat)]
+        value = max(samples) if better == "higher" else min(samples)
+        results[name] = {"value": value, "unit": unit, "better": better, "samples": samples}
+        print(f"{name:<26} {value:14.2f} {unit}", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "mb": args.mb,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def _compare(base_path: str, new_path: str, threshold: float) -> int:
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)["results"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            print(f"{name:<26} {'only in ' + (base_path if name in base else new_path)}")
+            continue
+        old, cur = base[name]["value"], new[name]["value"]
+        change = (cur - old) / old if old else 0.0
+        worse = -change if new[name]["better"] == "higher" else change
+        flag = ""
+        if worse > threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        elif worse < -threshold:
+            flag = "improved"
+        print(f"{name:<26} {old:14.2f} -> {cur:14.2f} {new[name]['unit']:<11} {change:+8.1%}  {flag}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--out", help="write the JSON results here (default: stdout)")
+    ap.add_argument("--only", nargs="*", default=[], help="benchmark name prefixes to run")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--mb", type=float, default=16, help="data volume per read benchmark")
+    ap.add_argument("--sessions", type=int, default=50, help="sessions for session.memory")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    ap.add_argument("--threshold", type=float, default=0.05,
+                    help="relative change counted as a regression")
+    ap.add_argument("--list", action="store_true", help="list benchmark names")
+    args = ap.parse_args()
+
+    if args.compare:
+        sys.exit(_compare(*args.compare, args.threshold))
+    if args.list:
+        for name, (unit, better, _) in BENCHMARKS.items():
+            print(f"{name:<26} {unit:<11} {better} is better")
+        return
+
+    report = json.dumps(_run(args), indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
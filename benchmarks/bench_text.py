@@ -0,0 +1,82 @@
+"""Text-mode line splitting: a readline() loop vs LineSplitter, in MB/s and lines.
+
+The baseline is the loop callers write today: ``await reader.readline()`` on a
+StreamReader fed with the capture, then ``decode()`` and ``rstrip("\\r\\n")``
+per line.  LineSplitter is fed the same chunks, with and without
+``collapse_cr``; the line count shows how much a ``\\r`` progress bar shrinks.
+
+    python benchmarks/bench_text.py [--chunk 4096] [--capture FILE ...]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.text import LineSplitter
+from captures import CAPTURES, chunked, load_capture
+
+
+async def _readline_loop(chunks) -> int:
+    reader = asyncio.StreamReader(limit=2**30)
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    n = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            return n
+        line.decode("utf-8", "replace").rstrip("\r\n")
+        n += 1
+
+
+def _splitter(chunks, collapse_cr: bool) -> int:
+    splitter = LineSplitter(collapse_cr=collapse_cr)
+    n = 0
+    for chunk in chunks:
+        n += len(splitter.feed(chunk))
+    return n + len(splitter.flush())
+
+
+def _time(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, n
+
+
+def bench(name: str, data: bytes, chunk_size: int, repeat: int):
+    chunks = chunked(data, chunk_size)
+    mb = len(data) / 1e6
+    cases = (
+        ("readline", lambda: asyncio.run(_readline_loop(chunks))),
+        ("splitter", lambda: _splitter(chunks, False)),
+        ("collapse_cr", lambda: _splitter(chunks, True)),
+    )
+    for label, fn in cases:
+        dt, lines = _time(fn, repeat)
+        print(f"{name:<12} {mb:8.2f} MB  {label:<12} {mb / dt:8.1f} MB/s  {lines:8d} lines")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    for name, make in CAPTURES.items():
+        bench(name, make(), args.chunk, args.repeat)
+    for path in args.capture:
+        bench(os.path.basename(path), load_capture(path), args.chunk, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
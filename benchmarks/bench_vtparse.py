@@ -0,0 +1,48 @@
+"""Throughput of VTParser on ConPTY captures, in MB/s.
+
+    python benchmarks/bench_vtparse.py [--chunk 4096] [--capture FILE ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aioconpty.vtparse import VTParser
+from captures import CAPTURES, chunked, load_capture
+
+
+def bench(name: str, data: bytes, chunk_size: int, repeat: int):
+    chunks = chunked(data, chunk_size)
+    best = None
+    events = 0
+    for _ in range(repeat):
+        parser = VTParser()
+        t0 = time.perf_counter()
+        n = 0
+        for chunk in chunks:
+            n += len(parser.feed(chunk))
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+        events = n
+    mb = len(data) / 1e6
+    print(f"{name:<12} {mb:8.2f} MB  chunk={chunk_size:<6} {mb / best:8.1f} MB/s  {events / best / 1e6:6.2f} Mev/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--chunk", type=int, default=4096)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--capture", nargs="*", default=[], help="raw ConPTY output captures")
+    args = ap.parse_args()
+
+    for name, make in CAPTURES.items():
+        bench(name, make(), args.chunk, args.repeat)
+    for path in args.capture:
+        bench(os.path.basename(path), load_capture(path), args.chunk, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
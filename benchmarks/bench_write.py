@@ -0,0 +1,66 @@
+"""Input throughput: per-call write() vs write_coalesce vs write_many().
+
+A child in raw mode swallows the input (``head -c N >/dev/null``) and prints
+a marker once everything has arrived.  Reported are keystrokes per second and
+the number of transport writes (one ``os.write`` each unless the pty is full).
+
+    python benchmarks/bench_write.py [--keys 20000] [--key "k"]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from aioconpty import AsyncConPTY
+
+MODES = {
+    "write": {},
+    "coalesce": {"write_coalesce": 0},
+    "coalesce1ms": {"write_coalesce": 0.001},
+    "write_many": {},
+}
+
+
+async def _run(mode: str, keys: int, key: bytes):
+    async with AsyncConPTY(80, 24, **MODES[mode]) as pty:
+        await pty.spawn(["sh", "-c", f"stty raw -echo; head -c {keys * len(key)} >/dev/null; echo DONE"])
+        await asyncio.sleep(0.2)  # stty が効くまで待つ
+
+        transport = pty._transport_write
+        write = transport.write
+        calls = 0
+
+        def counting_write(data):
+            nonlocal calls
+            calls += 1
+            write(data)
+
+        transport.write = counting_write
+        t0 = time.perf_counter()
+        if mode == "write_many":
+            await pty.write_many([key] * keys)
+        else:
+            for _ in range(keys):
+                await pty.write(key)
+        await pty.flush()
+        await pty.expect(b"DONE", timeout=60)
+        return time.perf_counter() - t0, calls
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--keys", type=int, default=20000)
+    ap.add_argument("--key", default="k")
+    args = ap.parse_args()
+    if sys.platform == "win32":
+        sys.exit("bench_write.py needs the posix backend (sh, stty, head)")
+
+    key = args.key.encode("utf-8")
+    for mode in MODES:
+        dt, calls = asyncio.run(_run(mode, args.keys, key))
+        print(f"{mode:<12} {args.keys / dt:10.0f} keys/s  {calls:6d} transport writes")
+
+
+if __name__ == "__main__":
+    main()
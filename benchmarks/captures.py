@@ -0,0 +1,100 @@
+"""ConPTY-style output captures for the benchmarks.
+
+The generators below reproduce the byte patterns ConPTY emits for ``cmd /c dir``
+and ``ping localhost`` (cursor hiding, full-screen clears, SGR resets, window
+title OSC sequences and ``\\x1b[K`` line erasures around CRLF-terminated text).
+Real captures recorded on Windows can be used instead with ``load_capture()``.
+"""
+
+import random
+
+CONPTY_PROLOGUE = (
+    b"\x1b[?9001h\x1b[?1004h\x1b[?25l\x1b[2J\x1b[m\x1b[H"
+    b"\x1b]0;C:\\WINDOWS\\system32\\cmd.exe\x07\x1b[?25h"
+)
+
+
+def cmd_dir_capture(entries: int = 20000, seed: int = 0) -> bytes:
+    """`cmd /c dir` 相当の出力"""
+    rnd = random.Random(seed)
+    out = bytearray(CONPTY_PROLOGUE)
+    out += b" Volume in drive C has no label.\x1b[K\r\n Volume Serial Number is 1234-ABCD\x1b[K\r\n\x1b[K\r\n"
+    out += b" Directory of C:\\Users\\build\\src\x1b[K\r\n\x1b[K\r\n"
+    for i in range(entries):
+        if i % 30 == 29:
+            # 画面末尾に達したときのスクロールとカーソル制御
+            out += b"\x1b[?25l\x1b[%d;1H\x1b[?25h" % (rnd.randint(1, 30),)
+        size = rnd.randint(0, 10**9)
+        name = "file_%06d.%s" % (i, rnd.choice(("txt", "py", "dll", "exe", "log")))
+        line = "2024/%02d/%02d  %02d:%02d    %14s %s" % (
+            rnd.randint(1, 12), rnd.randint(1, 28), rnd.randint(0, 23), rnd.randint(0, 59),
+            format(size, ","), name)
+        out += line.encode("ascii") + b"\x1b[K\r\n"
+    out += b"\x1b[K\r\n\x1b]0;C:\\WINDOWS\\system32\\cmd.exe\x07"
+    return bytes(out)
+
+
+def ping_capture(replies: int = 20000, seed: int = 0) -> bytes:
+    """`ping localhost` 相当の出力（色付きのプロンプト更新を含む）"""
+    rnd = random.Random(seed)
+    out = bytearray(CONPTY_PROLOGUE)
+    out += b"\r\nPinging DESKTOP [::1] with 32 bytes of data:\x1b[K\r\n"
+    for i in range(replies):
+        out += b"\x1b[?25l"
+        out += b"Reply from ::1: time<%dms\x1b[K\r\n" % (rnd.randint(1, 9),)
+        if i % 4 == 3:
+            out += b"\x1b[m\x1b]0;ping  localhost\x07\x1b[?25h"
+        if i % 50 == 49:
+            out += b"\x1b[1;32mOK\x1b[0m \xe5\xbf\x9c\xe7\xad\x94\r\n"
+    out += b"\r\nPing statistics for ::1:\x1b[K\r\n"
+    return bytes(out)
+
+
+def progress_capture(updates: int = 10000) -> bytes:
+    """\\r で上書きされる進捗表示（pip install 相当、UTF-8 の多バイト文字を含む）"""
+    out = bytearray(b"Collecting \xe3\x83\x91\xe3\x83\x83\xe3\x82\xb1\xe3\x83\xbc\xe3\x82\xb8\r\n")
+    for i in range(updates + 1):
+        done = i * 40 // updates
+        out += b"\r   %s%s %5.1f%% \xe2\x94\x81 %d/%d" % (
+            b"\xe2\x94\x81" * done, b" " * (40 - done), i * 100 / updates, i, updates)
+    out += b"\r\nSuccessfully installed\r\n"
+    return bytes(out)
+
+
+def top_capture(frames: int = 2000, rows: int = 30, seed: int = 0) -> bytes:
+    """`top` 相当の全画面再描画（毎回カーソルを左上に戻して全行を描き直す）"""
+    rnd = random.Random(seed)
+    out = bytearray(CONPTY_PROLOGUE)
+    procs = ["proc_%02d.exe" % i for i in range(rows - 3)]
+    cpu = [rnd.randint(0, 999) for _ in procs]
+    for f in range(frames):
+        out += b"\x1b[?25l\x1b[H"
+        out += b"\x1b[1;37;44m top - %02d:%02d:%02d  load %4.2f \x1b[K\x1b[m\r\n" % (
+            f // 3600 % 24, f // 60 % 60, f % 60, rnd.random() * 4)
+        out += b"\x1b[7m  PID NAME            %%CPU \x1b[K\x1b[m\r\n"
+        for i, name in enumerate(procs):
+            if rnd.random() < 0.2:
+                cpu[i] = rnd.randint(0, 999)
+            color = b"\x1b[31m" if cpu[i] > 800 else b""
+            out += b"%s%5d %-15s %3d.%d\x1b[m\x1b[K\r\n" % (
+                color, 1000 + i, name.encode(), cpu[i] // 10, cpu[i] % 10)
+        out += b"\x1b[J\x1b[?25h"
+    return bytes(out)
+
+
+CAPTURES = {
+    "cmd_dir": cmd_dir_capture,
+    "ping": ping_capture,
+    "progress": progress_capture,
+    "top": top_capture,
+}
+
+
+def load_capture(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def chunked(data: bytes, size: int = 4096):
+    """read_chunks(size) と同じ境界で data を分割する"""
+    return [data[i:i + size] for i in range(0, len(data), size)]
@@ -1,5 +1,38 @@
-"""Asyncio-friendly wrapper around Windows ConPTY."""
+"""Asyncio-friendly wrapper around Windows ConPTY.
 
-from .conpty import AsyncConPTY
+Submodules are imported on first attribute access (PEP 562), so
+``import aioconpty`` stays cheap and never touches platform bindings.
+"""
 
-__all__ = ["AsyncConPTY"]
+import importlib
+
+# 公開名 -> 定義しているサブモジュール
+_EXPORTS = {
+    "AsyncConPTY": ".conpty",
+    "CloseResult": ".shutdown",
+    "ExpectEOF": ".expect",
+    "ExpectMatch": ".expect",
+    "ExpectTimeout": ".expect",
+    "PtyPool": ".pool",
+    "RunResult": ".oneshot",
+    "Screen": ".screen",
+    "VTParser": ".vtparse",
+    "close_all": ".shutdown",
+    "run": ".oneshot",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # 2 回目以降は通常のグローバル参照
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
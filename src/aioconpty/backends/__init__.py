@@ -0,0 +1,32 @@
+"""Platform backends for :class:`aioconpty.AsyncConPTY`."""
+
+import sys
+
+from .base import ExitWatcher, PtyBackend, PtyProcess
+
+__all__ = ["ExitWatcher", "PtyBackend", "PtyProcess", "get_backend", "default_backend_name"]
+
+
+def default_backend_name() -> str:
+    return "windows" if sys.platform == "win32" else "posix"
+
+
+def get_backend(backend=None) -> PtyBackend:
+    """
+    バックエンド名（'windows' / 'posix'）またはインスタンスから PtyBackend を返す。
+    None ならプラットフォームに応じて自動選択。
+    """
+    if isinstance(backend, PtyBackend):
+        return backend
+    name = backend or default_backend_name()
+    if name == "windows":
+        if sys.platform != "win32":
+            raise RuntimeError("windows バックエンドは Windows 専用です。")
+        from .windows import WindowsConPTYBackend
+        return WindowsConPTYBackend()
+    if name == "posix":
+        if sys.platform == "win32":
+            raise RuntimeError("posix バックエンドは Windows では使えません。")
+        from .posix import PosixPtyBackend
+        return PosixPtyBackend()
+    raise ValueError(f"unknown pty backend: {backend!r}")
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""Backend interface shared by the platform specific pty implementations.
+
+:class:`aioconpty.AsyncConPTY` owns the asyncio streams and delegates every
+operating-system specific step (creating the pseudo terminal, spawning a
+child, resizing and releasing handles) to a :class:`PtyBackend` instance.
+
+Child exits are observed by one :class:`ExitWatcher` per event loop and
+backend kind, which batches the OS waits for every child, resolves a single
+shared future per process and caches the exit code, so ``wait()`` never
+blocks the loop and ``poll()`` needs no system call.
+
+System calls that can block for milliseconds (creating the pseudo console,
+process creation, resizing and releasing it) run on a small executor
+dedicated to the backends, so a burst of spawns on one session does not
+stall every other session on the loop, and cannot starve the loop's default
+executor either.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+import weakref
+
+# イベントループ -> {ExitWatcher のサブクラス: インスタンス}
+_watchers = weakref.WeakKeyDictionary()
+
+# 呼び出しはどれも短いので数本で足りる（CPU 数より多くしてもループと CPU を取り合うだけ）
+BLOCKING_WORKERS = min(4, os.cpu_count() or 1)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def blocking_executor() -> concurrent.futures.Executor:
+    """
+    バックエンドのブロッキング呼び出し用の共有 executor（最初の使用時に作る）
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=BLOCKING_WORKERS, thread_name_prefix="aioconpty-blocking")
+    return _executor
+
+
+def set_blocking_executor(executor: concurrent.futures.Executor | None):
+    """
+    ブロッキング呼び出しに使う executor を差し替える。None なら既定（BLOCKING_WORKERS 本）に戻す。
+    差し替え前の executor は呼び出し側が shutdown する。
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+class ExitWatcher:
+    """
+    子プロセスの終了をまとめて監視する（イベントループごと・バックエンドの種類ごとに 1 つ）。
+
+    watch(proc) はプロセスごとに 1 つの Future（結果は終了コード）を返し、何度 wait()
+    されても OS 側の待機は 1 つで済む。終了コードは proc に保存される。
+    サブクラスは _start() / _stop() を実装し、終了を観測したら _resolve() を呼ぶ。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._pending = {}  # proc -> Future
+        self.exited = 0
+
+    @classmethod
+    def for_loop(cls, loop: asyncio.AbstractEventLoop = None) -> "ExitWatcher":
+        loop = loop or asyncio.get_running_loop()
+        per_loop = _watchers.get(loop)
+        if per_loop is None:
+            per_loop = _watchers[loop] = {}
+        watcher = per_loop.get(cls)
+        if watcher is None:
+            watcher = per_loop[cls] = cls(loop)
+        return watcher
+
+    @property
+    def watched(self) -> int:
+        """
+        終了待ちのプロセス数
+        """
+        return len(self._pending)
+
+    def watch(self, proc) -> asyncio.Future:
+        fut = self._pending.get(proc)
+        if fut is None:
+            fut = self._loop.create_future()
+            self._pending[proc] = fut
+            self._start(proc)
+        return fut
+
+    def release(self, proc):
+        """
+        終了を待たずに監視をやめる（ハンドルを閉じる前に呼ぶ）。Future は None で完了する。
+        """
+        fut = self._pending.pop(proc, None)
+        if fut is not None:
+            self._stop(proc)
+            if not fut.done():
+                fut.set_result(None)
+
+    def _resolve(self, proc, code):
+        """
+        ループのスレッドで呼ぶ: 終了コードを保存して待機中の全員を起こす
+        """
+        fut = self._pending.pop(proc, None)
+        if fut is None:
+            return
+        proc._exit_code = code
+        proc._record_exit()
+        self.exited += 1
+        if not fut.done():
+            fut.set_result(code)
+
+    def _start(self, proc):
+        raise NotImplementedError
+
+    def _stop(self, proc):
+        raise NotImplementedError
+
+
+class PtyProcess:
+    """
+    pty にぶら下がっている子プロセスの共通インターフェース
+    """
+    pid = 0
+
+    metrics = None      # MetricsCollector（AsyncConPTY.spawn() が設定する）
+    _spawned_at = None  # time.perf_counter() での起動時刻
+    _exit_code = None   # 観測済みの終了コード
+    _exit = None        # ExitWatcher.watch() の Future（監視していなければ None）
+
+    def _record_exit(self):
+        """
+        終了を初めて観測したときに呼ぶ。process.lifetime を記録する。
+        """
+        metrics, self.metrics = self.metrics, None
+        if metrics is not None and self._spawned_at is not None:
+            metrics.observe("process.lifetime", time.perf_counter() - self._spawned_at)
+            metrics.count("process.exited")
+
+    async def wait(self, timeout: float | None = None) -> int | None:
+        """
+        プロセス終了待ち。戻り値は return code（タイムアウト時は None）
+        """
+        raise NotImplementedError
+
+    async def _wait_exit(self, timeout: float | None) -> int | None:
+        """
+        ExitWatcher の Future を待つ。共有の Future なので待ち手のキャンセルからは守る。
+        """
+        fut = asyncio.shield(self._exit)
+        if timeout is None:
+            return await fut
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return None  # タイムアウト
+
+    def poll(self) -> int | None:
+        """
+        現在の終了コードを返す。未終了なら None。
+        """
+        raise NotImplementedError
+
+    def kill(self):
+        """
+        プロセスを強制終了する（終了済みなら何もしない）
+        """
+        raise NotImplementedError
+
+    def close_handle(self):
+        """
+        プロセスハンドル等の OS 資源を解放する
+        """
+
+
+class PtyBackend:
+    """
+    擬似端末の生成/破棄とプロセス起動を担当するバックエンドの基底クラス。
+
+    open() は (read_transport, write_transport) を返す。AsyncConPTY は
+    渡したプロトコルを通じてそれらを StreamReader/StreamWriter に接続する。
+    """
+    name = "base"
+    metrics = None  # MetricsCollector（AsyncConPTY が設定する）。None なら計測しない
+
+    def _phase(self, name: str, t0: float) -> float:
+        """
+        t0 からの経過時間を name として記録し、現在時刻を返す（次の区間の起点にする）
+        """
+        now = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.observe(name, now - t0)
+        return now
+
+    def run_blocking(self, func, *args) -> asyncio.Future:
+        """
+        func(*args) を共有のブロッキング用 executor で実行する Future を返す
+        """
+        return asyncio.get_running_loop().run_in_executor(blocking_executor(), func, *args)
+
+    def prepare_host(self):
+        """
+        親側端末の前準備（VT 有効化など）。失敗しても例外を出さない。
+        """
+
+    def host_console_size(self, cols: int = 80, rows: int = 25):
+        """
+        親側端末のサイズを返す。取得できなければ既定値。
+        """
+        return cols, rows
+
+    @property
+    def is_open(self) -> bool:
+        raise NotImplementedError
+
+    async def open(self, loop: asyncio.AbstractEventLoop, cols: int, rows: int,
+                   read_protocol: asyncio.Protocol, write_protocol: asyncio.Protocol):
+        raise NotImplementedError
+
+    async def spawn(self, cmd, *, cwd: str = None, wait_thread: bool = True,
+                    close_thread: bool = True, quiet: bool = False) -> PtyProcess:
+        raise NotImplementedError
+
+    def resize(self, cols: int, rows: int):
+        raise NotImplementedError
+
+    async def resize_async(self, cols: int, rows: int):
+        """
+        resize() の非同期版。システムコールがブロックし得るバックエンドは executor で実行する。
+        """
+        self.resize(cols, rows)
+
+    def restore_terminal(self) -> bool:
+        """
+        端末設定を open() 時点に戻す。戻せたら True、端末設定を持たない
+        （または戻せない）バックエンドは False を返す。
+        """
+        return False
+
+    def hangup(self):
+        """
+        端末側だけを閉じる。transport は開いたまま残り、端末に残っていた出力が
+        流れきると読み取り側が EOF になる。以降 spawn() / resize() はできない。
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        transport を閉じた後に呼ばれ、残りの OS 資源を解放する。
+        """
+        raise NotImplementedError
+
+    async def hangup_async(self):
+        """
+        hangup() の非同期版（既定は executor で実行する）
+        """
+        await self.run_blocking(self.hangup)
+
+    async def close_async(self):
+        """
+        close() の非同期版。システムコールがブロックし得るバックエンドは executor で実行する。
+        """
+        self.close()
+
+    async def ensure_utf8_codepage(self, codepage: int = 65001):
+        """
+        コードページ切り替えが必要なプラットフォームのみ実装する。
+        """
@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+"""POSIX openpty backend.
+
+Allocates a pseudo terminal with :func:`os.openpty`, spawns children on the
+slave side (new session + controlling tty) and drives the master fd with
+readiness-based I/O (:meth:`loop.add_reader` / :meth:`loop.add_writer`).
+
+Child exits are watched through a pidfd per child registered with the loop's
+selector, or, where ``os.pidfd_open`` is unavailable, by one shared backoff
+timer that polls every pending child, instead of one poll loop per waiter.
+"""
+
+import os
+import sys
+import errno
+import signal
+import fcntl
+import shlex
+import struct
+import asyncio
+import termios
+import subprocess
+import time
+
+from .base import ExitWatcher, PtyBackend, PtyProcess
+
+
+# ===== ユーティリティ =====
+def _set_winsize(fd: int, cols: int, rows: int):
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack("HHHH", int(rows), int(cols), 0, 0))
+
+
+def _make_controlling_tty():
+    """
+    preexec_fn: setsid 済みの子で stdin(slave) を制御端末にする
+    """
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+
+def _split_cmd(cmd):
+    """'ping localhost' -> ['ping', 'localhost'] / リストならそのまま"""
+    if isinstance(cmd, (list, tuple)):
+        return [str(c) for c in cmd]
+    return shlex.split(str(cmd))
+
+
+# ===== トランスポート =====
+class _PtyReadTransport(asyncio.ReadTransport):
+    """
+    master fd の読み取り可能通知で os.read() するトランスポート。
+    Linux では slave 側が全て閉じられると EIO になるので EOF として扱う。
+    """
+    max_size = 256 * 1024
+
+    def __init__(self, loop, fd: int, protocol: asyncio.Protocol):
+        super().__init__()
+        self._loop = loop
+        self._fd = fd
+        self._protocol = protocol
+        self._closing = False
+        self._paused = False
+        self._loop.call_soon(self._protocol.connection_made, self)
+        self._loop.call_soon(self._add_reader)
+
+    def _add_reader(self):
+        if not self._closing and not self._paused:
+            self._loop.add_reader(self._fd, self._read_ready)
+
+    def _read_ready(self):
+        try:
+            data = os.read(self._fd, self.max_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            if exc.errno != errno.EIO:
+                self._fatal_error(exc)
+                return
+            data = b""
+        if data:
+            self._protocol.data_received(data)
+            return
+        self._closing = True
+        self._loop.remove_reader(self._fd)
+        self._loop.call_soon(self._protocol.eof_received)
+        self._loop.call_soon(self._call_connection_lost, None)
+
+    def is_reading(self) -> bool:
+        return not self._paused and not self._closing
+
+    def pause_reading(self):
+        if not self.is_reading():
+            return
+        self._paused = True
+        self._loop.remove_reader(self._fd)
+
+    def resume_reading(self):
+        if self._closing or not self._paused:
+            return
+        self._paused = False
+        self._loop.add_reader(self._fd, self._read_ready)
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def get_protocol(self):
+        return self._protocol
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self):
+        if not self._closing:
+            self._close(None)
+
+    def _fatal_error(self, exc):
+        self._close(exc)
+
+    def _close(self, exc):
+        self._closing = True
+        self._loop.remove_reader(self._fd)
+        self._loop.call_soon(self._call_connection_lost, exc)
+
+    def _call_connection_lost(self, exc):
+        if self._fd is None:
+            return
+        try:
+            self._protocol.connection_lost(exc)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._protocol = None
+
+
+class _PtyWriteTransport(asyncio.WriteTransport):
+    """
+    master fd への書き込みトランスポート。書き切れなかった分は add_writer で送る。
+    """
+
+    def __init__(self, loop, fd: int, protocol: asyncio.Protocol):
+        super().__init__()
+        self._loop = loop
+        self._fd = fd
+        self._protocol = protocol
+        self._buffer = bytearray()
+        self._closing = False
+        self._conn_lost = False
+        self._protocol_paused = False
+        self._high_water = 64 * 1024
+        self._low_water = 16 * 1024
+        self._loop.call_soon(self._protocol.connection_made, self)
+
+    def write(self, data):
+        if not data or self._conn_lost or self._closing:
+            return
+        if not self._buffer:
+            try:
+                n = os.write(self._fd, data)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError as exc:
+                self._fatal_error(exc)
+                return
+            if n == len(data):
+                return
+            data = memoryview(data)[n:]
+            self._loop.add_writer(self._fd, self._write_ready)
+        self._buffer += data
+        self._maybe_pause_protocol()
+
+    def _write_ready(self):
+        try:
+            n = os.write(self._fd, self._buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            self._buffer.clear()
+            self._loop.remove_writer(self._fd)
+            self._fatal_error(exc)
+            return
+        del self._buffer[:n]
+        self._maybe_resume_protocol()
+        if not self._buffer:
+            self._loop.remove_writer(self._fd)
+            if self._closing:
+                self._loop.call_soon(self._call_connection_lost, None)
+
+    def _maybe_pause_protocol(self):
+        if len(self._buffer) <= self._high_water or self._protocol_paused:
+            return
+        self._protocol_paused = True
+        self._protocol.pause_writing()
+
+    def _maybe_resume_protocol(self):
+        if self._protocol_paused and len(self._buffer) <= self._low_water:
+            self._protocol_paused = False
+            self._protocol.resume_writing()
+
+    def get_write_buffer_size(self) -> int:
+        return len(self._buffer)
+
+    def get_write_buffer_limits(self):
+        return (self._low_water, self._high_water)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        if high is None:
+            high = 64 * 1024 if low is None else 4 * low
+        if low is None:
+            low = high // 4
+        if not high >= low >= 0:
+            raise ValueError(f"high ({high!r}) must be >= low ({low!r}) must be >= 0")
+        self._high_water = high
+        self._low_water = low
+        self._maybe_pause_protocol()
+        self._maybe_resume_protocol()
+
+    def can_write_eof(self) -> bool:
+        return False
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def get_protocol(self):
+        return self._protocol
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        if not self._buffer:
+            self._loop.call_soon(self._call_connection_lost, None)
+
+    def abort(self):
+        self._close(None)
+
+    def _fatal_error(self, exc):
+        self._close(exc)
+
+    def _close(self, exc):
+        self._closing = True
+        if self._buffer:
+            self._loop.remove_writer(self._fd)
+            self._buffer.clear()
+        self._loop.call_soon(self._call_connection_lost, exc)
+
+    def _call_connection_lost(self, exc):
+        if self._conn_lost:
+            return
+        self._conn_lost = True
+        try:
+            self._protocol.connection_lost(exc)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._protocol = None
+
+
+# ===== バックエンド =====
+class PosixPtyBackend(PtyBackend):
+    """
+    os.openpty() による擬似端末バックエンド。
+
+    slave fd は open() から close() まで親が保持する（ConPTY と同様に複数回 spawn できる）。
+    """
+    name = "posix"
+
+    def __init__(self):
+        self._master_fd = None
+        self._slave_fd = None
+        self._termios = None    # open() 直後の slave の termios（restore_terminal() 用）
+        self._loop = None
+
+    def host_console_size(self, cols: int = 80, rows: int = 25):
+        try:
+            size = os.get_terminal_size(sys.__stdout__.fileno())
+            return size.columns, size.lines
+        except (AttributeError, ValueError, OSError):
+            return cols, rows
+
+    @property
+    def is_open(self) -> bool:
+        return self._slave_fd is not None
+
+    async def open(self, loop, cols, rows, read_protocol, write_protocol):
+        self._loop = loop
+        t = time.perf_counter()
+        master, slave = os.openpty()
+        try:
+            _set_winsize(slave, cols, rows)
+            self._termios = termios.tcgetattr(slave)
+            os.set_blocking(master, False)
+            # 読み書きのトランスポートがそれぞれ自分の fd を閉じられるよう複製する
+            master_w = os.dup(master)
+        except BaseException:
+            os.close(master)
+            os.close(slave)
+            raise
+        self._master_fd = master
+        self._slave_fd = slave
+        t = self._phase("open.openpty", t)
+
+        transport_r = _PtyReadTransport(loop, master, read_protocol)
+        transport_w = _PtyWriteTransport(loop, master_w, write_protocol)
+        self._phase("open.transports", t)
+        return transport_r, transport_w
+
+    def restore_terminal(self) -> bool:
+        # 子が raw / -echo などにしたまま終了しても、次の子には open() 時の設定で渡す
+        if self._slave_fd is None or self._termios is None:
+            return False
+        try:
+            termios.tcsetattr(self._slave_fd, termios.TCSANOW, self._termios)
+        except (termios.error, OSError):
+            return False
+        return True
+
+    def hangup(self):
+        # 親の slave fd を閉じる。子（と孫）が全員閉じると master の読み取りが EIO = EOF になる
+        if self._slave_fd is not None:
+            try:
+                os.close(self._slave_fd)
+            except OSError:
+                pass
+            finally:
+                self._slave_fd = None
+
+    async def hangup_async(self):
+        self.hangup()  # close() 1 回なのでループ上で済ませる
+
+    def close(self):
+        # master fd は transport が閉じる
+        self._master_fd = None
+        if self._slave_fd is not None:
+            try:
+                os.close(self._slave_fd)
+            except OSError:
+                pass
+            finally:
+                self._slave_fd = None
+
+    def resize(self, cols: int, rows: int):
+        if self._slave_fd is None:
+            raise OSError("pty is not open")
+        _set_winsize(self._slave_fd, cols, rows)
+
+    async def spawn(self, cmd, *, cwd: str = None, wait_thread: bool = True,
+                    close_thread: bool = True, quiet: bool = False):
+        # wait_thread / close_thread は ConPTY 互換のための引数（POSIX では不要）
+        if self._slave_fd is None:
+            raise RuntimeError("pty 未初期化。まず open()/__aenter__() を呼んでください。")
+
+        slave = self._slave_fd
+        t = time.perf_counter()
+        try:
+            # preexec_fn は他のスレッドが動いていると安全でない（fork 時に他スレッドが持っていた
+            # ロックで子が固まる）ので、executor には出さずループのスレッドで起動する
+            popen = subprocess.Popen(
+                _split_cmd(cmd),
+                stdin=slave, stdout=slave, stderr=slave,
+                cwd=cwd,
+                start_new_session=True,
+                preexec_fn=_make_controlling_tty,
+            )
+        except Exception:
+            if quiet:
+                return PosixPtyProcess(None, exit_code=0)
+            raise
+        self._phase("spawn.popen", t)
+        return PosixPtyProcess(popen, watcher=PosixExitWatcher.for_loop(self._loop))
+
+
+class PosixExitWatcher(ExitWatcher):
+    """
+    子プロセスの終了監視。pidfd をループのセレクタに登録し（子の終了で読み取り可能になる）、
+    pidfd が使えなければ全プロセスを 1 つのタイマーでまとめてポーリングする。
+    """
+    _poll_interval_max = 0.05
+
+    def __init__(self, loop):
+        super().__init__(loop)
+        self._pidfds = {}       # proc -> pidfd
+        self._polled = set()    # pidfd なしで監視しているプロセス
+        self._timer = None
+        self._delay = 0.001
+
+    def _start(self, proc):
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open is not None:
+            try:
+                pidfd = pidfd_open(proc.pid)
+            except OSError:
+                pidfd = None
+            if pidfd is not None:
+                self._pidfds[proc] = pidfd
+                self._loop.add_reader(pidfd, self._pidfd_ready, proc)
+                return
+        self._polled.add(proc)
+        # 新しいプロセスが来たら間隔を縮め直す（短命なプロセスの終了を早く拾う）
+        self._delay = 0.001
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self._delay, self._poll_all)
+
+    def _stop(self, proc):
+        pidfd = self._pidfds.pop(proc, None)
+        if pidfd is not None:
+            self._loop.remove_reader(pidfd)
+            os.close(pidfd)
+        self._polled.discard(proc)
+        if not self._polled and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _pidfd_ready(self, proc):
+        code = proc._popen.poll() if proc._popen is not None else None
+        if code is not None:
+            self._stop(proc)
+            self._resolve(proc, code)
+
+    def _poll_all(self):
+        self._timer = None
+        for proc in list(self._polled):
+            code = proc._popen.poll() if proc._popen is not None else None
+            if code is not None:
+                self._stop(proc)
+                self._resolve(proc, code)
+        if self._polled:
+            self._delay = min(self._delay * 2, self._poll_interval_max)
+            self._timer = self._loop.call_later(self._delay, self._poll_all)
+
+
+class PosixPtyProcess(PtyProcess):
+    """
+    pty にぶら下がっている子プロセスの簡易ハンドラ（subprocess.Popen ベース）。
+    終了は PosixExitWatcher が観測し、終了コードはキャッシュされる。
+    """
+
+    def __init__(self, popen: subprocess.Popen | None, exit_code: int | None = None,
+                 watcher: PosixExitWatcher = None):
+        self._popen = popen
+        self.pid = popen.pid if popen is not None else 0
+        self._exit_code = exit_code
+        self._watcher = watcher
+        if popen is not None and watcher is not None:
+            self._exit = watcher.watch(self)
+
+    async def wait(self, timeout: float | None = None) -> int | None:
+        """
+        プロセス終了待ち。戻り値は return code（シグナル終了は負値）
+        """
+        if self._exit_code is not None or self._exit is None:
+            return self.poll()
+        return await self._wait_exit(timeout)
+
+    def poll(self) -> int | None:
+        """
+        現在の終了コードを返す。未終了なら None。
+        監視中のプロセスはキャッシュを返すだけでシステムコールを発行しない。
+        """
+        if self._exit_code is not None:
+            return self._exit_code
+        if self._popen is None:
+            return 0
+        if self._exit is not None and not self._exit.done():
+            return None
+        code = self._popen.poll()
+        if code is not None:
+            self._exit_code = code
+            self._record_exit()
+        return code
+
+    def kill(self):
+        """
+        SIGKILL をプロセスグループ（子は新しいセッションの先頭）ごと送る
+        """
+        if self._popen is None or self.poll() is not None:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            self._popen.kill()
+
+    def close_handle(self):
+        if self._popen is not None:
+            if self._exit is not None and not self._exit.done():
+                self._watcher.release(self)
+            self.poll()
+        self._popen = None
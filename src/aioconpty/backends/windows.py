@@ -0,0 +1,695 @@
+# -*- coding: utf-8 -*-
+"""Windows ConPTY backend.
+
+Creates the pseudo console with :func:`CreatePseudoConsole`, wires its pipes
+into proactor transports and spawns children through :func:`CreateProcessW`
+with a :class:`STARTUPINFOEX` carrying the pseudo console attribute.
+
+Requires Windows 10 build 1809 or later.  The module itself imports on any
+platform: kernel32 prototypes are only resolved on first use.
+
+Child exits are watched by :class:`WindowsExitWatcher`: a few daemon threads,
+each blocked in ``WaitForMultipleObjects`` on up to 63 process handles plus a
+wake-up event, post exits to the loop with ``call_soon_threadsafe``.  This
+works on any event loop and never blocks the loop thread.
+"""
+
+import ctypes
+import ctypes.wintypes
+import asyncio
+import threading
+import time
+
+from .base import ExitWatcher, PtyBackend, PtyProcess
+
+# ===== 定数 =====
+FILE_SHARE_READ   = 0x00000001
+FILE_SHARE_WRITE  = 0x00000002
+FILE_ATTRIBUTE_NORMAL = 0x00000080
+
+STD_INPUT_HANDLE  = -10
+STD_OUTPUT_HANDLE = -11
+STD_ERROR_HANDLE  = -12
+
+INVALID_HANDLE_VALUE = ctypes.wintypes.HANDLE(-1).value
+
+S_OK = 0
+
+EXTENDED_STARTUPINFO_PRESENT = 0x00080000
+PROC_THREAD_ATTRIBUTE_PSEUDOCONSOLE = 0x00020016
+
+ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+STARTF_USESTDHANDLES = 0x0100
+
+INFINITE = 0xFFFFFFFF
+WAIT_OBJECT_0 = 0x00000000
+WAIT_TIMEOUT = 0x00000102
+WAIT_FAILED = 0xFFFFFFFF
+MAXIMUM_WAIT_OBJECTS = 64
+STILL_ACTIVE = 259
+
+GENERIC_READ  = 0x80000000
+GENERIC_WRITE = 0x40000000
+OPEN_EXISTING = 3
+
+# ===== 型エイリアス =====
+PVOID  = ctypes.wintypes.LPVOID
+SIZE_T = ctypes.c_size_t
+HPCON  = ctypes.wintypes.HANDLE
+
+
+# ===== エラーチェック =====
+def _errcheck_bool(value, func, args):
+    if not value:
+        raise ctypes.WinError()
+    return args
+
+def _errcheck_handle(value, func, args):
+    if value == 0 or value == INVALID_HANDLE_VALUE:
+        raise ctypes.WinError()
+    return value
+
+
+# ===== 構造体 =====
+class COORD(ctypes.Structure):
+    _fields_ = [("X", ctypes.wintypes.SHORT),
+                ("Y", ctypes.wintypes.SHORT)]
+
+class STARTUPINFO(ctypes.Structure):
+    _fields_ = [("cb", ctypes.wintypes.DWORD),
+                ("lpReserved", ctypes.c_void_p),
+                ("lpDesktop", ctypes.c_void_p),
+                ("lpTitle", ctypes.c_void_p),
+                ("dwX", ctypes.wintypes.DWORD),
+                ("dwY", ctypes.wintypes.DWORD),
+                ("dwXSize", ctypes.wintypes.DWORD),
+                ("dwYSize", ctypes.wintypes.DWORD),
+                ("dwXCountChars", ctypes.wintypes.DWORD),
+                ("dwYCountChars", ctypes.wintypes.DWORD),
+                ("dwFillAttribute", ctypes.wintypes.DWORD),
+                ("dwFlags", ctypes.wintypes.DWORD),
+                ("wShowWindow", ctypes.wintypes.WORD),
+                ("cbReserved2", ctypes.wintypes.WORD),
+                ("lpReserved2", ctypes.c_void_p),
+                ("hStdInput", ctypes.wintypes.HANDLE),
+                ("hStdOutput", ctypes.wintypes.HANDLE),
+                ("hStdError", ctypes.wintypes.HANDLE)]
+
+class STARTUPINFOEX(ctypes.Structure):
+    _fields_ = [("StartupInfo", STARTUPINFO),
+                ("lpAttributeList", ctypes.c_void_p)]
+
+class PROCESS_INFORMATION(ctypes.Structure):
+    _fields_ = [("hProcess", ctypes.wintypes.HANDLE),
+                ("hThread", ctypes.wintypes.HANDLE),
+                ("dwProcessId", ctypes.wintypes.DWORD),
+                ("dwThreadId", ctypes.wintypes.DWORD)]
+
+class CONSOLE_SCREEN_BUFFER_INFO(ctypes.Structure):
+    _fields_ = [
+        ("dwSize", COORD),
+        ("dwCursorPosition", COORD),
+        ("wAttributes", ctypes.wintypes.WORD),
+        ("srWindow", ctypes.wintypes.SMALL_RECT),
+        ("dwMaximumWindowSize", COORD),
+    ]
+
+
+# ===== WinAPI =====
+def _prototypes():
+    """
+    関数名 -> (argtypes, restype, errcheck)。ctypes.HRESULT は Windows にしかないため遅延評価する
+    """
+    W = ctypes.wintypes
+    return {
+        "SetLastError": ([W.DWORD], None, None),
+        "GetStdHandle": ([W.DWORD], W.HANDLE, None),
+        "CreateFileW": ([ctypes.c_wchar_p, W.DWORD, W.DWORD,
+                         ctypes.c_void_p, W.DWORD, W.DWORD,
+                         W.HANDLE], W.HANDLE, _errcheck_handle),
+        "GetConsoleMode": ([W.HANDLE, ctypes.POINTER(W.DWORD)], W.BOOL, None),
+        "SetConsoleMode": ([W.HANDLE, W.DWORD], W.BOOL, _errcheck_bool),
+        "GetConsoleScreenBufferInfo": ([W.HANDLE, ctypes.POINTER(CONSOLE_SCREEN_BUFFER_INFO)],
+                                       W.BOOL, _errcheck_bool),
+        "CreatePseudoConsole": ([COORD, W.HANDLE, W.HANDLE,
+                                 W.DWORD, ctypes.POINTER(HPCON)], ctypes.HRESULT, None),
+        "ResizePseudoConsole": ([HPCON, COORD], ctypes.HRESULT, None),
+        "ClosePseudoConsole": ([HPCON], None, None),
+        "InitializeProcThreadAttributeList": ([ctypes.c_void_p, W.DWORD,
+                                               W.DWORD, ctypes.POINTER(SIZE_T)], W.BOOL, None),
+        "UpdateProcThreadAttribute": ([ctypes.c_void_p, W.DWORD, SIZE_T,
+                                       ctypes.c_void_p, SIZE_T, ctypes.c_void_p,
+                                       ctypes.POINTER(SIZE_T)], W.BOOL, None),
+        "DeleteProcThreadAttributeList": ([ctypes.c_void_p], None, None),
+        "CreateProcessW": ([ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p, ctypes.c_void_p,
+                            W.BOOL, W.DWORD, ctypes.c_void_p,
+                            ctypes.c_wchar_p, ctypes.POINTER(STARTUPINFO),
+                            ctypes.POINTER(PROCESS_INFORMATION)], W.BOOL, _errcheck_bool),
+        "CloseHandle": ([W.HANDLE], W.BOOL, _errcheck_bool),
+        "WaitForSingleObject": ([W.HANDLE, W.DWORD], W.DWORD, None),
+        "WaitForMultipleObjects": ([W.DWORD, ctypes.POINTER(W.HANDLE), W.BOOL, W.DWORD],
+                                   W.DWORD, None),
+        "CreateEventW": ([ctypes.c_void_p, W.BOOL, W.BOOL, ctypes.c_wchar_p],
+                         W.HANDLE, _errcheck_handle),
+        "SetEvent": ([W.HANDLE], W.BOOL, _errcheck_bool),
+        "GetExitCodeProcess": ([W.HANDLE, ctypes.POINTER(W.DWORD)], W.BOOL, _errcheck_bool),
+        "TerminateProcess": ([W.HANDLE, W.UINT], W.BOOL, _errcheck_bool),
+    }
+
+
+class _Kernel32:
+    """
+    kernel32 の関数テーブル。
+
+    初回の属性アクセスで DLL をロードし、argtypes/restype/errcheck を設定した関数を
+    インスタンス属性としてキャッシュする（2 回目以降は通常の属性参照）。
+    ctypes.windll の共有インスタンスではなく専用の WinDLL を使うので、
+    他ライブラリが同じ関数に設定したプロトタイプとは干渉しない。
+    """
+
+    def __init__(self):
+        self._dll = None
+        self._protos = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._protos is None:
+            self._protos = _prototypes()
+        try:
+            argtypes, restype, errcheck = self._protos[name]
+        except KeyError:
+            raise AttributeError(f"kernel32 function not declared: {name}") from None
+        if self._dll is None:
+            self._dll = ctypes.WinDLL("kernel32")
+        func = getattr(self._dll, name)
+        func.argtypes = argtypes
+        func.restype = restype
+        if errcheck is not None:
+            func.errcheck = errcheck
+        setattr(self, name, func)
+        return func
+
+
+kernel32 = _Kernel32()
+
+
+# ===== ユーティリティ =====
+def _enable_host_console_vt_if_possible():
+    """
+    親側のコンソールで VT シーケンスを有効化（なくても動くが、親側でのカラー表示などに便利）
+    IDE などから起動していてコンソールがない場合は失敗しても握りつぶす。
+    """
+    try:
+        h_console = kernel32.CreateFileW("CONOUT$", GENERIC_READ | GENERIC_WRITE,
+                                FILE_SHARE_READ | FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
+        mode = ctypes.wintypes.DWORD(0)
+        if kernel32.GetConsoleMode(h_console, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(h_console, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING)
+        kernel32.CloseHandle(h_console)
+    except Exception:
+        pass  # 非コンソール環境や古い Windows など
+
+
+def _get_host_console_size_fallback(cols=80, rows=25):
+    """
+    親側コンソールのサイズを取得。失敗したら既定値を返す。
+    """
+    try:
+        h_console = kernel32.CreateFileW("CONOUT$", GENERIC_READ | GENERIC_WRITE,
+                                FILE_SHARE_READ | FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
+        csbi = CONSOLE_SCREEN_BUFFER_INFO()
+        kernel32.GetConsoleScreenBufferInfo(h_console, ctypes.byref(csbi))
+        kernel32.CloseHandle(h_console)
+        x = csbi.srWindow.Right - csbi.srWindow.Left + 1
+        y = csbi.srWindow.Bottom - csbi.srWindow.Top + 1
+        return x, y
+    except Exception:
+        return cols, rows
+
+
+def _list2cmdline(cmd):
+    """['ping', 'localhost'] -> 'ping localhost' / 文字列ならそのまま"""
+    if isinstance(cmd, (list, tuple)):
+        import subprocess
+        return subprocess.list2cmdline(list(cmd))
+    return str(cmd)
+
+
+
+# ===== バックエンド =====
+class WindowsConPTYBackend(PtyBackend):
+    """
+    ConPTY(擬似コンソール)バックエンド。
+    """
+    name = "windows"
+
+    def __init__(self):
+        self.hPC = HPCON()
+        self._hPipeIn = None   # ConPTY->親（親が読む）
+        self._hPipeOut = None  # 親->ConPTY（親が書く）
+
+        self._attr_mem = None  # attribute list backing buffer
+        self._si_ex = None     # STARTUPINFOEX
+
+        self._loop = None
+
+    def prepare_host(self):
+        _enable_host_console_vt_if_possible()
+
+    def host_console_size(self, cols: int = 80, rows: int = 25):
+        return _get_host_console_size_fallback(cols, rows)
+
+    @property
+    def is_open(self) -> bool:
+        # hangup() は hPC だけを閉じる（属性リストは close() まで残る）ので両方を見る
+        return bool(self._si_ex) and bool(self.hPC)
+
+    async def open(self, loop, cols, rows, read_protocol, write_protocol):
+        self._loop = loop
+        import asyncio.windows_utils
+        t = time.perf_counter()
+
+        # パイプと ConPTY の生成はブロックし得るので executor で行う
+        hPipeIn, hPipeOut = await self.run_blocking(self._create_pseudo_console, cols, rows)
+        t = self._phase("open.create_pseudo_console", t)
+
+        # asyncio のパイプハンドルへ
+        # 重要: PipeHandle に所有権を渡したため、内部では保持しない
+        # こうすることで二重 CloseHandle を防ぐ（PipeHandle.__del__ が CloseHandle を呼ぶ）
+        pipe_in_ph = asyncio.windows_utils.PipeHandle(hPipeIn)
+        pipe_out_ph = asyncio.windows_utils.PipeHandle(hPipeOut)
+
+        # ここから先で失敗したら、作った transport / パイプ / ConPTY をすべて解放する
+        transport_r = transport_w = None
+        try:
+            # Reader のセットアップ（通常の connect_read_pipe を使う）
+            transport_r, _ = await loop.connect_read_pipe(lambda: read_protocol, pipe_in_ph)
+
+            # ---- ここがポイント ----
+            # connect_write_pipe() が内部でパイプを読み取りしようとして PermissionError を出す環境があるため、
+            # 元スクリプトで使っていたように Proactor の内部クラスで書き込みトランスポートを直接作る。
+            # 互換のために proactor_events の非公開クラスを使う（Python の実装依存）。
+            from asyncio import proactor_events
+            # _ProactorBaseWritePipeTransport の呼び出しシグネチャはバージョン差があるため
+            # (loop, sock, protocol, waiter, extra) の順で渡す。waiter は None。
+            waiter = None
+            transport_w = proactor_events._ProactorBaseWritePipeTransport(loop, pipe_out_ph, write_protocol, waiter, None)
+            t = self._phase("open.transports", t)
+
+            await self.run_blocking(self._init_attribute_list)
+            self._phase("open.attribute_list", t)
+        except BaseException:
+            for transport, handle in ((transport_r, pipe_in_ph), (transport_w, pipe_out_ph)):
+                if transport is not None:
+                    transport.close()
+                else:
+                    handle.close()  # transport に渡る前のパイプは自分で閉じる
+            # 属性リストと ConPTY
+            await self.close_async()
+            raise
+
+        return transport_r, transport_w
+
+    def _create_pseudo_console(self, cols, rows):
+        """
+        executor で実行: パイプ 2 組と ConPTY を作り、親側のパイプ (読む側, 書く側) を返す
+        """
+        import asyncio.windows_utils
+        # (1) 親側が読むパイプ (ConPTY の出力)
+        #     overlapped: 親(read)=True / ConPTY(write)=False
+        hPipeIn, hPipePTYOut = asyncio.windows_utils.pipe(overlapped=(True, False), duplex=False)
+        # (2) 親側が書くパイプ (ConPTY の入力)
+        #     overlapped: ConPTY(read)=False / 親(write)=True
+        hPipePTYIn, hPipeOut = asyncio.windows_utils.pipe(overlapped=(False, True), duplex=False)
+
+        # ConPTY 生成
+        size = COORD(cols, rows)
+        hr = kernel32.CreatePseudoConsole(size, hPipePTYIn, hPipePTYOut, 0, ctypes.byref(self.hPC))
+        # ConPTY 側のパイプ終端は不要なのでクローズ
+        kernel32.CloseHandle(hPipePTYIn)
+        kernel32.CloseHandle(hPipePTYOut)
+        if hr != S_OK:
+            # 後片付け
+            kernel32.CloseHandle(hPipeIn)
+            kernel32.CloseHandle(hPipeOut)
+            raise OSError(f"CreatePseudoConsole failed: HRESULT=0x{hr:08X}")
+        return hPipeIn, hPipeOut
+
+    def _init_attribute_list(self):
+        """
+        executor で実行: STARTUPINFOEX を構築して ConPTY を属性にアタッチ
+        """
+        si_ex = STARTUPINFOEX()
+        si_ex.StartupInfo.cb = ctypes.sizeof(STARTUPINFOEX)
+
+        # kernel32.InitializeProcThreadAttributeList(第一次呼び出し: サイズ取得)
+        size_bytes = SIZE_T(0)
+        if not kernel32.InitializeProcThreadAttributeList(None, 1, 0, ctypes.byref(size_bytes)):
+            # ここは必ずエラー 122 (ERROR_INSUFFICIENT_BUFFER) になる想定
+            # なので明示的にエラーをクリア
+            kernel32.SetLastError(0)
+
+        # バッファ確保
+        mem = (ctypes.c_char * size_bytes.value)()
+        si_ex.lpAttributeList = ctypes.cast(mem, ctypes.c_void_p)
+
+        ok = kernel32.InitializeProcThreadAttributeList(si_ex.lpAttributeList, 1, 0, ctypes.byref(size_bytes))
+        if not ok:
+            raise ctypes.WinError()
+
+        # 擬似コンソール属性を設定
+        ok = kernel32.UpdateProcThreadAttribute(
+            si_ex.lpAttributeList,
+            0,
+            PROC_THREAD_ATTRIBUTE_PSEUDOCONSOLE,
+            self.hPC, ctypes.sizeof(self.hPC),
+            None, None
+        )
+        if not ok:
+            kernel32.DeleteProcThreadAttributeList(si_ex.lpAttributeList)
+            raise ctypes.WinError()
+        self._attr_mem = mem
+        self._si_ex = si_ex
+
+    def hangup(self):
+        # ClosePseudoConsole は最後の画面内容を出力パイプへ書いてから閉じる（パイプは EOF になる）
+        if self.hPC:
+            try:
+                kernel32.ClosePseudoConsole(self.hPC)
+            finally:
+                self.hPC = HPCON()
+
+    def close(self):
+        # パイプハンドル (もしまだ内部に残っていれば閉じる)
+        # ただし PipeHandle に渡していれば self._hPipeOut/_hPipeIn は None になっているはず
+        for attr_name in ("_hPipeOut", "_hPipeIn"):
+            h = getattr(self, attr_name, None)
+            if h is not None:
+                try:
+                    kernel32.CloseHandle(h)
+                except Exception:
+                    pass
+                finally:
+                    setattr(self, attr_name, None)
+
+        # 属性リスト削除（存在すれば）
+        try:
+            if self._si_ex and self._si_ex.lpAttributeList:
+                try:
+                    kernel32.DeleteProcThreadAttributeList(self._si_ex.lpAttributeList)
+                except Exception:
+                    pass
+                self._si_ex = None
+                self._attr_mem = None
+        except Exception:
+            pass
+
+        # ConPTY を閉じる
+        try:
+            if self.hPC:
+                try:
+                    kernel32.ClosePseudoConsole(self.hPC)
+                except Exception:
+                    pass
+                self.hPC = HPCON()
+        except Exception:
+            pass
+
+    async def hangup_async(self):
+        await self.run_blocking(self.hangup)
+
+    async def close_async(self):
+        # ClosePseudoConsole は conhost の終了を待つことがあるので executor で行う
+        await self.run_blocking(self.close)
+
+    # ---- サイズ変更 ----
+    def resize(self, cols: int, rows: int):
+        size = COORD(int(cols), int(rows))
+        hr = kernel32.ResizePseudoConsole(self.hPC, size)
+        if hr != S_OK:
+            raise OSError(f"ResizePseudoConsole failed: HRESULT=0x{hr:08X}")
+
+    async def resize_async(self, cols: int, rows: int):
+        await self.run_blocking(self.resize, cols, rows)
+
+    # ---- プロセス起動 ----
+    async def ensure_utf8_codepage(self, codepage: int = 65001):
+        """
+        元コード互換: 起動直後に chcp.com でコードページを UTF-8 にする（任意）
+        """
+        await self.spawn(f"chcp.com {codepage}", wait_thread=True, close_thread=True, quiet=True)
+
+    async def spawn(self, cmd, *, cwd: str = None, wait_thread: bool = True,
+                    close_thread: bool = True, quiet: bool = False):
+        if not self.is_open:
+            raise RuntimeError("ConPTY 未初期化。まず open()/__aenter__() を呼んでください。")
+
+        lp_pi = PROCESS_INFORMATION()
+        # lpCommandLine は書き換えられる可能性があるため可変バッファを渡す
+        cmdline = _list2cmdline(cmd)
+        buf = ctypes.create_unicode_buffer(cmdline)
+
+        t = time.perf_counter()
+        try:
+            # CreateProcessW は数十 ms かかることがあるので executor で行う
+            await self.run_blocking(
+                kernel32.CreateProcessW,
+                None, buf,
+                None, None,
+                False,
+                EXTENDED_STARTUPINFO_PRESENT,
+                None,
+                cwd,
+                ctypes.byref(self._si_ex.StartupInfo),
+                ctypes.byref(lp_pi)
+            )
+        except Exception:
+            if quiet:
+                # 失敗しても呼び出し側に投げない設定
+                return AsyncConPTYProcess(None, None, 0)
+            raise
+        t = self._phase("spawn.create_process", t)
+
+        watcher = WindowsExitWatcher.for_loop(self._loop)
+        # 起動スレッドのシグナルを待つ（短時間）。待機は監視スレッドで行うのでループは止まらない
+        if wait_thread:
+            await watcher.wait_handle(int(lp_pi.hThread))
+            self._phase("spawn.wait_thread", t)
+
+        if close_thread and lp_pi.hThread:
+            try:
+                kernel32.CloseHandle(lp_pi.hThread)
+            except Exception:
+                pass
+            lp_pi.hThread = None
+
+        return AsyncConPTYProcess(lp_pi.hProcess, lp_pi.dwProcessId, exit_code=None,
+                                  watcher=watcher)
+
+
+class _WaitGroup(threading.Thread):
+    """
+    最大 63 個のハンドルを WaitForMultipleObjects でまとめて待つスレッド。
+    追加/解放の要求は commands に積んで wake イベントで知らせる。
+    監視するハンドルがなくなったら終了する。
+    """
+    capacity = MAXIMUM_WAIT_OBJECTS - 1
+
+    def __init__(self, owner: "WindowsExitWatcher"):
+        super().__init__(name="aioconpty-exit-watcher", daemon=True)
+        self._owner = owner
+        self._wake = kernel32.CreateEventW(None, False, False, None)
+        self.handles = {}    # handle -> callback(handle)
+        self.commands = []   # ("add", handle, callback) / ("close", handle)
+        self.load = 0        # 監視中 + 追加待ちのハンドル数
+
+    def submit(self, command):
+        # owner._lock を保持した状態で呼ぶ
+        self.commands.append(command)
+        kernel32.SetEvent(self._wake)
+
+    def run(self):
+        owner = self._owner
+        while True:
+            with owner._lock:
+                for command in self.commands:
+                    if command[0] == "add":
+                        self.handles[command[1]] = command[2]
+                    else:
+                        handle = command[1]
+                        if self.handles.pop(handle, None) is not None:
+                            owner._where.pop(handle, None)
+                            self.load -= 1
+                        _close_quietly(handle)
+                self.commands.clear()
+                if not self.handles:
+                    owner._groups.remove(self)
+                    _close_quietly(self._wake)
+                    return
+                order = list(self.handles)
+            array = (ctypes.wintypes.HANDLE * (len(order) + 1))(self._wake, *order)
+            ret = kernel32.WaitForMultipleObjects(len(order) + 1, array, False, INFINITE)
+            if ret == WAIT_FAILED:
+                # 無効になったハンドルを個別に確かめて外す
+                signaled = [h for h in order if kernel32.WaitForSingleObject(h, 0) != WAIT_TIMEOUT]
+            elif WAIT_OBJECT_0 < ret <= WAIT_OBJECT_0 + len(order):
+                signaled = [order[ret - WAIT_OBJECT_0 - 1]]
+            else:
+                continue  # wake イベント
+            with owner._lock:
+                fired = []
+                for handle in signaled:
+                    callback = self.handles.pop(handle, None)
+                    if callback is not None:
+                        owner._where.pop(handle, None)
+                        self.load -= 1
+                        fired.append((callback, handle))
+            for callback, handle in fired:
+                callback(handle)
+
+
+def _close_quietly(handle):
+    try:
+        kernel32.CloseHandle(handle)
+    except OSError:
+        pass
+
+
+class WindowsExitWatcher(ExitWatcher):
+    """
+    プロセスハンドルの終了監視。_WaitGroup スレッド 1 本あたり 63 ハンドルまでまとめて待ち、
+    シグナルされたら call_soon_threadsafe でループに知らせる（ループのスレッドは待たない）。
+    """
+
+    def __init__(self, loop):
+        super().__init__(loop)
+        self._lock = threading.Lock()
+        self._groups = []
+        self._where = {}   # handle -> _WaitGroup
+
+    @property
+    def threads(self) -> int:
+        return len(self._groups)
+
+    def _add(self, handle: int, callback):
+        with self._lock:
+            group = next((g for g in self._groups if g.load < g.capacity), None)
+            start = group is None
+            if start:
+                group = _WaitGroup(self)
+                self._groups.append(group)
+            group.load += 1
+            self._where[handle] = group
+            group.submit(("add", handle, callback))
+        if start:
+            group.start()
+
+    def _post(self, func, *args):
+        try:
+            self._loop.call_soon_threadsafe(func, *args)
+        except RuntimeError:
+            pass  # ループは閉じられている
+
+    def wait_handle(self, handle: int) -> asyncio.Future:
+        """
+        任意の待機可能ハンドルがシグナルされるまで待つ Future を返す
+        """
+        fut = self._loop.create_future()
+
+        def done(fut=fut):
+            if not fut.done():
+                fut.set_result(None)
+
+        self._add(handle, lambda h: self._post(done))
+        return fut
+
+    def _start(self, proc):
+        self._add(int(proc.hProcess), lambda h: self._post(self._exited, proc))
+
+    def _stop(self, proc):
+        # 監視中のハンドルは監視スレッドが閉じる（待機中に閉じると WAIT_FAILED になるため）
+        handle = int(proc.hProcess)
+        with self._lock:
+            group = self._where.get(handle)
+            if group is not None:
+                group.submit(("close", handle))
+                return
+        _close_quietly(handle)
+
+    def _exited(self, proc):
+        if proc.hProcess is None:
+            return
+        code = ctypes.wintypes.DWORD(0)
+        try:
+            kernel32.GetExitCodeProcess(proc.hProcess, ctypes.byref(code))
+        except OSError:
+            # 無効なハンドル: 終了コードは分からない（ハンドルは close_handle() に任せる）
+            fut = self._pending.pop(proc, None)
+            if fut is not None and not fut.done():
+                fut.set_result(None)
+            return
+        self._resolve(proc, int(code.value))
+
+
+class AsyncConPTYProcess(PtyProcess):
+    """
+    ConPTY にぶら下がっている子プロセスの簡易ハンドラ。
+    終了は WindowsExitWatcher が観測し、終了コードはキャッシュされる。
+    """
+    def __init__(self, hProcess, pid: int, exit_code: int | None,
+                 watcher: WindowsExitWatcher = None):
+        self.hProcess = hProcess
+        self.pid = int(pid) if pid else 0
+        self._exit_code = exit_code
+        self._watcher = watcher
+        if hProcess and watcher is not None:
+            self._exit = watcher.watch(self)
+
+    async def wait(self, timeout: float | None = None) -> int | None:
+        """
+        プロセス終了待ち。戻り値は return code（タイムアウト時は None）
+        """
+        if self._exit_code is not None:
+            return self._exit_code
+        if self._exit is None:
+            return self.poll()
+        return await self._wait_exit(timeout)
+
+    def poll(self) -> int | None:
+        """
+        現在の終了コードを返す。未終了なら None。
+        監視中のプロセスはキャッシュを返すだけでシステムコールを発行しない。
+        """
+        if self._exit_code is not None:
+            return self._exit_code
+        if not self.hProcess:
+            return 0
+        if self._exit is not None and not self._exit.done():
+            return None
+        code = ctypes.wintypes.DWORD(0)
+        kernel32.GetExitCodeProcess(self.hProcess, ctypes.byref(code))
+        if code.value == STILL_ACTIVE:
+            return None
+        self._exit_code = int(code.value)
+        self._record_exit()
+        return self._exit_code
+
+    def kill(self):
+        if not self.hProcess or self.poll() is not None:
+            return
+        try:
+            kernel32.TerminateProcess(self.hProcess, 1)
+        except OSError:
+            pass  # 既に終了している
+
+    def close_handle(self):
+        try:
+            if self.hProcess:
+                if self._exit is not None and not self._exit.done():
+                    # ハンドルは監視スレッドが閉じる
+                    self._watcher.release(self)
+                else:
+                    kernel32.CloseHandle(self.hProcess)
+        finally:
+            self.hProcess = None
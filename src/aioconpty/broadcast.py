@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""Broadcast pty output to many subscribers from one shared segment log.
+
+``AsyncConPTY.subscribe()`` installs an :class:`OutputBroadcast` as the
+session's output sink, so the output is consumed through subscribers (the
+session's own ``read()`` no longer sees it, and it cannot stall them).
+
+:class:`OutputBroadcast` keeps every received chunk once, as an immutable
+``bytes`` segment in a shared log, and each :class:`Subscriber` only holds a
+cursor into it.  Reading a whole segment returns the stored object itself,
+so adding subscribers costs no per-chunk copies and memory stays bounded by
+the slowest cursor (capped by ``lag_limit``) plus the retained tail.
+
+Slow subscribers: once a subscriber is more than ``lag_limit`` bytes behind,
+``policy="drop"`` skips it forward to the oldest segment within the limit
+(counting ``dropped`` bytes), and ``policy="disconnect"`` closes it with
+:class:`SubscriberLagged`.  ``retain`` bytes of the most recent output are
+kept regardless, so late joiners can start with ``subscribe(replay=n)``.
+"""
+
+import asyncio
+import collections
+
+__all__ = ["OutputBroadcast", "Subscriber", "SubscriberLagged"]
+
+DEFAULT_RETAIN = 64 * 1024
+DEFAULT_LAG_LIMIT = 4 * 1024 * 1024
+
+POLICIES = ("drop", "disconnect")
+
+
+class SubscriberLagged(Exception):
+    """
+    lag_limit を超えて遅れたため切断された購読者の read() で送出される
+    """
+
+
+class Subscriber:
+    """
+    OutputBroadcast の購読者。共有ログ上のカーソルだけを持つ。
+
+    使い方:
+        sub = pty.subscribe(replay=4096)
+        async for segment in sub:      # bytes（共有オブジェクト、コピーなし）
+            ...
+    """
+
+    def __init__(self, broadcast, cursor: int, seq: int):
+        self._broadcast = broadcast
+        self.cursor = cursor    # 次に読む絶対オフセット
+        self._seq = seq         # cursor を含むセグメントの通し番号
+        self._waiter = None
+        self._closed = False
+        self._error = None
+        self.dropped = 0        # drop ポリシーで読み飛ばしたバイト数
+        self.delivered = 0
+
+    def __repr__(self):
+        return f"<Subscriber cursor={self.cursor} lag={self.lag} dropped={self.dropped}>"
+
+    @property
+    def lag(self) -> int:
+        """
+        未読バイト数
+        """
+        return self._broadcast.end - self.cursor
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """
+        購読をやめる（共有ログの保持対象から外れる）
+        """
+        if not self._closed:
+            self._closed = True
+            self._broadcast._unsubscribe(self)
+            self._wakeup()
+
+    def _disconnect(self, exc):
+        self._error = exc
+        self.close()
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def read(self, n: int = -1) -> bytes:
+        """
+        次のデータを最大 n バイト返す（1 セグメントをまたがない）。EOF/購読終了なら b""。
+        セグメント全体を読む場合は共有の bytes オブジェクトをそのまま返す。
+        """
+        bc = self._broadcast
+        while True:
+            if self._error is not None:
+                raise self._error
+            if self._closed:
+                return b""
+            if self.cursor < bc.end:
+                break
+            if bc.eof:
+                return b""
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        start, segment = bc._segments[self._seq - bc._first_seq]
+        pos = self.cursor - start
+        take = len(segment) - pos if n is None or n < 0 else min(n, len(segment) - pos)
+        data = segment if pos == 0 and take == len(segment) else segment[pos:pos + take]
+        self.cursor += take
+        self.delivered += take
+        if pos + take == len(segment):
+            self._seq += 1
+        return data
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read()
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+
+class OutputBroadcast:
+    """
+    出力 chunk を共有セグメントとして 1 度だけ保持し、購読者ごとにカーソルで配る。
+
+    retain    : 購読者がいなくても保持する直近の出力バイト数（後から参加した購読者向け）
+    lag_limit : 購読者の未読がこれを超えたら policy に従う
+    policy    : 'drop'（古いセグメントを読み飛ばさせる）/ 'disconnect'（切断する）
+    """
+
+    def __init__(self, *, retain: int = DEFAULT_RETAIN, lag_limit: int = DEFAULT_LAG_LIMIT,
+                 policy: str = "drop"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, not {policy!r}")
+        self.retain = int(retain)
+        self.lag_limit = int(lag_limit)
+        self.policy = policy
+        self._segments = collections.deque()  # [(開始オフセット, bytes)]
+        self._first_seq = 0                   # _segments[0] の通し番号
+        self._subscribers = []
+        self.end = 0                          # 受信済みの総バイト数（次の書き込み位置）
+        self.eof = False
+
+    def __repr__(self):
+        return (f"<OutputBroadcast subscribers={len(self._subscribers)} "
+                f"retained={self.retained_bytes} end={self.end}>")
+
+    @property
+    def subscribers(self) -> list:
+        return list(self._subscribers)
+
+    @property
+    def retained_bytes(self) -> int:
+        if not self._segments:
+            return 0
+        return self.end - self._segments[0][0]
+
+    def subscribe(self, *, replay: int = 0) -> Subscriber:
+        """
+        購読者を作る。replay バイト分（保持されている範囲で）過去の出力から読み始める。
+        """
+        start = self.end
+        seq = self._first_seq + len(self._segments)
+        if replay and self._segments:
+            target = max(self._segments[0][0], self.end - int(replay))
+            # target を含むセグメントを後ろから探す
+            for i in range(len(self._segments) - 1, -1, -1):
+                seg_start, segment = self._segments[i]
+                if seg_start <= target:
+                    start, seq = target, self._first_seq + i
+                    break
+        sub = Subscriber(self, start, seq)
+        self._subscribers.append(sub)
+        return sub
+
+    def _unsubscribe(self, sub):
+        try:
+            self._subscribers.remove(sub)
+        except ValueError:
+            return
+        self._trim()
+
+    # ---- 受信側 ----
+    def feed(self, data):
+        """
+        出力 chunk を追加する
+        """
+        if not data:
+            return
+        if type(data) is not bytes:
+            data = bytes(data)
+        # 読み終えたセグメントは次の chunk が来たときにまとめて捨てる
+        self._trim()
+        self._segments.append((self.end, data))
+        self.end += len(data)
+        oldest = self.end - self.lag_limit
+        for sub in tuple(self._subscribers):
+            if sub.cursor < oldest:
+                self._overrun(sub)
+                if sub.closed:
+                    continue
+            if sub._waiter is not None:
+                sub._wakeup()
+
+    def feed_eof(self):
+        self.eof = True
+        for sub in self._subscribers:
+            sub._wakeup()
+
+    # AsyncConPTY の出力 sink として使うための別名
+    data_received = feed
+
+    def eof_received(self):
+        self.feed_eof()
+
+    def connection_lost(self, exc):
+        self.feed_eof()
+
+    def _overrun(self, sub):
+        if self.policy == "disconnect":
+            sub._disconnect(SubscriberLagged(
+                f"subscriber fell {self.end - sub.cursor} bytes behind (lag_limit={self.lag_limit})"))
+            return
+        # lag_limit 以内に収まる最も古いセグメントの先頭まで進める（最新セグメントは必ず残す）
+        target = self.end - self.lag_limit
+        first = self._first_seq
+        for i, (seg_start, _) in enumerate(self._segments):
+            if seg_start >= target or i == len(self._segments) - 1:
+                if seg_start > sub.cursor:
+                    sub.dropped += seg_start - sub.cursor
+                    sub.cursor = seg_start
+                    sub._seq = first + i
+                return
+
+    def _trim(self):
+        """
+        どの購読者も必要とせず、retain の範囲外になったセグメントを捨てる
+        """
+        segments = self._segments
+        if not segments:
+            return
+        keep_from = self.end - self.retain
+        for sub in self._subscribers:
+            if sub.cursor < keep_from:
+                keep_from = sub.cursor
+        while segments:
+            seg_start, segment = segments[0]
+            if seg_start + len(segment) > keep_from:
+                break
+            segments.popleft()
+            self._first_seq += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "segments": len(self._segments),
+            "retained_bytes": self.retained_bytes,
+            "bytes_received": self.end,
+            "max_lag": max((s.lag for s in self._subscribers), default=0),
+            "dropped": sum(s.dropped for s in self._subscribers),
+        }
@@ -12,241 +12,209 @@ Features
   :class:`asyncio.StreamWriter` objects.
 * Spawn child processes attached to the pseudo console using
   :func:`CreateProcessW` and :class:`STARTUPINFOEX`.
+* The same API on Linux/macOS through the ``posix`` backend
+  (:func:`os.openpty` with readiness-based fd I/O), see
+  :mod:`aioconpty.backends`.
 
 Requirements
 ------------
-* Windows 10 build 1809 or later.
+* Windows 10 build 1809 or later, or a POSIX system with ``os.openpty``.
 * Python 3.8 or later.
 """
 
-import os
 import sys
-import ctypes
-import ctypes.wintypes
+import time
+import typing
 import asyncio
-import _winapi
-import asyncio.windows_utils
-
-# ===== 定数 =====
-FILE_SHARE_READ   = 0x00000001
-FILE_SHARE_WRITE  = 0x00000002
-FILE_ATTRIBUTE_NORMAL = 0x00000080
-
-STD_INPUT_HANDLE  = -10
-STD_OUTPUT_HANDLE = -11
-STD_ERROR_HANDLE  = -12
-
-INVALID_HANDLE_VALUE = ctypes.wintypes.HANDLE(-1).value
-
-S_OK = 0
-
-EXTENDED_STARTUPINFO_PRESENT = 0x00080000
-PROC_THREAD_ATTRIBUTE_PSEUDOCONSOLE = 0x00020016
-
-ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
-STARTF_USESTDHANDLES = 0x0100
-
-INFINITE = 0xFFFFFFFF
-WAIT_OBJECT_0 = 0x00000000
-
-GENERIC_READ  = _winapi.GENERIC_READ
-GENERIC_WRITE = _winapi.GENERIC_WRITE
-OPEN_EXISTING = _winapi.OPEN_EXISTING
-
-# ===== 型エイリアス =====
-PVOID  = ctypes.wintypes.LPVOID
-SIZE_T = ctypes.c_size_t
-HPCON  = ctypes.wintypes.HANDLE
-
-
-# ===== エラーチェック =====
-def _errcheck_bool(value, func, args):
-    if not value:
-        raise ctypes.WinError()
-    return args
-
-def _errcheck_handle(value, func, args):
-    if value == 0 or value == INVALID_HANDLE_VALUE:
-        raise ctypes.WinError()
-    return value
-
-
-# ===== 構造体 =====
-class COORD(ctypes.Structure):
-    _fields_ = [("X", ctypes.wintypes.SHORT),
-                ("Y", ctypes.wintypes.SHORT)]
-
-class STARTUPINFO(ctypes.Structure):
-    _fields_ = [("cb", ctypes.wintypes.DWORD),
-                ("lpReserved", ctypes.c_void_p),
-                ("lpDesktop", ctypes.c_void_p),
-                ("lpTitle", ctypes.c_void_p),
-                ("dwX", ctypes.wintypes.DWORD),
-                ("dwY", ctypes.wintypes.DWORD),
-                ("dwXSize", ctypes.wintypes.DWORD),
-                ("dwYSize", ctypes.wintypes.DWORD),
-                ("dwXCountChars", ctypes.wintypes.DWORD),
-                ("dwYCountChars", ctypes.wintypes.DWORD),
-                ("dwFillAttribute", ctypes.wintypes.DWORD),
-                ("dwFlags", ctypes.wintypes.DWORD),
-                ("wShowWindow", ctypes.wintypes.WORD),
-                ("cbReserved2", ctypes.wintypes.WORD),
-                ("lpReserved2", ctypes.c_void_p),
-                ("hStdInput", ctypes.wintypes.HANDLE),
-                ("hStdOutput", ctypes.wintypes.HANDLE),
-                ("hStdError", ctypes.wintypes.HANDLE)]
-
-class STARTUPINFOEX(ctypes.Structure):
-    _fields_ = [("StartupInfo", STARTUPINFO),
-                ("lpAttributeList", ctypes.c_void_p)]
-
-class PROCESS_INFORMATION(ctypes.Structure):
-    _fields_ = [("hProcess", ctypes.wintypes.HANDLE),
-                ("hThread", ctypes.wintypes.HANDLE),
-                ("dwProcessId", ctypes.wintypes.DWORD),
-                ("dwThreadId", ctypes.wintypes.DWORD)]
-
-class CONSOLE_SCREEN_BUFFER_INFO(ctypes.Structure):
-    _fields_ = [
-        ("dwSize", COORD),
-        ("dwCursorPosition", COORD),
-        ("wAttributes", ctypes.wintypes.WORD),
-        ("srWindow", ctypes.wintypes.SMALL_RECT),
-        ("dwMaximumWindowSize", COORD),
-    ]
-
-
-# ===== WinAPI =====
-kernel32 = ctypes.windll.kernel32
-
-SetLastError = kernel32.SetLastError
-SetLastError.argtypes = [ctypes.wintypes.DWORD]
-
-GetStdHandle = kernel32.GetStdHandle
-GetStdHandle.argtypes = [ctypes.wintypes.DWORD]
-GetStdHandle.restype  = ctypes.wintypes.HANDLE
-
-CreateFileW = kernel32.CreateFileW
-CreateFileW.argtypes = [ctypes.c_wchar_p, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD,
-                        ctypes.c_void_p, ctypes.wintypes.DWORD, ctypes.wintypes.DWORD,
-                        ctypes.wintypes.HANDLE]
-CreateFileW.restype  = ctypes.wintypes.HANDLE
-CreateFileW.errcheck = _errcheck_handle
-
-GetConsoleMode = kernel32.GetConsoleMode
-GetConsoleMode.argtypes = [ctypes.wintypes.HANDLE, ctypes.POINTER(ctypes.wintypes.DWORD)]
-GetConsoleMode.restype  = ctypes.wintypes.BOOL
-
-SetConsoleMode = kernel32.SetConsoleMode
-SetConsoleMode.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD]
-SetConsoleMode.restype  = ctypes.wintypes.BOOL
-SetConsoleMode.errcheck = _errcheck_bool
-
-GetConsoleScreenBufferInfo = kernel32.GetConsoleScreenBufferInfo
-GetConsoleScreenBufferInfo.argtypes = [ctypes.wintypes.HANDLE, ctypes.POINTER(CONSOLE_SCREEN_BUFFER_INFO)]
-GetConsoleScreenBufferInfo.restype  = ctypes.wintypes.BOOL
-GetConsoleScreenBufferInfo.errcheck = _errcheck_bool
-
-CreatePseudoConsole = kernel32.CreatePseudoConsole
-CreatePseudoConsole.argtypes = [COORD, ctypes.wintypes.HANDLE, ctypes.wintypes.HANDLE,
-                                ctypes.wintypes.DWORD, ctypes.POINTER(HPCON)]
-CreatePseudoConsole.restype  = ctypes.HRESULT
-
-ResizePseudoConsole = kernel32.ResizePseudoConsole
-ResizePseudoConsole.argtypes = [HPCON, COORD]
-ResizePseudoConsole.restype  = ctypes.HRESULT
-
-ClosePseudoConsole = kernel32.ClosePseudoConsole
-ClosePseudoConsole.argtypes = [HPCON]
-
-InitializeProcThreadAttributeList = kernel32.InitializeProcThreadAttributeList
-InitializeProcThreadAttributeList.argtypes = [ctypes.c_void_p, ctypes.wintypes.DWORD,
-                                              ctypes.wintypes.DWORD, ctypes.POINTER(SIZE_T)]
-InitializeProcThreadAttributeList.restype  = ctypes.wintypes.BOOL
-
-UpdateProcThreadAttribute = kernel32.UpdateProcThreadAttribute
-UpdateProcThreadAttribute.argtypes = [ctypes.c_void_p, ctypes.wintypes.DWORD, SIZE_T,
-                                      ctypes.c_void_p, SIZE_T, ctypes.c_void_p,
-                                      ctypes.POINTER(SIZE_T)]
-UpdateProcThreadAttribute.restype  = ctypes.wintypes.BOOL
-
-DeleteProcThreadAttributeList = kernel32.DeleteProcThreadAttributeList
-DeleteProcThreadAttributeList.argtypes = [ctypes.c_void_p]
-
-CreateProcessW = kernel32.CreateProcessW
-CreateProcessW.argtypes = [ctypes.c_wchar_p, ctypes.c_wchar_p, ctypes.c_void_p, ctypes.c_void_p,
-                           ctypes.wintypes.BOOL, ctypes.wintypes.DWORD, ctypes.c_void_p,
-                           ctypes.c_wchar_p, ctypes.POINTER(STARTUPINFO),
-                           ctypes.POINTER(PROCESS_INFORMATION)]
-CreateProcessW.restype  = ctypes.wintypes.BOOL
-CreateProcessW.errcheck = _errcheck_bool
-
-CloseHandle = kernel32.CloseHandle
-CloseHandle.argtypes = [ctypes.wintypes.HANDLE]
-CloseHandle.restype  = ctypes.wintypes.BOOL
-CloseHandle.errcheck = _errcheck_bool
-
-WaitForSingleObject = kernel32.WaitForSingleObject
-WaitForSingleObject.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD]
-WaitForSingleObject.restype  = ctypes.wintypes.DWORD
-
-GetExitCodeProcess = kernel32.GetExitCodeProcess
-GetExitCodeProcess.argtypes = [ctypes.wintypes.HANDLE, ctypes.POINTER(ctypes.wintypes.DWORD)]
-GetExitCodeProcess.restype  = ctypes.wintypes.BOOL
-GetExitCodeProcess.errcheck = _errcheck_bool
+
+from .backends import get_backend
+
+# expect/ringbuffer/screen/vtparse は使うメソッドの中で import する（import 時間短縮のため）
+if typing.TYPE_CHECKING:  # 型注釈用（実行時には import しない）
+    from .broadcast import OutputBroadcast, Subscriber
+    from .delta import DeltaStream
+    from .expect import ExpectMatch
+    from .keys import InputModes
+    from .record import AsciicastRecorder
+    from .screen import Screen
+    from .scrollback import Scrollback
+    from .sessionlog import SessionLog
+    from .vtparse import VTParser
 
 
 # ===== ユーティリティ =====
-def _enable_host_console_vt_if_possible():
+def _make_stream_writer(transport, protocol):
     """
-    親側のコンソールで VT シーケンスを有効化（なくても動くが、親側でのカラー表示などに便利）
-    IDE などから起動していてコンソールがない場合は失敗しても握りつぶす。
+    Python バージョン差異を吸収して StreamWriter を生成
     """
     try:
-        h_console = CreateFileW("CONOUT$", GENERIC_READ | GENERIC_WRITE,
-                                FILE_SHARE_READ | FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
-        mode = ctypes.wintypes.DWORD(0)
-        if GetConsoleMode(h_console, ctypes.byref(mode)):
-            SetConsoleMode(h_console, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING)
-        CloseHandle(h_console)
-    except Exception:
-        pass  # 非コンソール環境や古い Windows など
+        return asyncio.StreamWriter(transport, protocol, None, asyncio.get_running_loop())
+    except TypeError:
+        # 3.12 以降など
+        return asyncio.StreamWriter(transport, protocol)
 
 
-def _get_host_console_size_fallback(cols=80, rows=25):
+def _abort(transport):
     """
-    親側コンソールのサイズを取得。失敗したら既定値を返す。
+    送信バッファを捨てて閉じる（abort() を持たない transport は close()）
     """
     try:
-        h_console = CreateFileW("CONOUT$", GENERIC_READ | GENERIC_WRITE,
-                                FILE_SHARE_READ | FILE_SHARE_WRITE, None, OPEN_EXISTING, 0, None)
-        csbi = CONSOLE_SCREEN_BUFFER_INFO()
-        GetConsoleScreenBufferInfo(h_console, ctypes.byref(csbi))
-        CloseHandle(h_console)
-        x = csbi.srWindow.Right - csbi.srWindow.Left + 1
-        y = csbi.srWindow.Bottom - csbi.srWindow.Top + 1
-        return x, y
-    except Exception:
-        return cols, rows
-
-
-def _list2cmdline(cmd):
-    """['ping', 'localhost'] -> 'ping localhost' / 文字列ならそのまま"""
-    if isinstance(cmd, (list, tuple)):
-        import subprocess
-        return subprocess.list2cmdline(list(cmd))
-    return str(cmd)
+        transport.abort()
+    except NotImplementedError:
+        transport.close()
 
 
-def _make_stream_writer(transport, protocol):
+def _retrieve_exception(task):
     """
-    Python バージョン差異を吸収して StreamWriter を生成
+    待つのをやめた task の例外を取り出しておく（未取得の警告を出さない）
     """
-    try:
-        return asyncio.StreamWriter(transport, protocol, None, asyncio.get_running_loop())
-    except TypeError:
-        # 3.12 以降など
-        return asyncio.StreamWriter(transport, protocol)
+    if not task.cancelled():
+        task.exception()
+
+
+# Writer 用プロトコル: FlowControlMixin を先に継承して MRO を安定させる
+class _WriteProto(asyncio.streams.FlowControlMixin, asyncio.Protocol):
+    def __init__(self):
+        # FlowControlMixin.__init__ のシグネチャは Python バージョンで異なるため安全に初期化
+        try:
+            asyncio.streams.FlowControlMixin.__init__(self, loop=asyncio.get_running_loop())
+        except TypeError:
+            try:
+                asyncio.streams.FlowControlMixin.__init__(self)
+            except Exception:
+                pass
+        self.metrics = None
+        self.lost = asyncio.get_running_loop().create_future()  # connection_lost で完了
+
+    def connection_lost(self, exc):
+        if not self.lost.done():
+            self.lost.set_result(None)
+        super().connection_lost(exc)
+
+    def pause_writing(self):
+        if self.metrics is not None:
+            self.metrics.count("write.pauses")
+        super().pause_writing()
+
+    def resume_writing(self):
+        if self.metrics is not None:
+            self.metrics.count("write.resumes")
+        super().resume_writing()
+
+
+class _MeteredReadTransport:
+    """
+    transport の実際の pause_reading()/resume_reading() を数える薄いプロキシ（計測時のみ使う）
+    """
+    def __init__(self, transport, metrics):
+        self._transport = transport
+        self._metrics = metrics
+
+    def pause_reading(self):
+        self._metrics.count("read.pauses")
+        self._transport.pause_reading()
+
+    def resume_reading(self):
+        self._metrics.count("read.resumes")
+        self._transport.resume_reading()
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+
+class _ReadFlow:
+    """
+    読み取りの一時停止を参照カウントで管理する transport プロキシ。
+
+    Reader・sink（mux / サーバ）・ログなどが同じ transport を独立に止めるので、
+    pause_reading() の数だけ resume_reading() が呼ばれたとき（最後の 1 つ）にだけ再開する。
+    止める側はそれぞれ自分が止めているかを覚えておき、対にして呼ぶ。
+    """
+    def __init__(self, transport):
+        self._transport = transport
+        self.pausers = 0
+
+    def pause_reading(self):
+        self.pausers += 1
+        if self.pausers == 1:
+            self._transport.pause_reading()
+
+    def resume_reading(self):
+        if self.pausers == 0:
+            return
+        self.pausers -= 1
+        if self.pausers == 0:
+            self._transport.resume_reading()
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+
+class _ReaderProtocol(asyncio.StreamReaderProtocol):
+    """
+    StreamReader に渡す前に出力タップ（画面モデルなど）へ chunk を配る。
+    sink が設定されていれば chunk は Reader に溜めずに sink.data_received() へ直接渡す。
+    """
+    def __init__(self, reader, taps: list):
+        super().__init__(reader)
+        self._taps = taps
+        self.sink = None
+        self.metrics = None
+        self.spawned_at = None  # 計測用: 最初の出力までの時間（ttfb）の起点
+        self.lost = self._loop.create_future()  # connection_lost で完了
+        self.flow = None  # _ReadFlow（Reader と AsyncConPTY.pause_reading() が共有する）
+
+    def attach_flow(self, transport) -> _ReadFlow:
+        """
+        transport を包む _ReadFlow を返す（connection_made と AsyncConPTY.open のどちらが先でも同じもの）
+        """
+        if self.flow is None:
+            if self.metrics is not None:
+                transport = _MeteredReadTransport(transport, self.metrics)
+            self.flow = _ReadFlow(transport)
+        return self.flow
+
+    def connection_made(self, transport):
+        super().connection_made(self.attach_flow(transport))
+
+    def data_received(self, data):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count("output.bytes", len(data))
+            metrics.count("output.chunks")
+            metrics.observe("output.chunk_size", len(data))
+            if self.spawned_at is not None:
+                metrics.observe("ttfb.seconds", time.perf_counter() - self.spawned_at)
+                self.spawned_at = None
+        if self._taps:
+            for tap in tuple(self._taps):
+                try:
+                    tap(data)
+                except Exception as exc:
+                    self._loop.call_exception_handler({
+                        "message": "pty output tap failed",
+                        "exception": exc,
+                        "protocol": self,
+                    })
+        sink = self.sink
+        if sink is not None:
+            sink.data_received(data)
+        else:
+            super().data_received(data)
+
+    def eof_received(self):
+        callback = getattr(self.sink, "eof_received", None)
+        if callback is not None:
+            callback()
+        return super().eof_received()
+
+    def connection_lost(self, exc):
+        if not self.lost.done():
+            self.lost.set_result(None)
+        callback = getattr(self.sink, "connection_lost", None)
+        if callback is not None:
+            callback(exc)
+        super().connection_lost(exc)
 
 
 # ===== メインクラス =====
@@ -261,37 +229,93 @@ class AsyncConPTY:
             async for chunk in pty.read_chunks():
                 sys.stdout.buffer.write(chunk)
             rc = await proc.wait()
+
+    backend には 'windows' / 'posix' / PtyBackend インスタンスを指定できる。
+    省略時はプラットフォームから自動選択する。
+
+    ring_buffer にバイト数を指定すると StreamReader の代わりに RingBufferReader を使い、
+    readinto() でチャンクごとの bytes 生成なしに読み出せる。ring_buffer はセッションの
+    出力バッファ予算でもあり、読み手が遅れて満杯になったときの動作を overflow で選べる:
+    'block'（受信を止めて子プロセスを待たせる。既定）/ 'drop_oldest'（古い出力を捨てる）/
+    'spill'（溢れた分を spill_dir の一時ファイルへ退避して後で読み戻す）。
+    overflow だけを指定した場合の予算は 256 KiB。
+
+    write_coalesce に秒数を指定すると、その間の小さな write() をまとめて 1 回の
+    transport 書き込みにする（0 なら同じループ周回内の書き込みをまとめる）。
+    write_high_water / write_low_water は書き込みバッファの上限/再開点（drain() が待つ境界）。
+
+    metrics に MetricsCollector（aioconpty.metrics.SessionMetrics など）を渡すと、
+    I/O 量やチャンクサイズ、open/spawn/close の所要時間などを記録する。None なら計測しない。
     """
 
-    def __init__(self, cols: int = None, rows: int = None):
-        if sys.platform != "win32":
-            raise RuntimeError("AsyncConPTY は Windows 専用です。")
-        _enable_host_console_vt_if_possible()
+    def __init__(self, cols: int = None, rows: int = None, *, backend=None,
+                 ring_buffer: int = None, overflow: str = None, spill_dir: str = None,
+                 write_coalesce: float | None = None,
+                 write_high_water: int = None, write_low_water: int = None,
+                 metrics=None):
+        self._backend = get_backend(backend)
+        self._metrics = metrics
+        self._backend.metrics = metrics
+        self._backend.prepare_host()
 
         if cols is None or rows is None:
-            cols2, rows2 = _get_host_console_size_fallback()
+            cols2, rows2 = self._backend.host_console_size()
             cols = cols or cols2
             rows = rows or rows2
 
         self._cols = int(cols)
         self._rows = int(rows)
 
-        self.hPC = HPCON()
-        self._hPipeIn = None   # ConPTY->親（親が読む）
-        self._hPipeOut = None  # 親->ConPTY（親が書く）
-
-        self._reader = None    # asyncio.StreamReader
+        if overflow is not None and not ring_buffer:
+            from .ringbuffer import DEFAULT_CAPACITY
+            ring_buffer = DEFAULT_CAPACITY
+        self._ring_buffer = ring_buffer
+        self._overflow = overflow or "block"
+        self._spill_dir = spill_dir
+        self._reader = None    # asyncio.StreamReader (または RingBufferReader)
         self._writer = None    # asyncio.StreamWriter
 
-        self._attr_mem = None  # attribute list backing buffer
-        self._si_ex = None     # STARTUPINFOEX
-
         self._loop = None
         self._transport_read = None
         self._transport_write = None
+        self._read_flow = None  # 読み取りの一時停止の参照カウント（_ReadFlow）
+        self._protocol_read = None
+        self._protocol_write = None
+        self._sink = None
+
+        self._write_coalesce = write_coalesce
+        self._write_limits = (write_high_water, write_low_water)
+        self._pending_input = bytearray()  # write_coalesce 使用時にまとめ中の入力
+        self._flush_handle = None
+
+        self._expecter = None  # expect() 用（未消費の出力を呼び出し間で保持）
+        self._input_modes = None  # track_input_modes() 用の InputModes
+
+        self._output_taps = []       # callable(bytes): 出力 chunk の受信時に呼ばれる
+        self._input_taps = []        # callable(bytes): write() で送る直前に呼ばれる
+        self._broadcast = None       # subscribe() 用の OutputBroadcast
+        self._resize_callbacks = []  # callable(cols, rows): resize() 成功時に呼ばれる
+
+        self._children = []  # spawn() したプロセス（終了済みは随時取り除く）
 
         self._closed = False
 
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def size(self):
+        return self._cols, self._rows
+
     # ---- 初期化/破棄 ----
     async def __aenter__(self):
         await self.open()
@@ -301,73 +325,26 @@ class AsyncConPTY:
         await self.close()
 
     async def open(self):
-        if self._reader or self._writer:
+        if self._reader is not None or self._writer is not None:
             return  # 既にオープン済
 
         self._loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
 
-        # (1) 親側が読むパイプ (ConPTY の出力)
-        #     overlapped: 親(read)=True / ConPTY(write)=False
-        hPipeIn, hPipePTYOut = asyncio.windows_utils.pipe(overlapped=(True, False), duplex=False)
-        # (2) 親側が書くパイプ (ConPTY の入力)
-        #     overlapped: ConPTY(read)=False / 親(write)=True
-        hPipePTYIn, hPipeOut = asyncio.windows_utils.pipe(overlapped=(False, True), duplex=False)
-
-        # ConPTY 生成
-        size = COORD(self._cols, self._rows)
-        hr = CreatePseudoConsole(size, hPipePTYIn, hPipePTYOut, 0, ctypes.byref(self.hPC))
-        if hr != S_OK:
-            # 後片付け
-            CloseHandle(hPipePTYIn)
-            CloseHandle(hPipePTYOut)
-            CloseHandle(hPipeIn)
-            CloseHandle(hPipeOut)
-            raise OSError(f"CreatePseudoConsole failed: HRESULT=0x{hr:08X}")
-
-        # ConPTY 側のパイプ終端は不要なのでクローズ
-        CloseHandle(hPipePTYIn)
-        CloseHandle(hPipePTYOut)
-
-        self._hPipeIn = hPipeIn
-        self._hPipeOut = hPipeOut
-
-        # asyncio のパイプハンドルへ
-        pipe_in_ph = asyncio.windows_utils.PipeHandle(self._hPipeIn)
-        pipe_out_ph = asyncio.windows_utils.PipeHandle(self._hPipeOut)
-
-        # 重要: PipeHandle に所有権を渡したため、ここで内部保持を破棄する
-        # こうすることで二重 CloseHandle を防ぐ（PipeHandle.__del__ が CloseHandle を呼ぶ）
-        self._hPipeIn = None
-        self._hPipeOut = None
-
-        # Reader のセットアップ（通常の connect_read_pipe を使う）
-        reader = asyncio.StreamReader()
-        proto_r = asyncio.StreamReaderProtocol(reader)
-        transport_r, _ = await self._loop.connect_read_pipe(lambda: proto_r, pipe_in_ph)
-
-        # Writer 用プロトコル: FlowControlMixin を先に継承して MRO を安定させる
-        class _WriteProto(asyncio.streams.FlowControlMixin, asyncio.Protocol):
-            def __init__(self):
-                # FlowControlMixin.__init__ のシグネチャは Python バージョンで異なるため安全に初期化
-                try:
-                    asyncio.streams.FlowControlMixin.__init__(self, loop=asyncio.get_running_loop())
-                except TypeError:
-                    try:
-                        asyncio.streams.FlowControlMixin.__init__(self)
-                    except Exception:
-                        pass
-
+        # Reader / Writer のプロトコルを用意し、トランスポートはバックエンドに作らせる
+        if self._ring_buffer:
+            from .ringbuffer import RingBufferReader
+            reader = RingBufferReader(self._ring_buffer, overflow=self._overflow,
+                                      spill_dir=self._spill_dir)
+        else:
+            reader = asyncio.StreamReader()
+        proto_r = _ReaderProtocol(reader, self._output_taps)
+        proto_r.sink = self._sink
+        proto_r.metrics = self._metrics
         proto_w = _WriteProto()
-
-        # ---- ここがポイント ----
-        # connect_write_pipe() が内部でパイプを読み取りしようとして PermissionError を出す環境があるため、
-        # 元スクリプトで使っていたように Proactor の内部クラスで書き込みトランスポートを直接作る。
-        # 互換のために proactor_events の非公開クラスを使う（Python の実装依存）。
-        from asyncio import proactor_events
-        # _ProactorBaseWritePipeTransport の呼び出しシグネチャはバージョン差があるため
-        # (loop, sock, protocol, waiter, extra) の順で渡す。waiter は None。
-        waiter = None
-        transport_w = proactor_events._ProactorBaseWritePipeTransport(self._loop, pipe_out_ph, proto_w, waiter, None)
+        proto_w.metrics = self._metrics
+        transport_r, transport_w = await self._backend.open(
+            self._loop, self._cols, self._rows, proto_r, proto_w)
 
         # StreamWriter を作る（バージョン差を吸収）
         writer = _make_stream_writer(transport_w, proto_w)
@@ -376,118 +353,123 @@ class AsyncConPTY:
         self._reader = reader
         self._writer = writer
         self._transport_read = transport_r
+        self._read_flow = proto_r.attach_flow(transport_r)
         self._transport_write = transport_w
+        self._protocol_read = proto_r
+        self._protocol_write = proto_w
 
-        # STARTUPINFOEX を構築して ConPTY を属性にアタッチ
-        self._si_ex = STARTUPINFOEX()
-        self._si_ex.StartupInfo.cb = ctypes.sizeof(STARTUPINFOEX)
-
-        # InitializeProcThreadAttributeList(第一次呼び出し: サイズ取得)
-        size_bytes = SIZE_T(0)
-        if not InitializeProcThreadAttributeList(None, 1, 0, ctypes.byref(size_bytes)):
-            # ここは必ずエラー 122 (ERROR_INSUFFICIENT_BUFFER) になる想定
-            # なので明示的にエラーをクリア
-            SetLastError(0)
-
-        # バッファ確保
-        mem = (ctypes.c_char * size_bytes.value)()
-        self._attr_mem = mem
-        self._si_ex.lpAttributeList = ctypes.cast(mem, ctypes.c_void_p)
-
-        ok = InitializeProcThreadAttributeList(self._si_ex.lpAttributeList, 1, 0, ctypes.byref(size_bytes))
-        if not ok:
-            raise ctypes.WinError()
-
-        # 擬似コンソール属性を設定
-        ok = UpdateProcThreadAttribute(
-            self._si_ex.lpAttributeList,
-            0,
-            PROC_THREAD_ATTRIBUTE_PSEUDOCONSOLE,
-            self.hPC, ctypes.sizeof(self.hPC),
-            None, None
-        )
-        if not ok:
-            raise ctypes.WinError()
-
-    async def close(self):
+        if self._write_limits != (None, None):
+            self.set_write_buffer_limits(*self._write_limits)
+
+        if self._metrics is not None:
+            self._metrics.count("sessions.opened")
+            self._metrics.observe("open.seconds", time.perf_counter() - t0)
+
+    async def close(self, *, timeout: float | None = 1.0, fast: bool | None = None) -> bool:
+        """
+        セッションを閉じる。
+
+        送信待ちの入力を書ききって transport が閉じるまで合計 timeout 秒待ち、
+        間に合わなければ残りを捨てて閉じる（None なら待ち続ける）。
+        fast=True なら送信待ちの入力を捨てて待たずに閉じる。
+        fast=None（既定）は spawn() した子が全員終了済みなら fast になる。
+        擬似端末の解放も同じ timeout の内で待ち、間に合わなければ解放はバックグラウンドで
+        続けたまま閉じた扱いにして False を返す。それ以外は True を返す。
+        """
         if self._closed:
-            return
+            return True
+        t0 = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        if fast is None:
+            fast = not self.has_running_children()
 
-        # transports -> close & wait_closed() を待つ (存在すれば)
-        try:
-            if self._transport_write is not None:
-                try:
-                    self._transport_write.close()
-                    wait_closed = getattr(self._transport_write, "wait_closed", None)
-                    if wait_closed is not None:
-                        try:
-                            await asyncio.wait_for(wait_closed(), timeout=1.0)
-                        except asyncio.TimeoutError:
-                            pass
-                except Exception:
-                    pass
-                finally:
-                    self._transport_write = None
-        except Exception:
-            pass
+        # まとめ中の入力を送ってから閉じる
+        if not fast:
+            try:
+                self._flush_input()
+            except Exception:
+                pass
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending_input.clear()
 
         try:
-            if self._transport_read is not None:
-                try:
-                    self._transport_read.close()
-                    wait_closed = getattr(self._transport_read, "wait_closed", None)
-                    if wait_closed is not None:
-                        try:
-                            await asyncio.wait_for(wait_closed(), timeout=1.0)
-                        except asyncio.TimeoutError:
-                            pass
-                except Exception:
-                    pass
-                finally:
-                    self._transport_read = None
+            await self._close_transports(timeout, fast)
         except Exception:
             pass
+        self._transport_write = None
+        self._transport_read = None
+        self._read_flow = None
 
-        # Stream とハンドル参照を切る
+        # Stream とハンドル参照を切る（spill の一時ファイルもここで閉じる）
+        close_reader = getattr(self._reader, "close", None)
+        if close_reader is not None:
+            try:
+                close_reader()
+            except Exception:
+                pass
         self._writer = None
         self._reader = None
+        self._protocol_read = None
+        self._protocol_write = None
 
-        # パイプハンドル (もしまだ内部に残っていれば閉じる)
-        # ただし PipeHandle に渡していれば self._hPipeOut/_hPipeIn は None になっているはず
-        for attr_name in ("_hPipeOut", "_hPipeIn"):
-            h = getattr(self, attr_name, None)
-            if h is not None:
-                try:
-                    CloseHandle(h)
-                except Exception:
-                    pass
-                finally:
-                    setattr(self, attr_name, None)
-
-        # 属性リスト削除（存在すれば）
-        try:
-            if self._si_ex and self._si_ex.lpAttributeList:
-                try:
-                    DeleteProcThreadAttributeList(self._si_ex.lpAttributeList)
-                except Exception:
-                    pass
-                self._si_ex = None
-                self._attr_mem = None
-        except Exception:
-            pass
-
-        # ConPTY を閉じる
-        try:
-            if self.hPC:
-                try:
-                    ClosePseudoConsole(self.hPC)
-                except Exception:
-                    pass
-                self.hPC = HPCON()
-        except Exception:
-            pass
+        # 残りの OS 資源（擬似端末/ハンドル）はバックエンドが解放する（ブロックし得るものは executor で）
+        released = True
+        if deadline is None:
+            await self._backend.close_async()
+        else:
+            task = asyncio.ensure_future(self._backend.close_async())
+            try:
+                await asyncio.wait_for(asyncio.shield(task), max(deadline - loop.time(), 0.0))
+            except asyncio.TimeoutError:
+                # ClosePseudoConsole が戻らない場合など: 待つのはやめるが解放は続けさせる
+                released = False
+                task.add_done_callback(_retrieve_exception)
 
         self._closed = True
+        if self._metrics is not None:
+            self._metrics.count("sessions.closed")
+            self._metrics.observe("close.seconds", time.perf_counter() - t0)
+        return released
+
+    async def _close_transports(self, timeout: float | None, fast: bool):
+        """
+        transport を閉じ、両方の connection_lost を timeout 秒まで待つ。
+        書き込み側は fast なら即座に、そうでなければ期限切れ時に abort() する。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        transport_w = self._transport_write
+        waits = []
+        if transport_w is not None:
+            if fast:
+                _abort(transport_w)
+            else:
+                transport_w.close()
+            waits.append(self._protocol_write.lost)
+        if self._transport_read is not None:
+            self._transport_read.close()
+            waits.append(self._protocol_read.lost)
+        if not waits:
+            return
+        remaining = None if deadline is None else max(deadline - loop.time(), 0.0)
+        await asyncio.wait(waits, timeout=remaining)
+        if transport_w is not None and not self._protocol_write.lost.done():
+            # 子が入力を読まず送信バッファが捌けない: 残りを捨てる
+            _abort(transport_w)
+            await asyncio.sleep(0)
+
+    async def hangup(self):
+        """
+        子プロセスの終了後に呼ぶ: 端末側を閉じ、残りの出力を流しきって EOF にする。
+        transport は開いたままなので、read() / sink は EOF まで出力を受け取れる。
+        """
+        if self._closed or not self._backend.is_open:
+            return
+        # ClosePseudoConsole は最後の出力を書き終えるまで戻らないことがあるため別スレッドで呼ぶ
+        await self._backend.hangup_async()
 
     # ---- I/O ----
     @property
@@ -499,11 +481,15 @@ class AsyncConPTY:
         return self._writer
 
     async def read(self, n: int = -1) -> bytes:
+        if self._metrics is not None:
+            self._metrics.count("read.calls")
         if n is None or n < 0:
             return await self._reader.read()
         return await self._reader.read(n)
 
     async def readline(self) -> bytes:
+        if self._metrics is not None:
+            self._metrics.count("read.calls")
         return await self._reader.readline()
 
     async def read_chunks(self, chunk_size: int = 4096):
@@ -511,37 +497,423 @@ class AsyncConPTY:
         非同期ジェネレータ: 出力が EOF になるまで chunk を返す
         """
         while True:
+            if self._metrics is not None:
+                self._metrics.count("read.calls")
             data = await self._reader.read(chunk_size)
             if not data:
                 break
             yield data
 
+    def output_stats(self) -> dict | None:
+        """
+        出力バッファの統計（RingBufferReader 使用時のみ。bytes_dropped / bytes_spilled など）
+        """
+        stats = getattr(self._reader, "stats", None)
+        return stats() if stats is not None else None
+
+    async def readinto(self, buf) -> int:
+        """
+        buf（bytearray / memoryview など）へ読み込み、読んだバイト数を返す。EOF なら 0。
+        ring_buffer 使用時はチャンクごとのメモリ確保が発生しない。
+        """
+        if self._metrics is not None:
+            self._metrics.count("read.calls")
+        readinto = getattr(self._reader, "readinto", None)
+        if readinto is not None:
+            return await readinto(buf)
+        dst = memoryview(buf).cast("B")
+        data = await self._reader.read(len(dst))
+        dst[:len(data)] = data
+        return len(data)
+
+    async def read_lines(self, encoding: str = "utf-8", errors: str = "replace", *,
+                         collapse_cr: bool = False, chunk_size: int = 65536):
+        """
+        非同期ジェネレータ: 出力を増分デコードして 1 行ずつ str で返す（終端文字は含まない）。
+        \\r\\n / \\n / 単独の \\r で区切り、collapse_cr=True なら単独の \\r を上書きとして扱い
+        最後の内容だけを返す（進捗表示が 1 行にまとまる）。EOF で残りの行も返す。
+        """
+        from .text import LineSplitter
+        splitter = LineSplitter(encoding, errors, collapse_cr=collapse_cr)
+        async for chunk in self.read_chunks(chunk_size):
+            for line in splitter.feed(chunk):
+                yield line
+        for line in splitter.flush():
+            yield line
+
+    async def read_plain(self, chunk_size: int = 65536):
+        """
+        非同期ジェネレータ: エスケープシーケンスと制御文字（\\t / \\n 以外）を取り除いた
+        平文を chunk ごとに bytes で返す。chunk 境界で途切れたシーケンスも取り除かれる。
+        """
+        from .text import EscapeStripper
+        stripper = EscapeStripper()
+        async for chunk in self.read_chunks(chunk_size):
+            text = stripper.feed(chunk)
+            if text:
+                yield text
+
+    async def read_events(self, chunk_size: int = 4096, parser: "VTParser" = None):
+        """
+        非同期ジェネレータ: 出力を VTParser で解析し、chunk ごとのイベントのリストを返す。
+        chunk 境界で分断されたエスケープシーケンスは parser が次の chunk へ持ち越す。
+        """
+        if parser is None:
+            from .vtparse import VTParser
+            parser = VTParser()
+        async for chunk in self.read_chunks(chunk_size):
+            events = parser.feed(chunk)
+            if events:
+                yield events
+
+    async def expect(self, patterns, timeout: float | None = None, *,
+                     searchwindowsize: int = None) -> "ExpectMatch":
+        """
+        出力にいずれかのパターンが現れるまで待つ。
+
+        patterns には bytes/str（リテラル）と re.Pattern を混在できる。
+        一致より後ろのデータは次回の expect() に持ち越される。
+        タイムアウトで ExpectTimeout、EOF で ExpectEOF を送出する。
+        """
+        if self._expecter is None:
+            from .expect import Expecter
+            self._expecter = Expecter(self.read)
+        if searchwindowsize is not None:
+            self._expecter.searchwindowsize = int(searchwindowsize)
+        return await self._expecter.expect(patterns, timeout)
+
     async def write(self, data: bytes):
         """
         親->ConPTY へ書き込み
         """
         if isinstance(data, str):
             data = data.encode("utf-8", "replace")
-        self._writer.write(data)
+        for tap in tuple(self._input_taps):
+            tap(data)
+        if self._metrics is not None:
+            self._metrics.count("write.calls")
+            self._metrics.count("input.bytes", len(data))
+            self._metrics.observe("input.chunk_size", len(data))
+        if self._write_coalesce is None:
+            self._writer.write(data)
+        else:
+            self._coalesce(data)
         await self._writer.drain()
 
     async def writeline(self, line: str):
         await self.write(line + "\r\n")
 
+    async def write_many(self, items):
+        """
+        複数の bytes/str をまとめて 1 回の書き込みと 1 回の drain() で送る
+        """
+        data = b"".join(item.encode("utf-8", "replace") if isinstance(item, str) else item
+                        for item in items)
+        if data:
+            await self.write(data)
+
+    async def writelines(self, lines, newline: str = "\r\n"):
+        """
+        各行に newline を付けて write_many() で送る
+        """
+        await self.write_many(line + newline for line in lines)
+
+    async def flush(self):
+        """
+        write_coalesce でまとめ中の入力をすぐに送り、drain() する
+        """
+        self._flush_input()
+        if self._writer is not None:
+            await self._writer.drain()
+
+    # ---- キー/マウス/貼り付け ----
+    def track_input_modes(self) -> "InputModes":
+        """
+        出力を見てアプリの入力モード（application cursor / bracketed paste / マウス）を追跡し始める。
+        以降 send_keys() / send_mouse() / paste() はそのモードに合わせて符号化する。
+        モードの切り替えを見逃さないよう spawn() の前に呼ぶ。
+        """
+        if self._input_modes is None:
+            from .keys import InputModes
+            self._input_modes = InputModes()
+            self.add_output_tap(self._input_modes.feed)
+        return self._input_modes
+
+    async def send_keys(self, *keys):
+        """
+        キー指定（'ctrl+c' / 'Up' / 'Enter' / 'a' など、keys.encode_key() を参照）を
+        まとめて符号化し、1 回の書き込みと 1 回の drain() で送る。
+        """
+        from .keys import encode_keys
+        modes = self._input_modes
+        data = encode_keys(keys, application_cursor=modes is not None and modes.application_cursor)
+        if data:
+            await self.write(data)
+
+    async def send_mouse(self, button, x: int, y: int, **kwargs):
+        """
+        マウスイベントを送る（kwargs は keys.encode_mouse() に渡す）。
+        sgr を省略すると、モード追跡中はアプリが ?1006 を有効にしているかで決める。
+        """
+        from .keys import encode_mouse
+        if "sgr" not in kwargs:
+            kwargs["sgr"] = self._input_modes is None or self._input_modes.mouse_sgr
+        await self.write(encode_mouse(button, x, y, **kwargs))
+
+    async def paste(self, data, *, bracketed: bool | None = None, newline: str | None = "\r",
+                    chunk_size: int = None) -> int:
+        """
+        テキストを貼り付ける。送ったバイト数を返す。
+
+        改行は newline に揃え、bracketed なら ESC [200~ ... ESC [201~ で囲む
+        （None ならモード追跡中はアプリの ?2004 に従い、追跡していなければ囲まない）。
+        大きな貼り付けは chunk_size バイトずつ送り、書き込みバッファが high water を
+        超えている間は子が読むのを待つ（バッファを膨らませず、他のセッションも止めない）。
+        """
+        from .keys import DEFAULT_PASTE_CHUNK, prepare_paste
+        if bracketed is None:
+            bracketed = self._input_modes is not None and self._input_modes.bracketed_paste
+        payload = prepare_paste(data, bracketed=bracketed, newline=newline)
+        chunk_size = int(chunk_size or DEFAULT_PASTE_CHUNK)
+        self._flush_input()  # まとめ中の入力を先に送る
+        view = memoryview(payload)
+        for i in range(0, len(payload), chunk_size):
+            chunk = view[i:i + chunk_size]
+            if self._input_taps:
+                chunk = bytes(chunk)
+                for tap in tuple(self._input_taps):
+                    tap(chunk)
+            if self._metrics is not None:
+                self._metrics.count("write.calls")
+                self._metrics.count("input.bytes", len(chunk))
+                self._metrics.observe("input.chunk_size", len(chunk))
+            self._writer.write(chunk)
+            await self._writer.drain()
+            if i + chunk_size < len(payload):
+                await asyncio.sleep(0)  # 子がすぐ読んで詰まらなくても、ループを独占しない
+        return len(payload)
+
+    def _coalesce(self, data: bytes):
+        self._pending_input += data
+        transport = self._transport_write
+        high = transport.get_write_buffer_limits()[1] if transport is not None else 0
+        if len(self._pending_input) >= max(high, 4096):
+            # 溜めすぎない: 上限に達したら窓を待たずに送る
+            self._flush_input()
+        elif self._flush_handle is None:
+            if self._write_coalesce > 0:
+                self._flush_handle = self._loop.call_later(self._write_coalesce, self._flush_input)
+            else:
+                self._flush_handle = self._loop.call_soon(self._flush_input)
+
+    def _flush_input(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending_input and self._writer is not None:
+            data = bytes(self._pending_input)
+            self._pending_input.clear()
+            self._writer.write(data)
+
+    def set_write_buffer_limits(self, high: int = None, low: int = None):
+        """
+        書き込みバッファの high/low water mark を設定する。
+        バッファが high を超えると write() の drain() は low 以下になるまで待つ。
+        """
+        self._write_limits = (high, low)
+        if self._transport_write is not None:
+            self._transport_write.set_write_buffer_limits(high, low)
+
+    def get_write_buffer_limits(self):
+        """
+        (low, high) を返す（未オープンなら None）
+        """
+        if self._transport_write is None:
+            return None
+        return self._transport_write.get_write_buffer_limits()
+
+    # ---- 出力タップ ----
+    def add_output_tap(self, callback):
+        """
+        受信した出力 chunk を callback(bytes) にも渡す（読み手の有無に関係なく受信時に呼ばれる）
+        """
+        self._output_taps.append(callback)
+
+    def remove_output_tap(self, callback):
+        try:
+            self._output_taps.remove(callback)
+        except ValueError:
+            pass
+
+    def add_input_tap(self, callback):
+        """
+        write() で送る入力を callback(bytes) にも渡す
+        """
+        self._input_taps.append(callback)
+
+    def remove_input_tap(self, callback):
+        try:
+            self._input_taps.remove(callback)
+        except ValueError:
+            pass
+
+    def broadcast(self, **kwargs) -> "OutputBroadcast":
+        """
+        出力を複数の購読者へ配る OutputBroadcast を返す。初回に作って出力の sink にするので、
+        以降の出力は read() 系ではなく購読者から読む。kwargs（retain / lag_limit / policy）は初回のみ有効。
+        """
+        if self._broadcast is None:
+            from .broadcast import OutputBroadcast
+            self._broadcast = OutputBroadcast(**kwargs)
+            self.set_output_sink(self._broadcast)
+        elif kwargs:
+            raise RuntimeError("broadcast() options can only be set before the first subscriber")
+        return self._broadcast
+
+    def subscribe(self, *, replay: int = 0) -> "Subscriber":
+        """
+        出力の購読者を作る。各購読者は共有された出力を自分のカーソルで読む
+        （read() / async for）。replay バイト分の直近の出力から始められる。
+        """
+        return self.broadcast().subscribe(replay=replay)
+
+    def add_resize_callback(self, callback):
+        """
+        resize() 成功後に callback(cols, rows) を呼ぶ
+        """
+        self._resize_callbacks.append(callback)
+
+    def remove_resize_callback(self, callback):
+        try:
+            self._resize_callbacks.remove(callback)
+        except ValueError:
+            pass
+
+    def set_output_sink(self, sink):
+        """
+        出力の受け先を sink（data_received(bytes) を持つプロトコル風オブジェクト）に切り替える。
+        設定中の出力は Reader に溜まらず read()/readline() からは見えない（EOF のみ届く）。
+        sink は任意で eof_received() / connection_lost(exc) を持てる。None で Reader に戻す。
+        """
+        self._sink = sink
+        if self._protocol_read is not None:
+            self._protocol_read.sink = sink
+
+    def pause_reading(self):
+        """
+        出力の受信を一時停止する（sink 側のフロー制御用）。
+
+        Reader や他の利用者の一時停止と参照カウントを共有するので、呼び出し側は
+        自分が止めた回数だけ resume_reading() を呼ぶ。全員が再開したときだけ受信が再開する。
+        """
+        if self._read_flow is not None:
+            self._read_flow.pause_reading()
+
+    def resume_reading(self):
+        if self._read_flow is not None:
+            self._read_flow.resume_reading()
+
+    def attach_screen(self, screen: "Screen" = None) -> "Screen":
+        """
+        画面モデルを接続する。以降の出力が適用され、resize() にも追従する。
+        """
+        if screen is None:
+            from .screen import Screen
+            screen = Screen(self._cols, self._rows)
+        else:
+            screen.resize(self._cols, self._rows)
+        self.add_output_tap(screen.feed)
+        self.add_resize_callback(screen.resize)
+        return screen
+
+    def detach_screen(self, screen: "Screen"):
+        self.remove_output_tap(screen.feed)
+        self.remove_resize_callback(screen.resize)
+
+    def attach_scrollback(self, scrollback: "Scrollback" = None, **kwargs) -> "Scrollback":
+        """
+        スクロールバック（aioconpty.scrollback.Scrollback）を接続し、以降の出力を行として蓄える。
+        kwargs は Scrollback に渡す。不要になったら detach_scrollback() の後で close() する。
+        """
+        if scrollback is None:
+            from .scrollback import Scrollback
+            scrollback = Scrollback(**kwargs)
+        self.add_output_tap(scrollback.feed)
+        return scrollback
+
+    def detach_scrollback(self, scrollback: "Scrollback"):
+        self.remove_output_tap(scrollback.feed)
+        scrollback.flush()
+
+    def attach_log(self, path, **kwargs) -> "SessionLog":
+        """
+        出力を圧縮ログ（aioconpty.sessionlog.SessionLog）に記録し始める。kwargs は SessionLog に渡す。
+        ファイル I/O と圧縮は書き込みスレッドで行う。止めるには log.close() を await する。
+        """
+        from .sessionlog import SessionLog
+        log = SessionLog(path, **kwargs)
+        log.attach(self)
+        return log
+
+    def screen_deltas(self, interval: float = 1 / 30, *,
+                      screen: "Screen" = None) -> "DeltaStream":
+        """
+        画面の差分フレーム（bytes）を返す非同期イテレータ（閲覧者ごとに 1 つ）を作る。
+        最初はキーフレームで、以降は interval 秒に高々 1 回、変化した行の区間だけを送る。
+        screen を省略すると新しく attach_screen() する。受信側は aioconpty.delta.ScreenMirror。
+        """
+        from .delta import DeltaStream
+        owned = screen is None
+        if owned:
+            screen = self.attach_screen()
+
+        def detach(stream):
+            self.remove_output_tap(stream.notify)
+            self.remove_resize_callback(stream.notify)
+            if owned:
+                self.detach_screen(screen)
+
+        stream = DeltaStream(screen, interval, on_close=detach)
+        self.add_output_tap(stream.notify)
+        self.add_resize_callback(stream.notify)
+        return stream
+
+    async def record(self, file, **kwargs) -> "AsciicastRecorder":
+        """
+        出力（と任意で入力）と resize を asciicast v2 形式で file に記録し始める。
+        kwargs は AsciicastRecorder に渡す。止めるには recorder.close() を await する。
+        """
+        from .record import AsciicastRecorder
+        recorder = AsciicastRecorder(file, self._cols, self._rows, **kwargs)
+        await recorder.start()
+        recorder.attach(self)
+        return recorder
+
     # ---- サイズ変更 ----
     def resize(self, cols: int, rows: int):
-        size = COORD(int(cols), int(rows))
-        hr = ResizePseudoConsole(self.hPC, size)
-        if hr != S_OK:
-            raise OSError(f"ResizePseudoConsole failed: HRESULT=0x{hr:08X}")
-        self._cols, self._rows = int(cols), int(rows)
+        self._backend.resize(int(cols), int(rows))
+        self._resized(int(cols), int(rows))
+
+    async def resize_async(self, cols: int, rows: int):
+        """
+        resize() の非同期版。ResizePseudoConsole のようにブロックし得る呼び出しは
+        バックエンドの executor で行い、ループを止めない。
+        """
+        await self._backend.resize_async(int(cols), int(rows))
+        self._resized(int(cols), int(rows))
+
+    def _resized(self, cols: int, rows: int):
+        self._cols, self._rows = cols, rows
+        for callback in tuple(self._resize_callbacks):
+            callback(cols, rows)
 
     # ---- プロセス起動 ----
     async def ensure_utf8_codepage(self, codepage: int = 65001):
         """
         元コード互換: 起動直後に chcp.com でコードページを UTF-8 にする（任意）
+        POSIX バックエンドでは何もしない。
         """
-        await self.spawn(f"chcp.com {codepage}", wait_thread=True, close_thread=True, quiet=True)
+        await self._backend.ensure_utf8_codepage(codepage)
 
     async def spawn(self, cmd, *, cwd: str = None, wait_thread: bool = True,
                     close_thread: bool = True, quiet: bool = False):
@@ -563,110 +935,75 @@ class AsyncConPTY:
 
         Returns
         -------
-        AsyncConPTYProcess
+        PtyProcess
             wait() でプロセス終了待ちができるハンドルラッパ
+            （Windows では AsyncConPTYProcess）
         """
-        if not self._si_ex:
-            raise RuntimeError("ConPTY 未初期化。まず open()/__aenter__() を呼んでください。")
-
-        lp_pi = PROCESS_INFORMATION()
-        # lpCommandLine は書き換えられる可能性があるため可変バッファを渡す
-        cmdline = _list2cmdline(cmd)
-        buf = ctypes.create_unicode_buffer(cmdline)
-
-        try:
-            CreateProcessW(
-                None, buf,
-                None, None,
-                False,
-                EXTENDED_STARTUPINFO_PRESENT,
-                None,
-                cwd,
-                ctypes.byref(self._si_ex.StartupInfo),
-                ctypes.byref(lp_pi)
-            )
-        except Exception:
-            if quiet:
-                # 失敗しても呼び出し側に投げない設定
-                return AsyncConPTYProcess(None, None, 0)
-            raise
-
-        # 起動スレッドのシグナルを待つ（短時間）
-        if wait_thread:
-            # Proactor の wait_for_handle（非公開属性）を使うとノンブロッキングで待てる
-            loop = self._loop or asyncio.get_running_loop()
-            proactor = getattr(loop, "_proactor", None)
-            if proactor is not None:
-                await proactor.wait_for_handle(int(lp_pi.hThread), None)
-            else:
-                # 念のためブロッキング API で最低限の同期
-                WaitForSingleObject(lp_pi.hThread, 2000)
+        t0 = time.perf_counter()
+        if self._metrics is not None and self._protocol_read is not None:
+            self._protocol_read.spawned_at = t0
+        proc = await self._backend.spawn(cmd, cwd=cwd, wait_thread=wait_thread,
+                                         close_thread=close_thread, quiet=quiet)
+        if self._metrics is not None:
+            self._metrics.count("process.spawned")
+            self._metrics.observe("spawn.seconds", time.perf_counter() - t0)
+            proc.metrics = self._metrics
+            proc._spawned_at = t0
+        self._children = [c for c in self._children if c.poll() is None]
+        if proc.pid:
+            self._children.append(proc)
+        return proc
 
-        if close_thread and lp_pi.hThread:
-            try:
-                CloseHandle(lp_pi.hThread)
-            except Exception:
-                pass
-            lp_pi.hThread = None
-
-        return AsyncConPTYProcess(lp_pi.hProcess, lp_pi.dwProcessId, exit_code=None)
-
-
-class AsyncConPTYProcess:
-    """
-    ConPTY にぶら下がっている子プロセスの簡易ハンドラ
-    """
-    def __init__(self, hProcess, pid: int, exit_code: int | None):
-        self.hProcess = hProcess
-        self.pid = int(pid) if pid else 0
-        self._exit_code = exit_code
-
-    async def wait(self, timeout: float | None = None) -> int:
+    @property
+    def children(self) -> list:
         """
-        プロセス終了待ち。戻り値は return code
+        spawn() したプロセスのうち終了が確認されていないもの
         """
-        if not self.hProcess:
-            return 0
-        loop = asyncio.get_running_loop()
-        proactor = getattr(loop, "_proactor", None)
-        if proactor is not None:
-            # タイムアウト付き待機（ms 指定）
-            if timeout is None:
-                await proactor.wait_for_handle(int(self.hProcess), None)
-            else:
-                try:
-                    await asyncio.wait_for(proactor.wait_for_handle(int(self.hProcess), None), timeout)
-                except asyncio.TimeoutError:
-                    return None  # タイムアウト
-        else:
-            # 同期版フォールバック
-            ms = INFINITE if timeout is None else int(timeout * 1000)
-            WaitForSingleObject(self.hProcess, ms)
+        return list(self._children)
 
-        # 返り値取得
-        code = ctypes.wintypes.DWORD(0)
-        GetExitCodeProcess(self.hProcess, ctypes.byref(code))
-        self._exit_code = int(code.value)
-        return self._exit_code
+    def has_running_children(self) -> bool:
+        self._children = [c for c in self._children if c.poll() is None]
+        return bool(self._children)
 
-    def poll(self) -> int | None:
+    # ---- 再利用 ----
+    def discard_output(self) -> int:
         """
-        非同期でなく現在の終了コードを返す。未終了なら None。
+        Reader に溜まっている未読の出力を捨て、捨てたバイト数を返す
         """
-        if not self.hProcess:
-            return 0
-        code = ctypes.wintypes.DWORD(0)
-        GetExitCodeProcess(self.hProcess, ctypes.byref(code))
-        if code.value == 259:  # STILL_ACTIVE
-            return None
-        return int(code.value)
-
-    def close_handle(self):
-        try:
-            if self.hProcess:
-                CloseHandle(self.hProcess)
-        finally:
-            self.hProcess = None
+        n = 0
+        if self._expecter is not None:
+            n += len(self._expecter.clear())
+        reader = self._reader
+        if hasattr(reader, "clear"):
+            n += reader.clear()  # RingBufferReader
+        elif reader is not None:
+            # asyncio.StreamReader には公開の破棄 API がないため内部バッファを直接空にする
+            buf = reader._buffer
+            n += len(buf)
+            buf.clear()
+            reader._maybe_resume_transport()  # 上限超えで止めていた分を戻す
+        return n
+
+    def reset(self):
+        """
+        セッションを再利用できる状態に戻す: 未読出力、expect バッファ、
+        入出力タップ、画面、記録、購読、sink をすべて外し、端末設定（POSIX の termios）を
+        open() 時点に戻す。端末側の画面内容と、アプリが切り替えた入力モード（DECCKM /
+        bracketed paste / マウス）はそのまま残るので、入力モードの追跡も続ける。
+        """
+        if self._broadcast is not None:
+            # 購読者には EOF として見せる
+            self._broadcast.feed_eof()
+            self._broadcast = None
+        self._output_taps.clear()
+        self._input_taps.clear()
+        self._resize_callbacks.clear()
+        if self._input_modes is not None:
+            self._output_taps.append(self._input_modes.feed)
+        self.set_output_sink(None)
+        self.discard_output()
+        if self._backend.is_open:
+            self._backend.restore_terminal()
 
 
 # ===== サンプル（スクリプト実行時） =====
@@ -676,7 +1013,12 @@ async def _demo(argv: list[str]) -> int:
         python async_conpty.py             -> ping localhost を実行
         python async_conpty.py cmd /c dir -> 任意コマンド
     """
-    cmd = argv or ["ping", "localhost"]
+    if argv:
+        cmd = argv
+    elif sys.platform == "win32":
+        cmd = ["ping", "localhost"]
+    else:
+        cmd = ["ping", "-c", "4", "localhost"]
     async with AsyncConPTY() as pty:
         # 元コード互換: 文字化け防止に UTF-8 に変更（任意）
         await pty.ensure_utf8_codepage()
@@ -684,23 +1026,25 @@ async def _demo(argv: list[str]) -> int:
         proc = await pty.spawn(cmd)
 
         # 出力を行単位で受け取り標準出力へ中継
-        while True:
-            line = await pty.readline()
-            if not line:
-                break
-            # （必要ならエスケープ処理を入れる）
-            sys.stdout.buffer.write(line)
-            sys.stdout.buffer.flush()
-
+        async def relay():
+            while True:
+                line = await pty.readline()
+                if not line:
+                    break
+                # （必要ならエスケープ処理を入れる）
+                sys.stdout.buffer.write(line)
+                sys.stdout.buffer.flush()
+
+        relay_task = asyncio.create_task(relay())
         rc = await proc.wait()
         proc.close_handle()
+        # 子が終わったら端末側を切る: 残りの出力を吐き出した後に EOF が来る
+        await pty.hangup()
+        await relay_task
         return rc if rc is not None else 1
 
 
 def main():
-    if sys.platform != "win32":
-        print("Windows 上でのみ動作します。", file=sys.stderr)
-        sys.exit(1)
     try:
         rc = asyncio.run(_demo(sys.argv[1:]))
     except KeyboardInterrupt:
@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+"""Compact screen deltas for remote viewers.
+
+:func:`encode_delta` compares two :class:`ScreenSnapshot` objects and returns
+a binary frame holding only what changed: for each changed row, the span
+between its first and last differing cell, as UTF-8 text plus style runs,
+together with newly interned styles, the cursor and the title.  A frame for
+a first snapshot (or after a resize) is a keyframe carrying every row.
+:class:`ScreenMirror` applies frames on the viewer side.
+
+:class:`DeltaStream` ties an encoder to a live :class:`~aioconpty.screen.Screen`
+and paces it: output only marks the stream as changed, and a frame is
+encoded when the viewer asks for one, at most once per ``interval``.  A
+full-screen program redrawing thousands of times per second therefore costs
+each viewer one diff per interval, whatever the output rate.
+
+Frame layout (little endian)::
+
+    header  "<2sBBHHHH"  magic b"SD", version, flags, cols, rows, x, y
+    title   "<H" length + UTF-8               (only with FLAG_TITLE)
+    styles  "<HH" first id, count, then count * "<iiB" (fg, bg, attrs)
+    rows    "<H" count, then per row:
+            "<HHHHI" y, x0, cells, runs, text length,
+            runs * "<HH" (cells, style id), UTF-8 text of the cells
+"""
+
+import asyncio
+import struct
+import sys
+import time
+from array import array
+
+__all__ = ["ScreenSnapshot", "ScreenMirror", "DeltaStream", "encode_delta",
+           "DeltaFormatError"]
+
+MAGIC = b"SD"
+VERSION = 1
+
+FLAG_KEYFRAME = 1
+FLAG_CURSOR_VISIBLE = 2
+FLAG_TITLE = 4
+
+DEFAULT_INTERVAL = 1 / 30
+
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+_HEADER = struct.Struct("<2sBBHHHH")
+_U16 = struct.Struct("<H")
+_STYLES = struct.Struct("<HH")
+_STYLE = struct.Struct("<iiB")
+_ROW = struct.Struct("<HHHHI")
+_RUN = struct.Struct("<HH")
+
+
+class DeltaFormatError(ValueError):
+    """
+    フレームが壊れている、または受信側の状態と合わない
+    """
+
+
+class ScreenSnapshot:
+    """
+    ある時点の画面状態（セル配列のコピーとカーソル・タイトル）
+    """
+    __slots__ = ("cols", "rows", "chars", "styles", "style", "nstyles",
+                 "x", "y", "cursor_visible", "title")
+
+    def __init__(self, screen):
+        self.cols = screen.cols
+        self.rows = screen.rows
+        self.chars, self.styles = screen.copy_cells()
+        # スタイル表は追記のみなので、要素数だけ覚えておけば後から同じ範囲を参照できる
+        self.style = screen.style
+        self.nstyles = screen.style_count
+        self.x = screen.x
+        self.y = screen.y
+        self.cursor_visible = screen.cursor_visible
+        self.title = screen.title
+
+
+def _common_prefix(a, b, c, d, lo: int, hi: int) -> int:
+    """
+    a[lo:k] == b[lo:k] かつ c[lo:k] == d[lo:k] となる最大の k（二分探索、比較は C 側）
+    """
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid] and c[lo:mid] == d[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, c, d, lo: int, hi: int) -> int:
+    """
+    a[k:hi] == b[k:hi] かつ c[k:hi] == d[k:hi] となる最小の k
+    """
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if a[mid:hi] == b[mid:hi] and c[mid:hi] == d[mid:hi]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return hi
+
+
+def _runs(styles, start: int, end: int) -> list:
+    """
+    styles[start:end] を [(セル数, スタイル ID), ...] に分割する
+    """
+    first = styles[start]
+    if styles[start:end].count(first) == end - start:
+        return [(end - start, first)]
+    runs = []
+    run_start = start
+    cur = first
+    for x in range(start + 1, end):
+        s = styles[x]
+        if s != cur:
+            runs.append((x - run_start, cur))
+            run_start = x
+            cur = s
+    runs.append((end - run_start, cur))
+    return runs
+
+
+def _encode_row(out: bytearray, new, y: int, x0: int, x1: int):
+    off = y * new.cols
+    text = new.chars[off + x0:off + x1].tobytes().decode(_UTF32).encode("utf-8")
+    runs = _runs(new.styles, off + x0, off + x1)
+    out += _ROW.pack(y, x0, x1 - x0, len(runs), len(text))
+    for n, sid in runs:
+        out += _RUN.pack(n, sid)
+    out += text
+
+
+def encode_delta(old: ScreenSnapshot | None, new: ScreenSnapshot) -> bytes | None:
+    """
+    old から new への差分フレームを返す。変化がなければ None。
+    old が None か画面サイズが違う場合はキーフレーム（全行）を返す。
+    """
+    key = old is None or (old.cols, old.rows) != (new.cols, new.rows)
+    cols, rows = new.cols, new.rows
+    flags = FLAG_KEYFRAME if key else 0
+    if new.cursor_visible:
+        flags |= FLAG_CURSOR_VISIBLE
+    title_changed = key or new.title != old.title
+    if title_changed:
+        flags |= FLAG_TITLE
+
+    body = bytearray()
+    count = 0
+    if key:
+        for y in range(rows):
+            _encode_row(body, new, y, 0, cols)
+        count = rows
+    elif new.chars != old.chars or new.styles != old.styles:
+        a, b, c, d = old.chars, new.chars, old.styles, new.styles
+        for y in range(rows):
+            lo, hi = y * cols, (y + 1) * cols
+            if a[lo:hi] == b[lo:hi] and c[lo:hi] == d[lo:hi]:
+                continue
+            start = _common_prefix(a, b, c, d, lo, hi)
+            end = _common_suffix(a, b, c, d, start, hi)
+            _encode_row(body, new, y, start - lo, end - lo)
+            count += 1
+
+    first_style = 0 if key else old.nstyles
+    if not (key or count or title_changed or first_style < new.nstyles
+            or (new.x, new.y, new.cursor_visible) != (old.x, old.y, old.cursor_visible)):
+        return None
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, flags, cols, rows, new.x, new.y))
+    if title_changed:
+        title = new.title.encode("utf-8", "replace")[:0xFFFF]
+        out += _U16.pack(len(title))
+        out += title
+    out += _STYLES.pack(first_style, new.nstyles - first_style)
+    style = new.style
+    for sid in range(first_style, new.nstyles):
+        out += _STYLE.pack(*style(sid))
+    out += _U16.pack(count)
+    out += body
+    return bytes(out)
+
+
+class ScreenMirror:
+    """
+    受信側の画面。encode_delta() のフレームを apply() で適用する。
+
+    使い方:
+        mirror = ScreenMirror()
+        for frame in frames:
+            for y in mirror.apply(frame):
+                render(y, mirror.line(y))
+    """
+
+    def __init__(self):
+        self.cols = 0
+        self.rows = 0
+        self.x = 0
+        self.y = 0
+        self.cursor_visible = True
+        self.title = ""
+        self._chars = array("I")
+        self._styles = array("H")
+        self._styles_table = []
+        self.frames = 0
+
+    @property
+    def ready(self) -> bool:
+        """
+        キーフレームを受け取り済みか
+        """
+        return self.rows > 0
+
+    def apply(self, frame: bytes) -> list:
+        """
+        フレームを適用し、変化した行番号のリストを返す
+        """
+        mv = memoryview(frame)
+        try:
+            magic, version, flags, cols, rows, x, y = _HEADER.unpack_from(mv, 0)
+        except struct.error as exc:
+            raise DeltaFormatError("truncated frame header") from exc
+        if magic != MAGIC or version != VERSION:
+            raise DeltaFormatError(f"unsupported frame {bytes(magic)!r} v{version}")
+        if flags & FLAG_KEYFRAME:
+            if (cols, rows) != (self.cols, self.rows):
+                self.cols, self.rows = cols, rows
+                self._chars = array("I", [0x20]) * (cols * rows)
+                self._styles = array("H", [0]) * (cols * rows)
+        elif not self.ready:
+            raise DeltaFormatError("delta frame before the first keyframe")
+        elif (cols, rows) != (self.cols, self.rows):
+            raise DeltaFormatError("delta frame for a different screen size")
+        pos = _HEADER.size
+        try:
+            if flags & FLAG_TITLE:
+                (n,) = _U16.unpack_from(mv, pos)
+                pos += 2
+                self.title = bytes(mv[pos:pos + n]).decode("utf-8", "replace")
+                pos += n
+            first, n = _STYLES.unpack_from(mv, pos)
+            pos += _STYLES.size
+            if first > len(self._styles_table):
+                raise DeltaFormatError("style ids are not contiguous")
+            del self._styles_table[first:]
+            for _ in range(n):
+                self._styles_table.append(_STYLE.unpack_from(mv, pos))
+                pos += _STYLE.size
+            (count,) = _U16.unpack_from(mv, pos)
+            pos += 2
+            changed = []
+            for _ in range(count):
+                row, x0, ncells, nruns, tlen = _ROW.unpack_from(mv, pos)
+                pos += _ROW.size
+                if row >= rows or x0 + ncells > cols:
+                    raise DeltaFormatError("row span out of range")
+                off = row * cols + x0
+                styles = array("H")
+                for _ in range(nruns):
+                    k, sid = _RUN.unpack_from(mv, pos)
+                    pos += _RUN.size
+                    styles += array("H", [sid]) * k
+                cells = array("I")
+                cells.frombytes(bytes(mv[pos:pos + tlen]).decode("utf-8").encode(_UTF32))
+                pos += tlen
+                if len(cells) != ncells or len(styles) != ncells:
+                    raise DeltaFormatError("row span length mismatch")
+                self._chars[off:off + ncells] = cells
+                self._styles[off:off + ncells] = styles
+                changed.append(row)
+        except (struct.error, UnicodeDecodeError) as exc:
+            raise DeltaFormatError("truncated frame") from exc
+        self.x, self.y = x, y
+        self.cursor_visible = bool(flags & FLAG_CURSOR_VISIBLE)
+        self.frames += 1
+        return changed
+
+    def line(self, y: int) -> str:
+        off = y * self.cols
+        text = self._chars[off:off + self.cols].tobytes().decode(_UTF32)
+        return text.replace("\x00", "").rstrip()
+
+    @property
+    def display(self) -> list:
+        return [self.line(y) for y in range(self.rows)]
+
+    def style(self, style_id: int):
+        return self._styles_table[style_id]
+
+    def row_cells(self, y: int):
+        off = y * self.cols
+        return self._chars[off:off + self.cols], self._styles[off:off + self.cols]
+
+
+class DeltaStream:
+    """
+    画面の差分フレームを、interval 秒に高々 1 回の頻度で返す非同期イテレータ。
+    最初のフレームはキーフレーム。閲覧者ごとに 1 つ作る。
+
+    使い方:
+        stream = pty.screen_deltas(interval=1 / 30)
+        async for frame in stream:
+            await ws.send(frame)
+
+    close() で終了する（AsyncConPTY から外れ、イテレーションが止まる）。
+    """
+
+    def __init__(self, screen, interval: float = DEFAULT_INTERVAL, *, on_close=None):
+        self.screen = screen
+        self.interval = float(interval)
+        self._on_close = on_close
+        self._last = None          # 最後に送った ScreenSnapshot
+        self._last_time = None
+        self._changed = None       # asyncio.Event（ループ上で遅延生成）
+        self._closed = False
+        self.frames = 0
+        self.keyframes = 0
+        self.bytes_sent = 0
+        self.updates = 0           # 受け取った変化通知（フレームにまとめられた数を含む）
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def notify(self, *args):
+        """
+        画面が変わった可能性を知らせる（出力タップ / resize コールバックとして登録する）
+        """
+        self.updates += 1
+        if self._changed is not None:
+            self._changed.set()
+
+    def keyframe(self) -> bytes:
+        """
+        次の差分の基準をリセットし、現在の画面全体をキーフレームとして返す
+        """
+        self._last = None
+        return self.encode()
+
+    def encode(self) -> bytes | None:
+        """
+        前回のフレームからの差分を今すぐ作る（間隔制御なし）。変化がなければ None。
+        """
+        snap = ScreenSnapshot(self.screen)
+        frame = encode_delta(self._last, snap)
+        if frame is not None:
+            if frame[3] & FLAG_KEYFRAME:
+                self.keyframes += 1
+            self._last = snap
+            self._last_time = time.monotonic()
+            self.frames += 1
+            self.bytes_sent += len(frame)
+        return frame
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._changed is not None:
+            self._changed.set()
+        if self._on_close is not None:
+            self._on_close(self)
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "bytes_sent": self.bytes_sent,
+            "updates": self.updates,
+        }
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while not self._closed:
+            if self._last is not None:
+                await self._changed.wait()
+                if self._closed:
+                    break
+                # 間隔内に届いた変化はすべて次の 1 フレームにまとめる
+                delay = self._last_time + self.interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    if self._closed:
+                        break
+                self._changed.clear()
+            frame = self.encode()
+            if frame is not None:
+                return frame
+        raise StopAsyncIteration
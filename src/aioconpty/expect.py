@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Expect-style incremental pattern matching over the pty output stream.
+
+:class:`Expecter` keeps an input buffer across :meth:`Expecter.expect` calls.
+After each read only the new bytes plus a bounded look-back window are
+searched, so every byte is scanned a bounded number of times instead of
+re-running every pattern over the whole accumulated output.
+
+Literal patterns (``bytes``/``str``) use :meth:`bytes.find`; compiled regular
+expressions use :meth:`re.Pattern.search`.  A regex match must start within
+``searchwindowsize`` bytes of the data already searched to be found once the
+following chunk arrives.
+"""
+
+import re
+import asyncio
+
+__all__ = ["Expecter", "ExpectMatch", "ExpectTimeout", "ExpectEOF"]
+
+DEFAULT_SEARCH_WINDOW = 4096
+
+
+class ExpectTimeout(asyncio.TimeoutError):
+    """
+    expect() のタイムアウト。before にそれまでのバッファ内容を持つ
+    """
+    def __init__(self, before: bytes):
+        super().__init__("expect timed out")
+        self.before = before
+
+
+class ExpectEOF(EOFError):
+    """
+    パターンに一致する前に EOF に達した
+    """
+    def __init__(self, before: bytes):
+        super().__init__("EOF while waiting for pattern")
+        self.before = before
+
+
+class ExpectMatch:
+    """
+    expect() の結果。
+
+    index   : 一致したパターンの番号
+    pattern : 一致したパターン（bytes か re.Pattern）
+    before  : 一致位置より前のデータ
+    after   : 一致したデータ
+    match   : 正規表現の場合は re.Match（リテラルは None）
+    """
+    __slots__ = ("index", "pattern", "before", "after", "match")
+
+    def __init__(self, index, pattern, before, after, match=None):
+        self.index = index
+        self.pattern = pattern
+        self.before = before
+        self.after = after
+        self.match = match
+
+    def group(self, *groups):
+        if self.match is not None:
+            return self.match.group(*groups)
+        if groups and groups != (0,):
+            raise IndexError("no such group")
+        return self.after
+
+    def groups(self, default=None) -> tuple:
+        if self.match is not None:
+            return self.match.groups(default)
+        return ()
+
+    def __repr__(self):
+        return f"ExpectMatch(index={self.index}, after={self.after!r})"
+
+
+def _compile(patterns):
+    """
+    パターンを (pattern, literal_bytes or None, regex or None) のリストにする
+    """
+    if isinstance(patterns, (str, bytes, re.Pattern)):
+        patterns = [patterns]
+    compiled = []
+    for pat in patterns:
+        if isinstance(pat, str):
+            pat = pat.encode("utf-8")
+        if isinstance(pat, (bytes, bytearray)):
+            if not pat:
+                raise ValueError("empty expect pattern")
+            compiled.append((bytes(pat), bytes(pat), None))
+        elif isinstance(pat, re.Pattern):
+            regex = pat
+            if isinstance(pat.pattern, str):
+                # 出力はバイト列なので bytes パターンとして再コンパイルする
+                regex = re.compile(pat.pattern.encode("utf-8"), pat.flags & ~re.UNICODE)
+            compiled.append((pat, None, regex))
+        else:
+            raise TypeError(f"unsupported expect pattern: {pat!r}")
+    return compiled
+
+
+class Expecter:
+    """
+    read(n) コルーチン関数から読みながらパターンを探す。
+
+    使い方:
+        exp = Expecter(pty.read)
+        m = await exp.expect([b"$ ", re.compile(rb"error: (\\w+)")], timeout=5)
+    """
+
+    def __init__(self, read, *, searchwindowsize: int = DEFAULT_SEARCH_WINDOW,
+                 maxread: int = 4096):
+        self._read = read
+        self._buffer = bytearray()
+        self.searchwindowsize = int(searchwindowsize)
+        self.maxread = int(maxread)
+        self.bytes_scanned = 0  # 計測用: 検索対象になった延べバイト数
+
+    @property
+    def buffer(self) -> bytes:
+        return bytes(self._buffer)
+
+    def _search(self, compiled, start: int):
+        buf = self._buffer
+        self.bytes_scanned += (len(buf) - start) * len(compiled)
+        best = None
+        for index, (pat, literal, regex) in enumerate(compiled):
+            if literal is not None:
+                pos = buf.find(literal, start)
+                if pos >= 0 and (best is None or pos < best[0]):
+                    best = (pos, pos + len(literal), index, pat, None)
+            else:
+                m = regex.search(buf, start)
+                if m is not None and (best is None or m.start() < best[0]):
+                    best = (m.start(), m.end(), index, pat, m)
+        return best
+
+    def _lookback(self, compiled) -> int:
+        back = 0
+        for _, literal, _regex in compiled:
+            back = max(back, len(literal) - 1 if literal is not None else self.searchwindowsize)
+        return back
+
+    async def expect(self, patterns, timeout: float | None = None) -> ExpectMatch:
+        """
+        いずれかのパターンが現れるまで読み進める。最も手前で一致したものを返す。
+        """
+        compiled = _compile(patterns)
+        lookback = self._lookback(compiled)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        start = 0
+        while True:
+            found = self._search(compiled, start)
+            if found is not None:
+                pos, end, index, pat, m = found
+                buf = self._buffer
+                if m is not None:
+                    # re.Match はバッファを参照し続けるので、不変なコピーに対して取り直す。
+                    # 先読み・\b・$ が end より後ろを見ることがあるので、end の後ろも
+                    # searchwindowsize 分含めてコピーする（毎回バッファ全体を写すと二乗になる）
+                    regex = m.re
+                    m = regex.match(bytes(buf[:end + self.searchwindowsize]), pos)
+                    if m is None or m.end() != end:
+                        m = regex.match(bytes(buf), pos)  # 窓より先を見るパターン
+                result = ExpectMatch(index, pat, bytes(buf[:pos]), bytes(buf[pos:end]), m)
+                del buf[:end]
+                return result
+            # 次回は新しいデータと、その直前の look-back 分だけを検索する
+            start = max(0, len(self._buffer) - lookback)
+            if deadline is None:
+                data = await self._read(self.maxread)
+            else:
+                remaining = deadline - loop.time()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    data = await asyncio.wait_for(self._read(self.maxread), remaining)
+                except asyncio.TimeoutError:
+                    raise ExpectTimeout(bytes(self._buffer)) from None
+            if not data:
+                before = bytes(self._buffer)
+                self._buffer.clear()
+                raise ExpectEOF(before)
+            self._buffer += data
+
+    def clear(self) -> bytes:
+        """
+        未消費のバッファを取り出して空にする
+        """
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""Terminal input encoding: key and mouse events, bracketed paste.
+
+:func:`encode_key` turns a key such as ``"ctrl+c"``, ``"Up"`` or
+``"alt+shift+F5"`` into the bytes an xterm-compatible terminal sends for it.
+Every special key and printable ASCII character is precomputed for all 16
+modifier combinations, in both normal and application cursor mode, so
+encoding a key is a dict lookup and a script of keystrokes is a single
+``bytes.join``.  Parsed key specs are cached.
+
+:func:`encode_mouse` builds SGR (mode 1006) or legacy X10 mouse reports.
+:func:`prepare_paste` converts pasted text the way a terminal does: line
+endings become ``\\r``, an embedded paste-end marker is removed so the
+payload cannot leave the bracket early, and the result is wrapped in
+``ESC [200~`` / ``ESC [201~`` when bracketed paste is on.
+
+:class:`InputModes` is an output tap that follows the modes the application
+switches with ``DECSET``/``DECRST`` (application cursor keys, bracketed
+paste, mouse tracking), so keys and pastes can be encoded the way the
+application asked for.  Chunks without ``ESC [?`` cost one ``bytes.find``.
+"""
+
+import re
+
+__all__ = ["encode_key", "encode_keys", "encode_mouse", "prepare_paste", "InputModes",
+           "SHIFT", "ALT", "CTRL", "META", "PASTE_START", "PASTE_END"]
+
+# 修飾キー（xterm の修飾パラメータは 1 + これらの和）
+SHIFT = 1
+ALT = 2
+CTRL = 4
+META = 8
+
+PASTE_START = b"\x1b[200~"
+PASTE_END = b"\x1b[201~"
+DEFAULT_PASTE_CHUNK = 16 * 1024
+
+_MODIFIERS = {"shift": SHIFT, "alt": ALT, "opt": ALT, "option": ALT,
+              "ctrl": CTRL, "control": CTRL, "meta": META, "super": META}
+
+# カーソル系: CSI/SS3 + 終端文字。application cursor モードでは修飾なしが SS3 になる
+_CURSOR_KEYS = {"up": "A", "down": "B", "right": "C", "left": "D", "home": "H", "end": "F"}
+# F1-F4: 修飾なしは SS3
+_SS3_KEYS = {"f1": "P", "f2": "Q", "f3": "R", "f4": "S"}
+# CSI n ~ の形のキー
+_TILDE_KEYS = {"insert": 2, "delete": 3, "pageup": 5, "pagedown": 6,
+               "f5": 15, "f6": 17, "f7": 18, "f8": 19, "f9": 20, "f10": 21, "f11": 23, "f12": 24}
+# 1 バイトのキー（修飾は alt の ESC 前置と下の例外だけ）
+_PLAIN_KEYS = {"enter": b"\r", "tab": b"\t", "backspace": b"\x7f", "escape": b"\x1b",
+               "space": b" "}
+_ALIASES = {"return": "enter", "esc": "escape", "bs": "backspace", "del": "delete",
+            "ins": "insert", "pgup": "pageup", "page_up": "pageup", "pgdn": "pagedown",
+            "pgdown": "pagedown", "page_down": "pagedown", "arrowup": "up", "arrowdown": "down",
+            "arrowleft": "left", "arrowright": "right"}
+
+
+def _char_key(ch: str, mods: int) -> bytes:
+    """
+    文字キーの符号化（xterm の既定: ctrl は C0 に、shift は大文字に、alt は ESC を前置）
+    """
+    if mods & SHIFT and ch.isalpha():
+        ch = ch.upper()
+    data = ch.encode("utf-8")
+    if mods & CTRL:
+        up = ch.upper()
+        if ch == "?":
+            data = b"\x7f"
+        elif ch == " " or ch == "2":
+            data = b"\x00"
+        elif len(up) == 1 and "@" <= up <= "_":
+            data = bytes((ord(up) & 0x1f,))
+    if mods & (ALT | META):
+        data = b"\x1b" + data
+    return data
+
+
+def _special_key(name: str, mods: int, application: bool) -> bytes:
+    m = 1 + mods
+    if name in _CURSOR_KEYS:
+        final = _CURSOR_KEYS[name]
+        if mods:
+            return f"\x1b[1;{m}{final}".encode("ascii")
+        return f"\x1b{'O' if application else '['}{final}".encode("ascii")
+    if name in _SS3_KEYS:
+        final = _SS3_KEYS[name]
+        return f"\x1b[1;{m}{final}".encode("ascii") if mods else f"\x1bO{final}".encode("ascii")
+    if name in _TILDE_KEYS:
+        n = _TILDE_KEYS[name]
+        return f"\x1b[{n};{m}~".encode("ascii") if mods else f"\x1b[{n}~".encode("ascii")
+    data = _PLAIN_KEYS[name]
+    if name == "tab" and mods & SHIFT:
+        data = b"\x1b[Z"
+    elif name == "backspace" and mods & CTRL:
+        data = b"\x08"
+    elif name == "space" and mods & CTRL:
+        data = b"\x00"
+    if mods & (ALT | META) and name != "escape":
+        data = b"\x1b" + data
+    return data
+
+
+def _build_table(application: bool) -> dict:
+    table = {}
+    names = list(_CURSOR_KEYS) + list(_SS3_KEYS) + list(_TILDE_KEYS) + list(_PLAIN_KEYS)
+    for mods in range(16):
+        for name in names:
+            table[name, mods] = _special_key(name, mods, application)
+        for code in range(0x21, 0x7f):
+            table[chr(code), mods] = _char_key(chr(code), mods)
+    return table
+
+
+# (キー名 or 文字, 修飾) -> bytes。通常モードと application cursor モード
+_NORMAL = _build_table(False)
+_APPLICATION = _build_table(True)
+
+# "ctrl+c" などの指定 -> (キー, 修飾)
+_SPEC_CACHE = {}
+_SPEC_CACHE_MAX = 4096
+
+
+def _parse_spec(spec: str):
+    parsed = _SPEC_CACHE.get(spec)
+    if parsed is not None:
+        return parsed
+    if not spec:
+        raise ValueError("empty key")
+    if len(spec) == 1:
+        parsed = ("space" if spec == " " else spec, 0)
+    else:
+        if spec.endswith("++"):
+            # 末尾の "+" はキーそのもの（"ctrl++"）
+            prefix, key = (spec[:-2].split("+") if len(spec) > 2 else []), "+"
+        else:
+            *prefix, key = spec.split("+")
+        mods = 0
+        for part in prefix:
+            try:
+                mods |= _MODIFIERS[part.lower()]
+            except KeyError:
+                raise ValueError(f"unknown modifier {part!r} in key {spec!r}") from None
+        if not key:
+            raise ValueError(f"unknown key {spec!r}")
+        if len(key) > 1:
+            key = key.lower()
+            key = _ALIASES.get(key, key)
+            if (key, 0) not in _NORMAL:
+                raise ValueError(f"unknown key {spec!r}")
+        elif key == " ":
+            key = "space"
+        parsed = (key, mods)
+    if len(_SPEC_CACHE) >= _SPEC_CACHE_MAX:
+        _SPEC_CACHE.clear()
+    _SPEC_CACHE[spec] = parsed
+    return parsed
+
+
+def encode_key(key: str, mods: int = 0, *, application_cursor: bool = False) -> bytes:
+    """
+    キーを端末が送るバイト列にする。
+
+    key は 'a' / 'Enter' / 'Up' / 'F5' のようなキー名か、'ctrl+c' / 'alt+shift+left' のように
+    修飾を '+' でつないだ指定。mods（SHIFT | ALT | CTRL | META）は指定の修飾に加算される。
+    application_cursor はアプリが DECCKM（ESC [?1h）を有効にしているとき True にする。
+    """
+    name, spec_mods = _parse_spec(key)
+    mods |= spec_mods
+    table = _APPLICATION if application_cursor else _NORMAL
+    data = table.get((name, mods))
+    if data is None:
+        if len(name) != 1:
+            raise ValueError(f"bad modifiers {mods!r} for key {key!r}")
+        data = _char_key(name, mods)  # 非 ASCII 文字
+    return data
+
+
+def encode_keys(keys, *, application_cursor: bool = False) -> bytes:
+    """
+    キー指定の iterable をまとめて 1 つのバイト列にする。
+    str 以外の要素は (キー, 修飾) の組として扱う。
+    """
+    table = _APPLICATION if application_cursor else _NORMAL
+    get = table.get
+    out = []
+    append = out.append
+    for key in keys:
+        if isinstance(key, str):
+            data = get(_SPEC_CACHE.get(key) or _parse_spec(key))
+            if data is None:
+                data = encode_key(key, application_cursor=application_cursor)
+        else:
+            data = encode_key(key[0], key[1], application_cursor=application_cursor)
+        append(data)
+    return b"".join(out)
+
+
+# ---- マウス ----
+_BUTTONS = {"left": 0, "middle": 1, "right": 2, "none": 3, "release": 3,
+            "wheel_up": 64, "wheel_down": 65, "wheel_left": 66, "wheel_right": 67}
+
+
+def encode_mouse(button, x: int, y: int, *, mods: int = 0, release: bool = False,
+                 motion: bool = False, sgr: bool = True) -> bytes:
+    """
+    マウスイベントの報告を作る。x, y は 0 始まりのセル位置。
+
+    button は 'left' / 'middle' / 'right' / 'wheel_up' / 'wheel_down' / 'none'（ボタンなしの移動）か
+    ボタン番号。sgr=True は SGR 形式（ESC [< b;x;y M/m）、False は従来の X10 形式
+    （座標 222 まで、離したボタンは区別されない）。
+    """
+    b = _BUTTONS[button] if isinstance(button, str) else int(button)
+    if mods & SHIFT:
+        b |= 4
+    if mods & (ALT | META):
+        b |= 8
+    if mods & CTRL:
+        b |= 16
+    if motion:
+        b |= 32
+    if sgr:
+        return b"\x1b[<%d;%d;%d%c" % (b, x + 1, y + 1, 0x6d if release else 0x4d)
+    if release:
+        b = (b & ~3) | 3
+    if not (0 <= x < 223 and 0 <= y < 223):
+        raise ValueError("X10 mouse reports cannot encode positions beyond 222")
+    return bytes((0x1b, 0x5b, 0x4d, 32 + b, 33 + x, 33 + y))
+
+
+# ---- 貼り付け ----
+def prepare_paste(data, *, bracketed: bool = False, newline: str | None = "\r") -> bytes:
+    """
+    貼り付けるテキストを端末と同じように変換する。
+
+    newline が None でなければ \\r\\n / \\n をそれに揃える（端末は改行を \\r で送る）。
+    bracketed なら本文中の ESC [201~ を残らなくなるまで取り除き、全体を ESC [200~ ... ESC [201~ で囲む。
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8", "replace")
+    else:
+        data = bytes(data)
+    if newline is not None:
+        nl = newline.encode("ascii")
+        if b"\n" in data:
+            data = data.replace(b"\r\n", b"\n")
+            if nl != b"\n":
+                data = data.replace(b"\n", nl)
+    if bracketed:
+        # 取り除いた結果つながってできる ESC [201~ も残さない（"\x1b[20\x1b[201~1~" など）
+        while PASTE_END in data:
+            data = data.replace(PASTE_END, b"")
+        data = b"".join((PASTE_START, data, PASTE_END))
+    return data
+
+
+# ---- アプリが切り替える入力モードの追跡 ----
+_DECSET = re.compile(rb"\x1b\[\?([\d;]*)([hl])")
+# chunk 末尾で途切れた DECSET/DECRST
+_DECSET_PARTIAL = re.compile(rb"\x1b(?:\[(?:\?[\d;]*)?)?")
+_DECSET_MAX = 32
+
+_MOUSE_MODES = (9, 1000, 1002, 1003)
+
+
+class InputModes:
+    """
+    出力を見て、アプリが DECSET/DECRST で切り替えた入力モードを追跡する出力タップ。
+
+    使い方:
+        modes = pty.track_input_modes()   # spawn() の前に
+        ...
+        if modes.bracketed_paste: ...
+
+    application_cursor : DECCKM（?1）。カーソルキーを SS3 で送る
+    bracketed_paste    : ?2004
+    mouse              : 有効なマウス追跡モード（9 / 1000 / 1002 / 1003、無効なら 0）
+    mouse_sgr          : ?1006（SGR 形式の報告）
+    """
+    __slots__ = ("application_cursor", "bracketed_paste", "mouse", "mouse_sgr", "_tail")
+
+    def __init__(self):
+        self.application_cursor = False
+        self.bracketed_paste = False
+        self.mouse = 0
+        self.mouse_sgr = False
+        self._tail = b""
+
+    def feed(self, data: bytes):
+        if self._tail:
+            data = self._tail + data
+            self._tail = b""
+        if data.find(b"\x1b[?") >= 0:
+            for m in _DECSET.finditer(data):
+                on = m.group(2) == b"h"
+                for param in m.group(1).split(b";"):
+                    if param:
+                        self._set(int(param), on)
+        # 途中で切れたシーケンスは次の chunk とつなぐ
+        i = data.rfind(b"\x1b", max(0, len(data) - _DECSET_MAX))
+        if i >= 0 and _DECSET_PARTIAL.fullmatch(data, i):
+            self._tail = data[i:]
+
+    def _set(self, mode: int, on: bool):
+        if mode == 1:
+            self.application_cursor = on
+        elif mode == 2004:
+            self.bracketed_paste = on
+        elif mode in _MOUSE_MODES:
+            self.mouse = mode if on else 0
+        elif mode == 1006:
+            self.mouse_sgr = on
+
+    @property
+    def is_default(self) -> bool:
+        """
+        どのモードも既定（端末の初期状態）のままか
+        """
+        return not (self.application_cursor or self.bracketed_paste or self.mouse or self.mouse_sgr)
+
+    def reset(self):
+        self.__init__()
+
+    def __repr__(self):
+        return (f"InputModes(application_cursor={self.application_cursor}, "
+                f"bracketed_paste={self.bracketed_paste}, mouse={self.mouse}, "
+                f"mouse_sgr={self.mouse_sgr})")
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""I/O and lifecycle metrics for :class:`aioconpty.AsyncConPTY` sessions.
+
+Instrumentation is off unless a collector is passed as
+``AsyncConPTY(metrics=...)``; the disabled hot paths cost one attribute test.
+A collector is any object with ``count(name, n=1)`` and
+``observe(name, value)`` (see :class:`MetricsCollector`), so the hooks can
+forward straight to an external metrics client.  :class:`SessionMetrics`
+keeps counters and power-of-two histograms in memory and can be shared by
+many sessions; :meth:`SessionMetrics.snapshot` returns a plain dict.
+
+Metric names
+------------
+Counters: ``output.bytes``, ``output.chunks``, ``input.bytes``,
+``write.calls``, ``read.calls``, ``read.pauses``, ``read.resumes``,
+``write.pauses``, ``write.resumes``, ``sessions.opened``,
+``sessions.closed``, ``process.spawned``, ``process.exited``.
+
+Histograms (sizes in bytes, durations in seconds): ``output.chunk_size``,
+``input.chunk_size``, ``open.seconds`` and its backend phases
+(``open.create_pseudo_console`` including its pipes, ``open.transports``,
+``open.attribute_list`` on Windows, ``open.openpty`` on POSIX),
+``spawn.seconds`` (``spawn.create_process`` and ``spawn.wait_thread`` on
+Windows, ``spawn.popen`` on POSIX), ``close.seconds``, ``ttfb.seconds``
+(first output after ``spawn()``) and ``process.lifetime``.
+"""
+
+import math
+
+__all__ = ["MetricsCollector", "SessionMetrics", "Histogram"]
+
+# 0 以下の値を入れるバケット（どの正の double の指数よりも小さい）
+_ZERO_BUCKET = -1100
+
+
+class MetricsCollector:
+    """
+    計測フックの基底クラス（何もしない）。外部の計測基盤へ送る場合はこれを継承する。
+    """
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def observe(self, name: str, value: float):
+        pass
+
+
+class Histogram:
+    """
+    件数/合計/最小/最大と 2 のべき乗ごとのバケットを持つ簡易ヒストグラム。
+    バケット k には 2**(k-1) <= value < 2**k の値が入る（秒の値は負の k になる）。
+    """
+    __slots__ = ("count", "sum", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets = {}
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        k = math.frexp(value)[1] if value > 0 else _ZERO_BUCKET
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """
+        バケット上端で近似した分位点
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen >= rank:
+                return min(self.max, math.ldexp(1.0, k))
+        return self.max
+
+    def snapshot(self) -> dict:
+        if not self.count:
+            return {"count": 0, "sum": 0.0, "min": 0.0, "max": 0.0, "mean": 0.0,
+                    "p50": 0.0, "p99": 0.0, "buckets": {}}
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count,
+            "p50": self.quantile(0.50),
+            "p99": self.quantile(0.99),
+            # キーはバケット上端（0 以下の値は 0.0）
+            "buckets": {math.ldexp(1.0, k): n for k, n in sorted(self.buckets.items())},
+        }
+
+
+class SessionMetrics(MetricsCollector):
+    """
+    メモリ上に集計するコレクタ。複数セッションで共有できる。
+
+    使い方:
+        metrics = SessionMetrics()
+        async with AsyncConPTY(metrics=metrics) as pty:
+            ...
+        print(metrics.snapshot()["histograms"]["ttfb.seconds"]["p50"])
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+        hist.add(value)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: hist.snapshot() for name, hist in self.histograms.items()},
+        }
+
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
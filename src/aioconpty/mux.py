@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Fan-in multiplexer for many concurrent :class:`aioconpty.AsyncConPTY` sessions.
+
+:class:`PtyMux` replaces one reader task per session with output sinks: each
+session's chunks are queued by its transport callback, and a single consumer
+iterates ``(session_id, chunk)`` pairs (or whole batches) from all sessions.
+
+Delivery is deficit round robin: every scheduling round gives each session
+with pending output ``quantum`` bytes of credit, so a chatty session gets the
+same share per round as a quiet one and cannot starve it.  A session whose
+queue exceeds ``max_pending`` bytes is paused at the transport until the
+consumer drains it below half of that.  End of output is reported once as
+``(session_id, b"")``, after which the session is removed from the mux.
+"""
+
+import asyncio
+import collections
+import itertools
+
+__all__ = ["PtyMux"]
+
+DEFAULT_QUANTUM = 16 * 1024
+DEFAULT_MAX_BATCH = 256 * 1024
+DEFAULT_MAX_PENDING = 1024 * 1024
+
+
+class _Session:
+    """
+    セッションごとの受信キューと状態（PtyMux 内部用）。出力 sink としても働く。
+    """
+    __slots__ = ("mux", "sid", "pty", "chunks", "pending", "paused", "eof", "ready", "credit",
+                 "bytes_delivered")
+
+    def __init__(self, mux, sid, pty):
+        self.mux = mux
+        self.sid = sid
+        self.pty = pty
+        self.chunks = collections.deque()
+        self.pending = 0
+        self.paused = False
+        self.eof = False
+        self.ready = False     # ready キューに入っているか
+        self.credit = 0
+        self.bytes_delivered = 0
+
+    # ---- sink ----
+    def data_received(self, data):
+        if not data:
+            return
+        self.chunks.append(data)
+        self.pending += len(data)
+        if self.pending > self.mux.max_pending and not self.paused:
+            self.paused = True
+            self.mux.pauses += 1
+            self.pty.pause_reading()
+        self.mux._mark_ready(self)
+
+    def eof_received(self):
+        if not self.eof:
+            self.eof = True
+            self.mux._mark_ready(self)
+
+    def connection_lost(self, exc):
+        self.eof_received()
+
+
+class PtyMux:
+    """
+    複数の AsyncConPTY の出力を 1 本の非同期イテレータにまとめる。
+
+    使い方:
+        mux = PtyMux(quantum=16384)
+        for i in range(200):
+            pty = await mux.open(i, cols=120, rows=30)
+            await pty.spawn(["sh", "-c", "ls -R /usr"])
+        async for sid, chunk in mux:
+            if not chunk:          # そのセッションの出力が終わった
+                ...
+        # まとめて受け取る場合: async for batch in mux.batches(): ...
+
+    quantum     : 1 ラウンドで 1 セッションに渡す最大バイト数
+    max_batch   : batches() が 1 回に返す最大バイト数の目安（ラウンドの途中で区切る）
+    max_pending : セッションごとの未配送バイト数の上限（超えると受信を止める）
+    """
+
+    def __init__(self, *, quantum: int = DEFAULT_QUANTUM, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        if quantum <= 0 or max_batch <= 0 or max_pending <= 0:
+            raise ValueError("quantum, max_batch and max_pending must be positive")
+        self.quantum = int(quantum)
+        self.max_batch = int(max_batch)
+        self.max_pending = int(max_pending)
+
+        self._sessions = {}
+        self._ready = collections.deque()
+        self._waiter = None
+        self._closed = False
+        self._ids = itertools.count()
+
+        self.rounds = 0
+        self.batches_delivered = 0
+        self.bytes_delivered = 0
+        self.pauses = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id) -> bool:
+        return session_id in self._sessions
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ---- セッション管理 ----
+    def add(self, pty, session_id=None):
+        """
+        オープン済みの pty を加え、その session_id を返す（省略時は連番）。
+        以降 pty の出力は sink 経由で mux に届き、read() 系からは見えない。
+        """
+        if self._closed:
+            raise RuntimeError("PtyMux is closed")
+        if session_id is None:
+            session_id = next(self._ids)
+        if session_id in self._sessions:
+            raise KeyError(f"duplicate session id: {session_id!r}")
+        session = _Session(self, session_id, pty)
+        self._sessions[session_id] = session
+        pty.set_output_sink(session)
+        return session_id
+
+    async def open(self, session_id=None, **kwargs):
+        """
+        AsyncConPTY(**kwargs) を開いて加え、pty を返す
+        """
+        from .conpty import AsyncConPTY
+        pty = AsyncConPTY(**kwargs)
+        await pty.open()
+        try:
+            self.add(pty, session_id)
+        except BaseException:
+            await pty.close()
+            raise
+        return pty
+
+    def remove(self, session_id):
+        """
+        セッションを外して pty を返す（未配送の出力は捨てる。pty は閉じない）
+        """
+        session = self._sessions.pop(session_id)
+        self._detach(session)
+        return session.pty
+
+    def get(self, session_id):
+        return self._sessions[session_id].pty
+
+    @property
+    def sessions(self) -> dict:
+        return {sid: session.pty for sid, session in self._sessions.items()}
+
+    def _detach(self, session):
+        session.chunks.clear()
+        session.pending = 0
+        if session.ready:
+            # ready キューに残すと、後で _collect() が外したセッション（や同じ ID で
+            # 加え直した別のセッション）を EOF 扱いで消してしまう
+            session.ready = False
+            try:
+                self._ready.remove(session)
+            except ValueError:
+                pass
+        try:
+            session.pty.set_output_sink(None)
+            if session.paused:
+                session.pty.resume_reading()
+        except Exception:
+            pass
+
+    async def close(self, *, close_sessions: bool = True):
+        """
+        mux を閉じる。イテレータは終了する。close_sessions=True なら pty も閉じる。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self._ready.clear()
+        for session in sessions:
+            self._detach(session)
+        self._wakeup()
+        if close_sessions:
+            await asyncio.gather(*(s.pty.close() for s in sessions), return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ---- スケジューリング ----
+    def _mark_ready(self, session):
+        if not session.ready and self._sessions.get(session.sid) is session:
+            session.ready = True
+            self._ready.append(session)
+            self._wakeup()
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _collect(self) -> list:
+        """
+        ready なセッションを 1 巡（max_batch まで）して [(sid, chunk)] を作る
+        """
+        batch = []
+        size = 0
+        quantum = self.quantum
+        for _ in range(len(self._ready)):
+            if size >= self.max_batch:
+                break
+            session = self._ready.popleft()
+            if self._sessions.get(session.sid) is not session:
+                continue  # 外されたセッション
+            session.credit += quantum
+            chunks = session.chunks
+            taken = 0
+            while chunks and session.credit > 0:
+                chunk = chunks[0]
+                if len(chunk) <= session.credit:
+                    chunks.popleft()
+                else:
+                    # クレジットを超える分は次のラウンドへ回す
+                    chunks[0] = chunk[session.credit:]
+                    chunk = chunk[:session.credit]
+                session.credit -= len(chunk)
+                taken += len(chunk)
+                batch.append((session.sid, chunk))
+            session.pending -= taken
+            session.bytes_delivered += taken
+            size += taken
+            if session.paused and session.pending <= self.max_pending // 2:
+                session.paused = False
+                session.pty.resume_reading()
+            if chunks:
+                self._ready.append(session)
+            else:
+                # 空になったセッションのクレジットは持ち越さない
+                session.credit = 0
+                session.ready = False
+                if session.eof:
+                    batch.append((session.sid, b""))
+                    del self._sessions[session.sid]
+                    session.pty.set_output_sink(None)
+        self.rounds += 1
+        return batch
+
+    async def next_batch(self) -> list:
+        """
+        次のバッチ [(session_id, chunk), ...] を返す。閉じていれば []。
+        """
+        while not self._ready:
+            if self._closed:
+                return []
+            if self._waiter is not None:
+                raise RuntimeError("PtyMux is already being read by another coroutine")
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        batch = self._collect()
+        self.batches_delivered += 1
+        self.bytes_delivered += sum(len(chunk) for _, chunk in batch)
+        return batch
+
+    async def batches(self):
+        """
+        非同期ジェネレータ: close() されるまでバッチを返す
+        """
+        while True:
+            batch = await self.next_batch()
+            if not batch and self._closed:
+                return
+            if batch:
+                yield batch
+
+    def __aiter__(self):
+        return self._iter_chunks()
+
+    async def _iter_chunks(self):
+        async for batch in self.batches():
+            for item in batch:
+                yield item
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "ready": len(self._ready),
+            "pending": sum(s.pending for s in self._sessions.values()),
+            "paused": sum(1 for s in self._sessions.values() if s.paused),
+            "rounds": self.rounds,
+            "batches": self.batches_delivered,
+            "bytes_delivered": self.bytes_delivered,
+            "pauses": self.pauses,
+        }
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""One-shot command execution: spawn, capture, wait and clean up in one call.
+
+:func:`run` replaces the usual hand-written combination of a wait task, a
+drain task and closing transports to force EOF.  Output is pushed straight
+into a preallocated buffer through an output sink, so no ``StreamReader`` and
+no per-chunk ``bytes`` objects build up.  Past the preallocated size the
+buffer grows in place and stops at ``max_output``; bytes past the cap are
+counted and a marker is added to the result.
+
+Once the child exits, the terminal side is hung up (``ClosePseudoConsole`` on
+Windows, the parent's slave fd on POSIX), so the reader reaches EOF as soon as
+the last output is flushed instead of waiting out a fixed timeout.  If a
+``timeout`` passes first, the child is killed.
+"""
+
+import asyncio
+import time
+
+from .conpty import AsyncConPTY
+
+__all__ = ["run", "RunResult", "DEFAULT_MAX_OUTPUT", "TRUNCATION_MARKER"]
+
+DEFAULT_MAX_OUTPUT = 16 * 1024 * 1024
+DEFAULT_INITIAL_BUFFER = 64 * 1024
+# 子の終了後、timeout なしで EOF を待つ上限（孫プロセスが端末を掴んだままの場合だけ効く）
+DEFAULT_EOF_TIMEOUT = 1.0
+TRUNCATION_MARKER = b"\r\n[aioconpty: output truncated, %d bytes dropped]\r\n"
+
+
+class RunResult:
+    """
+    run() の結果。
+
+    returncode : 終了コード（timeout で kill した場合も kill 後のコード）
+    output     : 取り込んだ出力（切り詰めた場合は末尾にマーカー付き）
+    dropped    : max_output を超えて捨てたバイト数
+    timed_out  : timeout で kill したか
+    eof        : 出力が EOF まで届いたか（False なら残りを取りこぼした可能性がある）
+    spawn_time : open + spawn にかかった秒数
+    exit_time  : spawn から子の終了までの秒数
+    elapsed    : run() 全体の秒数
+    """
+    __slots__ = ("returncode", "output", "dropped", "timed_out", "eof",
+                 "spawn_time", "exit_time", "elapsed")
+
+    def __init__(self, returncode, output, dropped, timed_out, eof,
+                 spawn_time, exit_time, elapsed):
+        self.returncode = returncode
+        self.output = output
+        self.dropped = dropped
+        self.timed_out = timed_out
+        self.eof = eof
+        self.spawn_time = spawn_time
+        self.exit_time = exit_time
+        self.elapsed = elapsed
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped > 0
+
+    def __repr__(self):
+        return (f"RunResult(returncode={self.returncode}, output={len(self.output)} bytes, "
+                f"dropped={self.dropped}, timed_out={self.timed_out}, elapsed={self.elapsed:.3f})")
+
+
+class _Capture:
+    """
+    出力 sink: 事前確保した bytearray へ書き込み、溢れたら max_output まで伸ばす。
+    """
+    def __init__(self, limit: int | None, initial: int, on_output, loop):
+        if limit is not None:
+            initial = min(initial, limit)
+        self._buf = bytearray(initial)
+        self._len = 0
+        self._limit = limit
+        self._on_output = on_output
+        self.dropped = 0
+        self.done = loop.create_future()
+
+    def data_received(self, data):
+        if self._on_output is not None:
+            self._on_output(data)
+        n = self._len
+        k = len(data)
+        if self._limit is not None and n + k > self._limit:
+            keep = self._limit - n
+            self.dropped += k - keep
+            if keep <= 0:
+                return
+            data = memoryview(data)[:keep]
+            k = keep
+        buf = self._buf
+        if n + k <= len(buf):
+            buf[n:n + k] = data
+        else:
+            # 事前確保分を使い切ったら += で伸ばす（realloc + 過剰確保なのでゼロ埋めもコピーもしない）
+            if n < len(buf):
+                del buf[n:]
+            buf += data
+        self._len = n + k
+
+    def eof_received(self):
+        if not self.done.done():
+            self.done.set_result(None)
+
+    def connection_lost(self, exc):
+        self.eof_received()
+
+    def getvalue(self) -> bytes:
+        buf = self._buf
+        del buf[self._len:]
+        out = bytes(buf)
+        self._buf = bytearray()
+        if self.dropped:
+            out += TRUNCATION_MARKER % self.dropped
+        return out
+
+
+async def run(cmd, cols: int = 120, rows: int = 30, *, timeout: float | None = None,
+              max_output: int | None = DEFAULT_MAX_OUTPUT,
+              initial_buffer: int = DEFAULT_INITIAL_BUFFER,
+              on_output=None, cwd: str = None, backend=None,
+              eof_timeout: float = DEFAULT_EOF_TIMEOUT, **pty_options) -> RunResult:
+    """
+    cmd を新しい擬似端末で実行し、終了まで待って出力と終了コードを返す。
+
+    timeout 秒（open/spawn を含む全体）を過ぎたら子を kill する。出力は max_output
+    バイトまで取り込み（None なら無制限）、超えた分は捨ててマーカーを付ける。
+    on_output(bytes) を渡すと受信した chunk をそのまま流す（画面表示など。上限と無関係）。
+
+    使い方:
+        result = await aioconpty.run(["cmd", "/c", "dir"], timeout=10)
+        print(result.returncode, result.output.decode(errors="replace"))
+    """
+    loop = asyncio.get_running_loop()
+    t0 = time.perf_counter()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    def remaining():
+        return None if deadline is None else max(deadline - loop.time(), 0.0)
+
+    capture = _Capture(max_output, initial_buffer, on_output, loop)
+    pty = AsyncConPTY(cols, rows, backend=backend, **pty_options)
+    pty.set_output_sink(capture)
+    proc = None
+    timed_out = False
+    rc = None
+    t_spawned = t_exited = None
+    try:
+        await asyncio.wait_for(pty.open(), remaining())
+        proc = await asyncio.wait_for(pty.spawn(cmd, cwd=cwd), remaining())
+        t_spawned = time.perf_counter()
+
+        rc = await proc.wait(remaining())
+        if rc is None:
+            timed_out = True
+            proc.kill()
+            rc = await proc.wait()
+        t_exited = time.perf_counter()
+
+        # 端末側を閉じて残りの出力を EOF まで流す
+        await pty.hangup()
+        wait = eof_timeout if timed_out or deadline is None else max(remaining(), eof_timeout)
+        try:
+            await asyncio.wait_for(asyncio.shield(capture.done), wait)
+        except asyncio.TimeoutError:
+            pass
+    except asyncio.TimeoutError:
+        # open / spawn が期限に間に合わなかった
+        timed_out = True
+        if proc is not None:
+            proc.kill()
+            rc = await proc.wait()
+    finally:
+        if proc is not None:
+            proc.close_handle()
+        await pty.close()
+
+    t_end = time.perf_counter()
+    return RunResult(
+        returncode=rc,
+        output=capture.getvalue(),
+        dropped=capture.dropped,
+        timed_out=timed_out,
+        eof=capture.done.done(),
+        spawn_time=(t_spawned or t_end) - t0,
+        exit_time=(t_exited - t_spawned) if t_exited is not None and t_spawned is not None else None,
+        elapsed=t_end - t0,
+    )
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""Pre-warmed pool of :class:`aioconpty.AsyncConPTY` sessions.
+
+Opening a pseudo console (pipes, ``CreatePseudoConsole``, the STARTUPINFOEX
+attribute list, transports) and closing it again is a large share of the
+latency of short jobs.  :class:`PtyPool` keeps opened sessions warm, leases
+them resized to the requested dimensions and resets them on return.  Sessions
+that still have running children (or are returned with ``recycle=True``) are
+closed instead of reused.  A returned session is settled in the background
+before the next lease: its output is drained until it stays quiet for
+``drain_quiet`` seconds, and it is closed instead if output keeps arriving
+for ``drain_timeout`` seconds or the child left an input mode (application
+cursor keys, bracketed paste, mouse reporting) switched on.  Idle sessions
+above ``min_size`` are evicted after ``idle_timeout`` seconds.
+"""
+
+import asyncio
+import collections
+import contextlib
+
+from .conpty import AsyncConPTY
+from .shutdown import close_all
+
+__all__ = ["PtyPool"]
+
+
+class PtyPool:
+    """
+    AsyncConPTY のプール。
+
+    使い方:
+        async with PtyPool(min_size=4, max_size=32, cols=120, rows=30) as pool:
+            async with pool.lease() as pty:
+                proc = await pty.spawn("cmd /c ver")
+                await proc.wait()
+            print(pool.stats())
+    """
+
+    def __init__(self, min_size: int = 0, max_size: int = 8, *, cols: int = 80, rows: int = 25,
+                 idle_timeout: float | None = 300.0, drain_quiet: float = 0.01,
+                 drain_timeout: float = 0.5, factory=None):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("require 0 <= min_size <= max_size and max_size >= 1")
+        self.min_size = int(min_size)
+        self.max_size = int(max_size)
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self.idle_timeout = idle_timeout
+        # 返却後、出力が drain_quiet 秒途切れたら再利用する。drain_timeout 秒で静まらなければ破棄
+        self.drain_quiet = float(drain_quiet)
+        self.drain_timeout = float(drain_timeout)
+        # factory(cols, rows) -> 未オープンの AsyncConPTY
+        self._factory = factory or (lambda cols, rows: AsyncConPTY(cols=cols, rows=rows))
+
+        self._idle = []             # [(pty, released_at)] 末尾が最も新しい
+        self._leased = set()
+        self._settling = {}         # {pty: 返却後の後始末 task}
+        self._opening = 0
+        self._waiters = collections.deque()
+        self._evict_task = None
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self.evicted = 0
+        self.acquire_timeouts = 0
+        self._latencies = collections.deque(maxlen=1024)
+
+    # ---- 初期化/破棄 ----
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """
+        min_size 個のセッションを事前に開き、アイドル監視を開始する
+        """
+        await self._fill_min()
+        if self.idle_timeout and self._evict_task is None:
+            self._evict_task = asyncio.create_task(self._evict_loop())
+
+    async def close(self):
+        self._closed = True
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._evict_task
+            self._evict_task = None
+        for fut in self._waiters:
+            if not fut.done():
+                fut.set_exception(RuntimeError("PtyPool is closed"))
+        self._waiters.clear()
+        settling = list(self._settling.items())
+        self._settling.clear()
+        for _, task in settling:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in settling), return_exceptions=True)
+        idle = [pty for pty, _ in self._idle] + [pty for pty, _ in settling]
+        self._idle.clear()
+        await close_all(idle)
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._leased) + len(self._settling) + self._opening
+
+    # ---- 貸し出し ----
+    async def acquire(self, cols: int = None, rows: int = None, *,
+                      timeout: float | None = None) -> AsyncConPTY:
+        """
+        セッションを借りる。サイズが違えば resize() してから返す。
+        max_size に達していれば返却を待つ（timeout 秒で asyncio.TimeoutError）。
+        """
+        if self._closed:
+            raise RuntimeError("PtyPool is closed")
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        cols = int(cols or self.cols)
+        rows = int(rows or self.rows)
+        deadline = None if timeout is None else t0 + timeout
+        while True:
+            if self._idle:
+                pty, _ = self._idle.pop()
+                if pty.closed:
+                    continue
+                self.hits += 1
+                break
+            if self.size < self.max_size:
+                self.misses += 1
+                pty = await self._open(cols, rows)
+                break
+            pty = await self._wait_for_release(deadline, loop)
+            if pty is not None:
+                self.hits += 1
+                break
+        if pty.size != (cols, rows):
+            try:
+                await pty.resize_async(cols, rows)
+            except Exception:
+                await self._discard(pty)
+                raise
+        self._leased.add(pty)
+        self._latencies.append(loop.time() - t0)
+        return pty
+
+    async def _wait_for_release(self, deadline, loop):
+        """
+        返却を待つ。返却されたセッション、または枠が空いたことを示す None を返す
+        """
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        try:
+            if deadline is None:
+                return await fut
+            return await asyncio.wait_for(fut, max(0.0, deadline - loop.time()))
+        except BaseException as exc:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+            elif fut.done() and not fut.cancelled() and fut.exception() is None:
+                # 受け取る直前にタイムアウト/キャンセルされた: 次の待ち手へ回す
+                if fut.result() is not None:
+                    self._put_idle(fut.result())
+                else:
+                    self._wake_one(None)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.acquire_timeouts += 1
+            raise
+
+    async def release(self, pty: AsyncConPTY, *, recycle: bool = False):
+        """
+        セッションを返す。recycle=True、子プロセスが残っている、
+        またはプールが閉じている場合は閉じて破棄する。
+        それ以外は reset() し、出力が静まるのを待ってから（_settle()）アイドルへ戻す。
+        貸し出し中でないセッション（二重の返却、他から来たもの）は ValueError。
+        """
+        if pty not in self._leased or pty in self._settling:
+            raise ValueError("session is not leased from this pool")
+        self._leased.discard(pty)
+        if recycle or self._closed or pty.closed or pty.has_running_children():
+            await self._discard(pty)
+            return
+        pty.reset()
+        self._settling[pty] = asyncio.create_task(self._settle(pty))
+
+    @contextlib.asynccontextmanager
+    async def lease(self, cols: int = None, rows: int = None, *, timeout: float | None = None):
+        """
+        async with で使う acquire()/release() の組。例外時はセッションを作り直す。
+        """
+        pty = await self.acquire(cols, rows, timeout=timeout)
+        try:
+            yield pty
+        except BaseException:
+            await self.release(pty, recycle=True)
+            raise
+        else:
+            await self.release(pty)
+
+    # ---- 統計 ----
+    def stats(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(p):
+            return lat[min(len(lat) - 1, int(p * len(lat)))] if lat else 0.0
+
+        acquires = self.hits + self.misses
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "settling": len(self._settling),
+            "waiting": len(self._waiters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / acquires if acquires else 0.0,
+            "recycled": self.recycled,
+            "evicted": self.evicted,
+            "acquire_timeouts": self.acquire_timeouts,
+            "acquire_latency_p50": pct(0.50),
+            "acquire_latency_p99": pct(0.99),
+            "acquire_latency_max": lat[-1] if lat else 0.0,
+        }
+
+    # ---- 内部 ----
+    async def _open(self, cols: int, rows: int) -> AsyncConPTY:
+        self._opening += 1
+        try:
+            pty = self._factory(cols, rows)
+            # 子が入力モードを切り替えたまま終了したかを返却時に調べられるよう、最初から追跡する
+            pty.track_input_modes()
+            await pty.open()
+            return pty
+        finally:
+            self._opening -= 1
+
+    def _wake_one(self, pty) -> bool:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(pty)
+                return True
+        return False
+
+    def _put_idle(self, pty: AsyncConPTY):
+        if not self._wake_one(pty):
+            self._idle.append((pty, asyncio.get_running_loop().time()))
+
+    async def _settle(self, pty: AsyncConPTY):
+        """
+        子の終了後に届く出力を捨てきってからアイドルへ戻す。出力が止まらない
+        （孫プロセスなどがまだ書いている）か、入力モードが既定に戻っていなければ破棄する。
+        """
+        try:
+            quiet = await self._drain(pty)
+        finally:
+            self._settling.pop(pty, None)
+        if not quiet or self._closed or pty.closed or not pty.track_input_modes().is_default:
+            await self._discard(pty)
+        else:
+            self._put_idle(pty)
+
+    async def _drain(self, pty: AsyncConPTY) -> bool:
+        """
+        drain_quiet 秒ごとに未読出力を捨て、1 区間まるごと出力がなければ True。
+        drain_timeout 秒経っても静まらなければ False。
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.drain_timeout
+        while True:
+            await asyncio.sleep(self.drain_quiet)
+            if pty.closed:
+                return False
+            if not pty.discard_output():
+                return True
+            if loop.time() >= deadline:
+                return False
+
+    async def _discard(self, pty: AsyncConPTY):
+        self.recycled += 1
+        try:
+            await pty.close()
+        finally:
+            # 枠が空いたので待っている acquire() に作成を促す
+            self._wake_one(None)
+
+    async def _fill_min(self):
+        missing = self.min_size - self.size
+        if missing <= 0 or self._closed:
+            return
+
+        async def warm():
+            # 開き終えたものから順にアイドルへ入れ、size の数え漏れを防ぐ
+            self._put_idle(await self._open(self.cols, self.rows))
+
+        results = await asyncio.gather(*(warm() for _ in range(missing)), return_exceptions=True)
+        loop = asyncio.get_running_loop()
+        for exc in results:
+            if isinstance(exc, Exception):
+                # 開けなかった分は次の _fill_min() でやり直す
+                loop.call_exception_handler({
+                    "message": "pty pool failed to open a session",
+                    "exception": exc,
+                })
+
+    async def _evict_loop(self):
+        interval = max(0.05, self.idle_timeout / 4)
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            now = loop.time()
+            keep, evict = [], []
+            # 古いものから順に、min_size を割らない範囲で閉じる
+            surplus = self.size - self.min_size
+            for pty, released_at in self._idle:
+                if surplus > 0 and now - released_at >= self.idle_timeout:
+                    evict.append(pty)
+                    surplus -= 1
+                else:
+                    keep.append((pty, released_at))
+            self._idle = keep
+            if evict:
+                self.evicted += len(evict)
+                await asyncio.gather(*(pty.close() for pty in evict), return_exceptions=True)
+            await self._fill_min()
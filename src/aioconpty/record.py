@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+"""Session recording and replay in asciicast v2 format.
+
+:class:`AsciicastRecorder` taps an :class:`aioconpty.AsyncConPTY` (output,
+optionally ``write()`` input, and ``resize()``) and writes an asciicast v2
+file: a JSON header line followed by ``[time, code, data]`` event lines.
+The taps only append to an in-memory batch; JSON encoding and file I/O run
+in the default executor, either every ``flush_interval`` seconds or once
+``flush_bytes`` of data are pending.
+
+:class:`ReplayBackend` is a :class:`aioconpty.backends.PtyBackend` that
+feeds a recording back through the normal reader path, in real time
+(``speed``) or as fast as the consumer reads, so parsers, screens and
+``expect()`` can be exercised without spawning processes::
+
+    async with open_replay("session.cast") as pty:
+        screen = pty.attach_screen()
+        async for chunk in pty.read_chunks():
+            ...
+"""
+
+import asyncio
+import codecs
+import json
+import os
+import time
+
+from .backends.base import PtyBackend, PtyProcess
+
+__all__ = ["AsciicastRecorder", "ReplayBackend", "load_asciicast", "open_replay"]
+
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_FLUSH_BYTES = 64 * 1024
+
+# fast モードでこのバイト数を流すごとにイベントループへ制御を返す
+_REPLAY_YIELD_BYTES = 256 * 1024
+
+
+# ===== 記録 =====
+class AsciicastRecorder:
+    """
+    asciicast v2 レコーダー。
+
+    使い方:
+        recorder = await pty.record("session.cast", record_input=True)
+        ...
+        await recorder.close()
+
+    file にはパスかテキストファイルオブジェクトを渡す（後者は close() で閉じない）。
+    """
+
+    def __init__(self, file, cols: int, rows: int, *, record_input: bool = False,
+                 title: str = None, env: dict = None, idle_time_limit: float = None,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES):
+        self._file = file
+        self._owns_file = isinstance(file, (str, bytes, os.PathLike))
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self.record_input = record_input
+        self.title = title
+        self.env = env if env is not None else {"TERM": os.environ.get("TERM", "xterm-256color")}
+        self.idle_time_limit = idle_time_limit
+        self.flush_interval = flush_interval
+        self.flush_bytes = int(flush_bytes)
+
+        # ストリームごとの増分デコーダ（chunk 境界で分かれた UTF-8 を正しく繋ぐ）
+        self._decoders = {
+            "o": codecs.getincrementaldecoder("utf-8")("replace"),
+            "i": codecs.getincrementaldecoder("utf-8")("replace"),
+        }
+        self._pending = []          # [(t, code, data)]
+        self._pending_bytes = 0
+        self._loop = None
+        self._t0 = 0.0
+        self._wakeup = None
+        self._flusher = None
+        self._pty = None
+        self._closed = False
+
+        self.events = 0
+        self.bytes_recorded = 0
+        self.flushes = 0
+
+    # ---- 開始/終了 ----
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        if self._owns_file:
+            self._file = await self._loop.run_in_executor(
+                None, lambda: open(self._file, "w", encoding="utf-8", newline="\n"))
+        header = {"version": 2, "width": self.cols, "height": self.rows,
+                  "timestamp": int(time.time())}
+        if self.idle_time_limit is not None:
+            header["idle_time_limit"] = self.idle_time_limit
+        if self.title:
+            header["title"] = self.title
+        if self.env:
+            header["env"] = self.env
+        self._pending.append(header)
+        self._t0 = self._loop.time()
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def attach(self, pty):
+        """
+        pty の出力/入力/resize に記録用のタップを付ける
+        """
+        self._pty = pty
+        pty.add_output_tap(self.output)
+        if self.record_input:
+            pty.add_input_tap(self.input)
+        pty.add_resize_callback(self.resize)
+
+    def detach(self):
+        pty, self._pty = self._pty, None
+        if pty is not None:
+            pty.remove_output_tap(self.output)
+            pty.remove_input_tap(self.input)
+            pty.remove_resize_callback(self.resize)
+
+    async def close(self):
+        """
+        タップを外し、残りを書き出してファイルを閉じる
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.detach()
+        if self._flusher is not None:
+            # 書き出し中のバッチとファイルを閉じる処理が競合しないよう、キャンセルせず終了を待つ
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        for code, decoder in self._decoders.items():
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                self._add(code, tail, 0)
+        await self.flush()
+        if self._owns_file and self._file is not None:
+            await self._loop.run_in_executor(None, self._file.close)
+
+    # ---- イベント ----
+    def output(self, data: bytes):
+        self._add("o", self._decoders["o"].decode(data), len(data))
+
+    def input(self, data: bytes):
+        self._add("i", self._decoders["i"].decode(data), len(data))
+
+    def resize(self, cols: int, rows: int):
+        self._add("r", f"{cols}x{rows}", 0)
+
+    def marker(self, label: str = ""):
+        self._add("m", label, 0)
+
+    def _add(self, code: str, text: str, nbytes: int):
+        if self._loop is None or (not text and code in ("o", "i")):
+            return
+        self._pending.append((self._loop.time() - self._t0, code, text))
+        self._pending_bytes += nbytes
+        self.events += 1
+        self.bytes_recorded += nbytes
+        if self._pending_bytes >= self.flush_bytes:
+            self._wakeup.set()
+
+    # ---- 書き出し ----
+    async def flush(self):
+        """
+        溜まっているイベントを executor で書き出す
+        """
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        await self._loop.run_in_executor(None, self._write_batch, batch)
+        self.flushes += 1
+
+    def _write_batch(self, batch):
+        dumps = json.dumps
+        lines = []
+        for item in batch:
+            if isinstance(item, dict):
+                lines.append(dumps(item, ensure_ascii=False))
+            else:
+                t, code, text = item
+                lines.append(dumps([round(t, 6), code, text], ensure_ascii=False))
+        lines.append("")
+        self._file.write("\n".join(lines))
+        self._file.flush()
+
+    async def _flush_loop(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+# ===== 再生 =====
+def load_asciicast(path):
+    """
+    asciicast v2 ファイルを読み、(header, [(t, code, data), ...]) を返す
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != 2:
+            raise ValueError(f"unsupported asciicast version: {header.get('version')!r}")
+        events = []
+        for line in f:
+            if line.strip():
+                t, code, data = json.loads(line)
+                events.append((float(t), code, data))
+    return header, events
+
+
+class _ReplayProcess(PtyProcess):
+    """
+    再生の終了を「プロセスの終了」として見せる
+    """
+
+    def __init__(self, done: asyncio.Future):
+        self._done = done
+
+    async def wait(self, timeout: float | None = None) -> int | None:
+        try:
+            await asyncio.wait_for(asyncio.shield(self._done), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return 0
+
+    def poll(self) -> int | None:
+        return 0 if self._done.done() else None
+
+    def kill(self):
+        pass  # 再生は transport を閉じると止まる
+
+
+class _ReplayReadTransport(asyncio.ReadTransport):
+    def __init__(self, loop, protocol, events, speed, idle_time_limit, on_resize, done):
+        super().__init__()
+        self._loop = loop
+        self._protocol = protocol
+        self._events = events
+        self._speed = speed
+        self._idle_time_limit = idle_time_limit
+        self._on_resize = on_resize
+        self._done = done
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._closing = False
+        self._protocol.connection_made(self)
+        self._task = loop.create_task(self._run())
+
+    def is_reading(self) -> bool:
+        return self._resumed.is_set()
+
+    def pause_reading(self):
+        self._resumed.clear()
+
+    def resume_reading(self):
+        self._resumed.set()
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self._task.cancel()
+        self._loop.call_soon(self._protocol.connection_lost, None)
+
+    async def _run(self):
+        loop = self._loop
+        speed = self._speed
+        limit = self._idle_time_limit
+        start = loop.time()
+        offset = 0.0    # idle_time_limit で詰めた時間の累計
+        last = 0.0
+        since_yield = 0
+        try:
+            for t, code, data in self._events:
+                if speed:
+                    if limit is not None and t - last > limit:
+                        offset += t - last - limit
+                    last = t
+                    delay = start + (t - offset) / speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if code == "o":
+                    if not self._resumed.is_set():
+                        await self._resumed.wait()
+                    self._protocol.data_received(data)
+                    since_yield += len(data)
+                    if since_yield >= _REPLAY_YIELD_BYTES:
+                        since_yield = 0
+                        await asyncio.sleep(0)
+                elif code == "r" and self._on_resize is not None:
+                    cols, rows = data.split("x")
+                    self._on_resize(int(cols), int(rows))
+            self._protocol.eof_received()
+        finally:
+            if not self._done.done():
+                self._done.set_result(None)
+
+
+class _NullWriteTransport(asyncio.WriteTransport):
+    """
+    再生中の write() を捨てる
+    """
+
+    def __init__(self, protocol):
+        super().__init__()
+        self._closing = False
+        self._protocol = protocol
+        self.bytes_discarded = 0
+        protocol.connection_made(self)
+
+    def write(self, data):
+        self.bytes_discarded += len(data)
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def get_write_buffer_limits(self):
+        return (0, 0)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        pass
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        asyncio.get_running_loop().call_soon(self._protocol.connection_lost, None)
+
+    abort = close
+
+
+class ReplayBackend(PtyBackend):
+    """
+    asciicast v2 の記録を出力として流すバックエンド。
+
+    speed=None なら読み手の速度で（待ち時間なしで）流し、数値なら記録時刻の speed 倍速で流す。
+    'r' イベントでは on_resize(cols, rows) を呼ぶ（open_replay() は pty.resize を渡す）。
+    再生は open() 時に始まり、spawn() は再生の終了を待てる PtyProcess を返す。
+    """
+    name = "replay"
+
+    def __init__(self, source, *, speed: float | None = None, on_resize=None):
+        self._source = source
+        self.speed = speed
+        self.on_resize = on_resize
+        self.header = None
+        self._events = None
+        self._transport_read = None
+        self._done = None
+        if not isinstance(source, (str, bytes, os.PathLike)):
+            # (header, events) を直接渡された場合
+            self.header, events = source
+            self._events = self._encode(events)
+
+    @staticmethod
+    def _encode(events):
+        # 'o' イベントは再生中に変換しないよう先に bytes にしておく
+        return [(t, code, data.encode("utf-8") if code == "o" else data)
+                for t, code, data in events]
+
+    def _load(self):
+        if self._events is None:
+            self.header, events = load_asciicast(self._source)
+            self._events = self._encode(events)
+
+    def host_console_size(self, cols: int = 80, rows: int = 25):
+        self._load()
+        return self.header.get("width", cols), self.header.get("height", rows)
+
+    @property
+    def is_open(self) -> bool:
+        return self._transport_read is not None
+
+    async def open(self, loop, cols, rows, read_protocol, write_protocol):
+        if self._events is None:
+            await loop.run_in_executor(None, self._load)
+        self._done = loop.create_future()
+        self._transport_read = _ReplayReadTransport(
+            loop, read_protocol, self._events, self.speed,
+            self.header.get("idle_time_limit"), self._resize_event, self._done)
+        return self._transport_read, _NullWriteTransport(write_protocol)
+
+    def _resize_event(self, cols, rows):
+        if self.on_resize is not None:
+            self.on_resize(cols, rows)
+
+    async def spawn(self, cmd=None, *, cwd: str = None, wait_thread: bool = True,
+                    close_thread: bool = True, quiet: bool = False) -> PtyProcess:
+        if self._done is None:
+            raise RuntimeError("ReplayBackend is not open")
+        return _ReplayProcess(self._done)
+
+    def resize(self, cols: int, rows: int):
+        pass
+
+    def hangup(self):
+        pass  # 再生が終われば EOF になる
+
+    def close(self):
+        self._transport_read = None
+
+
+def open_replay(source, *, speed: float | None = None, ring_buffer: int = None):
+    """
+    記録を再生する AsyncConPTY を作る（async with で開く）。
+    記録中の 'r' イベントは pty.resize() として反映され、attach_screen() した画面も追従する。
+    """
+    from .conpty import AsyncConPTY
+    backend = ReplayBackend(source, speed=speed)
+    pty = AsyncConPTY(backend=backend, ring_buffer=ring_buffer)
+    backend.on_resize = pty.resize
+    return pty
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""Ring-buffer backed reader for the low-overhead read path.
+
+:class:`RingBufferReader` is a drop-in for the subset of
+:class:`asyncio.StreamReader` used by :class:`aioconpty.AsyncConPTY`
+(``read``/``readline``/``readuntil``/``readexactly``/``at_eof``) and adds
+:meth:`RingBufferReader.readinto`.  Incoming chunks are copied once into a
+preallocated ``bytearray``; ``readinto()`` copies them straight into the
+caller's buffer, so a consumer that reuses its buffer performs no per-chunk
+allocation.
+
+The capacity is the in-memory output budget of a session.  What happens when
+a slow consumer lets it fill up is selected with ``overflow``:
+
+``"block"``
+    pause the transport until the consumer catches up (the child blocks on
+    its next write).  At most one in-flight transport chunk is held beyond
+    the budget.
+``"drop_oldest"``
+    keep reading and discard the oldest unread output.
+``"spill"``
+    keep reading and append the excess to an anonymous temporary file,
+    which is read back into the ring as the consumer drains it.
+
+``bytes_dropped``/``bytes_spilled`` and :meth:`RingBufferReader.stats`
+report what each policy did.
+"""
+
+import asyncio
+import collections
+import tempfile
+
+__all__ = ["RingBufferReader", "OVERFLOW_POLICIES"]
+
+DEFAULT_CAPACITY = 256 * 1024
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+
+class RingBufferReader:
+    """
+    固定長リングバッファに出力を溜める Reader。
+
+    使い方:
+        async with AsyncConPTY(ring_buffer=1 << 20) as pty:
+            buf = bytearray(65536)
+            while n := await pty.readinto(buf):
+                consume(memoryview(buf)[:n])
+
+    overflow はリングが満杯のときの動作: 'block' / 'drop_oldest' / 'spill'。
+    spill_dir は 'spill' の一時ファイルを置くディレクトリ（None なら既定の一時ディレクトリ）。
+    """
+    _source_traceback = None  # StreamReaderProtocol 互換
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, *, overflow: str = "block",
+                 spill_dir: str = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, not {overflow!r}")
+        self._capacity = int(capacity)
+        self._policy = overflow
+        self._spill_dir = spill_dir
+        self._spill = None      # 'spill' の一時ファイル（初回の溢れで作る）
+        self._spill_read = 0    # 一時ファイル内の次に読む位置
+        self._spill_write = 0   # 一時ファイル内の次に書く位置
+        self._buf = bytearray(self._capacity)
+        self._view = memoryview(self._buf)
+        self._head = 0          # 次に読む位置
+        self._size = 0          # リング内のバイト数
+        self._overflow = collections.deque()  # リングに入り切らなかった chunk
+        self._overflow_size = 0
+        self._eof = False
+        self._exception = None
+        self._waiter = None
+        self._transport = None
+        self._paused = False
+
+        self.bytes_received = 0
+        self.bytes_dropped = 0
+        self.bytes_spilled = 0
+        self.pauses = 0
+
+    def __repr__(self):
+        return (f"<RingBufferReader {self._size}/{self._capacity} bytes "
+                f"overflow={self._policy} eof={self._eof}>")
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def overflow(self) -> str:
+        return self._policy
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self._capacity,
+            "overflow": self._policy,
+            "buffered": self._size,
+            "pending": self._overflow_size,   # リング外で待っているバイト数（溢れ chunk / 一時ファイル）
+            "bytes_received": self.bytes_received,
+            "bytes_dropped": self.bytes_dropped,
+            "bytes_spilled": self.bytes_spilled,
+            "pauses": self.pauses,
+        }
+
+    def __len__(self) -> int:
+        return self._size + self._overflow_size
+
+    # ---- プロトコル側 ----
+    def set_transport(self, transport):
+        self._transport = transport
+
+    def feed_data(self, data):
+        if not data:
+            return
+        self.bytes_received += len(data)
+        if self._overflow_size and self._policy == "spill":
+            # 一時ファイルに先行データがあるので順序を保つためそちらへ続ける
+            self._spill_out(data)
+        else:
+            n = self._put(data)
+            if n < len(data):
+                rest = memoryview(data)[n:]
+                if self._policy == "block":
+                    # 溢れた分はコピーせずに保持し、読み手が追いつくまで受信を止める
+                    self._overflow.append(rest)
+                    self._overflow_size += len(rest)
+                    self._pause()
+                elif self._policy == "drop_oldest":
+                    self._drop_oldest(rest)
+                else:
+                    self._spill_out(rest)
+        self._wakeup()
+
+    def feed_eof(self):
+        self._eof = True
+        self._wakeup()
+
+    def set_exception(self, exc):
+        self._exception = exc
+        self._wakeup()
+
+    def exception(self):
+        return self._exception
+
+    def at_eof(self) -> bool:
+        return self._eof and not len(self)
+
+    def clear(self) -> int:
+        """
+        未読データをすべて捨て、捨てたバイト数を返す
+        """
+        n = len(self)
+        self._overflow.clear()
+        self._overflow_size = 0
+        self._head = self._size = 0
+        self._reset_spill()
+        if self._paused:
+            self._resume()
+        return n
+
+    def close(self):
+        """
+        一時ファイルを閉じる（未読のスピル分は失われる）
+        """
+        if self._spill is not None:
+            self._overflow_size -= self._spill_write - self._spill_read
+            self._spill_read = self._spill_write = 0
+            try:
+                self._spill.close()
+            except Exception:
+                pass
+            self._spill = None
+
+    # ---- リング操作 ----
+    def _put(self, data) -> int:
+        free = self._capacity - self._size
+        n = min(len(data), free)
+        if n <= 0:
+            return 0
+        src = memoryview(data)
+        cap = self._capacity
+        tail = (self._head + self._size) % cap
+        first = min(n, cap - tail)
+        self._view[tail:tail + first] = src[:first]
+        if n > first:
+            self._view[:n - first] = src[first:n]
+        self._size += n
+        return n
+
+    def _take_into(self, dst: memoryview) -> int:
+        n = min(len(dst), self._size)
+        cap = self._capacity
+        head = self._head
+        first = min(n, cap - head)
+        dst[:first] = self._view[head:head + first]
+        if n > first:
+            dst[first:n] = self._view[:n - first]
+        self._consume(n)
+        return n
+
+    def _take(self, n: int) -> bytes:
+        n = min(n, self._size)
+        head = self._head
+        end = head + n
+        if end <= self._capacity:
+            data = bytes(self._view[head:end])
+        else:
+            data = bytes(self._view[head:]) + bytes(self._view[:end - self._capacity])
+        self._consume(n)
+        return data
+
+    def _consume(self, n: int):
+        self._size -= n
+        self._head = 0 if not self._size else (self._head + n) % self._capacity
+        if self._spill is not None and self._spill_write > self._spill_read:
+            self._spill_in()
+        # 溢れていた chunk をリングへ戻す
+        while self._overflow and self._size < self._capacity:
+            chunk = self._overflow[0]
+            k = self._put(chunk)
+            self._overflow_size -= k
+            if k < len(chunk):
+                self._overflow[0] = chunk[k:]
+                break
+            self._overflow.popleft()
+        if self._paused and not self._overflow and self._size <= self._capacity // 2:
+            self._resume()
+
+    # ---- 溢れ時のポリシー ----
+    def _drop_oldest(self, rest: memoryview):
+        """
+        rest が入るだけ古いデータを捨てる。rest 自体が容量を超える場合は末尾だけ残す。
+        """
+        cap = self._capacity
+        if len(rest) >= cap:
+            self.bytes_dropped += self._size + len(rest) - cap
+            self._head = self._size = 0
+            self._put(rest[len(rest) - cap:])
+            return
+        need = len(rest) - (cap - self._size)
+        self.bytes_dropped += need
+        self._size -= need
+        self._head = (self._head + need) % cap
+        self._put(rest)
+
+    def _spill_out(self, data):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(dir=self._spill_dir)
+        self._spill.seek(self._spill_write)
+        self._spill.write(data)
+        self._spill_write += len(data)
+        self._overflow_size += len(data)
+        self.bytes_spilled += len(data)
+
+    def _spill_in(self):
+        """
+        リングの空き分だけ一時ファイルから読み戻す
+        """
+        k = min(self._capacity - self._size, self._spill_write - self._spill_read)
+        if k <= 0:
+            return
+        self._spill.seek(self._spill_read)
+        chunk = self._spill.read(k)
+        self._put(chunk)
+        self._spill_read += len(chunk)
+        self._overflow_size -= len(chunk)
+        if self._spill_read >= self._spill_write:
+            self._reset_spill()
+
+    def _reset_spill(self):
+        # 読み切ったらファイルを先頭から使い直す
+        self._spill_read = self._spill_write = 0
+        if self._spill is not None:
+            self._spill.seek(0)
+            self._spill.truncate()
+
+    def _find(self, separator: bytes) -> int:
+        """
+        リング先頭からの separator の位置（見つからなければ -1）
+        """
+        buf, cap, head, size = self._buf, self._capacity, self._head, self._size
+        end = head + size
+        if end <= cap:
+            pos = buf.find(separator, head, end)
+            return pos - head if pos >= 0 else -1
+        pos = buf.find(separator, head, cap)
+        if pos >= 0:
+            return pos - head
+        seplen = len(separator)
+        if seplen > 1:
+            # 折り返し位置をまたぐ一致
+            lo = max(head, cap - seplen + 1)
+            joined = bytes(buf[lo:cap]) + bytes(buf[:min(seplen - 1, end - cap)])
+            pos = joined.find(separator)
+            if pos >= 0:
+                return lo + pos - head
+        pos = buf.find(separator, 0, end - cap)
+        return cap - head + pos if pos >= 0 else -1
+
+    # ---- フロー制御 ----
+    def _pause(self):
+        if not self._paused and self._transport is not None:
+            self._paused = True
+            self.pauses += 1
+            self._transport.pause_reading()
+
+    def _resume(self):
+        self._paused = False
+        if self._transport is not None:
+            self._transport.resume_reading()
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _wait_for_data(self):
+        if self._waiter is not None:
+            raise RuntimeError("RingBufferReader is already being read by another coroutine")
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    async def _fill(self):
+        """
+        データか EOF が来るまで待つ
+        """
+        while not self._size and not self._eof:
+            if self._exception is not None:
+                raise self._exception
+            await self._wait_for_data()
+        if self._exception is not None and not self._size:
+            raise self._exception
+
+    # ---- 読み出し ----
+    async def readinto(self, buf) -> int:
+        """
+        buf（書き込み可能なバッファ）へ最大 len(buf) バイトを書き込み、その数を返す。EOF なら 0。
+        """
+        dst = memoryview(buf).cast("B")
+        if not len(dst):
+            return 0
+        await self._fill()
+        return self._take_into(dst)
+
+    async def read(self, n: int = -1) -> bytes:
+        if n == 0:
+            return b""
+        if n < 0:
+            parts = []
+            while True:
+                await self._fill()
+                if not self._size:
+                    return b"".join(parts)
+                parts.append(self._take(self._size))
+        await self._fill()
+        return self._take(n)
+
+    async def readexactly(self, n: int) -> bytes:
+        parts = []
+        need = n
+        while need:
+            await self._fill()
+            if not self._size:
+                partial = b"".join(parts)
+                raise asyncio.IncompleteReadError(partial, n)
+            data = self._take(need)
+            parts.append(data)
+            need -= len(data)
+        return b"".join(parts)
+
+    async def readuntil(self, separator: bytes = b"\n") -> bytes:
+        """
+        separator までを返す。EOF の場合は IncompleteReadError、
+        リングが満杯でも見つからない場合はリングの内容をそのまま返す（行が長すぎる場合）。
+        """
+        while True:
+            pos = self._find(separator) if self._size else -1
+            if pos >= 0:
+                return self._take(pos + len(separator))
+            if self._size >= self._capacity:
+                return self._take(self._size)
+            if self._eof:
+                raise asyncio.IncompleteReadError(self._take(self._size), None)
+            if self._exception is not None:
+                raise self._exception
+            await self._wait_for_data()
+
+    async def readline(self) -> bytes:
+        try:
+            return await self.readuntil(b"\n")
+        except asyncio.IncompleteReadError as exc:
+            return exc.partial
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        line = await self.readline()
+        if line == b"":
+            raise StopAsyncIteration
+        return line
@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""In-process virtual screen for pty output.
+
+:class:`Screen` applies the output stream (through :class:`~aioconpty.vtparse.VTParser`)
+to a ``cols`` x ``rows`` grid.  Cells are stored in two flat arrays -- code
+points (``array('I')``) and interned style ids (``array('H')``) -- so a
+session costs about 6 bytes per cell instead of one Python object per cell.
+Rows touched since the last snapshot are tracked in :attr:`Screen.dirty`.
+
+Wide (East Asian) characters occupy two cells; the second cell holds ``0``.
+Erase operations fill with the default style.
+"""
+
+import sys
+import codecs
+import unicodedata
+from array import array
+
+from .vtparse import VTParser, EV_PRINT, EV_EXECUTE, EV_ESC, EV_CSI, EV_OSC
+
+__all__ = ["Screen", "Style", "DEFAULT_STYLE", "apply_sgr"]
+
+_UTF32 = "utf-32-le" if sys.byteorder == "little" else "utf-32-be"
+_BLANK = array("I", [0x20])
+_WIDE_PAD = "\x00"
+
+# ===== スタイル =====
+ATTR_BOLD = 1 << 0
+ATTR_DIM = 1 << 1
+ATTR_ITALIC = 1 << 2
+ATTR_UNDERLINE = 1 << 3
+ATTR_BLINK = 1 << 4
+ATTR_INVERSE = 1 << 5
+ATTR_HIDDEN = 1 << 6
+ATTR_STRIKE = 1 << 7
+
+_SGR_SET = {1: ATTR_BOLD, 2: ATTR_DIM, 3: ATTR_ITALIC, 4: ATTR_UNDERLINE,
+            5: ATTR_BLINK, 7: ATTR_INVERSE, 8: ATTR_HIDDEN, 9: ATTR_STRIKE}
+_SGR_RESET = {22: ATTR_BOLD | ATTR_DIM, 23: ATTR_ITALIC, 24: ATTR_UNDERLINE,
+              25: ATTR_BLINK, 27: ATTR_INVERSE, 28: ATTR_HIDDEN, 29: ATTR_STRIKE}
+
+# 色: -1 = 既定色, 0-255 = パレット, TRUECOLOR | 0xRRGGBB = 24bit
+TRUECOLOR = 1 << 24
+# スタイル表の上限（array('H') の範囲）。溢れたら既定スタイルで代用する
+MAX_STYLES = 0xFFFF
+
+Style = tuple  # (fg, bg, attrs)
+DEFAULT_STYLE = (-1, -1, 0)
+
+
+def _to_cells(text: str) -> str:
+    """
+    全角文字の後ろに埋め草セルを挿入する（ASCII は呼び出し側で除外）
+    """
+    out = []
+    for ch in text:
+        out.append(ch)
+        if unicodedata.east_asian_width(ch) in ("W", "F"):
+            out.append(_WIDE_PAD)
+    return "".join(out)
+
+
+def apply_sgr(style: Style, params) -> Style:
+    """
+    SGR（CSI ... m）のパラメータを style に適用した新しいスタイルを返す
+    """
+    fg, bg, attrs = style
+    if not params:
+        params = (0,)
+    i, n = 0, len(params)
+    while i < n:
+        p = params[i]
+        if p == 0:
+            fg, bg, attrs = DEFAULT_STYLE
+        elif 30 <= p <= 37:
+            fg = p - 30
+        elif 40 <= p <= 47:
+            bg = p - 40
+        elif 90 <= p <= 97:
+            fg = p - 90 + 8
+        elif 100 <= p <= 107:
+            bg = p - 100 + 8
+        elif p == 39:
+            fg = -1
+        elif p == 49:
+            bg = -1
+        elif p in _SGR_SET:
+            attrs |= _SGR_SET[p]
+        elif p in _SGR_RESET:
+            attrs &= ~_SGR_RESET[p]
+        elif p in (38, 48) and i + 1 < n:
+            if params[i + 1] == 5 and i + 2 < n:
+                color = params[i + 2] & 0xFF
+                i += 2
+            elif params[i + 1] == 2 and i + 4 < n:
+                r, g, b = params[i + 2:i + 5]
+                color = TRUECOLOR | ((r & 0xFF) << 16) | ((g & 0xFF) << 8) | (b & 0xFF)
+                i += 4
+            else:
+                color = -1
+                i += 1
+            if p == 38:
+                fg = color
+            else:
+                bg = color
+        i += 1
+    return fg, bg, attrs
+
+
+class Screen:
+    """
+    擬似端末の画面モデル。
+
+    使い方:
+        screen = pty.attach_screen()
+        ...
+        for y, text in screen.dirty_lines().items():
+            render(y, text)
+    """
+
+    def __init__(self, cols: int = 80, rows: int = 25):
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self._parser = VTParser()
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+        self._styles_table = [DEFAULT_STYLE]
+        self._style_ids = {DEFAULT_STYLE: 0}
+        self._style = DEFAULT_STYLE
+        self._sid = 0
+
+        self.title = ""
+        self.bytes_fed = 0
+        self.lines_scrolled = 0
+        self._alloc()
+
+    def _alloc(self):
+        n = self.cols * self.rows
+        self._chars = _BLANK * n
+        self._styles = array("H", [0]) * n
+        self.x = 0
+        self.y = 0
+        self._wrap_pending = False
+        self._autowrap = True
+        self.cursor_visible = True
+        self._top = 0
+        self._bottom = self.rows - 1
+        self._saved = (0, 0, DEFAULT_STYLE)
+        self.dirty = set(range(self.rows))
+
+    # ---- 入力 ----
+    def feed(self, data):
+        """
+        pty の出力バイト列を適用する
+        """
+        self.bytes_fed += len(data)
+        self.apply(self._parser.feed(data))
+
+    def apply(self, events):
+        """
+        VTParser のイベント列を適用する
+        """
+        for ev in events:
+            kind = ev[0]
+            if kind == EV_PRINT:
+                text = self._decoder.decode(ev[1])
+                if text:
+                    self._print(text)
+            elif kind == EV_EXECUTE:
+                self._execute(ev[1])
+            elif kind == EV_CSI:
+                self._csi(ev[1], ev[2], ev[3], ev[4])
+            elif kind == EV_ESC:
+                self._esc(ev[1], ev[2])
+            elif kind == EV_OSC:
+                self._osc(ev[1])
+
+    # ---- 参照 ----
+    def line(self, y: int) -> str:
+        off = y * self.cols
+        text = self._chars[off:off + self.cols].tobytes().decode(_UTF32)
+        return text.replace(_WIDE_PAD, "").rstrip()
+
+    @property
+    def display(self) -> list:
+        return [self.line(y) for y in range(self.rows)]
+
+    def take_dirty(self) -> set:
+        """
+        前回以降に変化した行番号を返してクリアする
+        """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def dirty_lines(self, clear: bool = True) -> dict:
+        """
+        変化した行だけを {行番号: テキスト} で返す
+        """
+        rows = self.take_dirty() if clear else self.dirty
+        return {y: self.line(y) for y in sorted(rows)}
+
+    def style(self, style_id: int) -> Style:
+        return self._styles_table[style_id]
+
+    @property
+    def style_count(self) -> int:
+        """
+        スタイル表の要素数（表は追記のみで、ID は振り直されない）
+        """
+        return len(self._styles_table)
+
+    def copy_cells(self):
+        """
+        画面全体の (コードポイント配列, スタイル ID 配列) のコピーを返す
+        """
+        return self._chars[:], self._styles[:]
+
+    def row_cells(self, y: int):
+        """
+        行 y の (コードポイント配列, スタイル ID 配列) のコピーを返す
+        """
+        off = y * self.cols
+        return self._chars[off:off + self.cols], self._styles[off:off + self.cols]
+
+    def style_runs(self, y: int) -> list:
+        """
+        行 y を同一スタイルの連続区間 [(start, end, style_id), ...] に分割する
+        """
+        off = y * self.cols
+        styles = self._styles[off:off + self.cols]
+        runs = []
+        start = 0
+        cur = styles[0]
+        for x in range(1, self.cols):
+            s = styles[x]
+            if s != cur:
+                runs.append((start, x, cur))
+                start = x
+                cur = s
+        runs.append((start, self.cols, cur))
+        return runs
+
+    def memory_usage(self) -> int:
+        """
+        セル配列とスタイル表が使うおおよそのバイト数
+        """
+        cells = self._chars.buffer_info()[1] * self._chars.itemsize
+        cells += self._styles.buffer_info()[1] * self._styles.itemsize
+        return cells + sys.getsizeof(self._style_ids) + sys.getsizeof(self._styles_table)
+
+    # ---- サイズ変更 ----
+    def resize(self, cols: int, rows: int):
+        cols, rows = int(cols), int(rows)
+        if (cols, rows) == (self.cols, self.rows):
+            return
+        old_chars, old_styles, old_cols = self._chars, self._styles, self.cols
+        # カーソル行が収まるように上側を切り捨てる
+        shift = max(0, self.y - (rows - 1))
+        keep_rows = min(self.rows - shift, rows)
+        x, y = self.x, self.y - shift
+        self.cols, self.rows = cols, rows
+        saved_visible = self.cursor_visible
+        self._alloc()
+        width = min(cols, old_cols)
+        for r in range(keep_rows):
+            src = (r + shift) * old_cols
+            dst = r * cols
+            self._chars[dst:dst + width] = old_chars[src:src + width]
+            self._styles[dst:dst + width] = old_styles[src:src + width]
+        self.x = min(x, cols - 1)
+        self.y = min(y, rows - 1)
+        self.cursor_visible = saved_visible
+
+    # ---- 書き込み ----
+    def _set_style(self, style):
+        sid = self._style_ids.get(style)
+        if sid is None:
+            if len(self._styles_table) >= MAX_STYLES:
+                style, sid = DEFAULT_STYLE, 0
+            else:
+                sid = len(self._styles_table)
+                self._styles_table.append(style)
+                self._style_ids[style] = sid
+        self._style = style
+        self._sid = sid
+
+    def _print(self, text: str):
+        if not text.isascii():
+            text = _to_cells(text)
+        cols = self.cols
+        chars, styles = self._chars, self._styles
+        pos, n = 0, len(text)
+        while pos < n:
+            if self._wrap_pending:
+                if not self._autowrap:
+                    # 自動折り返し無効: 右端のセルが上書きされ続け、最後の文字だけが残る
+                    last = text.rstrip(_WIDE_PAD)[-1:] or " "
+                    chars[self.y * cols + cols - 1] = ord(last)
+                    self.dirty.add(self.y)
+                    break
+                self._wrap_pending = False
+                self.x = 0
+                self._linefeed()
+            room = cols - self.x
+            seg = text[pos:pos + room]
+            consumed = len(seg)
+            if consumed == room and pos + room < n and text[pos + room] == _WIDE_PAD:
+                if room == 1 and self.x == 0:
+                    # 1 桁の画面には全角文字が入らない: 文字だけ書いてパディングを捨てる
+                    # （次の行へ送っても入らないので、送ると進まなくなる）
+                    consumed = 2
+                else:
+                    # 全角文字が右端で分断される場合は右端を空白にして次の行へ送る
+                    seg = seg[:-1] + " "
+                    consumed -= 1
+            k = len(seg)
+            off = self.y * cols + self.x
+            cells = array("I")
+            cells.frombytes(seg.encode(_UTF32))
+            chars[off:off + k] = cells
+            styles[off:off + k] = array("H", [self._sid]) * k
+            self.dirty.add(self.y)
+            pos += consumed
+            if self.x + k >= cols:
+                self.x = cols - 1
+                self._wrap_pending = True
+            else:
+                self.x += k
+
+    def _execute(self, code: int):
+        if code == 0x0d:
+            self.x = 0
+            self._wrap_pending = False
+        elif code in (0x0a, 0x0b, 0x0c):
+            self._linefeed()
+        elif code == 0x08:
+            if self.x > 0:
+                self.x -= 1
+            self._wrap_pending = False
+        elif code == 0x09:
+            self.x = min(self.cols - 1, (self.x // 8 + 1) * 8)
+
+    def _linefeed(self):
+        self._wrap_pending = False
+        if self.y == self._bottom:
+            self._scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def _reverse_index(self):
+        if self.y == self._top:
+            self._scroll_down(1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def _fill(self, start: int, end: int):
+        if end > start:
+            self._chars[start:end] = _BLANK * (end - start)
+            self._styles[start:end] = array("H", [0]) * (end - start)
+
+    def _scroll_up(self, n: int, top: int = None):
+        top = self._top if top is None else top
+        bottom = self._bottom
+        n = min(n, bottom - top + 1)
+        if n <= 0:
+            return
+        cols = self.cols
+        start, end, shift = top * cols, (bottom + 1) * cols, n * cols
+        self._chars[start:end - shift] = self._chars[start + shift:end]
+        self._styles[start:end - shift] = self._styles[start + shift:end]
+        self._fill(end - shift, end)
+        self.dirty.update(range(top, bottom + 1))
+        if top == 0:
+            self.lines_scrolled += n
+
+    def _scroll_down(self, n: int, top: int = None):
+        top = self._top if top is None else top
+        bottom = self._bottom
+        n = min(n, bottom - top + 1)
+        if n <= 0:
+            return
+        cols = self.cols
+        start, end, shift = top * cols, (bottom + 1) * cols, n * cols
+        self._chars[start + shift:end] = self._chars[start:end - shift]
+        self._styles[start + shift:end] = self._styles[start:end - shift]
+        self._fill(start, start + shift)
+        self.dirty.update(range(top, bottom + 1))
+
+    # ---- シーケンス処理 ----
+    def _csi(self, params, inter, final, private):
+        p0 = params[0] if params else 0
+        n = p0 or 1
+        cols, rows = self.cols, self.rows
+        if final != "m":
+            self._wrap_pending = False
+        if private:
+            if final in "hl" and private == "?":
+                on = final == "h"
+                for mode in params:
+                    if mode == 25:
+                        self.cursor_visible = on
+                    elif mode == 7:
+                        self._autowrap = on
+                    elif mode in (47, 1047, 1049):
+                        self._erase_display(2)
+                        if mode == 1049 and on:
+                            self.x = self.y = 0
+            return
+        if inter:
+            return
+        if final == "m":
+            self._sgr(params)
+        elif final in "Hf":
+            row = params[0] if len(params) > 0 and params[0] else 1
+            col = params[1] if len(params) > 1 and params[1] else 1
+            self.y = min(row, rows) - 1
+            self.x = min(col, cols) - 1
+        elif final == "K":
+            off = self.y * cols
+            if p0 == 0:
+                self._fill(off + self.x, off + cols)
+            elif p0 == 1:
+                self._fill(off, off + self.x + 1)
+            else:
+                self._fill(off, off + cols)
+            self.dirty.add(self.y)
+        elif final == "J":
+            self._erase_display(p0)
+        elif final == "A":
+            self.y = max(self._top if self.y >= self._top else 0, self.y - n)
+        elif final in "Be":
+            self.y = min(self._bottom if self.y <= self._bottom else rows - 1, self.y + n)
+        elif final in "Ca":
+            self.x = min(cols - 1, self.x + n)
+        elif final == "D":
+            self.x = max(0, self.x - n)
+        elif final == "E":
+            self.y = min(rows - 1, self.y + n)
+            self.x = 0
+        elif final == "F":
+            self.y = max(0, self.y - n)
+            self.x = 0
+        elif final in "G`":
+            self.x = min(n, cols) - 1
+        elif final == "d":
+            self.y = min(n, rows) - 1
+        elif final == "X":
+            off = self.y * cols + self.x
+            self._fill(off, off + min(n, cols - self.x))
+            self.dirty.add(self.y)
+        elif final == "@":
+            off, end = self.y * cols + self.x, (self.y + 1) * cols
+            n = min(n, end - off)
+            self._chars[off + n:end] = self._chars[off:end - n]
+            self._styles[off + n:end] = self._styles[off:end - n]
+            self._fill(off, off + n)
+            self.dirty.add(self.y)
+        elif final == "P":
+            off, end = self.y * cols + self.x, (self.y + 1) * cols
+            n = min(n, end - off)
+            self._chars[off:end - n] = self._chars[off + n:end]
+            self._styles[off:end - n] = self._styles[off + n:end]
+            self._fill(end - n, end)
+            self.dirty.add(self.y)
+        elif final == "L":
+            if self._top <= self.y <= self._bottom:
+                self._scroll_down(n, self.y)
+        elif final == "M":
+            if self._top <= self.y <= self._bottom:
+                self._scroll_up(n, self.y)
+        elif final == "S":
+            self._scroll_up(n)
+        elif final == "T":
+            self._scroll_down(n)
+        elif final == "r":
+            top = (params[0] if len(params) > 0 and params[0] else 1) - 1
+            bottom = (params[1] if len(params) > 1 and params[1] else rows) - 1
+            if 0 <= top < bottom < rows:
+                self._top, self._bottom = top, bottom
+                self.x = self.y = 0
+        elif final == "s":
+            self._saved = (self.x, self.y, self._style)
+        elif final == "u":
+            self._restore_cursor()
+
+    def _erase_display(self, mode: int):
+        cols = self.cols
+        cur = self.y * cols + self.x
+        if mode == 0:
+            self._fill(cur, self.rows * cols)
+            self.dirty.update(range(self.y, self.rows))
+        elif mode == 1:
+            self._fill(0, cur + 1)
+            self.dirty.update(range(0, self.y + 1))
+        else:
+            self._fill(0, self.rows * cols)
+            self.dirty.update(range(self.rows))
+
+    def _sgr(self, params):
+        self._set_style(apply_sgr(self._style, params))
+
+    def _esc(self, inter, final):
+        if inter:
+            return
+        if final == "7":
+            self._saved = (self.x, self.y, self._style)
+        elif final == "8":
+            self._restore_cursor()
+        elif final == "D":
+            self._linefeed()
+        elif final == "E":
+            self.x = 0
+            self._linefeed()
+        elif final == "M":
+            self._reverse_index()
+        elif final == "c":
+            self._set_style(DEFAULT_STYLE)
+            self._alloc()
+
+    def _restore_cursor(self):
+        x, y, style = self._saved
+        self.x = min(x, self.cols - 1)
+        self.y = min(y, self.rows - 1)
+        self._wrap_pending = False
+        self._set_style(style)
+
+    def _osc(self, payload: bytes):
+        code, _, text = payload.partition(b";")
+        if code in (b"0", b"2"):
+            self.title = text.decode("utf-8", "replace")
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+"""File-backed scrollback for a pty session.
+
+:class:`Scrollback` turns the output stream into lines of UTF-8 text and
+keeps them in a log of segment files.  Each segment is a memory-mapped file
+holding the text of its lines, ``\\n`` separated, so history is searched
+with ``mmap.find`` or a bytes regex directly on the mapping and only the
+pages touched are read.  Styles are stored beside the text as run-length
+encoded ``(bytes, style id)`` runs per line; an unstyled line costs 2 bytes.
+
+Per segment, two ``array('I')`` indexes hold the text and style offsets of
+every line, so line ``n`` is found with one bisect over the segments and one
+index lookup, without scanning.  When the active segment is full it is
+sealed (truncated and remapped read-only) and a new one is started.
+Retention works on sealed segments: the oldest are removed once the total
+exceeds ``max_bytes`` or once they are older than ``max_age`` seconds.
+
+Escape sequences are parsed with :class:`~aioconpty.vtparse.VTParser`.  SGR
+sets the style, ``\\n`` ends a line, and a bare ``\\r`` makes the next text
+overwrite the line, so a progress bar keeps only its last state.  Cursor
+addressing is not replayed: the scrollback is a log of the text as written,
+not of the screen.
+"""
+
+import bisect
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from array import array
+
+from .screen import DEFAULT_STYLE, MAX_STYLES, apply_sgr
+from .vtparse import VTParser, EV_PRINT, EV_EXECUTE, EV_CSI
+
+__all__ = ["Scrollback"]
+
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+# 1 行の最大バイト数（スタイルの run 長を 16bit で持つため）。超えた分は次の行になる
+MAX_LINE = 0xFFFF
+
+_COUNT = struct.Struct("<H")
+_RUN = struct.Struct("<HH")
+_PLAIN = _COUNT.pack(0)   # 既定スタイルだけの行
+
+
+class _Segment:
+    """
+    セグメント 1 つ分のファイル・mmap・行インデックス
+    """
+    __slots__ = ("path", "file", "mm", "used", "first_line", "offsets",
+                 "style_offsets", "styles", "sealed_at")
+
+    def __init__(self, path: str, size: int, first_line: int):
+        self.path = path
+        self.file = open(path, "w+b")
+        self.file.truncate(size)
+        self.mm = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_WRITE)
+        self.used = 0
+        self.first_line = first_line
+        self.offsets = array("I")         # 各行の先頭（テキスト内のオフセット）
+        self.style_offsets = array("I")   # 各行の run 列の先頭（styles 内）
+        self.styles = bytearray()         # 封印時に <path>.sty へ書き出して mmap し直す
+        self.sealed_at = None
+
+    @property
+    def lines(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def nbytes(self) -> int:
+        return self.used + len(self.styles)
+
+    def seal(self):
+        """
+        使った長さに切り詰め、テキストとスタイルを読み取り専用で mmap し直す
+        """
+        self.mm.close()
+        self.file.truncate(self.used)
+        with open(self.path + ".sty", "wb") as f:
+            f.write(self.styles)
+        self.mm = mmap.mmap(self.file.fileno(), self.used, access=mmap.ACCESS_READ)
+        if self.styles:
+            with open(self.path + ".sty", "rb") as f:
+                self.styles = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.sealed_at = time.monotonic()
+
+    def close(self, remove: bool = True):
+        if isinstance(self.styles, mmap.mmap):
+            self.styles.close()
+        self.mm.close()
+        self.file.close()
+        if remove:
+            for path in (self.path, self.path + ".sty"):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def end(self, i: int) -> int:
+        """
+        i 行目の終端（改行の位置）
+        """
+        offsets = self.offsets
+        return (offsets[i + 1] if i + 1 < len(offsets) else self.used) - 1
+
+
+class Scrollback:
+    """
+    セッションのスクロールバック（ファイル + mmap のセグメントログ）。
+
+    使い方:
+        scrollback = pty.attach_scrollback(max_bytes=256 * 1024 * 1024)
+        ...
+        scrollback.line(n)
+        for n, text in scrollback.search(re.compile(rb"error \\d+")):
+            ...
+        scrollback.close()
+
+    行番号はセッション開始からの通し番号で、保持期限で消えた行の番号は再利用しない。
+    directory  : セグメントファイルの置き場所（省略時は一時ディレクトリ）
+    max_bytes  : 封印済みセグメントの合計がこれを超えたら古い順に削除する
+    max_age    : 封印から max_age 秒を過ぎたセグメントを削除する
+    """
+
+    def __init__(self, directory: str = None, *, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 max_bytes: int = None, max_age: float = None, encoding: str = "utf-8"):
+        if segment_size <= MAX_LINE:
+            raise ValueError(f"segment_size must be larger than {MAX_LINE}")
+        self._own_dir = directory is None
+        self.directory = tempfile.mkdtemp(prefix="aioconpty-scrollback-") \
+            if directory is None else directory
+        self.segment_size = int(segment_size)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.encoding = encoding
+        self._parser = VTParser()
+        self._segments = []
+        self._first_lines = []      # bisect 用: 各セグメントの先頭行番号
+        self._seq = 0
+        self._next_line = 0         # 次に追加される行の番号
+        self._closed = False
+
+        self._styles_table = [DEFAULT_STYLE]
+        self._style_ids = {DEFAULT_STYLE: 0}
+        self._style = DEFAULT_STYLE
+        self._sid = 0
+
+        # 組み立て中の行
+        self._line = bytearray()
+        self._runs = []             # [[バイト数, スタイル ID], ...]
+        self._cr = False            # 直前が単独の \r（次の文字で行を上書きする）
+
+        self.bytes_fed = 0
+        self.lines_dropped = 0
+        self.segments_dropped = 0
+
+    # ---- 入力 ----
+    def feed(self, data):
+        """
+        pty の出力バイト列を追加する（出力タップとして登録できる）
+        """
+        if self._closed:
+            return
+        self.bytes_fed += len(data)
+        for ev in self._parser.feed(data):
+            kind = ev[0]
+            if kind == EV_PRINT:
+                self._put(ev[1])
+            elif kind == EV_EXECUTE:
+                code = ev[1]
+                if code == 0x0a:
+                    self._cr = False
+                    self._end_line()
+                elif code == 0x0d:
+                    self._cr = True
+                elif code == 0x09:
+                    self._put(b"\t")
+            elif kind == EV_CSI and ev[3] == "m" and not ev[4] and not ev[2]:
+                self._set_style(apply_sgr(self._style, ev[1]))
+
+    def flush(self):
+        """
+        終端の来ていない行も 1 行として確定する
+        """
+        if self._line:
+            self._end_line()
+
+    def _set_style(self, style):
+        sid = self._style_ids.get(style)
+        if sid is None:
+            if len(self._styles_table) >= MAX_STYLES:
+                style, sid = DEFAULT_STYLE, 0
+            else:
+                sid = len(self._styles_table)
+                self._styles_table.append(style)
+                self._style_ids[style] = sid
+        self._style = style
+        self._sid = sid
+
+    def _put(self, text: bytes):
+        if self._cr:
+            self._cr = False
+            self._line.clear()
+            self._runs.clear()
+        while len(self._line) + len(text) > MAX_LINE:
+            room = MAX_LINE - len(self._line)
+            self._put_run(text[:room])
+            self._end_line()
+            text = text[room:]
+        self._put_run(text)
+
+    def _put_run(self, text: bytes):
+        if not text:
+            return
+        self._line += text
+        runs = self._runs
+        if runs and runs[-1][1] == self._sid:
+            runs[-1][0] += len(text)
+        else:
+            runs.append([len(text), self._sid])
+
+    def _end_line(self):
+        runs = self._runs
+        if not runs or (len(runs) == 1 and runs[0][1] == 0):
+            encoded = _PLAIN
+        else:
+            encoded = _COUNT.pack(len(runs)) + b"".join([_RUN.pack(n, sid) for n, sid in runs])
+        self._append(self._line, encoded)
+        self._line.clear()
+        runs.clear()
+
+    def _append(self, text, encoded: bytes):
+        n = len(text) + 1
+        seg = self._segments[-1] if self._segments else None
+        if seg is None or seg.sealed_at is not None or seg.used + n > self.segment_size:
+            if seg is not None and seg.sealed_at is None:
+                self._seal(seg)
+            seg = self._new_segment()
+        used = seg.used
+        seg.mm[used:used + n - 1] = text
+        seg.mm[used + n - 1] = 0x0a
+        seg.offsets.append(used)
+        seg.style_offsets.append(len(seg.styles))
+        seg.styles += encoded
+        seg.used = used + n
+        self._next_line += 1
+        if self.max_age is not None:
+            oldest = self._segments[0].sealed_at
+            if oldest is not None and time.monotonic() - oldest > self.max_age:
+                self.trim()
+
+    def _new_segment(self) -> _Segment:
+        path = os.path.join(self.directory, "segment-%08d.txt" % self._seq)
+        self._seq += 1
+        seg = _Segment(path, self.segment_size, self._next_line)
+        self._segments.append(seg)
+        self._first_lines.append(seg.first_line)
+        return seg
+
+    def _seal(self, seg: _Segment):
+        if seg.used:
+            seg.seal()
+        else:
+            self._drop(seg)
+        self.trim()
+
+    # ---- 保持期限 ----
+    def trim(self) -> int:
+        """
+        max_bytes / max_age を超えた封印済みセグメントを古い順に削除し、削除した行数を返す
+        """
+        dropped = 0
+        now = time.monotonic()
+        total = self.bytes_stored
+        while self._segments and self._segments[0].sealed_at is not None:
+            seg = self._segments[0]
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            too_old = self.max_age is not None and now - seg.sealed_at > self.max_age
+            if not (too_big or too_old):
+                break
+            total -= seg.nbytes
+            dropped += seg.lines
+            self._drop(seg)
+        self.lines_dropped += dropped
+        return dropped
+
+    def _drop(self, seg: _Segment):
+        i = self._segments.index(seg)
+        del self._segments[i]
+        del self._first_lines[i]
+        seg.close()
+        self.segments_dropped += 1
+
+    # ---- 参照 ----
+    @property
+    def first_line(self) -> int:
+        """
+        保持している最初の行番号
+        """
+        return self._segments[0].first_line if self._segments else self._next_line
+
+    @property
+    def next_line(self) -> int:
+        """
+        次に追加される行の番号（= 追加済みの行数）
+        """
+        return self._next_line
+
+    def __len__(self) -> int:
+        return self._next_line - self.first_line
+
+    @property
+    def partial(self) -> str:
+        """
+        まだ改行の来ていない行
+        """
+        return self._line.decode(self.encoding, "replace")
+
+    @property
+    def bytes_stored(self) -> int:
+        return sum(seg.nbytes for seg in self._segments)
+
+    def _locate(self, n: int):
+        if not self.first_line <= n < self._next_line:
+            raise IndexError(f"line {n} is not in the scrollback "
+                             f"({self.first_line}..{self._next_line - 1})")
+        k = bisect.bisect_right(self._first_lines, n) - 1
+        seg = self._segments[k]
+        return seg, n - seg.first_line
+
+    def line_bytes(self, n: int) -> bytes:
+        seg, i = self._locate(n)
+        return seg.mm[seg.offsets[i]:seg.end(i)]
+
+    def line(self, n: int) -> str:
+        """
+        n 行目のテキスト（改行を含まない）
+        """
+        return self.line_bytes(n).decode(self.encoding, "replace")
+
+    def line_styles(self, n: int) -> list:
+        """
+        n 行目のスタイル [(バイト数, (fg, bg, attrs)), ...]
+        """
+        seg, i = self._locate(n)
+        off = seg.style_offsets[i]
+        (count,) = _COUNT.unpack_from(seg.styles, off)
+        if not count:
+            return [(seg.end(i) - seg.offsets[i], DEFAULT_STYLE)]
+        table = self._styles_table
+        return [(k, table[sid]) for k, sid in _RUN.iter_unpack(
+            seg.styles[off + 2:off + 2 + count * _RUN.size])]
+
+    def lines(self, start: int = None, stop: int = None):
+        """
+        [start, stop) の行をテキストで順に返すジェネレータ
+        """
+        start = self.first_line if start is None else max(start, self.first_line)
+        stop = self._next_line if stop is None else min(stop, self._next_line)
+        for n in range(start, stop):
+            yield self.line(n)
+
+    def search(self, pattern, start: int = None, stop: int = None):
+        """
+        pattern を含む行の (行番号, テキスト) を順に返すジェネレータ。
+
+        pattern は bytes/str（リテラル）か bytes の re.Pattern。mmap 上を直接検索するので
+        履歴全体をメモリに読み込まない。1 行につき 1 回だけ返す。
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode(self.encoding)
+        if isinstance(pattern, re.Pattern):
+            if isinstance(pattern.pattern, str):
+                raise TypeError("search() needs a bytes regex")
+            find = None
+        else:
+            find = bytes(pattern)
+        start = self.first_line if start is None else max(start, self.first_line)
+        stop = self._next_line if stop is None else min(stop, self._next_line)
+        for seg in list(self._segments):
+            first, count = seg.first_line, seg.lines
+            if first + count <= start or first >= stop:
+                continue
+            i0 = max(start - first, 0)
+            i1 = min(stop - first, count)
+            pos = seg.offsets[i0]
+            end = seg.end(i1 - 1) + 1
+            mm, offsets = seg.mm, seg.offsets
+            while pos < end:
+                if find is not None:
+                    hit = mm.find(find, pos, end)
+                else:
+                    m = pattern.search(mm, pos, end)
+                    hit = -1 if m is None else m.start()
+                if hit < 0:
+                    break
+                i = bisect.bisect_right(offsets, hit, i0, i1) - 1
+                line_end = seg.end(i)
+                yield first + i, mm[offsets[i]:line_end].decode(self.encoding, "replace")
+                pos = line_end + 1
+
+    # ---- 終了 ----
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """
+        セグメントファイルを削除する（一時ディレクトリなら丸ごと）
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for seg in self._segments:
+            seg.close()
+        self._segments.clear()
+        self._first_lines.clear()
+        if self._own_dir:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            "lines": len(self),
+            "first_line": self.first_line,
+            "segments": len(self._segments),
+            "bytes_fed": self.bytes_fed,
+            "bytes_stored": self.bytes_stored,
+            "lines_dropped": self.lines_dropped,
+            "segments_dropped": self.segments_dropped,
+            "styles": len(self._styles_table),
+        }
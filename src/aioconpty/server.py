@@ -0,0 +1,913 @@
+# -*- coding: utf-8 -*-
+"""Serve pty sessions to remote clients over TCP or WebSocket.
+
+Every connection to a :class:`PtyServer` gets its own session running the
+server's command.  Both directions carry a stream of binary frames::
+
+    type:u8  length:u32 (big endian)  payload
+
+``HELLO`` (server, first frame): version:u8 flags:u8 cols:u16 rows:u16.
+``OUTPUT`` (server): pty output.  ``INPUT`` (client): bytes for the pty.
+``RESIZE`` (both): cols:u16 rows:u16, from the client to resize the session
+and from the server after every resize.  ``EXIT`` (server, last frame):
+exit code as i32.
+
+The server does not write one frame per pty chunk: output arriving in the same
+event loop iteration is merged into one ``OUTPUT`` frame, and all pending
+frames are written with a single ``transport.write()`` per flush.  With
+``compress=True`` (``FLAG_ZLIB`` in ``HELLO``) everything after ``HELLO`` is
+one zlib stream, sync-flushed per flush, so the compression context carries
+across frames.
+
+Backpressure is per client: when a client's socket buffer passes
+``high_water``, that session's pty reader is paused until the buffer drains
+below ``low_water``; output is never buffered without limit.  Input from a
+client is paused the same way while the pty's write buffer is full.
+
+With ``websocket=True`` the listener speaks RFC 6455 (no extension, no
+dependency): each flush is one binary message, and client messages carry
+frames the same way.  :func:`connect` is the matching client.
+"""
+
+import asyncio
+import base64
+import collections
+import hashlib
+import os
+import struct
+import zlib
+
+from .conpty import AsyncConPTY
+
+__all__ = [
+    "PtyServer", "PtyClient", "connect", "FrameDecoder", "FrameError", "encode_frame",
+    "FRAME_HELLO", "FRAME_OUTPUT", "FRAME_INPUT", "FRAME_RESIZE", "FRAME_EXIT", "FLAG_ZLIB",
+]
+
+PROTOCOL_VERSION = 1
+
+FRAME_HELLO = 0
+FRAME_OUTPUT = 1
+FRAME_INPUT = 2
+FRAME_RESIZE = 3
+FRAME_EXIT = 4
+
+FLAG_ZLIB = 0x01
+
+_HEADER = struct.Struct(">BI")
+_HELLO = struct.Struct(">BBHH")
+_SIZE = struct.Struct(">HH")
+_EXIT = struct.Struct(">i")
+
+MAX_FRAME = 16 * 1024 * 1024
+MAX_OUTPUT_FRAME = 1024 * 1024      # これを超えたら OUTPUT フレームを分ける
+DEFAULT_HIGH_WATER = 256 * 1024
+DEFAULT_MAX_PENDING = 1024 * 1024   # クライアントが溜める未読出力の上限
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT = 0x1
+_WS_BINARY = 0x2
+_WS_CLOSE = 0x8
+_WS_PING = 0x9
+_WS_PONG = 0xA
+_MAX_HANDSHAKE = 16 * 1024
+
+
+class FrameError(ValueError):
+    """
+    フレーム（または WebSocket のハンドシェイク/フレーム）が壊れている
+    """
+
+
+def encode_frame(kind: int, payload=b"") -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+class FrameDecoder:
+    """
+    受信したバイト列からフレームを取り出す（途中で切れたフレームは次の feed() まで保持する）
+    """
+
+    def __init__(self, max_frame: int = MAX_FRAME):
+        self.max_frame = max_frame
+        self._buf = bytearray()
+
+    def feed(self, data) -> list:
+        """
+        data を追加し、揃ったフレームを [(type, payload), ...] で返す
+        """
+        if self._buf:
+            self._buf += data
+            data = self._buf
+        frames = []
+        pos = 0
+        end = len(data)
+        size = _HEADER.size
+        while end - pos >= size:
+            kind, length = _HEADER.unpack_from(data, pos)
+            if length > self.max_frame:
+                raise FrameError(f"frame of {length} bytes exceeds {self.max_frame}")
+            if end - pos - size < length:
+                break
+            pos += size
+            frames.append((kind, bytes(data[pos:pos + length])))
+            pos += length
+        if data is self._buf:
+            del self._buf[:pos]
+        elif pos < end:
+            self._buf += data[pos:]
+        return frames
+
+
+# ===== WebSocket (RFC 6455) =====
+def _ws_mask(data, key: bytes) -> bytes:
+    n = len(data)
+    if not n:
+        return b""
+    pad = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(pad, "big")).to_bytes(n, "big")
+
+
+def _ws_header(opcode: int, length: int, mask: bytes = None) -> bytes:
+    bit = 0x80 if mask else 0
+    if length < 126:
+        head = struct.pack(">BB", 0x80 | opcode, bit | length)
+    elif length < 65536:
+        head = struct.pack(">BBH", 0x80 | opcode, bit | 126, length)
+    else:
+        head = struct.pack(">BBQ", 0x80 | opcode, bit | 127, length)
+    return head + mask if mask else head
+
+
+def _ws_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+class _WebSocketDecoder:
+    """
+    WebSocket フレームをメッセージ単位に組み立てる（マスクの有無はどちらも受け付ける）
+    """
+
+    def __init__(self, max_message: int = MAX_FRAME):
+        self.max_message = max_message
+        self._buf = bytearray()
+        self._fragments = []
+        self._fragments_len = 0             # 分割メッセージのここまでの合計
+        self._opcode = None
+
+    def feed(self, data) -> list:
+        """
+        data を追加し、揃ったメッセージを [(opcode, payload), ...] で返す
+        """
+        buf = self._buf
+        buf += data
+        messages = []
+        pos = 0
+        while len(buf) - pos >= 2:
+            b0, b1 = buf[pos], buf[pos + 1]
+            length = b1 & 0x7F
+            head = 2
+            if length == 126:
+                if len(buf) - pos < 4:
+                    break
+                length = struct.unpack_from(">H", buf, pos + 2)[0]
+                head = 4
+            elif length == 127:
+                if len(buf) - pos < 10:
+                    break
+                length = struct.unpack_from(">Q", buf, pos + 2)[0]
+                head = 10
+            if length > self.max_message:
+                raise FrameError(f"websocket frame of {length} bytes exceeds {self.max_message}")
+            key = None
+            if b1 & 0x80:
+                key = bytes(buf[pos + head:pos + head + 4])
+                head += 4
+            if len(buf) - pos < head + length:
+                break
+            payload = bytes(buf[pos + head:pos + head + length])
+            pos += head + length
+            if key is not None:
+                payload = _ws_mask(payload, key)
+            opcode = b0 & 0x0F
+            fin = b0 & 0x80
+            if opcode >= 0x8:
+                messages.append((opcode, payload))  # 制御フレームは分割されない
+            elif opcode == 0:
+                if self._opcode is None:
+                    raise FrameError("unexpected websocket continuation frame")
+                self._add_fragment(payload)
+                if fin:
+                    messages.append((self._opcode, b"".join(self._fragments)))
+                    self._fragments.clear()
+                    self._fragments_len = 0
+                    self._opcode = None
+            elif self._opcode is not None:
+                raise FrameError("new websocket message before the fragmented one finished")
+            elif fin:
+                messages.append((opcode, payload))
+            else:
+                self._opcode = opcode
+                self._add_fragment(payload)
+        del buf[:pos]
+        return messages
+
+    def _add_fragment(self, payload: bytes):
+        # フレームごとの上限だけでは継続フレームでいくらでも溜められるので、合計でも制限する
+        self._fragments_len += len(payload)
+        if self._fragments_len > self.max_message:
+            raise FrameError(f"fragmented websocket message exceeds {self.max_message} bytes")
+        self._fragments.append(payload)
+
+
+def _parse_http_head(head: bytes):
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+class _Endpoint(asyncio.Protocol):
+    """
+    サーバ/クライアント共通: 生の TCP か WebSocket の上でフレームを送受信する
+    """
+
+    def __init__(self, websocket: bool, mask: bool):
+        self._transport = None
+        self._websocket = websocket
+        self._mask = mask                   # クライアントは WebSocket フレームをマスクする
+        self._handshake_buf = bytearray() if websocket else None
+        self._ws = _WebSocketDecoder() if websocket else None
+        self._decoder = FrameDecoder()
+        self.bytes_received = 0
+        self.bytes_sent = 0
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def data_received(self, data):
+        self.bytes_received += len(data)
+        try:
+            if self._handshake_buf is not None:
+                buf = self._handshake_buf
+                buf += data
+                end = buf.find(b"\r\n\r\n")
+                if end < 0:
+                    if len(buf) > _MAX_HANDSHAKE:
+                        raise FrameError("websocket handshake too large")
+                    return
+                head, data = bytes(buf[:end]), bytes(buf[end + 4:])
+                self._handshake_buf = None
+                self._handshake(head)
+                if not data or self._transport is None:
+                    return
+            if self._ws is None:
+                self._stream_received(data)
+                return
+            for opcode, payload in self._ws.feed(data):
+                if opcode in (_WS_BINARY, _WS_TEXT):
+                    self._stream_received(payload)
+                elif opcode == _WS_PING:
+                    self._write_ws(_WS_PONG, payload)
+                elif opcode == _WS_CLOSE:
+                    self._write_ws(_WS_CLOSE, payload[:2])
+                    self._transport.close()
+                    return
+        except FrameError as exc:
+            self._protocol_error(exc)
+
+    def _stream_received(self, data):
+        for kind, payload in self._decoder.feed(data):
+            self._frame_received(kind, payload)
+
+    def _write_ws(self, opcode: int, payload: bytes):
+        if self._mask:
+            key = os.urandom(4)
+            self._transport.write(_ws_header(opcode, len(payload), key) + _ws_mask(payload, key))
+        else:
+            self._transport.writelines((_ws_header(opcode, len(payload)), payload))
+
+    def _send(self, data: bytes):
+        transport = self._transport
+        if transport is None or transport.is_closing():
+            return
+        if self._ws is not None:
+            self._write_ws(_WS_BINARY, data)
+        else:
+            transport.write(data)
+        self.bytes_sent += len(data)
+
+    def _protocol_error(self, exc):
+        if self._transport is not None:
+            self._transport.abort()
+
+    def _handshake(self, head: bytes):
+        raise NotImplementedError
+
+    def _frame_received(self, kind: int, payload: bytes):
+        raise NotImplementedError
+
+
+# ===== サーバ =====
+class _OutputSink:
+    """
+    セッションの出力 sink（接続側の connection_lost と名前が衝突しないよう分ける）
+    """
+    __slots__ = ("conn",)
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def data_received(self, data):
+        self.conn._output_received(data)
+
+    def eof_received(self):
+        self.conn._output_eof()
+
+    def connection_lost(self, exc):
+        self.conn._output_eof()
+
+
+class _ServerConnection(_Endpoint):
+    """
+    1 クライアント = 1 セッション（PtyServer 内部用）
+    """
+
+    def __init__(self, server, websocket: bool):
+        super().__init__(websocket, mask=False)
+        self._server = server
+        self._loop = asyncio.get_running_loop()
+        self._size = (server.cols, server.rows)
+        self._pty = None
+        self._proc = None
+        self._task = None
+        self._ready = False
+        self._frames = []           # flush 待ちのフレーム片
+        self._output = []           # 組み立て中の OUTPUT フレームの中身
+        self._output_len = 0
+        self._flush_handle = None
+        self._compressor = None
+        self._paused = False
+        self._eof = self._loop.create_future()
+        self._input = collections.deque()
+        self._input_len = 0
+        self._input_paused = False
+        self._input_task = None
+        self._resize_task = None
+
+    # ---- 接続 ----
+    def connection_made(self, transport):
+        super().connection_made(transport)
+        transport.set_write_buffer_limits(high=self._server.high_water, low=self._server.low_water)
+        self._server._connections.add(self)
+        self._server.connections_total += 1
+        if not self._websocket:
+            self._start()
+
+    def _handshake(self, head: bytes):
+        request, headers = _parse_http_head(head)
+        key = headers.get("sec-websocket-key")
+        if (not request.startswith("GET ") or not key
+                or "websocket" not in headers.get("upgrade", "").lower()):
+            self._transport.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            self._transport.close()
+            self._transport = None
+            return
+        self._transport.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + _ws_accept(key).encode("ascii") + b"\r\n\r\n")
+        self._start()
+
+    def _start(self):
+        self._task = self._loop.create_task(self._run())
+        self._server._tasks.add(self._task)
+        self._task.add_done_callback(self._server._tasks.discard)
+
+    def connection_lost(self, exc):
+        self._transport = None
+        if self._proc is not None:
+            self._proc.kill()  # クライアントがいなくなったらセッションを終える
+        self._resume_output()
+        if self._input_paused:
+            self._input_paused = False
+        self._server._connections.discard(self)
+
+    def _protocol_error(self, exc):
+        self._server.protocol_errors += 1
+        super()._protocol_error(exc)
+
+    # ---- フロー制御（クライアント側の送信バッファ） ----
+    def pause_writing(self):
+        if not self._paused and self._pty is not None:
+            self._paused = True
+            self._server.pauses += 1
+            self._pty.pause_reading()
+
+    def resume_writing(self):
+        self._resume_output()
+
+    def _resume_output(self):
+        if self._paused:
+            self._paused = False
+            if self._pty is not None:
+                self._pty.resume_reading()
+
+    # ---- セッション ----
+    async def _run(self):
+        server = self._server
+        pty = proc = None
+        rc = None
+        try:
+            cols, rows = self._size
+            pty = self._pty = server._factory(cols, rows)
+            pty.set_output_sink(_OutputSink(self))
+            await pty.open()
+            pty.add_resize_callback(self._resized)
+            flags = FLAG_ZLIB if server.compress else 0
+            self._send(encode_frame(FRAME_HELLO, _HELLO.pack(PROTOCOL_VERSION, flags, cols, rows)))
+            if server.compress:
+                self._compressor = zlib.compressobj(server.compress_level)
+            self._ready = True
+            if self._size != (cols, rows):
+                self._request_resize(self._size)
+                await self._resize_task
+            if self._input:
+                self._start_input()
+
+            proc = self._proc = await pty.spawn(server.cmd)
+            if self._transport is None:
+                proc.kill()
+            rc = await proc.wait()
+
+            # 端末側を閉じ、残りの出力を送りきってから EXIT を送る
+            await pty.hangup()
+            while not self._eof.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._eof), server.eof_timeout)
+                except asyncio.TimeoutError:
+                    if not self._paused or self._transport is None:
+                        break  # 孫プロセスが端末を掴んだまま
+            self._queue(FRAME_EXIT, _EXIT.pack(rc if rc is not None else -1))
+            self._flush()
+        except Exception as exc:
+            self._loop.call_exception_handler({
+                "message": "pty server session failed",
+                "exception": exc,
+                "protocol": self,
+            })
+        finally:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            if self._transport is not None:
+                if self._ws is not None:
+                    self._write_ws(_WS_CLOSE, struct.pack(">H", 1000))
+                self._transport.close()
+            if self._input_task is not None:
+                self._input_task.cancel()
+            if self._resize_task is not None:
+                self._resize_task.cancel()
+            if proc is not None:
+                proc.kill()
+                proc.close_handle()
+            if pty is not None:
+                await pty.close()
+            server.sessions_finished += 1
+
+    def _resized(self, cols: int, rows: int):
+        self._queue(FRAME_RESIZE, _SIZE.pack(cols, rows))
+
+    # ---- 受信 ----
+    def _frame_received(self, kind: int, payload: bytes):
+        if kind == FRAME_INPUT:
+            self._input.append(payload)
+            self._input_len += len(payload)
+            if self._input_len > self._server.high_water and not self._input_paused:
+                self._input_paused = True
+                self._transport.pause_reading()
+            if self._ready:
+                self._start_input()
+        elif kind == FRAME_RESIZE:
+            if len(payload) != _SIZE.size:
+                raise FrameError("bad RESIZE frame")
+            size = _SIZE.unpack(payload)
+            if size[0] < 1 or size[1] < 1:
+                raise FrameError(f"bad RESIZE size {size[0]}x{size[1]}")
+            if self._ready:
+                self._request_resize(size)
+            else:
+                self._size = size
+        else:
+            raise FrameError(f"unexpected frame type {kind} from client")
+
+    def _request_resize(self, size):
+        # ResizePseudoConsole はブロックし得るので data_received からは呼ばず、タスクで
+        # resize_async() する。続けて届いた RESIZE は最後のサイズだけを順に反映する
+        self._size = size
+        if self._resize_task is None:
+            self._resize_task = self._loop.create_task(self._apply_resize())
+
+    async def _apply_resize(self):
+        pty = self._pty
+        try:
+            while pty.size != self._size:
+                if pty.closed or not pty.backend.is_open:
+                    break  # hangup() 後: もう端末はない
+                try:
+                    await pty.resize_async(*self._size)
+                except OSError as exc:
+                    self._loop.call_exception_handler({
+                        "message": "pty server resize failed",
+                        "exception": exc,
+                        "protocol": self,
+                    })
+                    break
+        finally:
+            self._resize_task = None
+
+    def _start_input(self):
+        if self._input_task is None:
+            self._input_task = self._loop.create_task(self._pump_input())
+
+    async def _pump_input(self):
+        try:
+            while self._input:
+                batch = list(self._input)
+                self._input.clear()
+                self._input_len = 0
+                if self._pty.closed or self._pty.writer is None:
+                    break  # セッションは閉じ始めている: 残りの入力は捨てる
+                await self._pty.write_many(batch)  # 溜まった入力を 1 回の書き込みにまとめる
+                if self._input_paused and self._transport is not None:
+                    self._input_paused = False
+                    self._transport.resume_reading()
+        except OSError:
+            pass  # 子の終了後に pty の書き込み側が閉じた（ConnectionResetError / EIO）
+        finally:
+            self._input_task = None
+
+    # ---- 送信 ----
+    def _output_received(self, data):
+        self._output.append(data)
+        self._output_len += len(data)
+        if self._output_len >= MAX_OUTPUT_FRAME:
+            self._close_output()
+        self._schedule_flush()
+
+    def _output_eof(self):
+        if not self._eof.done():
+            self._eof.set_result(None)
+
+    def _close_output(self):
+        if self._output:
+            self._frames.append(_HEADER.pack(FRAME_OUTPUT, self._output_len))
+            self._frames.extend(self._output)
+            self._output = []
+            self._output_len = 0
+
+    def _queue(self, kind: int, payload: bytes):
+        self._close_output()
+        self._frames.append(encode_frame(kind, payload))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_soon(self._flush)
+
+    def _flush(self):
+        """
+        同じループ周回で溜まったフレームをまとめて 1 回で送る
+        """
+        self._flush_handle = None
+        self._close_output()
+        if not self._frames:
+            return
+        data = b"".join(self._frames)
+        self._frames.clear()
+        server = self._server
+        server.bytes_out += len(data)
+        server.flushes += 1
+        if self._compressor is not None:
+            data = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        server.bytes_sent += len(data)
+        self._send(data)
+
+
+class PtyServer:
+    """
+    接続ごとに cmd を新しいセッションで起動し、TCP / WebSocket 越しに中継するサーバ。
+
+    使い方:
+        async with PtyServer(["cmd.exe"], cols=120, rows=30, compress=True) as server:
+            await server.start("127.0.0.1", 8022)                  # TCP
+            await server.start("127.0.0.1", 8080, websocket=True)  # WebSocket
+            await server.serve_forever()
+
+    factory(cols, rows) で未オープンの AsyncConPTY を作る方法を差し替えられる。
+    high_water / low_water はクライアントごとの送信バッファの上限/再開点で、
+    上限を超えるとそのセッションの出力の受信を止める。
+    """
+
+    def __init__(self, cmd, *, cols: int = 80, rows: int = 25, factory=None,
+                 compress: bool = False, compress_level: int = 1,
+                 high_water: int = DEFAULT_HIGH_WATER, low_water: int = None,
+                 eof_timeout: float = 1.0):
+        self.cmd = cmd
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self._factory = factory or (lambda cols, rows: AsyncConPTY(cols=cols, rows=rows))
+        self.compress = compress
+        self.compress_level = compress_level
+        self.high_water = int(high_water)
+        self.low_water = int(low_water) if low_water is not None else self.high_water // 4
+        self.eof_timeout = eof_timeout
+
+        self._servers = []
+        self._connections = set()
+        self._tasks = set()
+
+        self.connections_total = 0
+        self.sessions_finished = 0
+        self.bytes_out = 0        # フレームとしての送信量（圧縮前）
+        self.bytes_sent = 0       # 実際に送った量（圧縮後）
+        self.flushes = 0
+        self.pauses = 0
+        self.protocol_errors = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, *,
+                    websocket: bool = False, **kwargs) -> asyncio.AbstractServer:
+        """
+        host:port で待ち受けを始める（何度でも呼べる）。port=0 なら空きポートを使う。
+        """
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: _ServerConnection(self, websocket),
+                                          host, port, **kwargs)
+        self._servers.append(server)
+        return server
+
+    @property
+    def sockets(self) -> list:
+        return [sock for server in self._servers for sock in server.sockets]
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def close(self, timeout: float = 5.0):
+        """
+        待ち受けを止め、全接続を切ってセッションの後始末を timeout 秒まで待つ。
+        それでも終わらないセッション（子が終了しないなど）はキャンセルする（子は kill される）。
+        """
+        for server in self._servers:
+            server.close()
+        for conn in list(self._connections):
+            if conn._transport is not None:
+                conn._transport.close()
+        if self._tasks:
+            _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._connections),
+            "connections_total": self.connections_total,
+            "sessions_finished": self.sessions_finished,
+            "bytes_out": self.bytes_out,
+            "bytes_sent": self.bytes_sent,
+            "compression_ratio": self.bytes_sent / self.bytes_out if self.bytes_out else 1.0,
+            "flushes": self.flushes,
+            "pauses": self.pauses,
+            "protocol_errors": self.protocol_errors,
+        }
+
+
+# ===== クライアント =====
+class PtyClient(_Endpoint):
+    """
+    PtyServer のクライアント。connect() で作る。
+
+    使い方:
+        client = await connect("127.0.0.1", 8022)
+        client.resize(120, 30)
+        client.write(b"dir\\r\\n")
+        async for chunk in client:
+            sys.stdout.buffer.write(chunk)
+        print(await client.wait())
+
+    未読の出力が max_pending バイトを超えると受信を止める（サーバ側のセッションも止まる）。
+    """
+
+    def __init__(self, websocket: bool = False, max_pending: int = DEFAULT_MAX_PENDING):
+        super().__init__(websocket, mask=True)
+        loop = asyncio.get_running_loop()
+        self._hello = loop.create_future()
+        self._exit = loop.create_future()
+        self._closed = loop.create_future()
+        self._raw = bytearray()       # HELLO を受け取るまでの受信データ
+        self._decompressor = None
+        self._chunks = collections.deque()
+        self._pending = 0
+        self.max_pending = int(max_pending)
+        self._reading_paused = False
+        self._waiter = None
+        self._eof = False
+        self._drain_waiter = None
+        self._write_paused = False
+        self._ws_key = None
+        self.version = None
+        self.compressed = False
+        self.cols = None
+        self.rows = None
+        self.returncode = None
+
+    # ---- 接続 ----
+    def _start_handshake(self, host: str, port: int, path: str):
+        self._ws_key = base64.b64encode(os.urandom(16)).decode("ascii")
+        self._transport.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {self._ws_key}\r\n"
+            f"Sec-WebSocket-Version: 13\r\n\r\n".encode("ascii"))
+
+    def _handshake(self, head: bytes):
+        status, headers = _parse_http_head(head)
+        if status.split(" ")[1:2] != ["101"]:
+            raise FrameError(f"websocket handshake failed: {status}")
+        if headers.get("sec-websocket-accept") != _ws_accept(self._ws_key):
+            raise FrameError("websocket handshake failed: bad Sec-WebSocket-Accept")
+
+    def _protocol_error(self, exc):
+        if not self._hello.done():
+            self._hello.set_exception(exc)
+        super()._protocol_error(exc)
+
+    def connection_lost(self, exc):
+        self._transport = None
+        if not self._hello.done():
+            self._hello.set_exception(exc or ConnectionError("connection closed before HELLO"))
+        if not self._exit.done():
+            self._exit.set_result(None)  # EXIT なしで切れた
+        if not self._closed.done():
+            self._closed.set_result(None)
+        self._eof = True
+        self._wakeup()
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    # ---- 受信 ----
+    def _stream_received(self, data):
+        if self.version is None:
+            self._raw += data
+            size = _HEADER.size + _HELLO.size
+            if len(self._raw) < size:
+                return
+            kind, length = _HEADER.unpack_from(self._raw, 0)
+            if kind != FRAME_HELLO or length != _HELLO.size:
+                raise FrameError("expected a HELLO frame")
+            self.version, flags, self.cols, self.rows = _HELLO.unpack_from(self._raw, _HEADER.size)
+            if self.version != PROTOCOL_VERSION:
+                raise FrameError(f"unsupported protocol version {self.version}")
+            if flags & FLAG_ZLIB:
+                self.compressed = True
+                self._decompressor = zlib.decompressobj()
+            data = bytes(self._raw[size:])
+            self._raw = None
+            self._hello.set_result(None)
+            if not data:
+                return
+        if self._decompressor is not None:
+            try:
+                data = self._decompressor.decompress(data)
+            except zlib.error as exc:
+                raise FrameError(f"bad compressed stream: {exc}") from None
+        super()._stream_received(data)
+
+    def _frame_received(self, kind: int, payload: bytes):
+        if kind == FRAME_OUTPUT:
+            self._chunks.append(payload)
+            self._pending += len(payload)
+            if self._pending > self.max_pending and not self._reading_paused:
+                self._reading_paused = True
+                self._transport.pause_reading()
+            self._wakeup()
+        elif kind == FRAME_RESIZE:
+            if len(payload) != _SIZE.size:
+                raise FrameError("bad RESIZE frame")
+            self.cols, self.rows = _SIZE.unpack(payload)
+        elif kind == FRAME_EXIT:
+            if len(payload) != _EXIT.size:
+                raise FrameError("bad EXIT frame")
+            self.returncode = _EXIT.unpack(payload)[0]
+            if not self._exit.done():
+                self._exit.set_result(self.returncode)
+            self._eof = True
+            self._wakeup()
+        else:
+            raise FrameError(f"unexpected frame type {kind} from server")
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def read(self) -> bytes:
+        """
+        届いている出力をまとめて返す。終了後は b""
+        """
+        while not self._chunks:
+            if self._eof:
+                return b""
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        chunks = self._chunks
+        data = chunks.popleft() if len(chunks) == 1 else b"".join(chunks)
+        chunks.clear()
+        self._pending = 0
+        if self._reading_paused and self._transport is not None:
+            self._reading_paused = False
+            self._transport.resume_reading()
+        return data
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        data = await self.read()
+        if not data:
+            raise StopAsyncIteration
+        return data
+
+    async def wait(self) -> int | None:
+        """
+        セッションの終了コードを待つ（EXIT なしで切断された場合は None）
+        """
+        return await asyncio.shield(self._exit)
+
+    # ---- 送信 ----
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8", "replace")
+        if data:
+            self._send(encode_frame(FRAME_INPUT, data))
+
+    def resize(self, cols: int, rows: int):
+        self._send(encode_frame(FRAME_RESIZE, _SIZE.pack(int(cols), int(rows))))
+
+    def pause_writing(self):
+        self._write_paused = True
+
+    def resume_writing(self):
+        self._write_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+    async def drain(self):
+        if self._write_paused and self._transport is not None:
+            self._drain_waiter = asyncio.get_running_loop().create_future()
+            await self._drain_waiter
+
+    def close(self):
+        if self._transport is not None and not self._transport.is_closing():
+            if self._ws is not None:
+                self._write_ws(_WS_CLOSE, struct.pack(">H", 1000))
+            self._transport.close()
+
+    async def wait_closed(self):
+        await asyncio.shield(self._closed)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+        await self.wait_closed()
+
+
+async def connect(host: str = "127.0.0.1", port: int = 0, *, websocket: bool = False,
+                  path: str = "/", max_pending: int = DEFAULT_MAX_PENDING, **kwargs) -> PtyClient:
+    """
+    PtyServer に接続し、HELLO を受け取ってから PtyClient を返す
+    """
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_connection(lambda: PtyClient(websocket, max_pending),
+                                             host, port, **kwargs)
+    if websocket:
+        client._start_handshake(host, port, path)
+    await client._hello
+    return client
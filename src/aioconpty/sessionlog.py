@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""Compressed, rotating session output logs written off the event loop.
+
+:class:`SessionLog` taps an :class:`aioconpty.AsyncConPTY` and persists its
+raw output.  The tap only appends the chunk to the current block; once a
+block reaches ``block_size`` (or every ``flush_interval`` seconds) it is
+handed to one of a few writer threads shared by all logs, which joins,
+compresses (streaming gzip or zlib) and writes it.  The event loop never touches the
+file or the compressor.
+
+The hand-off is bounded per log: once more than ``max_queued`` bytes wait for
+the writer, the session's pty reader is paused until the writer has caught
+up to half of that, so a slow disk slows the child instead of growing memory.
+
+Files rotate once the current one holds ``max_bytes`` (compressed) or is
+older than ``max_age`` seconds.  ``path`` is a template: ``{n}`` is the file
+sequence number and ``{time}`` the local time the file was opened; without
+``{n}``, ``.{n}`` is added, e.g. ``session.log`` -> ``session.log.0001.gz``.
+Existing files are never overwritten: a name that is already taken moves on
+to the next sequence number.
+Each file is a complete gzip (or zlib) stream and is sync-flushed on every
+interval, so the tail can be read while the session is still running.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+import zlib
+
+__all__ = ["SessionLog"]
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_MAX_QUEUED = 8 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+WRITER_THREADS = min(4, os.cpu_count() or 1)
+
+# 圧縮形式 -> (zlib の wbits, 拡張子)
+FORMATS = {
+    "gzip": (31, ".gz"),
+    "zlib": (15, ".zz"),
+    None: (None, ""),
+}
+
+_WRITE = 0
+_FLUSH = 1
+_CLOSE = 2
+
+
+class _Writer:
+    """
+    SessionLog で共有する書き込みスレッド。最大 WRITER_THREADS 本を最初の使用時に起動し、
+    ログごとに 1 本を割り当てる（ログ内の書き込み順はスレッド 1 本で保たれる）。
+    zlib は圧縮中に GIL を手放すので、複数のログを並列に圧縮できる。
+    """
+    _pool = []
+    _next = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def pick(cls) -> "_Writer":
+        with cls._lock:
+            if len(cls._pool) < WRITER_THREADS:
+                cls._pool.append(cls(len(cls._pool)))
+            writer = cls._pool[cls._next % len(cls._pool)]
+            cls._next += 1
+            return writer
+
+    def __init__(self, index: int):
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=f"aioconpty-sessionlog-{index}",
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        get = self.queue.get
+        while True:
+            log, op, arg = get()
+            try:
+                if op == _WRITE:
+                    log._write_block(arg)
+                elif op == _FLUSH:
+                    log._flush_file()
+                else:
+                    log._close_file()
+            except Exception as exc:
+                log._failed(exc)
+            if op == _WRITE:
+                log._post(log._written, sum(map(len, arg)))
+            elif op == _CLOSE:
+                log._post(arg.set_result, None)
+
+
+class SessionLog:
+    """
+    セッション出力の圧縮ログ。
+
+    使い方:
+        log = pty.attach_log("logs/build-{time}.log", max_bytes=64 << 20)
+        ...
+        await log.close()
+        print(log.stats())
+
+    compression は 'gzip' / 'zlib' / None。level は zlib の圧縮レベル（既定は速度優先の 1）。
+    """
+
+    def __init__(self, path, *, compression: str | None = "gzip", level: int = 1,
+                 block_size: int = DEFAULT_BLOCK_SIZE, max_queued: int = DEFAULT_MAX_QUEUED,
+                 flush_interval: float | None = DEFAULT_FLUSH_INTERVAL,
+                 max_bytes: int | None = None, max_age: float | None = None):
+        if compression not in FORMATS:
+            raise ValueError(f"compression must be one of {sorted(map(str, FORMATS))}")
+        path = os.fspath(path)
+        if "{n" not in path:
+            # {time} だけでは 1 秒以内のローテーションが同じ名前になる
+            path += ".{n:04d}"
+        self.template = path + FORMATS[compression][1]
+        self.compression = compression
+        self.level = level
+        self.block_size = int(block_size)
+        self.max_queued = int(max_queued)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        # イベントループ側
+        self._block = []
+        self._block_len = 0
+        self._queued = 0            # 書き込みスレッドに渡して未完了のバイト数
+        self._queued_blocks = 0
+        self._loop = None
+        self._pty = None
+        self._paused = False
+        self._timer = None
+        self._dirty = False         # 前回の flush 以降に書いたか
+        self._closed = False
+        self._writer = None
+
+        # 書き込みスレッド側
+        self._file = None
+        self._compressor = None
+        self._opened_at = 0.0
+        self._file_bytes = 0
+        self._seq = 0
+        self._error = None
+
+        self.bytes_in = 0
+        self.bytes_written = 0      # 圧縮後にファイルへ書いたバイト数
+        self.blocks = 0
+        self.stalls = 0             # max_queued を超えて出力を止めた回数
+        self.files = []             # 作成したファイルのパス
+
+    # ---- 接続 ----
+    def attach(self, pty):
+        """
+        pty の出力にタップを付けて記録を始める
+        """
+        self._start()
+        self._pty = pty
+        pty.add_output_tap(self.feed)
+
+    def detach(self):
+        pty, self._pty = self._pty, None
+        if pty is not None:
+            pty.remove_output_tap(self.feed)
+            if self._paused:
+                self._paused = False
+                pty.resume_reading()
+
+    def _start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._writer = _Writer.pick()
+            if self.flush_interval:
+                self._timer = self._loop.call_later(self.flush_interval, self._tick)
+
+    async def close(self):
+        """
+        タップを外し、残りを書き出してファイルを閉じる（書き込みスレッドの完了を待つ）
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.detach()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._loop is None:
+            return
+        self._submit()
+        done = self._loop.create_future()
+        self._writer.queue.put((self, _CLOSE, done))
+        await done
+        if self._error is not None:
+            raise self._error
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # ---- 受信（イベントループ側） ----
+    def feed(self, data: bytes):
+        if self._closed or not data:
+            return
+        if self._loop is None:
+            self._start()
+        self._block.append(data)
+        self._block_len += len(data)
+        self.bytes_in += len(data)
+        if self._block_len >= self.block_size:
+            self._submit()
+
+    def _submit(self):
+        if not self._block:
+            return
+        block, n = self._block, self._block_len
+        self._block = []
+        self._block_len = 0
+        self._queued += n
+        self._queued_blocks += 1
+        self._dirty = True
+        self.blocks += 1
+        self._writer.queue.put((self, _WRITE, block))  # join と圧縮は書き込みスレッドで行う
+        if self._queued > self.max_queued and not self._paused and self._pty is not None:
+            self._paused = True
+            self.stalls += 1
+            self._pty.pause_reading()
+
+    def _tick(self):
+        self._submit()
+        if self._dirty:
+            self._dirty = False
+            self._writer.queue.put((self, _FLUSH, None))
+        self._timer = self._loop.call_later(self.flush_interval, self._tick)
+
+    def _written(self, n: int):
+        self._queued -= n
+        self._queued_blocks -= 1
+        if self._paused and self._queued <= self.max_queued // 2:
+            self._paused = False
+            if self._pty is not None:
+                self._pty.resume_reading()
+
+    def _post(self, callback, *args):
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # ループが既に閉じている
+
+    def _failed(self, exc):
+        if self._error is None:
+            self._error = exc
+            self._post(self._loop.call_exception_handler, {
+                "message": "session log write failed",
+                "exception": exc,
+            })
+
+    # ---- 書き込みスレッド側 ----
+    def _open_file(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        while True:
+            self._seq += 1
+            path = self.template.format(n=self._seq, time=stamp)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                self._file = open(path, "xb")  # 既存のファイル（前回の実行分など）は上書きしない
+                break
+            except FileExistsError:
+                continue
+        wbits = FORMATS[self.compression][0]
+        self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, wbits) if wbits else None
+        self._opened_at = time.monotonic()
+        self._file_bytes = 0
+        self.files.append(path)
+
+    def _write_block(self, block: list):
+        if self._error is not None:
+            return
+        if self._file is not None and (
+                (self.max_bytes is not None and self._file_bytes >= self.max_bytes)
+                or (self.max_age is not None and time.monotonic() - self._opened_at >= self.max_age)):
+            self._close_file()
+        if self._file is None:
+            self._open_file()
+        data = b"".join(block)
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._emit(data)
+
+    def _emit(self, data: bytes):
+        if data:
+            self._file.write(data)
+            self._file_bytes += len(data)
+            self.bytes_written += len(data)
+
+    def _flush_file(self):
+        if self._file is None or self._error is not None:
+            return
+        if self._compressor is not None:
+            self._emit(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        try:
+            if self._compressor is not None and self._error is None:
+                self._emit(self._compressor.flush(zlib.Z_FINISH))
+        finally:
+            self._file.close()
+            self._file = None
+            self._compressor = None
+
+    # ---- 計測 ----
+    @property
+    def queued_bytes(self) -> int:
+        return self._queued + self._block_len
+
+    def stats(self) -> dict:
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_written": self.bytes_written,
+            "compression_ratio": self.bytes_written / self.bytes_in if self.bytes_in else 1.0,
+            "queued_bytes": self.queued_bytes,
+            "queue_depth": self._queued_blocks,
+            "blocks": self.blocks,
+            "stalls": self.stalls,
+            "files": len(self.files),
+        }
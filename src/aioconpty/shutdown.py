@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Bulk shutdown: close many sessions concurrently under one deadline.
+
+:func:`close_all` tears every session down at the same time instead of one
+after another.  Children still running are given ``grace`` seconds to exit
+on their own and are then killed; sessions whose children have all exited
+are closed in fast mode (no wait for pending input to drain).  The whole
+operation is bounded by ``timeout`` seconds, and a :class:`CloseResult` per
+session reports what happened and how long it took.
+"""
+
+import asyncio
+import time
+
+__all__ = ["close_all", "CloseResult"]
+
+
+class CloseResult:
+    """
+    close_all() のセッションごとの結果。
+
+    session  : 対象の AsyncConPTY
+    status   : 'closed'（子は終了済みだった/猶予内に終了した）/ 'killed'（残っていた子を kill した）/
+               'timeout'（kill した子の終了、または擬似端末の解放を期限内に確認できなかった）/ 'error'
+    killed   : kill したプロセス数
+    duration : 閉じ終わるまでの秒数
+    error    : status が 'error' のときの例外
+    """
+    __slots__ = ("session", "status", "killed", "duration", "error")
+
+    def __init__(self, session, status, killed, duration, error=None):
+        self.session = session
+        self.status = status
+        self.killed = killed
+        self.duration = duration
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("closed", "killed")
+
+    def __repr__(self):
+        return (f"CloseResult(status={self.status!r}, killed={self.killed}, "
+                f"duration={self.duration:.3f})")
+
+
+async def _close_one(pty, loop, deadline: float, grace_until: float) -> CloseResult:
+    t0 = time.perf_counter()
+    status = "closed"
+    killed = 0
+    try:
+        running = [proc for proc in pty.children if proc.poll() is None]
+        if running:
+            # 猶予内に自分で終了しなかった子だけ kill する
+            if grace_until > loop.time():
+                codes = await asyncio.gather(*(proc.wait(max(grace_until - loop.time(), 0.0))
+                                               for proc in running))
+                stragglers = [proc for proc, code in zip(running, codes) if code is None]
+            else:
+                stragglers = running
+            for proc in stragglers:
+                proc.kill()
+            killed = len(stragglers)
+            if stragglers:
+                status = "killed"
+                codes = await asyncio.gather(*(proc.wait(max(deadline - loop.time(), 0.0))
+                                               for proc in stragglers))
+                if any(code is None for code in codes):
+                    status = "timeout"
+        if not await pty.close(timeout=max(deadline - loop.time(), 0.0), fast=True):
+            status = "timeout"
+    except Exception as exc:
+        return CloseResult(pty, "error", killed, time.perf_counter() - t0, exc)
+    return CloseResult(pty, status, killed, time.perf_counter() - t0)
+
+
+async def close_all(sessions, timeout: float = 5.0, *, grace: float | None = None) -> list:
+    """
+    sessions（AsyncConPTY の iterable）を並行して閉じ、入力順の CloseResult のリストを返す。
+
+    timeout は全体の期限（秒）。実行中の子には grace 秒（既定は timeout の半分）
+    だけ自分で終了する猶予を与え、残りは kill する。
+
+    使い方:
+        results = await close_all(sessions, timeout=5.0)
+        failed = [r for r in results if not r.ok]
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return []
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+    if grace is None:
+        grace = timeout / 2
+    deadline = now + timeout
+    grace_until = now + min(grace, timeout)
+    return list(await asyncio.gather(*(_close_one(pty, loop, deadline, grace_until)
+                                       for pty in sessions)))
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Incremental text mode: streaming decoding and line splitting.
+
+:class:`LineSplitter` turns raw output chunks into ``str`` lines.  Decoding
+uses an incremental codec, so multibyte sequences cut at a chunk boundary
+are joined correctly, and lines are split with ``str.split`` once per chunk
+rather than per byte.  ``\\r\\n``, ``\\n`` and bare ``\\r`` all end a line;
+a ``\\r`` at the end of a chunk is held back until the next chunk shows
+whether it starts a ``\\r\\n``.
+
+With ``collapse_cr=True`` a bare ``\\r`` is treated as a carriage return
+that overwrites the current line instead of ending it, and only the last
+non-empty segment is kept.  A progress bar redrawn 10,000 times then yields
+a single line holding its final state, and the partial line is compacted as
+the updates arrive so it never grows with the number of redraws.
+
+:class:`EscapeStripper` reduces raw output to plain text for logging.  It
+removes CSI/ESC sequences, OSC/DCS/SOS/PM/APC strings and C0 controls other
+than ``\\t`` and ``\\n`` (so ``\\r\\n`` becomes ``\\n``), and leaves UTF-8
+text untouched.  Chunks without ESC go through a single
+``bytes.translate``; the others through one ``re.sub``.  Only a sequence cut
+by the end of a chunk is held back, and for strings just their introducer is
+kept, so an unterminated OSC title never grows the held-back tail.
+"""
+
+import codecs
+import re
+
+__all__ = ["LineSplitter", "EscapeStripper", "strip_escapes"]
+
+DEFAULT_MAX_LINE = 64 * 1024
+
+# 残す制御文字は \t と \n だけ
+_CONTROLS = bytes(b for b in range(0x20) if b not in (0x09, 0x0a)) + b"\x7f"
+# 完結したシーケンス。CAN/SUB は文字列を中断し、ST 以外の ESC は文字列を終えて
+# 次のシーケンスの開始になる（VTParser と同じ扱い）。最後の分岐は不正な単独 ESC。
+_SEQUENCE = re.compile(
+    rb"\x1b\[[\x30-\x3f]*[\x20-\x2f]*[\x40-\x7e]"
+    rb"|\x1b[\]PX^_][^\x07\x18\x1a\x1b]*(?:\x07|\x1b\\|[\x18\x1a])?"
+    rb"|\x1b[\x20-\x2f]*[\x30-\x7e]"
+    rb"|\x1b"
+)
+# chunk 末尾で途切れたシーケンス（文字列は ST の ESC まで来ている場合を含む）
+_PARTIAL = re.compile(rb"\x1b(?:\[[\x30-\x3f]*[\x20-\x2f]*|[\x20-\x2f]*)")
+_PARTIAL_STRING = re.compile(rb"\x1b[\]PX^_][^\x07\x18\x1a\x1b]*")
+
+
+def _last_segment(line: str) -> str:
+    """
+    \\r で上書きされた行の最終的な内容（最後の空でない区間）
+    """
+    for segment in reversed(line.split("\r")):
+        if segment:
+            return segment
+    return ""
+
+
+class LineSplitter:
+    """
+    出力 chunk を行（str）に分割する。
+
+    使い方:
+        splitter = LineSplitter()
+        for chunk in chunks:
+            for line in splitter.feed(chunk):
+                ...
+        tail = splitter.flush()
+
+    collapse_cr : 単独の \\r を改行ではなく行頭への復帰（上書き）として扱う
+    max_line    : 改行が来なくてもこの文字数を超えたら 1 行として返す
+    """
+
+    def __init__(self, encoding: str = "utf-8", errors: str = "replace", *,
+                 collapse_cr: bool = False, max_line: int = DEFAULT_MAX_LINE):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors)
+        self.collapse_cr = collapse_cr
+        self.max_line = int(max_line)
+        self._pending = ""   # まだ終端の来ていない行
+        self.lines = 0       # 返した行数
+
+    def feed(self, data: bytes) -> list:
+        """
+        chunk を与え、完成した行のリストを返す（終端文字は含まない）
+        """
+        return self._split(self._decoder.decode(data))
+
+    def flush(self) -> list:
+        """
+        残りをすべて行として返す（ストリームの終端で呼ぶ）
+        """
+        lines = self._split(self._decoder.decode(b"", final=True))
+        pending, self._pending = self._pending, ""
+        if pending.endswith("\r"):
+            pending = pending[:-1]
+        tail = []
+        if self.collapse_cr:
+            tail.append(_last_segment(pending))
+        else:
+            tail.extend(pending.split("\r"))
+        if not tail[-1]:
+            tail.pop()
+        self.lines += len(tail)
+        return lines + tail
+
+    def _split(self, text: str) -> list:
+        if not text:
+            return []
+        parts = (self._pending + text).split("\n")
+        pending = parts.pop()
+        out = []
+        if self.collapse_cr:
+            for line in parts:
+                if "\r" in line:
+                    line = _last_segment(line)
+                out.append(line)
+            if "\r" in pending[:-1]:
+                # 上書きされた区間は捨てて、行の途中経過を小さく保つ
+                trailing = "\r" if pending.endswith("\r") else ""
+                pending = _last_segment(pending[:-1] if trailing else pending) + trailing
+        else:
+            for line in parts:
+                if line.endswith("\r"):
+                    line = line[:-1]
+                if "\r" in line:
+                    out.extend(line.split("\r"))
+                else:
+                    out.append(line)
+            if "\r" in pending[:-1]:
+                # 末尾の \r は次の chunk の \n と組になるかもしれないので残す
+                trailing = "\r" if pending.endswith("\r") else ""
+                *done, pending = (pending[:-1] if trailing else pending).split("\r")
+                out.extend(done)
+                pending += trailing
+        while len(pending) > self.max_line:
+            out.append(pending[:self.max_line])
+            pending = pending[self.max_line:]
+        self._pending = pending
+        self.lines += len(out)
+        return out
+
+
+def strip_escapes(data: bytes) -> bytes:
+    """
+    完結したデータからエスケープシーケンスと制御文字を取り除く
+    """
+    stripper = EscapeStripper()
+    return stripper.feed(data) + stripper.flush()
+
+
+class EscapeStripper:
+    """
+    出力 chunk からエスケープシーケンスと制御文字を取り除き、平文（bytes）にする。
+
+    使い方:
+        stripper = EscapeStripper()
+        async for chunk in pty.read_chunks():
+            log.write(stripper.feed(chunk))
+        log.write(stripper.flush())
+
+    chunk 境界で途切れたシーケンスは次の feed() に持ち越す。
+    """
+
+    def __init__(self):
+        self._pending = b""  # 途切れたシーケンスの先頭
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def feed(self, data: bytes) -> bytes:
+        """
+        chunk を与え、取り除いた後の平文を返す
+        """
+        self.bytes_in += len(data)
+        if self._pending:
+            data = self._pending + data
+            self._pending = b""
+        elif b"\x1b" not in data:
+            out = data.translate(None, _CONTROLS)
+            self.bytes_out += len(out)
+            return out
+        cut = self._partial_start(data)
+        if cut >= 0:
+            tail = data[cut:]
+            m = _PARTIAL_STRING.match(tail)
+            if m is not None:
+                # 文字列の中身は捨てるので導入部（と ST の ESC）だけ残す
+                tail = tail[:2] + (b"\x1b" if m.end() < len(tail) else b"")
+            self._pending = bytes(tail)
+            data = data[:cut]
+        out = _SEQUENCE.sub(b"", data).translate(None, _CONTROLS)
+        self.bytes_out += len(out)
+        return out
+
+    def flush(self) -> bytes:
+        """
+        持ち越し分を破棄する（ストリームの終端で呼ぶ）。未完のシーケンスは出力しない。
+        """
+        self._pending = b""
+        return b""
+
+    @staticmethod
+    def _partial_start(data) -> int:
+        """
+        末尾で途切れたシーケンスの開始位置（なければ -1）
+        """
+        n = len(data)
+        esc = data.rfind(b"\x1b")
+        if esc < 0:
+            return -1
+        if esc == n - 1:
+            # ESC \\ の途中かもしれない: 直前の ESC が未終端の文字列を開いていないか
+            prev = data.rfind(b"\x1b", 0, esc)
+            if prev >= 0:
+                m = _PARTIAL_STRING.match(data, prev)
+                if m is not None and m.end() == esc:
+                    return prev
+            return esc
+        m = _PARTIAL_STRING.match(data, esc) or _PARTIAL.match(data, esc)
+        return esc if m.end() == n else -1
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""Incremental VT/ANSI (DEC / ECMA-48) escape sequence parser.
+
+:class:`VTParser` turns the raw pty byte stream into batches of events.  It
+keeps its state between :meth:`VTParser.feed` calls, so sequences split across
+read chunks are handled transparently.
+
+Complete sequences inside a chunk are matched in bulk by a single compiled
+regular expression; only sequences cut by a chunk boundary (or malformed ones)
+fall back to the byte-level, table-driven state machine modelled on the DEC
+VT500 parser.
+
+Events are plain tuples whose first item is the event kind:
+
+* ``(EV_PRINT, data: bytes)`` -- run of printable bytes (UTF-8 is not decoded)
+* ``(EV_EXECUTE, code: int)`` -- C0 control (``\\r``, ``\\n``, ``\\b`` ...)
+* ``(EV_ESC, intermediates: bytes, final: str)``
+* ``(EV_CSI, params: tuple[int, ...], intermediates: bytes, final: str, private: str)``
+  -- empty parameters are reported as ``0``
+* ``(EV_OSC, payload: bytes)``
+* ``(EV_STRING, introducer: str, payload: bytes)`` -- DCS / SOS / PM / APC
+"""
+
+import re
+
+__all__ = [
+    "VTParser",
+    "EV_PRINT", "EV_EXECUTE", "EV_ESC", "EV_CSI", "EV_OSC", "EV_STRING",
+]
+
+# ===== イベント種別 =====
+EV_PRINT = 0
+EV_EXECUTE = 1
+EV_ESC = 2
+EV_CSI = 3
+EV_OSC = 4
+EV_STRING = 5
+
+# ===== 状態 =====
+GROUND = 0
+ESCAPE = 1
+ESCAPE_INTERMEDIATE = 2
+CSI_ENTRY = 3
+CSI_PARAM = 4
+CSI_INTERMEDIATE = 5
+CSI_IGNORE = 6
+OSC_STRING = 7
+SOS_STRING = 8     # DCS / SOS / PM / APC（中身は解釈せず丸ごと返す）
+STRING_ESC = 9     # 文字列中の ESC（ST = ESC \ の途中）
+_NUM_STATES = 10
+
+# ===== アクション =====
+A_NONE = 0
+A_PRINT = 1
+A_EXECUTE = 2
+A_CLEAR = 3
+A_COLLECT = 4
+A_PARAM = 5
+A_PRIVATE = 6
+A_ESC_DISPATCH = 7
+A_CSI_DISPATCH = 8
+A_STR_START = 9
+A_STR_PUT = 10
+A_STR_END = 11
+A_STR_ESC = 12
+A_STR_ESC_END = 13
+
+# OSC/DCS の最大保持長（超過分は捨てる）
+MAX_STRING = 64 * 1024
+
+
+def _build_tables():
+    """
+    状態ごとに 256 要素の (action, next_state) 表を作る
+    """
+    act = [bytearray(256) for _ in range(_NUM_STATES)]
+    nxt = [bytearray(256) for _ in range(_NUM_STATES)]
+
+    def put(state, lo, hi, action, to):
+        for b in range(lo, hi + 1):
+            act[state][b] = action
+            nxt[state][b] = to
+
+    c0 = ((0x00, 0x17), (0x19, 0x19), (0x1c, 0x1f))
+    for s in range(_NUM_STATES):
+        put(s, 0x00, 0xff, A_NONE, s)
+    # GROUND
+    for lo, hi in c0:
+        put(GROUND, lo, hi, A_EXECUTE, GROUND)
+    put(GROUND, 0x20, 0x7e, A_PRINT, GROUND)
+    put(GROUND, 0x80, 0xff, A_PRINT, GROUND)   # UTF-8 はそのまま文字として扱う
+    # ESCAPE
+    for lo, hi in c0:
+        put(ESCAPE, lo, hi, A_EXECUTE, ESCAPE)
+    put(ESCAPE, 0x20, 0x2f, A_COLLECT, ESCAPE_INTERMEDIATE)
+    put(ESCAPE, 0x30, 0x7e, A_ESC_DISPATCH, GROUND)
+    put(ESCAPE, 0x5b, 0x5b, A_CLEAR, CSI_ENTRY)
+    put(ESCAPE, 0x5d, 0x5d, A_STR_START, OSC_STRING)
+    for b in (0x50, 0x58, 0x5e, 0x5f):          # DCS / SOS / PM / APC
+        put(ESCAPE, b, b, A_STR_START, SOS_STRING)
+    # ESCAPE_INTERMEDIATE
+    for lo, hi in c0:
+        put(ESCAPE_INTERMEDIATE, lo, hi, A_EXECUTE, ESCAPE_INTERMEDIATE)
+    put(ESCAPE_INTERMEDIATE, 0x20, 0x2f, A_COLLECT, ESCAPE_INTERMEDIATE)
+    put(ESCAPE_INTERMEDIATE, 0x30, 0x7e, A_ESC_DISPATCH, GROUND)
+    # CSI_ENTRY
+    for lo, hi in c0:
+        put(CSI_ENTRY, lo, hi, A_EXECUTE, CSI_ENTRY)
+    put(CSI_ENTRY, 0x20, 0x2f, A_COLLECT, CSI_INTERMEDIATE)
+    put(CSI_ENTRY, 0x30, 0x3b, A_PARAM, CSI_PARAM)
+    put(CSI_ENTRY, 0x3c, 0x3f, A_PRIVATE, CSI_PARAM)
+    put(CSI_ENTRY, 0x40, 0x7e, A_CSI_DISPATCH, GROUND)
+    # CSI_PARAM
+    for lo, hi in c0:
+        put(CSI_PARAM, lo, hi, A_EXECUTE, CSI_PARAM)
+    put(CSI_PARAM, 0x20, 0x2f, A_COLLECT, CSI_INTERMEDIATE)
+    put(CSI_PARAM, 0x30, 0x3b, A_PARAM, CSI_PARAM)
+    put(CSI_PARAM, 0x3c, 0x3f, A_NONE, CSI_IGNORE)
+    put(CSI_PARAM, 0x40, 0x7e, A_CSI_DISPATCH, GROUND)
+    # CSI_INTERMEDIATE
+    for lo, hi in c0:
+        put(CSI_INTERMEDIATE, lo, hi, A_EXECUTE, CSI_INTERMEDIATE)
+    put(CSI_INTERMEDIATE, 0x20, 0x2f, A_COLLECT, CSI_INTERMEDIATE)
+    put(CSI_INTERMEDIATE, 0x30, 0x3f, A_NONE, CSI_IGNORE)
+    put(CSI_INTERMEDIATE, 0x40, 0x7e, A_CSI_DISPATCH, GROUND)
+    # CSI_IGNORE
+    for lo, hi in c0:
+        put(CSI_IGNORE, lo, hi, A_EXECUTE, CSI_IGNORE)
+    put(CSI_IGNORE, 0x40, 0x7e, A_NONE, GROUND)
+    # OSC_STRING / SOS_STRING: BEL でも終端（xterm 互換）
+    for s in (OSC_STRING, SOS_STRING):
+        put(s, 0x00, 0xff, A_STR_PUT, s)
+        put(s, 0x07, 0x07, A_STR_END, GROUND)
+        put(s, 0x1b, 0x1b, A_STR_ESC, STRING_ESC)
+    # STRING_ESC: ESC \ なら終端、それ以外は文字列を確定して ESC 扱い
+    put(STRING_ESC, 0x00, 0xff, A_STR_ESC_END, ESCAPE)
+    put(STRING_ESC, 0x5c, 0x5c, A_STR_END, GROUND)
+
+    # どの状態からでも有効な遷移
+    for s in range(_NUM_STATES):
+        if s in (OSC_STRING, SOS_STRING, STRING_ESC):
+            continue
+        put(s, 0x18, 0x18, A_EXECUTE, GROUND)   # CAN
+        put(s, 0x1a, 0x1a, A_EXECUTE, GROUND)   # SUB
+        put(s, 0x1b, 0x1b, A_CLEAR, ESCAPE)
+        put(s, 0x7f, 0x7f, A_NONE, s)           # DEL は無視
+    for s in (OSC_STRING, SOS_STRING):
+        put(s, 0x18, 0x18, A_NONE, GROUND)
+        put(s, 0x1a, 0x1a, A_NONE, GROUND)
+    return [bytes(t) for t in act], [bytes(t) for t in nxt]
+
+
+_ACTIONS, _NEXT = _build_tables()
+
+# チャンク内で完結しているシーケンスは 1 回の正規表現マッチでまとめて処理する。
+# グループ番号（lastindex）でどの分岐にマッチしたかを判定する。
+_TOKEN = re.compile(
+    rb"([^\x00-\x1f\x7f]+)"                                          # 1: 文字列
+    rb"|\x1b\[([\x3c-\x3f]?)([\x30-\x3b]*)([\x20-\x2f]*)([\x40-\x7e])"  # 2-5: CSI
+    rb"|\x1b\]([^\x07\x18\x1a\x1b]*)(?:\x07|\x1b\\)"                 # 6: OSC
+    rb"|\x1b([\x20-\x2f]*)([\x30-\x4f\x51-\x57\x59\x5a\x5c\x60-\x7e])"  # 7-8: ESC
+    rb"|([\x00-\x17\x19\x1c-\x1f])"                                  # 9: C0
+)
+_STRING_STOP = re.compile(rb"[\x07\x18\x1a\x1b]")
+_PARAM_SPLIT = re.compile(rb"[;:]")
+
+
+def _parse_params(raw: bytes) -> tuple:
+    if not raw:
+        return ()
+    return tuple([int(p) if p else 0 for p in _PARAM_SPLIT.split(raw)])
+
+
+class VTParser:
+    """
+    再開可能な VT/ANSI パーサ。
+
+    使い方:
+        parser = VTParser()
+        async for chunk in pty.read_chunks():
+            for ev in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._state = GROUND
+        self._private = b""
+        self._params = bytearray()
+        self._intermediates = bytearray()
+        self._string = bytearray()
+        self._string_kind = ""
+
+    @property
+    def state(self) -> int:
+        return self._state
+
+    def feed(self, data) -> list:
+        """
+        data を解析してイベントのリストを返す。不完全なシーケンスは次回に持ち越す。
+        """
+        events = []
+        append = events.append
+        n = len(data)
+        i = 0
+        if self._state != GROUND:
+            i = self._feed_slow(data, 0, events)
+        match = _TOKEN.match
+        while i < n:
+            m = match(data, i)
+            if m is None:
+                # ESC で始まる不完全/不正なシーケンス: 状態機械で処理
+                i = self._feed_slow(data, i, events)
+                continue
+            kind = m.lastindex
+            if kind == 1:
+                append((EV_PRINT, m.group(1)))
+            elif kind == 9:
+                append((EV_EXECUTE, data[i]))
+            elif kind == 5:
+                private, params, inter, final = m.group(2, 3, 4, 5)
+                append((EV_CSI, _parse_params(params), inter, chr(final[0]), private.decode("ascii")))
+            elif kind == 6:
+                append((EV_OSC, m.group(6)))
+            else:
+                inter, final = m.group(7, 8)
+                append((EV_ESC, inter, chr(final[0])))
+            i = m.end()
+        return events
+
+    def _feed_slow(self, data, i: int, events: list) -> int:
+        """
+        1 バイトずつ表に従って遷移し、GROUND に戻った位置を返す
+        """
+        n = len(data)
+        state = self._state
+        while i < n:
+            if state == OSC_STRING or state == SOS_STRING:
+                # 文字列本体は終端候補までまとめて取り込む
+                m = _STRING_STOP.search(data, i)
+                end = m.start() if m else n
+                if end > i:
+                    room = MAX_STRING - len(self._string)
+                    if room > 0:
+                        self._string += data[i:min(end, i + room)]
+                    i = end
+                    if i >= n:
+                        break
+            b = data[i]
+            action = _ACTIONS[state][b]
+            state = _NEXT[state][b]
+            i += 1
+            if action == A_NONE:
+                pass
+            elif action == A_EXECUTE:
+                events.append((EV_EXECUTE, b))
+            elif action == A_PARAM:
+                self._params.append(b)
+            elif action == A_COLLECT:
+                self._intermediates.append(b)
+            elif action == A_CLEAR:
+                self._private = b""
+                self._params.clear()
+                self._intermediates.clear()
+            elif action == A_PRIVATE:
+                self._private = bytes((b,))
+            elif action == A_CSI_DISPATCH:
+                events.append((EV_CSI, _parse_params(bytes(self._params)),
+                               bytes(self._intermediates), chr(b), self._private.decode("ascii")))
+            elif action == A_ESC_DISPATCH:
+                events.append((EV_ESC, bytes(self._intermediates), chr(b)))
+            elif action == A_PRINT:
+                events.append((EV_PRINT, bytes((b,))))
+            elif action == A_STR_START:
+                self._string.clear()
+                self._string_kind = "" if b == 0x5d else chr(b)
+            elif action == A_STR_PUT:
+                if len(self._string) < MAX_STRING:
+                    self._string.append(b)
+            elif action == A_STR_ESC:
+                pass
+            elif action == A_STR_END:
+                self._emit_string(events)
+            elif action == A_STR_ESC_END:
+                # ST でない ESC: 文字列を確定し、この ESC の次のバイトとして再処理
+                self._emit_string(events)
+                self._private = b""
+                self._params.clear()
+                self._intermediates.clear()
+                i -= 1
+            if state == GROUND:
+                break
+        self._state = state
+        return i
+
+    def _emit_string(self, events: list):
+        payload = bytes(self._string)
+        self._string.clear()
+        if self._string_kind:
+            events.append((EV_STRING, self._string_kind, payload))
+        else:
+            events.append((EV_OSC, payload))
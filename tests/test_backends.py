@@ -0,0 +1,114 @@
+"""Tests for :mod:`aioconpty.backends.base` (exit watching and the blocking executor)."""
+
+import asyncio
+import concurrent.futures
+import sys
+import threading
+
+from aioconpty import AsyncConPTY
+from aioconpty.backends.base import (ExitWatcher, PtyBackend, PtyProcess, blocking_executor,
+                                     set_blocking_executor)
+
+
+class _Watcher(ExitWatcher):
+    """_start() / _stop() の呼び出しを記録するだけの ExitWatcher"""
+
+    def __init__(self, loop):
+        super().__init__(loop)
+        self.started = []
+        self.stopped = []
+
+    def _start(self, proc):
+        self.started.append(proc)
+
+    def _stop(self, proc):
+        self.stopped.append(proc)
+
+
+def test_exit_watcher_is_shared_per_loop():
+    async def main():
+        return _Watcher.for_loop(), _Watcher.for_loop(), _Watcher.for_loop(asyncio.get_running_loop())
+
+    first, again, explicit = asyncio.run(main())
+    assert first is again is explicit
+    other, _, _ = asyncio.run(main())
+    assert other is not first
+
+
+def test_exit_watcher_waits_once_per_process():
+    async def main():
+        watcher = _Watcher.for_loop()
+        proc = PtyProcess()
+        fut = watcher.watch(proc)
+        assert watcher.watch(proc) is fut
+        assert watcher.started == [proc] and watcher.watched == 1
+        waiters = [asyncio.ensure_future(asyncio.shield(fut)) for _ in range(3)]
+        watcher._resolve(proc, 3)
+        watcher._resolve(proc, 4)  # 2 回目は無視される
+        return await asyncio.gather(*waiters), proc._exit_code, watcher
+
+    codes, code, watcher = asyncio.run(main())
+    assert codes == [3, 3, 3]
+    assert code == 3
+    assert (watcher.watched, watcher.exited) == (0, 1)
+
+
+def test_exit_watcher_release_resolves_none():
+    async def main():
+        watcher = _Watcher.for_loop()
+        proc = PtyProcess()
+        fut = watcher.watch(proc)
+        watcher.release(proc)
+        return await fut, watcher
+
+    result, watcher = asyncio.run(main())
+    assert result is None
+    assert len(watcher.stopped) == 1
+    assert (watcher.watched, watcher.exited) == (0, 0)
+
+
+def test_concurrent_waits_share_the_exit():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            proc = await pty.spawn([sys.executable, "-c", "raise SystemExit(5)"])
+            codes = await asyncio.gather(*(proc.wait(10) for _ in range(5)))
+            return codes, proc.poll()
+
+    codes, code = asyncio.run(main())
+    assert codes == [5] * 5
+    assert code == 5
+
+
+def test_blocking_executor_is_shared():
+    executor = blocking_executor()
+    assert blocking_executor() is executor
+    name = executor.submit(lambda: threading.current_thread().name).result()
+    assert name.startswith("aioconpty-blocking")
+
+
+def test_run_blocking_runs_off_the_loop_thread():
+    async def main():
+        return await PtyBackend().run_blocking(lambda x: (x, threading.get_ident()), 1)
+
+    result, ident = asyncio.run(main())
+    assert result == 1
+    assert ident != threading.get_ident()
+
+
+def test_set_blocking_executor():
+    default = blocking_executor()
+    custom = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="custom")
+    try:
+        set_blocking_executor(custom)
+        assert blocking_executor() is custom
+        name = asyncio.run(_thread_name())
+        assert name.startswith("custom")
+        set_blocking_executor(None)
+        assert blocking_executor() is not custom
+    finally:
+        set_blocking_executor(default)
+        custom.shutdown()
+
+
+async def _thread_name():
+    return await PtyBackend().run_blocking(lambda: threading.current_thread().name)
@@ -0,0 +1,53 @@
+"""Tests for :mod:`aioconpty.broadcast`."""
+
+import asyncio
+
+import pytest
+
+from aioconpty.broadcast import OutputBroadcast, SubscriberLagged
+
+
+async def _read_all(sub, n):
+    out = b""
+    while len(out) < n:
+        out += await sub.read()
+    return out
+
+
+def test_subscribers_read_independently_with_replay():
+    async def main():
+        broadcast = OutputBroadcast(retain=10)
+        broadcast.feed(b"early")
+        late = broadcast.subscribe(replay=100)
+        live = broadcast.subscribe()
+        broadcast.feed(b"abc")
+        broadcast.feed(b"def")
+        assert await _read_all(late, 11) == b"earlyabcdef"
+        assert await live.read(2) == b"ab"
+        assert await _read_all(live, 4) == b"cdef"
+        broadcast.feed_eof()
+        assert await live.read() == b""
+    asyncio.run(main())
+
+
+def test_drop_policy_skips_ahead():
+    async def main():
+        broadcast = OutputBroadcast(lag_limit=20)
+        sub = broadcast.subscribe()
+        broadcast.feed(b"abc")
+        broadcast.feed(b"def")
+        broadcast.feed(b"x" * 30)
+        assert await sub.read() == b"x" * 30
+        assert sub.dropped == 6
+    asyncio.run(main())
+
+
+def test_disconnect_policy():
+    async def main():
+        broadcast = OutputBroadcast(lag_limit=5, policy="disconnect")
+        sub = broadcast.subscribe()
+        broadcast.feed(b"x" * 10)
+        with pytest.raises(SubscriberLagged):
+            await sub.read()
+        assert broadcast.stats()["subscribers"] == 0
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Tests for :class:`aioconpty.AsyncConPTY` on the platform's default backend."""
+
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+import aioconpty
+from aioconpty import AsyncConPTY
+from aioconpty.conpty import _ReadFlow
+
+SIZE = "import os; print('size', *os.get_terminal_size(1), flush=True)"
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+async def _until(pty, marker: bytes) -> bytes:
+    out = b""
+    while marker not in out:
+        data = await asyncio.wait_for(pty.read(4096), 10)
+        if not data:
+            raise EOFError(out)
+        out += data
+    return out
+
+
+def test_spawn_read_and_exit_code():
+    async def main():
+        async with AsyncConPTY(100, 40) as pty:
+            proc = await pty.spawn(_py(SIZE + "; raise SystemExit(7)"))
+            out = await _until(pty, b"\n")
+            return out, await proc.wait(), pty.has_running_children()
+
+    out, code, running = asyncio.run(main())
+    assert b"size 100 40" in out
+    assert code == 7
+    assert not running
+
+
+def test_write_reaches_the_child():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            proc = await pty.spawn(_py("print('echo', input())"))
+            await pty.write(b"ping\r")
+            out = await _until(pty, b"echo ping")
+            await proc.wait()
+            return out
+
+    assert b"echo ping" in asyncio.run(main())
+
+
+def test_several_spawns_and_resize_in_one_session():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            first = await pty.spawn(_py(SIZE))
+            await _until(pty, b"size 80 24")
+            await first.wait()
+            pty.resize(120, 30)
+            assert pty.size == (120, 30)
+            second = await pty.spawn(_py(SIZE))
+            await _until(pty, b"size 120 30")
+            return await second.wait()
+
+    assert asyncio.run(main()) == 0
+
+
+def test_hangup_ends_the_output_stream():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            proc = await pty.spawn(_py("print('bye')"))
+            await proc.wait()
+            await pty.hangup()
+            out = b""
+            while data := await asyncio.wait_for(pty.read(4096), 10):
+                out += data
+            # 端末はもう開いていない（spawn もできない）
+            assert not pty.backend.is_open
+            with pytest.raises(RuntimeError):
+                await pty.spawn(_py("pass"))
+            return out, pty.closed
+
+    out, closed = asyncio.run(main())
+    assert b"bye" in out
+    assert not closed
+
+
+def test_demo_relays_output_and_exit_code():
+    src = os.path.dirname(os.path.dirname(aioconpty.__file__))
+    result = subprocess.run(
+        [sys.executable, "-m", "aioconpty.conpty", *_py("print('demo'); raise SystemExit(3)")],
+        capture_output=True, timeout=30, env=dict(os.environ, PYTHONPATH=src))
+    assert b"demo" in result.stdout
+    assert result.returncode == 3
+
+
+class _Transport:
+    def __init__(self):
+        self.paused = False
+
+    def pause_reading(self):
+        self.paused = True
+
+    def resume_reading(self):
+        self.paused = False
+
+
+def test_read_flow_is_reference_counted():
+    transport = _Transport()
+    flow = _ReadFlow(transport)
+    flow.pause_reading()
+    flow.pause_reading()
+    flow.resume_reading()
+    assert transport.paused and flow.pausers == 1
+    flow.resume_reading()
+    assert not transport.paused
+    flow.resume_reading()  # 止めていない側の resume は無視する
+    assert flow.pausers == 0 and not transport.paused
+
+
+def test_pause_reading_holds_back_output():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            pty.pause_reading()
+            await pty.spawn(_py("print('late')"))
+            await asyncio.sleep(0.2)
+            held = pty.discard_output()
+            pty.resume_reading()
+            out = await _until(pty, b"late")
+            return held, out
+
+    held, out = asyncio.run(main())
+    assert held == 0
+    assert b"late" in out
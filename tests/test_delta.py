@@ -0,0 +1,34 @@
+"""Tests for :mod:`aioconpty.delta`."""
+
+import pytest
+
+from aioconpty.delta import DeltaFormatError, ScreenMirror, ScreenSnapshot, encode_delta
+from aioconpty.screen import Screen
+
+
+def test_keyframe_then_delta_reproduce_the_screen():
+    screen = Screen(10, 3)
+    screen.feed(b"\x1b]0;T\x07hi \x1b[32mgreen")
+    mirror = ScreenMirror()
+    assert mirror.apply(encode_delta(None, ScreenSnapshot(screen))) == [0, 1, 2]
+    assert mirror.display == screen.display
+    assert mirror.title == "T"
+
+    old = ScreenSnapshot(screen)
+    screen.feed(b"\r\nnext")
+    new = ScreenSnapshot(screen)
+    assert mirror.apply(encode_delta(old, new)) == [1]
+    assert mirror.display == screen.display
+    assert (mirror.x, mirror.y) == (screen.x, screen.y)
+    _, styles = mirror.row_cells(0)
+    _, expected = screen.row_cells(0)
+    assert [mirror.style(sid) for sid in styles] == [screen.style(sid) for sid in expected]
+    assert encode_delta(new, new) is None
+
+
+def test_delta_before_keyframe_is_rejected():
+    screen = Screen(4, 2)
+    old = ScreenSnapshot(screen)
+    screen.feed(b"x")
+    with pytest.raises(DeltaFormatError):
+        ScreenMirror().apply(encode_delta(old, ScreenSnapshot(screen)))
@@ -0,0 +1,108 @@
+"""Tests for :mod:`aioconpty.expect`."""
+
+import asyncio
+import re
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.expect import Expecter, ExpectEOF, ExpectTimeout
+
+
+def _reader(*chunks):
+    queue = list(chunks)
+
+    async def read(n):
+        return queue.pop(0) if queue else b""
+    return read
+
+
+def _expect(read, patterns, **kwargs):
+    async def main():
+        exp = Expecter(read)
+        return exp, await exp.expect(patterns, **kwargs)
+    return asyncio.run(main())
+
+
+def test_literal_across_chunks():
+    exp, m = _expect(_reader(b"abc pro", b"mpt$ rest"), b"prompt$ ")
+    assert (m.index, m.before, m.after) == (0, b"abc ", b"prompt$ ")
+    assert exp.buffer == b"rest"
+
+
+def test_earliest_pattern_wins():
+    _, m = _expect(_reader(b"warning then error"), [b"error", re.compile(rb"warn\w+")])
+    assert m.index == 1
+    assert m.group() == b"warning"
+
+
+def test_regex_groups_and_str_pattern():
+    _, m = _expect(_reader(b"xx foo1 yy"), re.compile(r"(foo)(\d)"))
+    assert m.groups() == (b"foo", b"1")
+    assert m.group(2) == b"1"
+
+
+def test_lookahead_past_match_end_is_kept():
+    # 一致の後ろを先読みするパターン: 一致の終わりで切ったコピーに対して取り直すと失われていた
+    _, m = _expect(_reader(b"value=42;"), re.compile(rb"value=(\d+)(?=;)"))
+    assert m.after == b"value=42"
+    assert m.group(1) == b"42"
+    assert m.match is not None
+
+
+def test_word_boundary_after_match():
+    _, m = _expect(_reader(b"cat catalog"), re.compile(rb"cat\b"))
+    assert m.before == b""
+    assert m.match.group() == b"cat"
+
+
+def test_match_copies_only_a_window_of_the_buffer():
+    async def main():
+        exp = Expecter(_reader(b"n1;" * 10000), searchwindowsize=16)
+        matches = [await exp.expect(re.compile(rb"n(\d)(?=;)")) for _ in range(3)]
+        return exp, matches
+
+    exp, matches = asyncio.run(main())
+    assert [m.group(1) for m in matches] == [b"1"] * 3
+    assert [m.before for m in matches] == [b"", b";", b";"]
+    assert all(len(m.match.string) <= m.match.end() + 16 for m in matches)
+    assert len(exp.buffer) == 3 * 10000 - 3 * 2 - 2
+
+
+def test_eof_before_match():
+    with pytest.raises(ExpectEOF) as info:
+        _expect(_reader(b"no match here"), b"prompt")
+    assert info.value.before == b"no match here"
+
+
+def test_timeout_keeps_buffer():
+    async def read(n):
+        if not sent:
+            sent.append(1)
+            return b"partial"
+        await asyncio.sleep(10)
+
+    sent = []
+    with pytest.raises(ExpectTimeout) as info:
+        _expect(read, b"never", timeout=0.05)
+    assert info.value.before == b"partial"
+
+
+def test_empty_pattern_rejected():
+    with pytest.raises(ValueError):
+        _expect(_reader(b"x"), b"")
+
+
+def test_expect_through_the_pty():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            await pty.spawn([sys.executable, "-c", "print('value=42;', flush=True); print('bye')"])
+            m = await pty.expect(re.compile(rb"value=(\d+)(?=;)"), timeout=10)
+            await pty.expect(b"bye", timeout=10)
+            await pty.hangup()
+            with pytest.raises(ExpectEOF):
+                await pty.expect(b"never", timeout=10)
+            return m
+
+    assert asyncio.run(main()).group(1) == b"42"
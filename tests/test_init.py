@@ -0,0 +1,38 @@
+"""Tests for the lazy exports of :mod:`aioconpty`."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import aioconpty
+
+
+def _modules_after(code: str) -> list:
+    # 既に import 済みのモジュールに左右されないよう新しいインタプリタで調べる
+    script = code + "\nimport sys, json\nprint(json.dumps(sorted(m for m in sys.modules if m.startswith('aioconpty'))))"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(aioconpty.__file__)))
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                         check=True, env=env)
+    return json.loads(out.stdout)
+
+
+def test_import_does_not_load_submodules():
+    assert _modules_after("import aioconpty") == ["aioconpty"]
+
+
+def test_conpty_defers_optional_submodules():
+    loaded = _modules_after("import aioconpty.conpty")
+    for name in ("screen", "vtparse", "expect", "ringbuffer", "record", "keys",
+                 "backends.windows", "backends.posix"):
+        assert f"aioconpty.{name}" not in loaded
+
+
+def test_exports_resolve_on_first_access():
+    for name in aioconpty.__all__:
+        assert getattr(aioconpty, name) is not None
+    assert set(aioconpty.__all__) <= set(dir(aioconpty))
+    with pytest.raises(AttributeError):
+        aioconpty.no_such_name  # noqa: B018
@@ -0,0 +1,105 @@
+"""Tests for :mod:`aioconpty.keys`."""
+
+import asyncio
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.keys import (CTRL, PASTE_END, PASTE_START, InputModes, encode_key, encode_keys,
+                            encode_mouse, prepare_paste)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("a", b"a"),
+    ("Enter", b"\r"),
+    ("ctrl+c", b"\x03"),
+    ("alt+b", b"\x1bb"),
+    ("Up", b"\x1b[A"),
+    ("shift+Up", b"\x1b[1;2A"),
+    ("F1", b"\x1bOP"),
+    ("Delete", b"\x1b[3~"),
+])
+def test_encode_key(spec, expected):
+    assert encode_key(spec) == expected
+
+
+def test_encode_key_modifier_argument_and_application_cursor():
+    assert encode_key("a", CTRL) == b"\x01"
+    assert encode_key("Up", application_cursor=True) == b"\x1bOA"
+
+
+def test_encode_keys_and_unknown_key():
+    assert encode_keys(["h", "i", "Enter"]) == b"hi\r"
+    with pytest.raises(ValueError):
+        encode_key("nosuchkey")
+
+
+def test_encode_mouse():
+    assert encode_mouse("left", 0, 0) == b"\x1b[<0;1;1M"
+    assert encode_mouse("left", 9, 4, release=True) == b"\x1b[<0;10;5m"
+    assert encode_mouse("left", 9, 4, sgr=False) == b"\x1b[M *%"
+
+
+def test_prepare_paste_newlines_and_brackets():
+    assert prepare_paste("a\nb\r\nc") == b"a\rb\rc"
+    assert prepare_paste("a\nb", newline=None) == b"a\nb"
+    assert prepare_paste("x", bracketed=True) == PASTE_START + b"x" + PASTE_END
+
+
+@pytest.mark.parametrize("payload", [
+    b"rm -rf \x1b[201~ /",
+    b"a\x1b[201\x1b[201~~rm -rf /",
+    b"\x1b[20\x1b[201~1~x",
+])
+def test_prepare_paste_cannot_end_bracket_early(payload):
+    data = prepare_paste(payload, bracketed=True, newline=None)
+    assert data.startswith(PASTE_START) and data.endswith(PASTE_END)
+    assert PASTE_END not in data[len(PASTE_START):-len(PASTE_END)]
+
+
+def test_input_modes_tracks_split_sequences():
+    modes = InputModes()
+    assert modes.is_default
+    modes.feed(b"\x1b[?1;2004h\x1b[?100")
+    modes.feed(b"6h")
+    assert modes.application_cursor and modes.bracketed_paste and modes.mouse_sgr
+    assert not modes.is_default
+    modes.feed(b"\x1b[?1l\x1b[?2004l\x1b[?1006l")
+    assert modes.is_default
+
+
+# 端末を raw にして、貼り付けの終端が届くまでに受け取ったバイト列を repr で返す
+ECHO_RAW = r"""
+import os, sys
+if os.name == "posix":
+    import tty
+    tty.setraw(0)
+sys.stdout.write("ready\n")
+sys.stdout.flush()
+data = b""
+while not data.endswith(b"\x1b[201~"):
+    data += os.read(0, 1024)
+sys.stdout.write(repr(data) + "\n")
+sys.stdout.flush()
+"""
+
+
+async def _until(pty, marker: bytes) -> bytes:
+    out = b""
+    while marker not in out:
+        out += await asyncio.wait_for(pty.read(4096), 10)
+    return out
+
+
+def test_send_keys_and_paste_reach_the_child():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            await pty.spawn([sys.executable, "-c", ECHO_RAW])
+            await _until(pty, b"ready")
+            await pty.send_keys("h", "i", "Up", "ctrl+c")
+            await pty.paste("a\nb", bracketed=True)
+            return await _until(pty, b"~'")
+
+    expected = repr(b"hi\x1b[A\x03\x1b[200~a\rb\x1b[201~").encode()
+    assert expected in asyncio.run(main())
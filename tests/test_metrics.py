@@ -0,0 +1,52 @@
+"""Tests for :mod:`aioconpty.metrics`."""
+
+import asyncio
+import sys
+
+from aioconpty import AsyncConPTY
+from aioconpty.metrics import Histogram, SessionMetrics
+
+
+def test_histogram_quantiles_are_bucket_upper_bounds():
+    hist = Histogram()
+    for value in (0.001, 0.002, 0.003, 0.1):
+        hist.add(value)
+    snap = hist.snapshot()
+    assert (snap["count"], snap["min"], snap["max"]) == (4, 0.001, 0.1)
+    assert snap["p50"] >= 0.002
+    assert snap["p99"] == 0.1
+    assert sum(snap["buckets"].values()) == 4
+
+
+def test_session_metrics_snapshot_and_reset():
+    metrics = SessionMetrics()
+    metrics.count("bytes", 10)
+    metrics.count("bytes", 5)
+    metrics.observe("latency", 0.5)
+    snap = metrics.snapshot()
+    assert snap["counters"] == {"bytes": 15}
+    assert snap["histograms"]["latency"]["count"] == 1
+    metrics.reset()
+    assert metrics.snapshot() == {"counters": {}, "histograms": {}}
+
+
+def test_session_records_io_and_lifecycle():
+    async def main():
+        metrics = SessionMetrics()
+        async with AsyncConPTY(80, 24, metrics=metrics) as pty:
+            proc = await pty.spawn([sys.executable, "-c", "print('hello')"])
+            await proc.wait()
+            await pty.write(b"x")
+            out = b""
+            while b"hello" not in out:
+                out += await asyncio.wait_for(pty.read(4096), 10)
+        return metrics.snapshot()
+
+    snap = asyncio.run(main())
+    counters = snap["counters"]
+    assert counters["sessions.opened"] == counters["sessions.closed"] == 1
+    assert counters["process.spawned"] == counters["process.exited"] == 1
+    assert counters["input.bytes"] == 1
+    assert counters["output.bytes"] >= len(b"hello")
+    for name in ("open.seconds", "spawn.seconds", "ttfb.seconds", "close.seconds"):
+        assert snap["histograms"][name]["count"] == 1
@@ -0,0 +1,90 @@
+"""Tests for :mod:`aioconpty.mux`."""
+
+import asyncio
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.mux import PtyMux
+from aioconpty.record import ReplayBackend
+
+
+def _replay(*chunks):
+    events = [(0.0, "o", chunk) for chunk in chunks]
+    return AsyncConPTY(backend=ReplayBackend(({"version": 2, "width": 80, "height": 24}, events)))
+
+
+def test_mux_delivers_every_session_in_order():
+    async def main():
+        mux = PtyMux(quantum=4)
+        expected = {}
+        for sid, chunks in (("a", ["hello ", "world"]), ("b", ["x" * 10])):
+            pty = _replay(*chunks)
+            await pty.open()
+            mux.add(pty, sid)
+            expected[sid] = "".join(chunks).encode()
+        got = {sid: b"" for sid in expected}
+        finished = set()
+        async for sid, chunk in mux:
+            if not chunk:
+                finished.add(sid)
+                if finished == set(expected):
+                    break
+                continue
+            assert len(chunk) <= mux.quantum
+            got[sid] += chunk
+        await mux.close()
+        return expected, got, mux
+
+    expected, got, mux = asyncio.run(main())
+    assert got == expected
+    assert mux.closed
+
+
+def test_duplicate_session_id():
+    async def main():
+        mux = PtyMux()
+        pty = _replay("a")
+        await pty.open()
+        mux.add(pty, 1)
+        with pytest.raises(KeyError):
+            mux.add(pty, 1)
+        await mux.close()
+    asyncio.run(main())
+
+
+
+def test_removed_session_does_not_break_next_batch():
+    async def main():
+        mux = PtyMux()
+        removed, kept = _replay("gone"), _replay("kept")
+        for sid, pty in (("a", removed), ("b", kept)):
+            await pty.open()
+            mux.add(pty, sid)
+        await asyncio.sleep(0.05)  # 出力と EOF が ready キューに入るまで待つ
+        assert mux.remove("a") is removed
+        batch = await asyncio.wait_for(mux.next_batch(), 5)
+        await mux.close()
+        return batch
+
+    assert asyncio.run(main()) == [("b", b"kept"), ("b", b"")]
+
+
+def test_readding_an_id_is_not_ended_by_the_stale_entry():
+    async def main():
+        mux = PtyMux()
+        first = _replay("old")
+        await first.open()
+        mux.add(first, "a")
+        await asyncio.sleep(0.05)
+        mux.remove("a")
+        second = _replay("new")
+        await second.open()
+        mux.add(second, "a")
+        got = []
+        while ("a", b"") not in got:
+            got += await asyncio.wait_for(mux.next_batch(), 5)
+        await mux.close()
+        return got
+
+    assert asyncio.run(main()) == [("a", b"new"), ("a", b"")]
@@ -0,0 +1,34 @@
+"""Tests for :func:`aioconpty.run`."""
+
+import asyncio
+import sys
+
+from aioconpty import run
+from aioconpty.oneshot import TRUNCATION_MARKER
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+def test_output_and_exit_code():
+    result = asyncio.run(run(_py("import sys; print('hello'); sys.exit(5)"), 100, 40))
+    assert result.returncode == 5
+    assert b"hello" in result.output
+    assert result.eof and not result.timed_out and not result.truncated
+
+
+def test_max_output_truncates_with_marker():
+    result = asyncio.run(run(_py("print('x' * 100000)"), max_output=1000))
+    assert result.truncated
+    marker = TRUNCATION_MARKER % result.dropped
+    assert result.output == b"x" * 1000 + marker
+    assert result.dropped + 1000 == 100000 + 2  # print() の改行は pty で \r\n になる
+
+
+def test_timeout_kills_the_child():
+    result = asyncio.run(run(_py("import time; print('start', flush=True); time.sleep(30)"),
+                             timeout=1.0))
+    assert result.timed_out
+    assert b"start" in result.output
+    assert result.elapsed < 10
@@ -0,0 +1,209 @@
+"""Tests for :mod:`aioconpty.pool`."""
+
+import asyncio
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.pool import PtyPool
+
+
+def _py(code):
+    return [sys.executable, "-c", code]
+
+
+async def _until(pty, marker: bytes) -> bytes:
+    out = b""
+    while marker not in out:
+        out += await asyncio.wait_for(pty.read(4096), 10)
+    return out
+
+
+async def _run_in(pool, code, **kwargs):
+    async with pool.lease(**kwargs) as pty:
+        proc = await pty.spawn(_py(code))
+        await proc.wait()
+        proc.close_handle()
+        return pty
+
+
+async def _settled(pool):
+    while pool.stats()["settling"]:
+        await asyncio.sleep(0.005)
+
+
+def test_sessions_are_reused_and_resized():
+    async def main():
+        async with PtyPool(min_size=1, max_size=1, cols=80, rows=24) as pool:
+            first = await _run_in(pool, "pass")
+            await _settled(pool)
+            second = await _run_in(pool, "pass", cols=100, rows=40)
+            assert second is first
+            assert second.size == (100, 40)
+            return pool.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["hits"], stats["misses"], stats["recycled"]) == (2, 0, 0)
+
+
+def test_leftover_output_does_not_reach_next_lease():
+    async def main():
+        async with PtyPool(min_size=1, max_size=1) as pool:
+            await _run_in(pool, "print('leftover')")
+            async with pool.lease() as pty:
+                proc = await pty.spawn(_py("print('fresh')"))
+                await proc.wait()
+                return await _until(pty, b"fresh")
+
+    assert b"leftover" not in asyncio.run(main())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="termios is POSIX only")
+def test_termios_restored_between_leases():
+    async def main():
+        async with PtyPool(min_size=1, max_size=1) as pool:
+            await _run_in(pool, "import tty; tty.setraw(0)")
+            async with pool.lease() as pty:
+                proc = await pty.spawn(_py(
+                    "import termios; a = termios.tcgetattr(0); "
+                    "print('echo', bool(a[3] & termios.ECHO), 'icanon', bool(a[3] & termios.ICANON))"))
+                await proc.wait()
+                out = b""
+                while b"icanon" not in out or not out.endswith(b"\n"):
+                    out += await asyncio.wait_for(pty.read(4096), 10)
+                return out, pool.stats()
+
+    out, stats = asyncio.run(main())
+    assert b"echo True icanon True" in out
+    assert stats["recycled"] == 0
+
+
+def test_session_left_in_bracketed_paste_is_recycled():
+    async def main():
+        async with PtyPool(min_size=1, max_size=1) as pool:
+            first = await _run_in(pool, "import sys; sys.stdout.write('\\x1b[?2004h'); sys.stdout.flush()")
+            await _settled(pool)
+            second = await _run_in(pool, "pass")
+            return first, second, pool.stats()
+
+    first, second, stats = asyncio.run(main())
+    assert second is not first
+    assert first.closed
+    assert stats["recycled"] == 1
+
+
+def test_failed_lease_and_running_children_are_recycled():
+    async def main():
+        async with PtyPool(max_size=2) as pool:
+            with pytest.raises(RuntimeError):
+                async with pool.lease() as pty:
+                    raise RuntimeError("job failed")
+            assert pty.closed
+            async with pool.lease() as pty:
+                proc = await pty.spawn(_py("import time; time.sleep(30)"))
+            assert pty.closed
+            await proc.wait()
+            return pool.stats()
+
+    assert asyncio.run(main())["recycled"] == 2
+
+
+def test_acquire_waits_for_release_and_times_out():
+    async def main():
+        async with PtyPool(max_size=1) as pool:
+            pty = await pool.acquire()
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.acquire(timeout=0.05)
+            waiter = asyncio.ensure_future(pool.acquire(timeout=5))
+            await asyncio.sleep(0)
+            await pool.release(pty)
+            assert await waiter is pty
+            await pool.release(pty)
+            return pool.stats()
+
+    stats = asyncio.run(main())
+    assert stats["acquire_timeouts"] == 1
+    assert stats["hits"] == 1
+
+
+def test_idle_sessions_above_min_size_are_evicted():
+    async def main():
+        async with PtyPool(min_size=1, max_size=3, idle_timeout=0.05) as pool:
+            leased = [await pool.acquire() for _ in range(3)]
+            for pty in leased:
+                await pool.release(pty)
+            await asyncio.sleep(0.3)
+            return pool.stats()
+
+    stats = asyncio.run(main())
+    assert stats["size"] == 1
+    assert stats["evicted"] == 2
+
+
+def test_bad_sizes():
+    with pytest.raises(ValueError):
+        PtyPool(min_size=2, max_size=1)
+
+
+def test_release_rejects_sessions_not_leased():
+    async def main():
+        async with PtyPool(max_size=1) as pool:
+            pty = await pool.acquire()
+            await pool.release(pty)
+            with pytest.raises(ValueError):
+                await pool.release(pty)  # 後始末中の二重返却
+            await _settled(pool)
+            with pytest.raises(ValueError):
+                await pool.release(pty)  # アイドルに戻った後の二重返却
+            async with AsyncConPTY() as foreign:
+                with pytest.raises(ValueError):
+                    await pool.release(foreign)
+            return pool.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["idle"], stats["leased"], stats["size"]) == (1, 0, 1)
+
+
+def test_failed_warm_up_is_reported():
+    def factory(cols, rows):
+        raise OSError("no pty")
+
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        async with PtyPool(min_size=2, max_size=2, factory=factory) as pool:
+            return errors, pool.size
+
+    errors, size = asyncio.run(main())
+    assert [type(context["exception"]) for context in errors] == [OSError, OSError]
+    assert size == 0
+
+
+def test_reset_keeps_input_mode_tracking():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            modes = pty.track_input_modes()
+            proc = await pty.spawn(_py("import sys; sys.stdout.write('\\x1b[?2004hok\\n')"))
+            await _until(pty, b"ok")
+            await proc.wait()
+            pty.reset()
+            assert pty.track_input_modes() is modes
+            assert modes.bracketed_paste
+            # リセット後の出力も追跡し続ける
+            await pty.spawn(_py("import sys; sys.stdout.write('\\x1b[?2004lok\\n')"))
+            await _until(pty, b"ok")
+            return modes
+
+    assert asyncio.run(main()).is_default
+
+
+def test_discard_output():
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            proc = await pty.spawn(_py("print('x' * 100)"))
+            await proc.wait()
+            await asyncio.sleep(0.1)
+            return pty.discard_output()
+
+    assert asyncio.run(main()) >= 100
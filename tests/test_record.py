@@ -0,0 +1,96 @@
+"""Tests for :mod:`aioconpty.record` (asciicast recording and replay)."""
+
+import asyncio
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.record import AsciicastRecorder, ReplayBackend, load_asciicast, open_replay
+
+CHILD = "import sys; print('héllo', sys.stdin.readline().strip())"
+
+
+async def _read_all(pty) -> bytes:
+    data = b""
+    while chunk := await pty.read(4096):
+        data += chunk
+    return data
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "session.cast")
+
+    async def record():
+        async with AsyncConPTY(40, 10) as pty:
+            recorder = await pty.record(path, record_input=True, title="t")
+            proc = await pty.spawn([sys.executable, "-c", CHILD])
+            await pty.write("in\r")
+            out = b""
+            while "héllo in".encode() not in out:
+                out += await asyncio.wait_for(pty.read(4096), 10)
+            await proc.wait()
+            pty.resize(50, 12)
+            recorder.marker("done")
+            await recorder.close()
+            return out
+
+    async def replay():
+        async with open_replay(path) as pty:
+            screen = pty.attach_screen()
+            data = await _read_all(pty)
+            return data, pty.size, screen.display
+
+    live = asyncio.run(record())
+    header, events = load_asciicast(path)
+    assert (header["version"], header["width"], header["height"], header["title"]) == (2, 40, 10, "t")
+    assert [data for _, code, data in events if code == "i"] == ["in\r"]
+    assert ("r", "50x12") in [(code, data) for _, code, data in events]
+    assert events[-1][1:] == ("m", "done")
+    times = [t for t, _, _ in events]
+    assert times == sorted(times)
+    recorded = "".join(data for _, code, data in events if code == "o").encode()
+    assert recorded.startswith(live)
+
+    data, size, display = asyncio.run(replay())
+    assert data == recorded
+    assert size == (50, 12)
+    assert "héllo in" in display
+
+
+def test_replay_in_memory_with_speed():
+    source = ({"version": 2, "width": 20, "height": 5}, [(0.0, "o", "abc"), (0.05, "o", "déf")])
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with AsyncConPTY(backend=ReplayBackend(source, speed=1.0)) as pty:
+            t0 = loop.time()
+            data = await _read_all(pty)
+            return data, pty.size, loop.time() - t0
+
+    data, size, elapsed = asyncio.run(main())
+    assert data == "abcdéf".encode()
+    assert size == (20, 5)
+    assert elapsed >= 0.04
+
+
+def test_recorder_to_file_object(tmp_path):
+    path = tmp_path / "out.cast"
+
+    async def main():
+        with open(path, "w", encoding="utf-8") as f:
+            async with AsciicastRecorder(f, 80, 24) as recorder:
+                recorder.output("é".encode()[:1])
+                recorder.output("é".encode()[1:] + b"!")
+            assert not f.closed
+
+    asyncio.run(main())
+    _, events = load_asciicast(path)
+    assert "".join(data for _, _, data in events) == "é!"
+
+
+def test_load_rejects_other_versions(tmp_path):
+    path = tmp_path / "v1.cast"
+    path.write_text('{"version": 1}\n')
+    with pytest.raises(ValueError):
+        load_asciicast(path)
@@ -0,0 +1,151 @@
+"""Tests for :mod:`aioconpty.ringbuffer`."""
+
+import asyncio
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.ringbuffer import RingBufferReader
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_read_helpers_across_wraparound():
+    async def main():
+        reader = RingBufferReader(8)
+        reader.feed_data(b"hello\nwor")
+        reader.feed_data(b"ld\n")
+        assert await reader.readline() == b"hello\n"
+        assert await reader.readexactly(3) == b"wor"
+        assert len(reader) == 3
+        reader.feed_eof()
+        assert await reader.read() == b"ld\n"
+        assert await reader.read() == b""
+        assert reader.at_eof()
+    _run(main())
+
+
+def test_readinto_and_clear():
+    async def main():
+        reader = RingBufferReader(16)
+        reader.feed_data(b"abcdef")
+        buf = bytearray(4)
+        assert await reader.readinto(buf) == 4
+        assert buf == b"abcd"
+        assert reader.clear() == 2
+        assert len(reader) == 0
+    _run(main())
+
+
+def test_readexactly_incomplete_at_eof():
+    async def main():
+        reader = RingBufferReader(16)
+        reader.feed_data(b"ab")
+        reader.feed_eof()
+        with pytest.raises(asyncio.IncompleteReadError):
+            await reader.readexactly(3)
+    _run(main())
+
+
+def test_bad_capacity():
+    with pytest.raises(ValueError):
+        RingBufferReader(0)
+
+
+def test_readinto_through_the_pty():
+    async def main():
+        async with AsyncConPTY(80, 24, ring_buffer=4096) as pty:
+            proc = await pty.spawn([sys.executable, "-c", "print('x' * 10000)"])
+            buf = bytearray(1000)
+            out = b""
+            while out.count(b"x") < 10000:
+                n = await asyncio.wait_for(pty.readinto(buf), 10)
+                assert n
+                out += buf[:n]
+            await proc.wait()
+            return out
+
+    assert asyncio.run(main()).count(b"x") == 10000
+
+
+def test_output_sink_receives_chunks_instead_of_reader():
+    class Sink:
+        def __init__(self):
+            self.data = b""
+            self.eof = asyncio.get_running_loop().create_future()
+
+        def data_received(self, data):
+            self.data += data
+
+        def eof_received(self):
+            if not self.eof.done():
+                self.eof.set_result(None)
+
+    async def main():
+        async with AsyncConPTY(80, 24) as pty:
+            sink = Sink()
+            pty.set_output_sink(sink)
+            proc = await pty.spawn([sys.executable, "-c", "print('to the sink')"])
+            await proc.wait()
+            await pty.hangup()
+            await asyncio.wait_for(sink.eof, 10)
+            return sink.data, pty.discard_output()
+
+    data, buffered = asyncio.run(main())
+    assert b"to the sink" in data
+    assert buffered == 0
+
+
+def test_drop_oldest_keeps_newest_bytes():
+    async def main():
+        reader = RingBufferReader(8, overflow="drop_oldest")
+        reader.feed_data(b"0123456789ab")
+        reader.feed_eof()
+        assert await reader.read() == b"456789ab"
+        assert reader.stats()["bytes_dropped"] == 4
+    _run(main())
+
+
+@pytest.mark.parametrize("overflow", ["block", "spill"])
+def test_lossless_policies_keep_everything(overflow, tmp_path):
+    async def main():
+        reader = RingBufferReader(8, overflow=overflow, spill_dir=str(tmp_path))
+        reader.feed_data(b"x" * 20)
+        reader.feed_data(b"y" * 5)
+        reader.feed_eof()
+        out = b""
+        while data := await reader.read():
+            out += data
+        reader.close()
+        return out, reader.stats()
+
+    out, stats = _run(main())
+    assert out == b"x" * 20 + b"y" * 5
+    assert stats["bytes_dropped"] == 0
+    if overflow == "spill":
+        assert stats["bytes_spilled"] > 0
+
+
+def test_bad_overflow_policy():
+    with pytest.raises(ValueError):
+        RingBufferReader(8, overflow="nope")
+
+
+def test_pty_overflow_policy_drops_when_reader_lags():
+    async def main():
+        async with AsyncConPTY(80, 24, ring_buffer=1024, overflow="drop_oldest") as pty:
+            proc = await pty.spawn([sys.executable, "-c", "print('x' * 100000 + 'END')"])
+            await proc.wait()
+            out = b""
+            while b"END" not in out:
+                out += await asyncio.wait_for(pty.read(4096), 10)
+            return out, pty.output_stats()
+
+    out, stats = asyncio.run(main())
+    assert stats["overflow"] == "drop_oldest"
+    assert stats["bytes_dropped"] > 0
+    assert len(out) <= 1024 + 4096
+
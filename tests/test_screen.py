@@ -0,0 +1,67 @@
+"""Tests for :mod:`aioconpty.screen`."""
+
+from aioconpty.screen import DEFAULT_STYLE, Screen, apply_sgr
+
+
+def test_text_cursor_and_styles():
+    screen = Screen(10, 3)
+    screen.feed(b"hello\r\nwor\x1b[1mld\x1b[0m\x1b[3;2HX")
+    assert screen.display == ["hello", "world", " X"]
+    assert (screen.x, screen.y) == (2, 2)
+    runs = screen.style_runs(1)
+    assert [(start, end) for start, end, _ in runs] == [(0, 3), (3, 5), (5, 10)]
+    assert screen.style(runs[1][2]) == apply_sgr(DEFAULT_STYLE, (1,))
+
+
+def test_autowrap_and_scroll():
+    screen = Screen(4, 2)
+    screen.feed(b"abcdef")
+    assert screen.display == ["abcd", "ef"]
+    screen = Screen(4, 2)
+    screen.feed(b"a\r\nb\r\nc")
+    assert screen.display == ["b", "c"]
+    assert screen.lines_scrolled == 1
+
+
+def test_wide_characters_wrap_as_a_whole():
+    screen = Screen(4, 2)
+    screen.feed("あいう".encode())
+    assert screen.display == ["あい", "う"]
+
+
+def test_wide_character_on_one_column_screen_does_not_hang():
+    screen = Screen(1, 3)
+    screen.feed("あい".encode())
+    assert screen.display == ["あ", "い", ""]
+
+
+def test_utf8_split_across_chunks():
+    screen = Screen(5, 2)
+    data = "é".encode()
+    screen.feed(data[:1])
+    screen.feed(data[1:])
+    assert screen.display == ["é", ""]
+
+
+def test_title_and_resize():
+    screen = Screen(5, 2)
+    screen.feed(b"\x1b]0;hi\x07abc")
+    assert screen.title == "hi"
+    screen.resize(3, 2)
+    assert (screen.cols, screen.rows) == (3, 2)
+    assert screen.display == ["abc", ""]
+
+
+def test_dirty_lines():
+    screen = Screen(5, 3)
+    screen.take_dirty()
+    screen.feed(b"\x1b[2;1Hxy")
+    assert screen.dirty_lines() == {1: "xy"}
+    assert screen.dirty_lines() == {}
+
+
+def test_apply_sgr():
+    assert apply_sgr(DEFAULT_STYLE, (0,)) == DEFAULT_STYLE
+    bold_red = apply_sgr(DEFAULT_STYLE, (1, 31))
+    assert bold_red != DEFAULT_STYLE
+    assert apply_sgr(bold_red, (0,)) == DEFAULT_STYLE
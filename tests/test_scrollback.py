@@ -0,0 +1,46 @@
+"""Tests for :mod:`aioconpty.scrollback`."""
+
+import os
+import re
+
+import pytest
+
+from aioconpty.scrollback import Scrollback
+
+
+def test_lines_styles_and_search(tmp_path):
+    sb = Scrollback(str(tmp_path), segment_size=1 << 17)
+    try:
+        sb.feed(b"line0\r\n\x1b[31mred\x1b[0m line1\r\nprogress 1\rprogress 2\r\npart")
+        assert (sb.first_line, sb.next_line) == (0, 3)
+        assert list(sb.lines()) == ["line0", "red line1", "progress 2"]
+        assert sb.partial == "part"
+        assert [n for n, _ in sb.line_styles(1)] == [3, 6]
+        assert list(sb.search(re.compile(rb"line\d"))) == [(0, "line0"), (1, "red line1")]
+    finally:
+        sb.close()
+
+
+def test_retention_drops_old_segments(tmp_path):
+    sb = Scrollback(str(tmp_path), segment_size=1 << 17, max_bytes=1 << 17)
+    for i in range(10000):
+        sb.feed(b"%05d " % i + b"x" * 44 + b"\r\n")
+    sb.flush()
+    stats = sb.stats()
+    assert stats["segments_dropped"] > 0
+    assert sb.first_line == stats["lines_dropped"] > 0
+    assert sb.line(sb.first_line).startswith("%05d" % sb.first_line)
+    assert sb.line(sb.next_line - 1).startswith("09999")
+    with pytest.raises(IndexError):
+        sb.line(0)
+    sb.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_own_directory_is_removed():
+    sb = Scrollback(segment_size=1 << 17)
+    sb.feed(b"a\r\n")
+    directory = sb.directory
+    sb.close()
+    assert sb.closed
+    assert not os.path.exists(directory)
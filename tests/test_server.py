@@ -0,0 +1,153 @@
+"""Tests for :mod:`aioconpty.server` (frame and WebSocket codecs, end-to-end relay)."""
+
+import asyncio
+import os
+import struct
+import sys
+
+import pytest
+
+from aioconpty import AsyncConPTY
+from aioconpty.server import (FRAME_EXIT, FRAME_INPUT, FRAME_OUTPUT, FRAME_RESIZE, FrameDecoder,
+                              FrameError, PtyClient, PtyServer, _WebSocketDecoder, _ws_header,
+                              _ws_mask, connect, encode_frame)
+
+
+def test_frame_round_trip_byte_by_byte():
+    frames = [(FRAME_OUTPUT, b"hello"), (FRAME_INPUT, b""), (FRAME_RESIZE, struct.pack(">HH", 100, 40)),
+              (FRAME_EXIT, struct.pack(">i", -1)), (FRAME_OUTPUT, os.urandom(70000))]
+    data = b"".join(encode_frame(kind, payload) for kind, payload in frames)
+    decoder = FrameDecoder()
+    got = []
+    for i in range(0, len(data), 7):
+        got += decoder.feed(data[i:i + 7])
+    assert got == frames
+
+
+def test_frame_too_large():
+    decoder = FrameDecoder(max_frame=16)
+    with pytest.raises(FrameError):
+        decoder.feed(encode_frame(FRAME_OUTPUT, b"x" * 17))
+
+
+def _ws_frame(opcode, payload, *, fin=True, mask=None):
+    head = bytearray(_ws_header(opcode, len(payload), mask))
+    if not fin:
+        head[0] &= 0x7F
+    return bytes(head) + (_ws_mask(payload, mask) if mask else payload)
+
+
+@pytest.mark.parametrize("size", [0, 125, 126, 65535, 65536])
+def test_websocket_round_trip(size):
+    payload = os.urandom(size)
+    decoder = _WebSocketDecoder()
+    data = _ws_frame(0x2, payload, mask=b"\x01\x02\x03\x04") + _ws_frame(0x2, payload)
+    got = []
+    for i in range(0, len(data), 1000):
+        got += decoder.feed(data[i:i + 1000])
+    assert got == [(0x2, payload), (0x2, payload)]
+
+
+def test_websocket_fragments_and_interleaved_control():
+    decoder = _WebSocketDecoder()
+    data = (_ws_frame(0x1, b"hel", fin=False) + _ws_frame(0x9, b"ping")
+            + _ws_frame(0x0, b"lo", fin=False) + _ws_frame(0x0, b"!"))
+    assert decoder.feed(data) == [(0x9, b"ping"), (0x1, b"hello!")]
+
+
+def test_websocket_fragment_total_is_limited():
+    decoder = _WebSocketDecoder(max_message=8)
+    decoder.feed(_ws_frame(0x2, b"12345", fin=False))
+    with pytest.raises(FrameError):
+        decoder.feed(_ws_frame(0x0, b"67890", fin=False))
+
+
+def test_websocket_protocol_errors():
+    with pytest.raises(FrameError):
+        _WebSocketDecoder().feed(_ws_frame(0x0, b"orphan"))
+    decoder = _WebSocketDecoder()
+    decoder.feed(_ws_frame(0x2, b"a", fin=False))
+    with pytest.raises(FrameError):
+        decoder.feed(_ws_frame(0x2, b"b"))
+
+
+CHILD = r"""
+import os, sys
+print("size", *os.get_terminal_size(1), flush=True)
+print("echo", sys.stdin.readline().strip())
+sys.exit(3)
+"""
+
+
+@pytest.mark.parametrize("websocket", [False, True])
+def test_relay_end_to_end(websocket):
+    async def main():
+        async with PtyServer([sys.executable, "-c", CHILD], cols=100, rows=40) as server:
+            await server.start("127.0.0.1", 0, websocket=websocket)
+            port = server.sockets[0].getsockname()[1]
+            client = await connect("127.0.0.1", port, websocket=websocket)
+            out = b""
+            while b"size" not in out or b"\n" not in out.split(b"size", 1)[1]:
+                out += await asyncio.wait_for(client.read(), 10)
+            client.write(b"ping\r")
+            async for data in client:
+                out += data
+            code = await asyncio.wait_for(client.wait(), 10)
+            client.close()
+            return out, code
+
+    out, code = asyncio.run(main())
+    assert b"size 100 40" in out
+    assert b"echo ping" in out
+    assert code == 3
+
+
+class _Transport:
+    def __init__(self):
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+HELLO = encode_frame(0, struct.pack(">BBHH", 1, 0, 80, 24))
+HELLO_ZLIB = encode_frame(0, struct.pack(">BBHH", 1, 1, 80, 24))
+
+
+@pytest.mark.parametrize("data", [
+    HELLO + encode_frame(FRAME_RESIZE, b"\x00\x50"),
+    HELLO + encode_frame(FRAME_EXIT, b""),
+    HELLO_ZLIB + b"not a zlib stream",
+])
+def test_client_rejects_malformed_frames(data):
+    async def main():
+        client = PtyClient()
+        transport = _Transport()
+        client.connection_made(transport)
+        client.data_received(data)
+        return transport.aborted, client.returncode
+
+    assert asyncio.run(main()) == (True, None)
+
+
+class _StuckPty(AsyncConPTY):
+    async def open(self):
+        await asyncio.sleep(30)  # 応答しなくなった擬似端末の代わり
+
+
+def test_close_cancels_sessions_that_outlive_the_timeout():
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = PtyServer([sys.executable, "-c", "pass"], factory=lambda cols, rows: _StuckPty(cols, rows))
+        await server.start("127.0.0.1", 0)
+        _, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        while not server._tasks:
+            await asyncio.sleep(0.01)
+        t0 = loop.time()
+        await server.close(timeout=0.2)
+        writer.close()
+        return loop.time() - t0, server.stats()
+
+    elapsed, stats = asyncio.run(main())
+    assert elapsed < 5
+    assert stats["sessions_finished"] == 1
@@ -0,0 +1,66 @@
+"""Tests for :mod:`aioconpty.sessionlog`."""
+
+import asyncio
+import gzip
+import os
+import zlib
+
+import pytest
+
+from aioconpty.sessionlog import SessionLog
+
+
+def _write(log, chunks):
+    async def main():
+        async with log:
+            for chunk in chunks:
+                log.feed(chunk)
+    asyncio.run(main())
+
+
+def _chunks():
+    return [os.urandom(300).hex().encode() for _ in range(50)]
+
+
+def test_gzip_round_trip(tmp_path):
+    chunks = _chunks()
+    log = SessionLog(tmp_path / "s.log", block_size=1024, flush_interval=None)
+    _write(log, chunks)
+    assert [os.path.basename(f) for f in log.files] == ["s.log.0001.gz"]
+    with gzip.open(log.files[0]) as f:
+        assert f.read() == b"".join(chunks)
+    assert log.stats()["bytes_in"] == sum(map(len, chunks))
+
+
+def test_zlib_round_trip(tmp_path):
+    chunks = _chunks()
+    log = SessionLog(tmp_path / "s-{n}.log", compression="zlib", flush_interval=None)
+    _write(log, chunks)
+    with open(log.files[0], "rb") as f:
+        assert zlib.decompress(f.read()) == b"".join(chunks)
+
+
+def test_rotation_within_one_second_never_overwrites(tmp_path):
+    chunks = _chunks()
+    log = SessionLog(tmp_path / "s-{time}.log", compression=None, block_size=1024,
+                     max_bytes=2000, flush_interval=None)
+    _write(log, chunks)
+    assert len(log.files) == len(set(log.files)) > 1
+    data = b""
+    for path in log.files:
+        with open(path, "rb") as f:
+            data += f.read()
+    assert data == b"".join(chunks)
+
+
+def test_existing_file_is_skipped(tmp_path):
+    (tmp_path / "s.log.0001").write_bytes(b"previous run")
+    log = SessionLog(tmp_path / "s.log", compression=None)
+    _write(log, [b"new"])
+    assert [os.path.basename(f) for f in log.files] == ["s.log.0002"]
+    assert (tmp_path / "s.log.0001").read_bytes() == b"previous run"
+
+
+def test_bad_compression():
+    with pytest.raises(ValueError):
+        SessionLog("x.log", compression="lz4")
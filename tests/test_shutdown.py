@@ -0,0 +1,49 @@
+"""Tests for :func:`aioconpty.close_all`."""
+
+import asyncio
+import sys
+
+from aioconpty import AsyncConPTY, close_all
+
+
+def test_close_all_kills_running_children():
+    async def main():
+        sessions = [AsyncConPTY(80, 24) for _ in range(3)]
+        for pty in sessions:
+            await pty.open()
+        await sessions[0].spawn([sys.executable, "-c", "import time; time.sleep(30)"])
+        proc = await sessions[1].spawn([sys.executable, "-c", "pass"])
+        await proc.wait()
+        results = await close_all(sessions, timeout=5.0, grace=0.1)
+        return sessions, results
+
+    sessions, results = asyncio.run(main())
+    assert [r.session for r in results] == sessions
+    assert [r.status for r in results] == ["killed", "closed", "closed"]
+    assert results[0].killed == 1
+    assert all(r.ok for r in results)
+    assert all(pty.closed for pty in sessions)
+
+
+def test_close_all_bounds_a_hanging_backend_close():
+    async def main():
+        released = asyncio.Event()
+
+        async def slow_close():
+            await asyncio.sleep(0.5)  # 戻らない ClosePseudoConsole の代わり
+            await close_async()
+            released.set()
+
+        async with AsyncConPTY(80, 24) as pty:
+            close_async = pty._backend.close_async
+            pty._backend.close_async = slow_close
+            results = await close_all([pty], timeout=0.1)
+            closed = pty.closed
+        await asyncio.wait_for(released.wait(), 5)  # 解放はバックグラウンドで続く
+        return results[0], closed
+
+    result, closed = asyncio.run(main())
+    assert result.status == "timeout"
+    assert not result.ok
+    assert result.duration < 0.4
+    assert closed
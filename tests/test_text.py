@@ -0,0 +1,28 @@
+"""Tests for :mod:`aioconpty.text`."""
+
+from aioconpty.text import EscapeStripper, LineSplitter, strip_escapes
+
+
+def test_line_splitter_joins_chunks():
+    splitter = LineSplitter()
+    assert splitter.feed(b"a\r") == []
+    assert splitter.feed(b"\nb\xe3\x81") == ["a"]
+    assert splitter.feed(b"\x82\nc") == ["bあ"]
+    assert splitter.flush() == ["c"]
+
+
+def test_line_splitter_collapse_cr():
+    splitter = LineSplitter(collapse_cr=True)
+    assert splitter.feed(b"10%\r20%\r100%\n") == ["100%"]
+
+
+def test_strip_escapes():
+    assert strip_escapes(b"\x1b[1mbold\x1b[0m\r\n\x1b]0;t\x07x\ty") == b"bold\nx\ty"
+
+
+def test_escape_stripper_holds_split_sequences():
+    stripper = EscapeStripper()
+    assert stripper.feed(b"a\x1b[") == b"a"
+    assert stripper.feed(b"31mb\x1b]0;ti") == b"b"
+    assert stripper.feed(b"tle\x07c") == b"c"
+    assert stripper.flush() == b""
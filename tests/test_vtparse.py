@@ -0,0 +1,63 @@
+"""Tests for :mod:`aioconpty.vtparse`."""
+
+from aioconpty.vtparse import (EV_CSI, EV_ESC, EV_EXECUTE, EV_OSC, EV_PRINT, EV_STRING,
+                               VTParser)
+
+
+def test_print_execute_and_sequences():
+    events = VTParser().feed(b"ab\x1b[1;31mc\r\n\x1b]0;title\x07\x1b(B\x1bP1$r\x1b\\")
+    assert events == [
+        (EV_PRINT, b"ab"),
+        (EV_CSI, (1, 31), b"", "m", ""),
+        (EV_PRINT, b"c"),
+        (EV_EXECUTE, 13),
+        (EV_EXECUTE, 10),
+        (EV_OSC, b"0;title"),
+        (EV_ESC, b"(", "B"),
+        (EV_STRING, "P", b"1$r"),
+    ]
+
+
+def test_private_and_empty_params():
+    events = VTParser().feed(b"\x1b[?1049h\x1b[;5H")
+    assert events == [(EV_CSI, (1049,), b"", "h", "?"), (EV_CSI, (0, 5), b"", "H", "")]
+
+
+def test_sequence_split_across_chunks():
+    parser = VTParser()
+    assert parser.feed(b"x\x1b[3") == [(EV_PRINT, b"x")]
+    assert parser.feed(b"8;5;1m") == [(EV_CSI, (38, 5, 1), b"", "m", "")]
+
+
+def test_split_at_every_byte_matches_whole_feed():
+    data = b"\x1b[1mbold\x1b[0m\r\n\x1b]2;t\x1b\\\x1b[?25l\x1b7\x1b8done"
+    whole = VTParser().feed(data)
+    parser = VTParser()
+    pieces = []
+    for i in range(len(data)):
+        pieces += parser.feed(data[i:i + 1])
+    # 1 バイトずつだと PRINT が文字ごとに分かれるので繋いで比べる
+    assert _join_prints(pieces) == _join_prints(whole)
+
+
+def test_osc_split_inside_payload():
+    parser = VTParser()
+    assert parser.feed(b"\x1b]0;ti") == []
+    assert parser.feed(b"tle\x07") == [(EV_OSC, b"0;title")]
+
+
+def test_reset_drops_partial_sequence():
+    parser = VTParser()
+    parser.feed(b"\x1b[12")
+    parser.reset()
+    assert parser.feed(b"3m") == [(EV_PRINT, b"3m")]
+
+
+def _join_prints(events):
+    out = []
+    for ev in events:
+        if ev[0] == EV_PRINT and out and out[-1][0] == EV_PRINT:
+            out[-1] = (EV_PRINT, out[-1][1] + ev[1])
+        else:
+            out.append(ev)
+    return out
@@ -0,0 +1,79 @@
+"""Tests for the write path of :class:`aioconpty.AsyncConPTY` (batching and coalescing)."""
+
+import asyncio
+import sys
+
+from aioconpty import AsyncConPTY
+
+# 端末を raw にして、END が届くまでに受け取ったバイト列を repr で返す
+RAW_ECHO = r"""
+import os, sys
+if os.name == "posix":
+    import tty
+    tty.setraw(0)
+sys.stdout.write("ready\n")
+sys.stdout.flush()
+data = b""
+while not data.endswith(b"END"):
+    data += os.read(0, 1024)
+sys.stdout.write(repr(data) + "\n")
+sys.stdout.flush()
+"""
+
+
+async def _until(pty, marker: bytes) -> bytes:
+    out = b""
+    while marker not in out:
+        out += await asyncio.wait_for(pty.read(4096), 10)
+    return out
+
+
+async def _echo(send, **kwargs):
+    async with AsyncConPTY(80, 24, **kwargs) as pty:
+        await pty.spawn([sys.executable, "-c", RAW_ECHO])
+        await _until(pty, b"ready")
+        transport = pty._transport_write
+        writes = []
+        original = transport.write
+
+        def counting_write(data):
+            writes.append(bytes(data))
+            original(data)
+
+        transport.write = counting_write
+        await send(pty)
+        out = await _until(pty, b"END'")
+        return out, writes
+
+
+def test_write_many_and_writelines_send_one_write():
+    async def send(pty):
+        await pty.write_many([b"a", "b", b"c"])
+        await pty.writelines(["x", "y"], newline="|")
+        await pty.write(b"END")
+
+    out, writes = asyncio.run(_echo(send))
+    assert repr(b"abcx|y|END").encode() in out
+    assert writes == [b"abc", b"x|y|", b"END"]
+
+
+def test_write_coalesce_merges_small_writes():
+    async def send(pty):
+        await asyncio.gather(*(pty.write(ch) for ch in "hello"))
+        await pty.flush()
+        await pty.write(b"END")
+        await pty.flush()
+
+    out, writes = asyncio.run(_echo(send, write_coalesce=0))
+    assert repr(b"helloEND").encode() in out
+    assert writes[0] == b"hello"
+
+
+def test_write_buffer_limits():
+    async def main():
+        async with AsyncConPTY(80, 24, write_high_water=8192, write_low_water=1024) as pty:
+            limits = pty.get_write_buffer_limits()
+            pty.set_write_buffer_limits(high=4096, low=512)
+            return limits, pty.get_write_buffer_limits()
+
+    assert asyncio.run(main()) == ((1024, 8192), (512, 4096))